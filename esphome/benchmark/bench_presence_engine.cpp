@@ -0,0 +1,225 @@
+/**
+ * Host micro-benchmarks for the Bed Presence Engine per-frame path.
+ *
+ * Build and run from the esphome/ directory (Google Benchmark required):
+ *   g++ -std=c++14 -O2 -DUNIT_TEST -I custom_components/bed_presence_engine -I test/stubs \
+ *       benchmark/bench_presence_engine.cpp custom_components/bed_presence_engine/bed_presence.cpp \
+ *       custom_components/bed_presence_engine/bed_zone.cpp \
+ *       -lbenchmark -lpthread -o /tmp/bench_presence_engine && /tmp/bench_presence_engine
+ *
+ * The engine benchmarks run the real BedPresenceEngine (same sources and stubs as
+ * the unit tests). BM_EngineSteady* and BM_EngineTransitionStorm are per-frame
+ * costs in the common and worst-case states; BM_CalibrationFinalize is the one-off
+ * median/MAD pass over a full 4096-sample calibration buffer.
+ *
+ * Absolute numbers are for a desktop CPU; the ratios are what carry over to the ESP32,
+ * where float division is markedly slower than integer comparison.
+ */
+
+#include <benchmark/benchmark.h>
+
+#include "bed_presence.h"
+#include "bed_zone.h"
+#include "energy_thresholds.h"
+
+using namespace esphome::bed_presence_engine;
+
+namespace {
+
+// Whole-percent LD2410 energies hovering around the ON threshold
+constexpr int FRAME_COUNT = 256;
+
+void fill_frames(float *frames) {
+  uint32_t seed = 12345;
+  for (int i = 0; i < FRAME_COUNT; ++i) {
+    seed = seed * 1103515245u + 12345u;
+    frames[i] = static_cast<float>((seed >> 16) % 60);
+  }
+}
+
+// Phase 2 per-frame work before fixed-point thresholds: guarded z-score, then compares
+void BM_FloatZThresholds(benchmark::State &state) {
+  float frames[FRAME_COUNT];
+  fill_frames(frames);
+  float mu = 6.7f, sigma = 3.5f, k_on = 9.0f, k_off = 4.0f;
+  benchmark::DoNotOptimize(frames);
+  int i = 0;
+  for (auto _ : state) {
+    float energy = frames[i++ & (FRAME_COUNT - 1)];
+    benchmark::DoNotOptimize(mu);
+    benchmark::DoNotOptimize(sigma);
+    float z = sigma <= 0.001f ? 0.0f : (energy - mu) / sigma;
+    bool on = z >= k_on;
+    bool strict = z > k_on;
+    bool off = z < k_off;
+    benchmark::DoNotOptimize(on);
+    benchmark::DoNotOptimize(strict);
+    benchmark::DoNotOptimize(off);
+  }
+}
+BENCHMARK(BM_FloatZThresholds);
+
+void BM_FixedPointThresholds(benchmark::State &state) {
+  float frames[FRAME_COUNT];
+  fill_frames(frames);
+  EnergyThresholds thresholds = compute_energy_thresholds(6.7f, 3.5f, 9.0f, 4.0f);
+  benchmark::DoNotOptimize(frames);
+  int i = 0;
+  for (auto _ : state) {
+    float energy = frames[i++ & (FRAME_COUNT - 1)];
+    benchmark::DoNotOptimize(thresholds);
+    int32_t energy_q = energy_to_q8(energy);
+    bool on = energy_q >= thresholds.on;
+    bool strict = energy_q > thresholds.on_strict;
+    bool off = energy_q < thresholds.off;
+    benchmark::DoNotOptimize(on);
+    benchmark::DoNotOptimize(strict);
+    benchmark::DoNotOptimize(off);
+  }
+}
+BENCHMARK(BM_FixedPointThresholds);
+
+// One full frame through the engine: sensor callback, loop(), state machine
+void BM_EngineFrame(benchmark::State &state) {
+  float frames[FRAME_COUNT];
+  fill_frames(frames);
+  esphome::sensor::Sensor energy;
+  BedPresenceEngine engine;
+  engine.set_energy_sensor(&energy);
+  esphome::set_millis(0);
+  engine.setup();
+  int i = 0;
+  for (auto _ : state) {
+    esphome::advance_millis(100);
+    energy.publish_state(frames[i++ & (FRAME_COUNT - 1)]);
+    engine.loop();
+  }
+}
+BENCHMARK(BM_EngineFrame);
+
+// Engine frame with N side-by-side 50cm zones; frames land in one zone at a time
+void BM_EngineFrameZones(benchmark::State &state) {
+  float frames[FRAME_COUNT];
+  fill_frames(frames);
+  esphome::sensor::Sensor energy;
+  esphome::sensor::Sensor distance;
+  BedPresenceEngine engine;
+  BedZone zones[MAX_ZONES];
+  engine.set_energy_sensor(&energy);
+  engine.set_distance_sensor(&distance);
+  int zone_count = state.range(0);
+  for (int i = 0; i < zone_count; ++i) {
+    zones[i].set_d_min_cm(i * 50.0f);
+    zones[i].set_d_max_cm(i * 50.0f + 49.0f);
+    engine.add_zone(&zones[i]);
+  }
+  esphome::set_millis(0);
+  engine.setup();
+  int i = 0;
+  for (auto _ : state) {
+    esphome::advance_millis(100);
+    distance.publish_state(static_cast<float>((i * 37) % (zone_count * 50)));
+    energy.publish_state(frames[i++ & (FRAME_COUNT - 1)]);
+    engine.loop();
+  }
+}
+BENCHMARK(BM_EngineFrameZones)->Arg(1)->Arg(2)->Arg(4)->Arg(8);
+
+// Publishes `frames` frames of the given energy, 100ms apart
+void feed(BedPresenceEngine &engine, esphome::sensor::Sensor &energy, float value, int frames) {
+  for (int i = 0; i < frames; ++i) {
+    esphome::advance_millis(100);
+    energy.publish_state(value);
+    engine.loop();
+  }
+}
+
+// Steady empty bed: every frame stays in IDLE
+void BM_EngineSteadyIdle(benchmark::State &state) {
+  esphome::sensor::Sensor energy;
+  BedPresenceEngine engine;
+  engine.set_energy_sensor(&energy);
+  esphome::set_millis(0);
+  engine.setup();
+  int i = 0;
+  for (auto _ : state) {
+    esphome::advance_millis(100);
+    energy.publish_state(static_cast<float>(4 + (i++ & 7)));  // 4-11%, z < k_on
+    engine.loop();
+  }
+}
+BENCHMARK(BM_EngineSteadyIdle);
+
+// Steady occupied bed: every frame refreshes the high-confidence time in PRESENT
+void BM_EngineSteadyPresent(benchmark::State &state) {
+  esphome::sensor::Sensor energy;
+  BedPresenceEngine engine;
+  engine.set_energy_sensor(&energy);
+  esphome::set_millis(0);
+  engine.setup();
+  feed(engine, energy, 64.0f, 40);
+  if (!engine.state) {
+    state.SkipWithError("engine did not turn ON");
+    return;
+  }
+  int i = 0;
+  for (auto _ : state) {
+    esphome::advance_millis(100);
+    energy.publish_state(static_cast<float>(60 + (i++ & 7)));  // 60-67%, z > k_on
+    engine.loop();
+  }
+}
+BENCHMARK(BM_EngineSteadyPresent);
+
+// Worst case: 100ms debounces and no clear hold, with the energy flipping every two
+// frames, so every other frame is an ON or OFF publish (reasons, frame log, counters)
+void BM_EngineTransitionStorm(benchmark::State &state) {
+  esphome::sensor::Sensor energy;
+  BedPresenceEngine engine;
+  engine.set_energy_sensor(&energy);
+  engine.set_on_debounce_ms(100);
+  engine.set_off_debounce_ms(100);
+  engine.set_abs_clear_delay_ms(0);
+  esphome::set_millis(0);
+  engine.setup();
+  int i = 0;
+  int transitions = 0;
+  bool last = false;
+  for (auto _ : state) {
+    esphome::advance_millis(100);
+    energy.publish_state((i++ & 2) != 0 ? 64.0f : 6.0f);
+    engine.loop();
+    transitions += engine.state != last;
+    last = engine.state;
+  }
+  state.counters["transitions/frame"] =
+      benchmark::Counter(transitions, benchmark::Counter::kAvgIterations);
+}
+BENCHMARK(BM_EngineTransitionStorm);
+
+// Median + MAD over a full calibration buffer; filling the buffer is not timed
+void BM_CalibrationFinalize(benchmark::State &state) {
+  esphome::sensor::Sensor energy;
+  BedPresenceEngine engine;
+  engine.set_energy_sensor(&energy);
+  esphome::set_millis(0);
+  engine.setup();
+  float frames[FRAME_COUNT];
+  fill_frames(frames);
+  for (auto _ : state) {
+    state.PauseTiming();
+    engine.start_baseline_calibration(600);
+    for (int i = 0; i < 4096; ++i) {
+      esphome::advance_millis(100);
+      energy.publish_state(frames[i & (FRAME_COUNT - 1)] / 6.0f);  // 0-9%, empty-bed noise
+      engine.loop();
+    }
+    state.ResumeTiming();
+    engine.stop_baseline_calibration();
+  }
+}
+BENCHMARK(BM_CalibrationFinalize)->Unit(benchmark::kMicrosecond);
+
+}  // namespace
+
+BENCHMARK_MAIN();
@@ -0,0 +1,48 @@
+#!/bin/bash
+
+# Compare the engine's diagnostics_level builds on the host
+#
+# For each level (lean, basic, full) this compiles the engine with the same flags
+# ESPHome uses for size (-Os, one section per function) and reports the object
+# sizes, then runs the per-frame benchmarks built at that level. Run from anywhere;
+# requires g++, binutils and Google Benchmark.
+#
+# Host numbers give the relative cost of each level. For the on-device firmware
+# size, set diagnostics_level in the YAML and compare the RAM/Flash summary that
+# `esphome compile` prints at the end of the build.
+
+set -e  # Exit on error
+set -u  # Exit on undefined variable
+
+ESPHOME_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+COMPONENT="$ESPHOME_DIR/custom_components/bed_presence_engine"
+BUILD_DIR="$(mktemp -d)"
+trap 'rm -rf "$BUILD_DIR"' EXIT
+
+FLAGS=(-std=c++14 -DUNIT_TEST -I "$COMPONENT" -I "$ESPHOME_DIR/test/stubs")
+LEVELS=("0:lean" "1:basic" "2:full")
+
+printf "%-6s %10s %10s %10s\n" "level" "text" "data" "bss"
+for entry in "${LEVELS[@]}"; do
+    level="${entry%%:*}"
+    name="${entry##*:}"
+    objects=()
+    for source in "$COMPONENT"/bed_presence.cpp "$COMPONENT"/bed_zone.cpp; do
+        object="$BUILD_DIR/$name-$(basename "$source" .cpp).o"
+        g++ "${FLAGS[@]}" -Os -ffunction-sections -fdata-sections \
+            -DBED_PRESENCE_DIAGNOSTICS_LEVEL="$level" -c "$source" -o "$object"
+        objects+=("$object")
+    done
+    size --totals "${objects[@]}" | awk -v name="$name" 'END { printf "%-6s %10s %10s %10s\n", name, $1, $2, $3 }'
+done
+
+for entry in "${LEVELS[@]}"; do
+    level="${entry%%:*}"
+    name="${entry##*:}"
+    echo ""
+    echo "== $name =="
+    g++ "${FLAGS[@]}" -O2 -DBED_PRESENCE_DIAGNOSTICS_LEVEL="$level" \
+        "$ESPHOME_DIR/benchmark/bench_presence_engine.cpp" "$COMPONENT"/*.cpp \
+        -lbenchmark -lpthread -o "$BUILD_DIR/bench-$name"
+    "$BUILD_DIR/bench-$name" --benchmark_filter='BM_EngineFrame' "$@"
+done
@@ -5,6 +5,7 @@ Implements the full three-phase presence engine:
 - Z-score calculation with runtime thresholds
 - 4-state debounced state machine
 - Phase 3 distance windowing + MAD-based calibration services
+- Optional bed zones (e.g. left/right side) sharing one LD2410 stream
 """
 import esphome.codegen as cg
 from esphome.components import binary_sensor
@@ -19,3 +20,4 @@ BedPresenceEngine = bed_presence_engine_ns.class_(
     cg.Component,
     binary_sensor.BinarySensor
 )
+BedZone = bed_presence_engine_ns.class_("BedZone", binary_sensor.BinarySensor)
@@ -1,4 +1,7 @@
 #include "bed_presence.h"
+#include "bed_zone.h"
+#include "frame_log_handler.h"
+#include "esphome/core/hal.h"
 #include "esphome/core/log.h"
 #include <algorithm>
 #include <cmath>
@@ -18,40 +21,468 @@ void BedPresenceEngine::setup() {
   ESP_LOGCONFIG(TAG, "  Distance window: [%.1fcm, %.1fcm]", this->d_min_cm_, this->d_max_cm_);
   ESP_LOGCONFIG(TAG, "  Phase 3: Distance windowing + MAD calibration enabled");
 
+  this->update_energy_thresholds();
+  this->reset_gate_baselines();
+  this->update_gate_window();
+  if (this->gate_mode_) {
+    for (uint8_t gate = 0; gate < GATE_COUNT; ++gate) {
+      if (this->gate_still_sensors_[gate] != nullptr) {
+        ESP_LOGCONFIG(TAG, "  Gate %u: weight=%.2f%s", gate, this->gate_weights_[gate],
+                      this->gate_window_weights_[gate] > 0.0f ? "" : " (outside distance window)");
+      }
+    }
+  }
+
+  this->configured_prefilter_ = this->prefilter_.get_settings();
+  if (this->prefilter_.get_mode() != PREFILTER_NONE) {
+    ESP_LOGCONFIG(TAG, "  Prefilter: %s", prefilter_mode_to_string(this->prefilter_.get_mode()));
+  }
+  if (this->detector_mode_ == DETECTOR_CUSUM) {
+    ESP_LOGCONFIG(TAG, "  Detector: CUSUM (h_on=%.1f, h_off=%.1f)", this->cusum_h_on_, this->cusum_h_off_);
+  }
+  if (this->convergence_enabled_) {
+    ESP_LOGCONFIG(TAG, "  Calibration: stops early once median/MAD converge");
+  }
+  for (uint8_t i = 0; i < this->profile_count_; ++i) {
+    ESP_LOGCONFIG(TAG, "  Profile '%s': k_on=%.2f, k_off=%.2f, window [%.1fcm, %.1fcm]", this->profiles_[i].name,
+                  this->profiles_[i].k_on, this->profiles_[i].k_off, this->profiles_[i].d_min_cm,
+                  this->profiles_[i].d_max_cm);
+  }
+  if (this->active_profile_sensor_ != nullptr) {
+    this->active_profile_sensor_->publish_state(this->get_active_profile());
+  }
+
+  if (this->zone_count_ > 0) {
+    ESP_LOGCONFIG(TAG, "  Zones: %u", this->zone_count_);
+    for (uint8_t i = 0; i < this->zone_count_; ++i) {
+      this->zones_[i]->setup(i);
+    }
+    this->rebuild_zone_windows();
+  }
+
+  if (this->frame_log_capacity_ > 0 && this->frame_log_.allocate(this->frame_log_capacity_)) {
+    ESP_LOGCONFIG(TAG, "  Frame log: %u frames (%u bytes)", this->frame_log_capacity_,
+                  static_cast<unsigned>(this->frame_log_capacity_ * sizeof(FrameRecord)));
+#ifdef USE_BED_PRESENCE_FRAME_LOG_HTTP
+    if (this->frame_log_web_server_ != nullptr) {
+      this->frame_log_web_server_->init();
+      this->frame_log_web_server_->add_handler(new FrameLogHandler(&this->frame_log_));
+    }
+#endif
+  }
+
+#ifdef USE_BED_PRESENCE_FRAME_STREAM
+  if (this->frame_stream_port_ > 0) {
+    this->frame_stream_ = new FrameStreamServer(this->frame_stream_port_, this->frame_stream_max_clients_);
+    this->frame_stream_->start();
+  }
+#endif
+
+  // Per-frame stages advance once per LD2410 frame rather than once per loop() iteration
+  if (this->energy_sensor_ != nullptr) {
+    this->energy_sensor_->add_on_state_callback([this](float) { this->frame_pending_ = true; });
+  }
+
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  this->counters_.start_window(millis());
+#endif
+  this->summary_.start(millis(), false);
+  this->telemetry_window_start_ms_ = millis();
+
   // Initialize to IDLE state
   this->current_state_ = IDLE;
   this->publish_state(false);
 
-  if (this->state_reason_sensor_ != nullptr) {
-    this->state_reason_sensor_->publish_state("Initial state: IDLE");
-  }
-  if (this->last_change_reason_sensor_ != nullptr) {
-    this->last_change_reason_sensor_->publish_state("idle:init");
-  }
+  this->publish_reason("Initial state: IDLE");
+  this->publish_change_reason(REASON_IDLE_INIT);
 }
 
 void BedPresenceEngine::loop() {
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  uint32_t start_us = micros();
+#endif
+
   if (this->calibrating_ && millis() >= this->calibration_end_time_) {
     this->finalize_calibration();
   }
 
   // Check if we have a valid energy reading
-  if (this->energy_sensor_ == nullptr || !this->energy_sensor_->has_state()) {
+  if (this->energy_sensor_ != nullptr && this->energy_sensor_->has_state()) {
+    this->new_frame_ = this->frame_pending_;
+    this->frame_pending_ = false;
+    if (this->new_frame_) {
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+      this->counters_.frames++;
+#endif
+      if (this->telemetry_enabled_) {
+        this->telemetry_.add(this->energy_sensor_->state);
+      }
+    }
+
+    bool was_occupied = this->current_state_ == PRESENT || this->current_state_ == DEBOUNCING_OFF;
+    this->process_current_frame();
+    bool occupied = this->current_state_ == PRESENT || this->current_state_ == DEBOUNCING_OFF;
+    if (occupied != was_occupied) {
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+      this->counters_.transitions++;
+#endif
+      if (this->transition_z_sensor_ != nullptr) {
+        this->transition_z_sensor_->publish_state(this->current_z_score());
+      }
+    }
+    if (this->summary_enabled_) {
+      this->update_occupancy_summary(millis(), occupied);
+    }
+
+    if (this->new_frame_) {
+      this->record_frame();
+    }
+  }
+
+  uint32_t now = millis();
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  this->counters_.record_loop(micros() - start_us);
+  if (now - this->counters_.window_start_ms >= this->diagnostics_interval_ms_) {
+    this->publish_diagnostics(now);
+  }
+#endif
+  if (this->telemetry_enabled_ && now - this->telemetry_window_start_ms_ >= this->telemetry_interval_ms_) {
+    this->publish_telemetry(now);
+  }
+  if (this->summary_enabled_ && this->summary_rollover_due(now)) {
+    this->publish_occupancy_summary();
+  }
+}
+
+void BedPresenceEngine::process_current_frame() {
+  if (this->zone_count_ > 0) {
+    this->process_zones(this->energy_sensor_->state);
+  }
+
+  // Per-gate mode falls back to the aggregate path until engineering-mode frames arrive
+  if (this->gate_mode_ && this->read_gate_frame()) {
+    this->process_gate_frame(this->energy_sensor_->state);
     return;
   }
 
   if (this->distance_sensor_ != nullptr && this->distance_sensor_->has_state()) {
     float distance = this->distance_sensor_->state;
     if (distance < this->d_min_cm_ || distance > this->d_max_cm_) {
-      ESP_LOGVV(TAG, "Ignoring frame, distance %.2fcm outside window [%.1fcm, %.1fcm]", distance, this->d_min_cm_,
-                this->d_max_cm_);
+      BED_PRESENCE_LOGVV(TAG, "Ignoring frame, distance %.2fcm outside window [%.1fcm, %.1fcm]", distance,
+                         this->d_min_cm_, this->d_max_cm_);
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+      if (this->new_frame_) {
+        this->counters_.frames_out_of_window++;
+      }
+#endif
       return;
     }
   }
 
   float energy = this->energy_sensor_->state;
   this->handle_calibration_sample(energy);
-  this->process_energy_reading(energy);
+  this->process_energy_reading(this->prefilter(energy, false));
+}
+
+void BedPresenceEngine::process_zones(float energy) {
+  // Shared per-frame work happens once; each zone is then a few integer comparisons
+  uint8_t mask = (1u << this->zone_count_) - 1;
+  if (this->distance_sensor_ != nullptr && this->distance_sensor_->has_state()) {
+    mask = this->zone_windows_.lookup(this->distance_sensor_->state);
+  }
+  this->last_zone_mask_ = mask;
+  if (mask == 0) {
+    return;
+  }
+
+  int32_t energy_q = energy_to_q8(energy);
+  unsigned long now = millis();
+  bool sample = this->calibrating_ && this->new_frame_;
+  while (mask != 0) {
+    uint8_t index = __builtin_ctz(mask);
+    mask &= mask - 1;
+    BedZone *zone = this->zones_[index];
+    zone->process_frame(energy, energy_q, now);
+    if (sample) {
+      zone->add_calibration_sample(energy);
+    }
+  }
+}
+
+void BedPresenceEngine::add_zone(BedZone *zone) {
+  if (this->zone_count_ >= MAX_ZONES) {
+    ESP_LOGW(TAG, "Ignoring zone, at most %u zones are supported", MAX_ZONES);
+    return;
+  }
+  this->zones_[this->zone_count_++] = zone;
+}
+
+void BedPresenceEngine::rebuild_zone_windows() {
+  float d_min[MAX_ZONES];
+  float d_max[MAX_ZONES];
+  for (uint8_t i = 0; i < this->zone_count_; ++i) {
+    d_min[i] = this->zones_[i]->get_d_min_cm();
+    d_max[i] = this->zones_[i]->get_d_max_cm();
+  }
+  this->zone_windows_.build(d_min, d_max, this->zone_count_);
+}
+
+void BedPresenceEngine::update_zone_window(uint8_t index, float d_min_cm, float d_max_cm) {
+  if (index >= this->zone_count_) {
+    ESP_LOGW(TAG, "Ignoring window update for unknown zone %u", index);
+    return;
+  }
+  ESP_LOGI(TAG, "Updating zone %u window: [%.1fcm, %.1fcm]", index, d_min_cm, d_max_cm);
+  this->zones_[index]->set_d_min_cm(d_min_cm);
+  this->zones_[index]->set_d_max_cm(d_max_cm);
+  this->rebuild_zone_windows();
+}
+
+void BedPresenceEngine::record_frame() {
+  bool stream = false;
+#ifdef USE_BED_PRESENCE_FRAME_STREAM
+  stream = this->frame_stream_ != nullptr;
+#endif
+  if (!stream && !this->frame_log_.is_allocated()) {
+    return;
+  }
+
+  // Occupancy can flip on a timer between frames, so compare against the last recorded frame
+  bool occupied = this->current_state_ == PRESENT || this->current_state_ == DEBOUNCING_OFF;
+  uint8_t flags = static_cast<uint8_t>(this->current_state_) & FRAME_STATE_MASK;
+  if (occupied != this->last_logged_occupied_) {
+    flags |= FRAME_FLAG_TRANSITION;
+    this->last_logged_occupied_ = occupied;
+  }
+  if (this->calibrating_) {
+    flags |= FRAME_FLAG_CALIBRATING;
+  }
+
+  float still_energy = this->energy_sensor_->state;
+  float move_energy = 0.0f;
+  if (this->moving_energy_sensor_ != nullptr && this->moving_energy_sensor_->has_state()) {
+    move_energy = this->moving_energy_sensor_->state;
+  }
+  float distance = NAN;
+  if (this->distance_sensor_ != nullptr && this->distance_sensor_->has_state()) {
+    distance = this->distance_sensor_->state;
+  }
+  unsigned long now = millis();
+
+  if (this->frame_log_.is_allocated()) {
+    bool was_frozen = this->frame_log_.is_frozen();
+    this->frame_log_.record(now, still_energy, move_energy, distance, flags, this->last_zone_mask_);
+    if (!was_frozen && this->frame_log_.is_frozen()) {
+      ESP_LOGI(TAG, "Frame log frozen after transition (%u frames)", this->frame_log_.count());
+    } else if (was_frozen && !this->frame_log_.is_frozen()) {
+      ESP_LOGI(TAG, "Frame log recording resumed automatically");
+    }
+  }
+
+#ifdef USE_BED_PRESENCE_FRAME_STREAM
+  if (stream) {
+    this->frame_stream_->accept_clients();
+    StreamFrame frame{static_cast<uint32_t>(now), this->frame_sequence_++, quantize_distance(distance),
+                      quantize_energy(still_energy), quantize_energy(move_energy), flags, this->last_zone_mask_};
+    this->frame_stream_->publish(frame);
+  }
+#endif
+}
+
+void BedPresenceEngine::publish_telemetry(uint32_t now) {
+  this->telemetry_window_start_ms_ = now;
+  if (this->telemetry_.count() == 0) {
+    return;
+  }
+  for (uint8_t stat = 0; stat < TELEMETRY_STAT_COUNT; ++stat) {
+    sensor::Sensor *target = this->telemetry_sensors_[stat];
+    if (target == nullptr) {
+      continue;
+    }
+    float value = this->telemetry_.stat(static_cast<TelemetryStat>(stat));
+    if (this->telemetry_filters_[stat].should_publish(value, now, this->telemetry_delta_,
+                                                      this->telemetry_heartbeat_ms_)) {
+      target->publish_state(value);
+    }
+  }
+  this->telemetry_.clear();
+}
+
+void BedPresenceEngine::update_occupancy_summary(uint32_t now, bool occupied) {
+  this->summary_.update(now, occupied);
+  if (this->new_frame_ && this->moving_energy_sensor_ != nullptr && this->moving_energy_sensor_->has_state()) {
+    this->summary_.add_moving_energy(now, this->moving_energy_sensor_->state);
+  }
+}
+
+bool BedPresenceEngine::summary_rollover_due(uint32_t now) {
+#ifdef USE_TIME
+  if (this->summary_time_ != nullptr) {
+    // The wall clock only needs checking a few times a minute
+    if (now - this->summary_last_check_ms_ < 10000) {
+      return false;
+    }
+    this->summary_last_check_ms_ = now;
+    ESPTime time = this->summary_time_->now();
+    if (time.is_valid()) {
+      if (time.hour != this->summary_rollover_hour_ || time.day_of_year == this->summary_last_rollover_day_) {
+        return false;
+      }
+      this->summary_last_rollover_day_ = time.day_of_year;
+      return true;
+    }
+  }
+#endif
+  return now - this->summary_.period_start_ms() >= this->summary_period_ms_;
+}
+
+void BedPresenceEngine::publish_occupancy_summary() {
+  uint32_t now = millis();
+  uint32_t period_ms = now - this->summary_.period_start_ms();
+  OccupancyPeriod period = this->summary_.close(now);
+
+  ESP_LOGI(TAG, "Occupancy summary (%.1fh): in bed %.2fh, entries=%u, exits=%u, longest in bed %.2fh, "
+                "longest absence %.1fmin, restless events=%u",
+           period_ms / 3600000.0f, period.occupied_ms / 3600000.0f, period.entries, period.exits,
+           period.longest_occupied_ms / 3600000.0f, period.longest_absence_ms / 60000.0f, period.restless_events);
+
+  if (this->time_in_bed_sensor_ != nullptr) {
+    this->time_in_bed_sensor_->publish_state(period.occupied_ms / 3600000.0f);
+  }
+  if (this->entries_sensor_ != nullptr) {
+    this->entries_sensor_->publish_state(period.entries);
+  }
+  if (this->exits_sensor_ != nullptr) {
+    this->exits_sensor_->publish_state(period.exits);
+  }
+  if (this->longest_in_bed_sensor_ != nullptr) {
+    this->longest_in_bed_sensor_->publish_state(period.longest_occupied_ms / 3600000.0f);
+  }
+  if (this->longest_absence_sensor_ != nullptr) {
+    this->longest_absence_sensor_->publish_state(period.longest_absence_ms / 60000.0f);
+  }
+  if (this->restless_events_sensor_ != nullptr) {
+    this->restless_events_sensor_->publish_state(period.restless_events);
+  }
+}
+
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+void BedPresenceEngine::publish_diagnostics(uint32_t now) {
+  if (this->frame_rate_sensor_ != nullptr) {
+    this->frame_rate_sensor_->publish_state(this->counters_.frame_rate(now));
+  }
+  if (this->frames_out_of_window_sensor_ != nullptr) {
+    this->frames_out_of_window_sensor_->publish_state(this->counters_.frames_out_of_window);
+  }
+  if (this->loop_time_max_sensor_ != nullptr) {
+    this->loop_time_max_sensor_->publish_state(this->counters_.loop_time_max_us);
+  }
+  if (this->loop_time_avg_sensor_ != nullptr) {
+    this->loop_time_avg_sensor_->publish_state(this->counters_.loop_time_avg_us());
+  }
+  if (this->transitions_per_hour_sensor_ != nullptr) {
+    this->transitions_per_hour_sensor_->publish_state(this->counters_.transitions_per_hour(now));
+  }
+  if (this->debounce_aborts_sensor_ != nullptr) {
+    this->debounce_aborts_sensor_->publish_state(this->counters_.debounce_aborts);
+  }
+  if (this->calibration_fill_sensor_ != nullptr) {
+    this->calibration_fill_sensor_->publish_state(100.0f * this->calibration_count_ / MAX_CALIBRATION_SAMPLES);
+  }
+  this->publish_latency_summary();
+  this->counters_.start_window(now);
+}
+
+void BedPresenceEngine::publish_latency_summary() {
+  if (this->on_latency_p90_sensor_ != nullptr && this->on_latency_.count() > 0) {
+    this->on_latency_p90_sensor_->publish_state(this->on_latency_.percentile_ms(0.9f) / 1000.0f);
+  }
+  if (this->off_latency_p90_sensor_ != nullptr && this->off_latency_.count() > 0) {
+    this->off_latency_p90_sensor_->publish_state(this->off_latency_.percentile_ms(0.9f) / 1000.0f);
+  }
+  if (this->latency_summary_sensor_ != nullptr) {
+    char on[64];
+    char off[64];
+    this->on_latency_.format_summary(on, sizeof(on));
+    this->off_latency_.format_summary(off, sizeof(off));
+    char summary[160];
+    snprintf(summary, sizeof(summary), "ON %s | OFF %s", on, off);
+    this->latency_summary_sensor_->publish_state(summary);
+  }
+}
+
+#endif
+
+void BedPresenceEngine::log_latency_histograms() {
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  ESP_LOGI(TAG, "Detection latency (ON: first frame >= k_on -> ON, OFF: first frame < k_off -> OFF)");
+  ESP_LOGI(TAG, "  %-12s %6s %6s", "bucket", "on", "off");
+  for (uint8_t i = 0; i < LATENCY_BUCKET_COUNT; ++i) {
+    char label[16];
+    if (i < LATENCY_BUCKET_COUNT - 1) {
+      snprintf(label, sizeof(label), "<= %ums", static_cast<unsigned>(LATENCY_BUCKET_EDGES_MS[i]));
+    } else {
+      snprintf(label, sizeof(label), "> %ums", static_cast<unsigned>(LATENCY_BUCKET_EDGES_MS[i - 1]));
+    }
+    ESP_LOGI(TAG, "  %-12s %6u %6u", label, static_cast<unsigned>(this->on_latency_.bucket(i)),
+             static_cast<unsigned>(this->off_latency_.bucket(i)));
+  }
+  char summary[64];
+  this->on_latency_.format_summary(summary, sizeof(summary));
+  ESP_LOGI(TAG, "  ON:  %s", summary);
+  this->off_latency_.format_summary(summary, sizeof(summary));
+  ESP_LOGI(TAG, "  OFF: %s", summary);
+  this->publish_latency_summary();
+#else
+  ESP_LOGW(TAG, "Latency histograms require diagnostics_level: full");
+#endif
+}
+
+void BedPresenceEngine::reset_latency_histograms() {
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  ESP_LOGI(TAG, "Resetting detection latency histograms");
+  this->on_latency_.clear();
+  this->off_latency_.clear();
+  this->publish_latency_summary();
+#else
+  ESP_LOGW(TAG, "Latency histograms require diagnostics_level: full");
+#endif
+}
+
+void BedPresenceEngine::freeze_frame_log() {
+  if (!this->frame_log_.is_allocated()) {
+    ESP_LOGW(TAG, "Frame log is not configured");
+    return;
+  }
+  this->frame_log_.freeze();
+  ESP_LOGI(TAG, "Frame log frozen (%u frames)", this->frame_log_.count());
+}
+
+void BedPresenceEngine::resume_frame_log() {
+  if (!this->frame_log_.is_allocated()) {
+    ESP_LOGW(TAG, "Frame log is not configured");
+    return;
+  }
+  if (this->frame_log_.resume()) {
+    ESP_LOGI(TAG, "Frame log recording resumed");
+  } else {
+    ESP_LOGI(TAG, "Frame log download in progress, recording resumes once it completes");
+  }
+}
+
+float BedPresenceEngine::prefilter(float value, bool gate_input) {
+  if (this->prefilter_.get_mode() == PREFILTER_NONE) {
+    return value;
+  }
+  // Don't mix energies and gate z-scores in one window when falling back between paths
+  if (gate_input != this->prefilter_gate_input_) {
+    this->prefilter_.reset();
+    this->prefilter_gate_input_ = gate_input;
+    this->prefiltered_ = this->prefilter_.update(value);
+  } else if (this->new_frame_) {
+    this->prefiltered_ = this->prefilter_.update(value);
+  }
+  return this->prefiltered_;
 }
 
 float BedPresenceEngine::calculate_z_score(float energy, float mu, float sigma) {
@@ -66,108 +497,313 @@ float BedPresenceEngine::calculate_z_score(float energy, float mu, float sigma)
 }
 
 void BedPresenceEngine::process_energy_reading(float energy) {
-  // Calculate z-score for still energy (Phase 2 uses still_energy)
-  float z_still = this->calculate_z_score(energy, this->mu_still_, this->sigma_still_);
+  this->last_energy_ = energy;
+  this->last_z_valid_ = false;
 
-  // Log the z-score for debugging
-  ESP_LOGVV(TAG, "Energy=%.2f, z_still=%.2f, state=%d", energy, z_still, this->current_state_);
+  // Log the z-score for debugging (only evaluated in verbose builds)
+  BED_PRESENCE_LOGVV(TAG, "Energy=%.2f, z_still=%.2f, state=%d", energy, this->current_z_score(),
+                     this->current_state_);
+
+  if (this->detector_mode_ == DETECTOR_CUSUM) {
+    this->process_cusum(this->current_z_score());
+    return;
+  }
+
+  // Integer comparisons against the precomputed μ + kσ thresholds; no per-frame division
+  int32_t energy_q = energy_to_q8(energy);
+  this->run_state_machine({energy_q >= this->energy_thresholds_.on, energy_q > this->energy_thresholds_.on_strict,
+                           energy_q < this->energy_thresholds_.off});
+}
+
+float BedPresenceEngine::current_z_score() {
+  if (!this->last_z_valid_) {
+    // Calculate z-score for still energy (Phase 2 uses still_energy)
+    this->last_z_ = this->calculate_z_score(this->last_energy_, this->mu_still_, this->sigma_still_);
+    this->last_z_valid_ = true;
+  }
+  return this->last_z_;
+}
+
+void BedPresenceEngine::update_energy_thresholds() {
+  this->energy_thresholds_ = compute_energy_thresholds(this->mu_still_, this->sigma_still_, this->k_on_, this->k_off_);
+  ESP_LOGD(TAG, "Energy thresholds: on=%.2f, off=%.2f", this->energy_thresholds_.on / ENERGY_Q8_SCALE,
+           this->energy_thresholds_.off / ENERGY_Q8_SCALE);
+}
+
+bool BedPresenceEngine::read_gate_frame() {
+  for (uint8_t gate = 0; gate < GATE_COUNT; ++gate) {
+    sensor::Sensor *still = this->gate_still_sensors_[gate];
+    if (still == nullptr) {
+      continue;
+    }
+    if (!still->has_state()) {
+      return false;
+    }
+    this->gate_still_energy_[gate] = still->state;
+
+    sensor::Sensor *move = this->gate_move_sensors_[gate];
+    this->gate_move_energy_[gate] = (move != nullptr && move->has_state()) ? move->state : 0.0f;
+  }
+  return true;
+}
 
+void BedPresenceEngine::process_gate_frame(float energy) {
+  // Calibration collects every configured gate (not just the windowed ones) so the
+  // window can be moved later without recalibrating; one sample per LD2410 frame
+  if (this->calibrating_ && this->new_frame_) {
+    for (uint8_t gate = 0; gate < GATE_COUNT; ++gate) {
+      if (this->gate_still_sensors_[gate] == nullptr) {
+        continue;
+      }
+      this->gate_still_histograms_[gate].add(this->gate_still_energy_[gate]);
+      if (this->gate_move_sensors_[gate] != nullptr) {
+        this->gate_move_histograms_[gate].add(this->gate_move_energy_[gate]);
+      }
+    }
+  }
+  // The aggregate baseline stays calibrated too, for the fallback path
+  this->handle_calibration_sample(energy);
+
+  float z_still = weighted_gate_z(this->gate_still_energy_, this->gate_still_baseline_,
+                                  this->gate_window_weights_, GATE_COUNT);
+  this->last_z_move_ = weighted_gate_z(this->gate_move_energy_, this->gate_move_baseline_,
+                                       this->gate_window_weights_, GATE_COUNT);
+
+  BED_PRESENCE_LOGVV(TAG, "Gates: z_still=%.2f, z_move=%.2f, state=%d", z_still, this->last_z_move_,
+                     this->current_state_);
+
+  this->process_z_score(this->prefilter(z_still, true));
+}
+
+void BedPresenceEngine::process_z_score(float z_still) {
+  this->last_z_ = z_still;
+  this->last_z_valid_ = true;
+
+  if (this->detector_mode_ == DETECTOR_CUSUM) {
+    this->process_cusum(z_still);
+    return;
+  }
+
+  this->run_state_machine({z_still >= this->k_on_, z_still > this->k_on_, z_still < this->k_off_});
+}
+
+void BedPresenceEngine::run_state_machine(ThresholdCrossing crossing) {
   unsigned long now = millis();
 
   // Phase 2 Logic: 4-state machine with debouncing
   switch (this->current_state_) {
     case IDLE:
-      if (z_still >= this->k_on_) {
+      if (crossing.at_or_above_on) {
         this->debounce_start_time_ = now;
         this->current_state_ = DEBOUNCING_ON;
-        ESP_LOGD(TAG, "IDLE → DEBOUNCING_ON (z=%.2f >= k_on=%.2f)", z_still, this->k_on_);
+        ESP_LOGD(TAG, "IDLE → DEBOUNCING_ON (z=%.2f >= k_on=%.2f)", this->current_z_score(), this->k_on_);
       }
       break;
 
     case DEBOUNCING_ON:
-      if (z_still >= this->k_on_) {
+      if (crossing.at_or_above_on) {
         // Condition still holds, check timer
         if ((now - this->debounce_start_time_) >= this->on_debounce_ms_) {
           this->current_state_ = PRESENT;
           this->last_high_confidence_time_ = now;
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+          this->off_candidate_ = false;
+          this->on_latency_.record(now - this->debounce_start_time_);
+#endif
           this->publish_state(true);
 
           char reason[64];
-          snprintf(reason, sizeof(reason), "ON: z=%.2f, debounced %lums", z_still, this->on_debounce_ms_);
+          BED_PRESENCE_FORMAT_REASON(reason, "ON: z=%.2f, debounced %lums", this->current_z_score(),
+                                     this->on_debounce_ms_);
           this->publish_reason(reason);
-          this->publish_change_reason("on:threshold_exceeded");
+          this->publish_change_reason(REASON_ON_THRESHOLD_EXCEEDED);
 
           ESP_LOGI(TAG, "DEBOUNCING_ON → PRESENT: %s", reason);
         }
       } else {
         // Condition lost, abort debounce
         this->current_state_ = IDLE;
-        ESP_LOGD(TAG, "DEBOUNCING_ON → IDLE (z=%.2f < k_on, abort)", z_still);
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+        this->counters_.debounce_aborts++;
+        this->on_latency_.record_abort();
+#endif
+        ESP_LOGD(TAG, "DEBOUNCING_ON → IDLE (z=%.2f < k_on, abort)", this->current_z_score());
       }
       break;
 
     case PRESENT:
       // Update high confidence timestamp whenever strong signal detected
-      if (z_still > this->k_on_) {
+      if (crossing.above_on) {
         this->last_high_confidence_time_ = now;
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+        this->off_candidate_ = false;
+#endif
       }
 
       // Check for transition to DEBOUNCING_OFF
-      if (z_still < this->k_off_) {
+      if (crossing.below_off) {
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+        if (!this->off_candidate_) {
+          // OFF latency is measured from here, through the abs_clear hold and the debounce
+          this->off_candidate_ = true;
+          this->off_candidate_since_ = now;
+        }
+#endif
         // Low signal detected, check absolute clear delay
         if ((now - this->last_high_confidence_time_) >= this->abs_clear_delay_ms_) {
           this->debounce_start_time_ = now;
           this->current_state_ = DEBOUNCING_OFF;
           ESP_LOGD(TAG, "PRESENT → DEBOUNCING_OFF (z=%.2f < k_off, abs_clear=%lums ago)",
-                   z_still, (now - this->last_high_confidence_time_));
+                   this->current_z_score(), (now - this->last_high_confidence_time_));
         }
       }
       break;
 
     case DEBOUNCING_OFF:
-      if (z_still < this->k_off_) {
+      if (crossing.below_off) {
         // Condition still holds, check timer
         if ((now - this->debounce_start_time_) >= this->off_debounce_ms_) {
           this->current_state_ = IDLE;
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+          this->off_candidate_ = false;
+          this->off_latency_.record(now - this->off_candidate_since_);
+#endif
           this->publish_state(false);
 
           char reason[64];
-          snprintf(reason, sizeof(reason), "OFF: z=%.2f, debounced %lums", z_still, this->off_debounce_ms_);
+          BED_PRESENCE_FORMAT_REASON(reason, "OFF: z=%.2f, debounced %lums", this->current_z_score(),
+                                     this->off_debounce_ms_);
           this->publish_reason(reason);
-          this->publish_change_reason("off:abs_clear_delay");
+          this->publish_change_reason(REASON_OFF_ABS_CLEAR_DELAY);
 
           ESP_LOGI(TAG, "DEBOUNCING_OFF → IDLE: %s", reason);
         }
-      } else if (z_still >= this->k_on_) {
+      } else if (crossing.at_or_above_on) {
         // High signal returned, abort debounce
         this->current_state_ = PRESENT;
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+        this->counters_.debounce_aborts++;
+        this->off_latency_.record_abort();
+        this->off_candidate_ = false;
+#endif
         this->last_high_confidence_time_ = now;
-        ESP_LOGD(TAG, "DEBOUNCING_OFF → PRESENT (z=%.2f >= k_on, signal returned)", z_still);
+        ESP_LOGD(TAG, "DEBOUNCING_OFF → PRESENT (z=%.2f >= k_on, signal returned)", this->current_z_score());
       }
       break;
   }
 }
 
-void BedPresenceEngine::publish_reason(const std::string &reason) {
+void BedPresenceEngine::process_cusum(float z_still) {
+  // CUSUM accumulates per frame; re-reading the same frame must not add evidence
+  if (!this->new_frame_) {
+    return;
+  }
+
+  bool occupied = this->current_state_ == PRESENT || this->current_state_ == DEBOUNCING_OFF;
+  float statistic;
+
+  if (!occupied) {
+    statistic = this->cusum_.update_rise(z_still, this->k_on_);
+    if (statistic >= this->cusum_h_on_) {
+      this->current_state_ = PRESENT;
+      this->last_high_confidence_time_ = millis();
+      this->cusum_.reset();
+      this->publish_state(true);
+
+      char reason[64];
+      BED_PRESENCE_FORMAT_REASON(reason, "ON: z=%.2f, cusum=%.1f >= h=%.1f", z_still, statistic, this->cusum_h_on_);
+      this->publish_reason(reason);
+      this->publish_change_reason(REASON_ON_CUSUM_ALARM);
+
+      ESP_LOGI(TAG, "CUSUM → PRESENT: %s", reason);
+    } else {
+      this->current_state_ = statistic > 0.0f ? DEBOUNCING_ON : IDLE;
+    }
+  } else {
+    statistic = this->cusum_.update_fall(z_still, this->k_off_);
+    if (statistic >= this->cusum_h_off_) {
+      this->current_state_ = IDLE;
+      this->cusum_.reset();
+      this->publish_state(false);
+
+      char reason[64];
+      BED_PRESENCE_FORMAT_REASON(reason, "OFF: z=%.2f, cusum=%.1f >= h=%.1f", z_still, statistic,
+                                 this->cusum_h_off_);
+      this->publish_reason(reason);
+      this->publish_change_reason(REASON_OFF_CUSUM_ALARM);
+
+      ESP_LOGI(TAG, "CUSUM → IDLE: %s", reason);
+    } else {
+      this->current_state_ = statistic > 0.0f ? DEBOUNCING_OFF : PRESENT;
+    }
+  }
+
+  BED_PRESENCE_LOGVV(TAG, "CUSUM: z=%.2f, statistic=%.2f, state=%d", z_still, statistic, this->current_state_);
+
+  // Only publish when the statistic moves; it sits at 0 while the level is stable
+  if (this->cusum_statistic_sensor_ != nullptr && statistic != this->last_cusum_published_) {
+    this->last_cusum_published_ = statistic;
+    this->cusum_statistic_sensor_->publish_state(statistic);
+  }
+}
+
+const char *change_reason_to_string(ChangeReason reason) {
+  switch (reason) {
+    case REASON_IDLE_INIT:
+      return "idle:init";
+    case REASON_ON_THRESHOLD_EXCEEDED:
+      return "on:threshold_exceeded";
+    case REASON_OFF_ABS_CLEAR_DELAY:
+      return "off:abs_clear_delay";
+    case REASON_ON_CUSUM_ALARM:
+      return "on:cusum_alarm";
+    case REASON_OFF_CUSUM_ALARM:
+      return "off:cusum_alarm";
+    case REASON_OFF_RESET_TO_DEFAULTS:
+      return "off:reset_to_defaults";
+    case REASON_CALIBRATION_STARTED:
+      return "calibration:started";
+    case REASON_CALIBRATION_COMPLETED:
+      return "calibration:completed";
+    case REASON_CALIBRATION_INSUFFICIENT_SAMPLES:
+      return "calibration:insufficient_samples";
+    default:
+      return "unknown";
+  }
+}
+
+// Reasons are formatted into stack buffers or come from the static table above;
+// the only copy is the one the text sensor keeps, and only on transitions.
+void BedPresenceEngine::publish_reason(const char *reason) {
+#if BED_PRESENCE_HAS_REASONS
   if (this->state_reason_sensor_ != nullptr) {
-    this->state_reason_sensor_->publish_state(reason.c_str());
+    this->state_reason_sensor_->publish_state(reason);
   }
+#else
+  (void) reason;
+#endif
 }
 
-void BedPresenceEngine::publish_change_reason(const std::string &reason) {
+void BedPresenceEngine::publish_change_reason(ChangeReason reason) {
+#if BED_PRESENCE_HAS_REASONS
   if (this->last_change_reason_sensor_ != nullptr) {
-    this->last_change_reason_sensor_->publish_state(reason.c_str());
+    this->last_change_reason_sensor_->publish_state(change_reason_to_string(reason));
   }
+#else
+  (void) reason;
+#endif
 }
 
 void BedPresenceEngine::update_k_on(float k) {
   ESP_LOGI(TAG, "Updating k_on: %.2f -> %.2f", this->k_on_, k);
   this->k_on_ = k;
+  this->update_energy_thresholds();
 }
 
 void BedPresenceEngine::update_k_off(float k) {
   ESP_LOGI(TAG, "Updating k_off: %.2f -> %.2f", this->k_off_, k);
   this->k_off_ = k;
+  this->update_energy_thresholds();
 }
 
 void BedPresenceEngine::update_on_debounce_ms(unsigned long ms) {
@@ -188,11 +824,105 @@ void BedPresenceEngine::update_abs_clear_delay_ms(unsigned long ms) {
 void BedPresenceEngine::update_d_min_cm(float value) {
   ESP_LOGI(TAG, "Updating d_min_cm: %.1f -> %.1f", this->d_min_cm_, value);
   this->d_min_cm_ = value;
+  this->update_gate_window();
 }
 
 void BedPresenceEngine::update_d_max_cm(float value) {
   ESP_LOGI(TAG, "Updating d_max_cm: %.1f -> %.1f", this->d_max_cm_, value);
   this->d_max_cm_ = value;
+  this->update_gate_window();
+}
+
+void BedPresenceEngine::add_profile(const EngineProfile &profile) {
+  if (this->profile_count_ >= MAX_PROFILES) {
+    ESP_LOGW(TAG, "Ignoring profile '%s': at most %u profiles", profile.name, MAX_PROFILES);
+    return;
+  }
+  this->profiles_[this->profile_count_++] = profile;
+}
+
+bool BedPresenceEngine::activate_profile(const std::string &name) {
+  for (uint8_t i = 0; i < this->profile_count_; ++i) {
+    if (name == this->profiles_[i].name) {
+      return this->activate_profile(i);
+    }
+  }
+  ESP_LOGW(TAG, "Unknown profile '%s'", name.c_str());
+  return false;
+}
+
+bool BedPresenceEngine::activate_profile(uint8_t index) {
+  if (index >= this->profile_count_) {
+    ESP_LOGW(TAG, "Unknown profile index %u", index);
+    return false;
+  }
+
+  // Services run between loop() iterations, so no frame ever sees a mix of two profiles.
+  // current_state_ and the debounce/clear timers are left alone: a running debounce
+  // completes against the new timers.
+  const EngineProfile &profile = this->profiles_[index];
+  this->k_on_ = profile.k_on;
+  this->k_off_ = profile.k_off;
+  this->on_debounce_ms_ = profile.on_debounce_ms;
+  this->off_debounce_ms_ = profile.off_debounce_ms;
+  this->abs_clear_delay_ms_ = profile.abs_clear_delay_ms;
+  this->d_min_cm_ = profile.d_min_cm;
+  this->d_max_cm_ = profile.d_max_cm;
+  this->prefilter_.configure(profile.prefilter_mode, profile.prefilter_window, profile.prefilter_alpha,
+                             profile.prefilter_process_noise, profile.prefilter_measurement_noise);
+  this->update_energy_thresholds();
+  this->update_gate_window();
+  this->active_profile_ = index;
+
+  ESP_LOGI(TAG, "Activated profile '%s': k_on=%.2f, k_off=%.2f, debounce on=%ums off=%ums abs_clear=%ums, "
+                "window [%.1fcm, %.1fcm], prefilter %s",
+           profile.name, profile.k_on, profile.k_off, static_cast<unsigned>(profile.on_debounce_ms),
+           static_cast<unsigned>(profile.off_debounce_ms), static_cast<unsigned>(profile.abs_clear_delay_ms),
+           profile.d_min_cm, profile.d_max_cm,
+           prefilter_mode_to_string(profile.prefilter_mode));
+  if (this->active_profile_sensor_ != nullptr) {
+    this->active_profile_sensor_->publish_state(profile.name);
+  }
+  return true;
+}
+
+const char *BedPresenceEngine::get_active_profile() const {
+  return this->active_profile_ < this->profile_count_ ? this->profiles_[this->active_profile_].name : "none";
+}
+
+void BedPresenceEngine::set_gate_still_energy_sensor(uint8_t gate, sensor::Sensor *sensor) {
+  if (gate >= GATE_COUNT) {
+    return;
+  }
+  this->gate_still_sensors_[gate] = sensor;
+  this->gate_mode_ = true;
+}
+
+void BedPresenceEngine::set_gate_move_energy_sensor(uint8_t gate, sensor::Sensor *sensor) {
+  if (gate < GATE_COUNT) {
+    this->gate_move_sensors_[gate] = sensor;
+  }
+}
+
+void BedPresenceEngine::set_gate_weight(uint8_t gate, float weight) {
+  if (gate < GATE_COUNT) {
+    this->gate_weights_[gate] = weight;
+  }
+}
+
+void BedPresenceEngine::update_gate_window() {
+  for (uint8_t gate = 0; gate < GATE_COUNT; ++gate) {
+    bool active = this->gate_still_sensors_[gate] != nullptr && gate_in_window(gate, this->d_min_cm_, this->d_max_cm_);
+    this->gate_window_weights_[gate] = active ? this->gate_weights_[gate] : 0.0f;
+  }
+}
+
+void BedPresenceEngine::reset_gate_baselines() {
+  // Same empty-bed defaults as the aggregate baseline (RFD-001 calibration data)
+  for (uint8_t gate = 0; gate < GATE_COUNT; ++gate) {
+    this->gate_still_baseline_[gate] = {6.7f, 3.5f};
+    this->gate_move_baseline_[gate] = {2.1f, 1.8f};
+  }
 }
 
 void BedPresenceEngine::start_baseline_calibration(uint32_t duration_s) {
@@ -203,14 +933,24 @@ void BedPresenceEngine::start_baseline_calibration(uint32_t duration_s) {
 
   uint32_t clamped = std::min<uint32_t>(duration_s, 600);  // Hard cap at 10 minutes
   this->calibrating_ = true;
-  this->calibration_samples_.clear();
-  size_t expected_samples = static_cast<size_t>(clamped) * 50;  // assume up to 50 frames/sec
-  this->calibration_samples_.reserve(std::min(expected_samples, MAX_CALIBRATION_SAMPLES));
-  this->calibration_end_time_ = millis() + clamped * 1000UL;
+  this->calibration_count_ = 0;
+  for (uint8_t gate = 0; gate < GATE_COUNT; ++gate) {
+    this->gate_still_histograms_[gate].clear();
+    this->gate_move_histograms_[gate].clear();
+  }
+  for (uint8_t i = 0; i < this->zone_count_; ++i) {
+    this->zones_[i]->start_calibration();
+  }
+  if (this->convergence_enabled_) {
+    this->convergence_.start();
+  }
+  this->calibration_start_time_ = millis();
+  this->calibration_end_time_ = this->calibration_start_time_ + clamped * 1000UL;
 
-  ESP_LOGI(TAG, "Starting baseline calibration for %us (collecting samples within distance window)", clamped);
+  ESP_LOGI(TAG, "Starting baseline calibration for %s%us (collecting samples within distance window)",
+           this->convergence_enabled_ ? "up to " : "", clamped);
   this->publish_reason("Calibration started");
-  this->publish_change_reason("calibration:started");
+  this->publish_change_reason(REASON_CALIBRATION_STARTED);
 }
 
 void BedPresenceEngine::stop_baseline_calibration() {
@@ -232,47 +972,101 @@ void BedPresenceEngine::reset_to_defaults() {
   this->abs_clear_delay_ms_ = 30000;
   this->d_min_cm_ = 0.0f;
   this->d_max_cm_ = 600.0f;
+  this->update_energy_thresholds();
+  this->reset_gate_baselines();
+  this->update_gate_window();
+  // A profile may have replaced the YAML prefilter; restore it and start from an empty window
+  const PrefilterSettings &prefilter = this->configured_prefilter_;
+  this->prefilter_.configure(prefilter.mode, prefilter.window, prefilter.alpha, prefilter.process_noise,
+                             prefilter.measurement_noise);
+  this->prefilter_.reset();
+  this->cusum_.reset();
+  for (uint8_t i = 0; i < this->zone_count_; ++i) {
+    this->zones_[i]->reset_to_defaults();
+  }
 
   this->calibrating_ = false;
-  this->calibration_samples_.clear();
+  this->calibration_count_ = 0;
+  this->active_profile_ = NO_PROFILE;
+  if (this->active_profile_sensor_ != nullptr) {
+    this->active_profile_sensor_->publish_state(this->get_active_profile());
+  }
 
   this->current_state_ = IDLE;
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  this->off_candidate_ = false;
+#endif
   this->publish_state(false);
   this->publish_reason("Reset to defaults");
-  this->publish_change_reason("off:reset_to_defaults");
+  this->publish_change_reason(REASON_OFF_RESET_TO_DEFAULTS);
 }
 
 void BedPresenceEngine::handle_calibration_sample(float energy) {
-  if (!this->calibrating_) {
+  // Samples are taken per LD2410 frame, not per loop(): re-reading a frame must not weight it twice
+  if (!this->calibrating_ || !this->new_frame_) {
     return;
   }
 
-  if (this->calibration_samples_.size() >= MAX_CALIBRATION_SAMPLES) {
+  if (this->calibration_count_ >= MAX_CALIBRATION_SAMPLES) {
     ESP_LOGW(TAG, "Calibration sample buffer full (%u samples), finalizing early",
-             static_cast<unsigned>(this->calibration_samples_.size()));
+             static_cast<unsigned>(this->calibration_count_));
     this->finalize_calibration();
     return;
   }
 
-  this->calibration_samples_.push_back(energy);
+  this->calibration_samples_[this->calibration_count_++] = energy;
+
+  if (this->convergence_enabled_) {
+    if (this->convergence_.add(energy)) {
+      ESP_LOGI(TAG, "Calibration converged after %u frames (%lums)", static_cast<unsigned>(this->convergence_.count()),
+               millis() - this->calibration_start_time_);
+      this->finalize_calibration();
+      return;
+    }
+    if (this->convergence_.count() % CALIBRATION_PROGRESS_EVERY == 0) {
+      this->publish_calibration_progress(millis());
+    }
+  }
 
   if (millis() >= this->calibration_end_time_) {
     this->finalize_calibration();
   }
 }
 
-static float compute_median(std::vector<float> values) {
-  if (values.empty()) {
+void BedPresenceEngine::publish_calibration_progress(unsigned long now) {
+  // Time left from the frame rate seen so far, assuming the estimate holds; never past the deadline
+  // 64-bit product: samples × elapsed ms overflows 32 bits on long calibrations
+  uint16_t count = this->convergence_.count();
+  uint64_t remaining_ms = static_cast<uint64_t>(this->convergence_.remaining_samples()) *
+                          (now - this->calibration_start_time_) / count;
+  unsigned long deadline_ms = this->calibration_end_time_ > now ? this->calibration_end_time_ - now : 0;
+  if (remaining_ms > deadline_ms) {
+    remaining_ms = deadline_ms;
+  }
+  const GateBaseline &estimate = this->convergence_.estimate();
+  unsigned long remaining_s = static_cast<unsigned long>((remaining_ms + 999) / 1000);
+
+  ESP_LOGD(TAG, "Calibration progress: n=%u, mu=%.2f, sigma=%.2f, ~%lus left", static_cast<unsigned>(count),
+           estimate.mu, estimate.sigma, remaining_s);
+  char progress[96];
+  BED_PRESENCE_FORMAT_REASON(progress, "Calibrating: n=%u, μ=%.2f, σ=%.2f, ~%lus left", static_cast<unsigned>(count),
+                             estimate.mu, estimate.sigma, remaining_s);
+  this->publish_reason(progress);
+}
+
+// Median of values[0..count), reordering the array in place
+static float compute_median_in_place(float *values, size_t count) {
+  if (count == 0) {
     return 0.0f;
   }
 
-  size_t mid = values.size() / 2;
-  std::nth_element(values.begin(), values.begin() + mid, values.end());
+  size_t mid = count / 2;
+  std::nth_element(values, values + mid, values + count);
   float median = values[mid];
 
-  if (values.size() % 2 == 0) {
-    std::nth_element(values.begin(), values.begin() + mid - 1, values.end());
-    median = (median + values[mid - 1]) / 2.0f;
+  if (count % 2 == 0) {
+    // nth_element leaves the lower half in front; its maximum is the other middle value
+    median = (median + *std::max_element(values, values + mid)) / 2.0f;
   }
   return median;
 }
@@ -284,22 +1078,30 @@ void BedPresenceEngine::finalize_calibration() {
 
   this->calibrating_ = false;
 
-  if (this->calibration_samples_.empty()) {
+  if (this->gate_mode_) {
+    this->finalize_gate_calibration();
+  }
+  for (uint8_t i = 0; i < this->zone_count_; ++i) {
+    this->zones_[i]->finalize_calibration();
+  }
+
+  if (this->calibration_count_ == 0) {
     ESP_LOGW(TAG, "Calibration finished with no samples collected");
     this->publish_reason("Calibration failed: no samples");
-    this->publish_change_reason("calibration:insufficient_samples");
+    this->publish_change_reason(REASON_CALIBRATION_INSUFFICIENT_SAMPLES);
     return;
   }
 
-  auto samples = this->calibration_samples_;
-  this->calibration_samples_.clear();
+  // Median, then MAD computed over the same buffer (samples are overwritten by deviations)
+  float *samples = this->calibration_samples_;
+  size_t count = this->calibration_count_;
+  this->calibration_count_ = 0;
 
-  float median = compute_median(samples);
-  std::vector<float> deviations(samples.size());
-  for (size_t i = 0; i < samples.size(); ++i) {
-    deviations[i] = std::fabs(samples[i] - median);
+  float median = compute_median_in_place(samples, count);
+  for (size_t i = 0; i < count; ++i) {
+    samples[i] = std::fabs(samples[i] - median);
   }
-  float mad = compute_median(deviations);
+  float mad = compute_median_in_place(samples, count);
   float sigma = mad * 1.4826f;
   if (sigma < 0.05f) {
     sigma = 0.05f;
@@ -307,15 +1109,36 @@ void BedPresenceEngine::finalize_calibration() {
 
   this->mu_still_ = median;
   this->sigma_still_ = sigma;
+  this->update_energy_thresholds();
 
   ESP_LOGI(TAG, "Calibration complete: mu=%.2f, sigma=%.2f (samples=%u)", median, sigma,
-           static_cast<unsigned>(samples.size()));
+           static_cast<unsigned>(count));
 
   char summary[96];
-  snprintf(summary, sizeof(summary), "Calibration complete: μ=%.2f, σ=%.2f, n=%u", median, sigma,
-           static_cast<unsigned>(samples.size()));
+  BED_PRESENCE_FORMAT_REASON(summary, "Calibration complete: μ=%.2f, σ=%.2f, n=%u", median, sigma,
+                             static_cast<unsigned>(count));
   this->publish_reason(summary);
-  this->publish_change_reason("calibration:completed");
+  this->publish_change_reason(REASON_CALIBRATION_COMPLETED);
+}
+
+void BedPresenceEngine::finalize_gate_calibration() {
+  for (uint8_t gate = 0; gate < GATE_COUNT; ++gate) {
+    const EnergyHistogram &still = this->gate_still_histograms_[gate];
+    if (this->gate_still_sensors_[gate] == nullptr || still.count() == 0) {
+      continue;
+    }
+    this->gate_still_baseline_[gate] = baseline_from_histogram(still);
+
+    const EnergyHistogram &move = this->gate_move_histograms_[gate];
+    if (move.count() > 0) {
+      this->gate_move_baseline_[gate] = baseline_from_histogram(move);
+    }
+
+    ESP_LOGI(TAG, "Gate %u calibration: still mu=%.2f sigma=%.2f, move mu=%.2f sigma=%.2f (samples=%u)", gate,
+             this->gate_still_baseline_[gate].mu, this->gate_still_baseline_[gate].sigma,
+             this->gate_move_baseline_[gate].mu, this->gate_move_baseline_[gate].sigma,
+             static_cast<unsigned>(still.count()));
+  }
 }
 
 
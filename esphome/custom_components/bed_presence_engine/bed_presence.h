@@ -1,11 +1,33 @@
 #pragma once
 
 #include "esphome/core/component.h"
+#include "esphome/core/defines.h"
 #include "esphome/components/binary_sensor/binary_sensor.h"
 #include "esphome/components/sensor/sensor.h"
 #include "esphome/components/text_sensor/text_sensor.h"
+#include "calibration_convergence.h"
+#include "cusum.h"
+#include "diagnostics_level.h"
+#include "energy_telemetry.h"
+#include "engine_profile.h"
+#include "energy_thresholds.h"
+#include "frame_log.h"
+#include "frame_stream.h"
+#include "gate_energy.h"
+#include "latency_histogram.h"
+#include "occupancy_summary.h"
+#include "perf_counters.h"
+#include "prefilter.h"
+#include "zone_window.h"
+#ifdef USE_BED_PRESENCE_FRAME_LOG_HTTP
+#include "esphome/components/web_server_base/web_server_base.h"
+#endif
+#ifdef USE_TIME
+#include "esphome/components/time/real_time_clock.h"
+#endif
+#include <cstddef>
+#include <cstdint>
 #include <string>
-#include <vector>
 
 namespace esphome {
 namespace bed_presence_engine {
@@ -18,6 +40,31 @@ enum State {
   DEBOUNCING_OFF  // Low signal detected, timer running (binary sensor: ON)
 };
 
+// Per-frame comparison results that drive the threshold state machine
+struct ThresholdCrossing {
+  bool at_or_above_on;  // z >= k_on
+  bool above_on;        // z > k_on (refreshes high-confidence time)
+  bool below_off;       // z < k_off
+};
+
+// Reasons published to last_change_reason, mapped to static strings so
+// transitions never build temporary strings
+enum ChangeReason : uint8_t {
+  REASON_IDLE_INIT,
+  REASON_ON_THRESHOLD_EXCEEDED,
+  REASON_OFF_ABS_CLEAR_DELAY,
+  REASON_ON_CUSUM_ALARM,
+  REASON_OFF_CUSUM_ALARM,
+  REASON_OFF_RESET_TO_DEFAULTS,
+  REASON_CALIBRATION_STARTED,
+  REASON_CALIBRATION_COMPLETED,
+  REASON_CALIBRATION_INSUFFICIENT_SAMPLES,
+};
+
+const char *change_reason_to_string(ChangeReason reason);
+
+class BedZone;
+
 /**
  * BedPresenceEngine Component - Phase 2 Implementation
  *
@@ -27,6 +74,20 @@ enum State {
  * - 4-state machine with debouncing (IDLE, DEBOUNCING_ON, PRESENT, DEBOUNCING_OFF)
  * - Eliminates "twitchiness" through sustained condition requirements
  * - Absolute clear delay prevents premature clearing after recent high signals
+ * - Selectable detector: thresholds + debounce, or two-sided CUSUM change-point test
+ * - Optional prefilter (rolling median / EWMA / Kalman) in front of the state machine
+ * - Optional per-gate mode: weighted z across the LD2410 engineering-mode gates covering the bed
+ * - Optional zones: up to MAX_ZONES independent distance-band state machines fed from the same frame
+ * - Optional frame log: recent frames in a ring buffer, frozen around each transition for replay
+ * - Optional raw frame stream: every frame over TCP to local subscribers, dropped (never blocking) under backpressure
+ * - Performance counters (frame rate, loop time, transitions, aborts) as diagnostic sensors
+ * - Detection latency histograms (first crossing → ON/OFF), summarized as diagnostic sensors
+ * - Occupancy summary per period (time in bed, entries/exits, longest stretch/absence, restlessness)
+ * - Summarized telemetry: per-interval still energy min/max/mean/p95 behind delta/heartbeat filters
+ * - Optional profile table (k, debounce, distance window, prefilter), switched in one call
+ * - Optional calibration convergence: finish as soon as the running median/MAD has settled
+ * - diagnostics_level (lean/basic/full) compiles reasons, verbose logs and diagnostics in or out
+ * - No heap allocation after setup(): fixed buffers only
  */
 class BedPresenceEngine : public Component, public binary_sensor::BinarySensor {
  public:
@@ -41,11 +102,93 @@ class BedPresenceEngine : public Component, public binary_sensor::BinarySensor {
   void set_on_debounce_ms(unsigned long ms) { on_debounce_ms_ = ms; }
   void set_off_debounce_ms(unsigned long ms) { off_debounce_ms_ = ms; }
   void set_abs_clear_delay_ms(unsigned long ms) { abs_clear_delay_ms_ = ms; }
+#if BED_PRESENCE_HAS_REASONS
   void set_state_reason_sensor(text_sensor::TextSensor *sensor) { state_reason_sensor_ = sensor; }
   void set_last_change_reason_sensor(text_sensor::TextSensor *sensor) { last_change_reason_sensor_ = sensor; }
+#endif
   void set_distance_sensor(sensor::Sensor *sensor) { distance_sensor_ = sensor; }
+  void set_moving_energy_sensor(sensor::Sensor *sensor) { moving_energy_sensor_ = sensor; }
   void set_d_min_cm(float value) { d_min_cm_ = value; }
   void set_d_max_cm(float value) { d_max_cm_ = value; }
+  void set_gate_still_energy_sensor(uint8_t gate, sensor::Sensor *sensor);
+  void set_gate_move_energy_sensor(uint8_t gate, sensor::Sensor *sensor);
+  void set_gate_weight(uint8_t gate, float weight);
+  void set_detector_mode(DetectorMode mode) { detector_mode_ = mode; }
+  void set_cusum_h_on(float h) { cusum_h_on_ = h; }
+  void set_cusum_h_off(float h) { cusum_h_off_ = h; }
+  void set_cusum_statistic_sensor(sensor::Sensor *sensor) { cusum_statistic_sensor_ = sensor; }
+  void add_zone(BedZone *zone);
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  void set_diagnostics_interval_ms(uint32_t ms) { diagnostics_interval_ms_ = ms; }
+  void set_frame_rate_sensor(sensor::Sensor *sensor) { frame_rate_sensor_ = sensor; }
+  void set_frames_out_of_window_sensor(sensor::Sensor *sensor) { frames_out_of_window_sensor_ = sensor; }
+  void set_loop_time_max_sensor(sensor::Sensor *sensor) { loop_time_max_sensor_ = sensor; }
+  void set_loop_time_avg_sensor(sensor::Sensor *sensor) { loop_time_avg_sensor_ = sensor; }
+  void set_transitions_per_hour_sensor(sensor::Sensor *sensor) { transitions_per_hour_sensor_ = sensor; }
+  void set_debounce_aborts_sensor(sensor::Sensor *sensor) { debounce_aborts_sensor_ = sensor; }
+  void set_calibration_fill_sensor(sensor::Sensor *sensor) { calibration_fill_sensor_ = sensor; }
+  void set_on_latency_p90_sensor(sensor::Sensor *sensor) { on_latency_p90_sensor_ = sensor; }
+  void set_off_latency_p90_sensor(sensor::Sensor *sensor) { off_latency_p90_sensor_ = sensor; }
+  void set_latency_summary_sensor(text_sensor::TextSensor *sensor) { latency_summary_sensor_ = sensor; }
+#endif
+  void set_calibration_convergence(uint16_t min_samples, uint16_t stable_samples, float tolerance) {
+    convergence_enabled_ = true;
+    convergence_.configure(min_samples, stable_samples, tolerance);
+  }
+  void set_summary_period_ms(uint32_t ms) {
+    summary_enabled_ = true;
+    summary_period_ms_ = ms;
+  }
+#ifdef USE_TIME
+  void set_summary_time(time::RealTimeClock *time, uint8_t rollover_hour) {
+    summary_time_ = time;
+    summary_rollover_hour_ = rollover_hour;
+  }
+#endif
+  void set_restless_threshold(float energy) { summary_.set_restless_threshold(energy); }
+  void set_restless_refractory_ms(uint32_t ms) { summary_.set_restless_refractory_ms(ms); }
+  void set_time_in_bed_sensor(sensor::Sensor *sensor) { time_in_bed_sensor_ = sensor; }
+  void set_entries_sensor(sensor::Sensor *sensor) { entries_sensor_ = sensor; }
+  void set_exits_sensor(sensor::Sensor *sensor) { exits_sensor_ = sensor; }
+  void set_longest_in_bed_sensor(sensor::Sensor *sensor) { longest_in_bed_sensor_ = sensor; }
+  void set_longest_absence_sensor(sensor::Sensor *sensor) { longest_absence_sensor_ = sensor; }
+  void set_restless_events_sensor(sensor::Sensor *sensor) { restless_events_sensor_ = sensor; }
+  void set_telemetry_interval_ms(uint32_t ms) {
+    telemetry_enabled_ = true;
+    telemetry_interval_ms_ = ms;
+  }
+  void set_telemetry_filter(float delta, uint32_t heartbeat_ms) {
+    telemetry_delta_ = delta;
+    telemetry_heartbeat_ms_ = heartbeat_ms;
+  }
+  void set_telemetry_sensor(TelemetryStat stat, sensor::Sensor *sensor) {
+    if (stat < TELEMETRY_STAT_COUNT) {
+      telemetry_sensors_[stat] = sensor;
+    }
+  }
+  void set_transition_z_sensor(sensor::Sensor *sensor) { transition_z_sensor_ = sensor; }
+  void set_frame_log_capacity(uint16_t capacity) { frame_log_capacity_ = capacity; }
+  void set_frame_log_freeze_on_transition(bool enabled, uint16_t post_frames) {
+    frame_log_.set_freeze_on_transition(enabled, post_frames);
+  }
+  void set_frame_log_auto_resume(bool after_dump, uint32_t hold_off_ms) {
+    frame_log_.set_auto_resume(after_dump, hold_off_ms);
+  }
+  void set_frame_stream(uint16_t port, uint8_t max_clients) {
+    frame_stream_port_ = port;
+    frame_stream_max_clients_ = max_clients;
+  }
+#ifdef USE_BED_PRESENCE_FRAME_LOG_HTTP
+  void set_frame_log_web_server(web_server_base::WebServerBase *server) { frame_log_web_server_ = server; }
+#endif
+  void set_prefilter_mode(PrefilterMode mode) { prefilter_.set_mode(mode); }
+  void set_prefilter_window(uint8_t window) { prefilter_.set_median_window(window); }
+  void set_prefilter_alpha(float alpha) { prefilter_.set_ewma_alpha(alpha); }
+  void set_prefilter_kalman_noise(float process_noise, float measurement_noise) {
+    prefilter_.set_kalman_noise(process_noise, measurement_noise);
+  }
+  void add_profile(const EngineProfile &profile);
+  void set_active_profile_sensor(text_sensor::TextSensor *sensor) { active_profile_sensor_ = sensor; }
 
   // Public methods for runtime updates from HA
   void update_k_on(float k);
@@ -55,16 +198,48 @@ class BedPresenceEngine : public Component, public binary_sensor::BinarySensor {
   void update_abs_clear_delay_ms(unsigned long ms);
   void update_d_min_cm(float value);
   void update_d_max_cm(float value);
+  void update_zone_window(uint8_t index, float d_min_cm, float d_max_cm);
+
+  // Current knob values (after HA updates or a profile switch), for syncing the number entities
+  float get_k_on() const { return k_on_; }
+  float get_k_off() const { return k_off_; }
+  unsigned long get_on_debounce_ms() const { return on_debounce_ms_; }
+  unsigned long get_off_debounce_ms() const { return off_debounce_ms_; }
+  unsigned long get_abs_clear_delay_ms() const { return abs_clear_delay_ms_; }
+  float get_d_min_cm() const { return d_min_cm_; }
+  float get_d_max_cm() const { return d_max_cm_; }
+
+  // Profile service: applies every knob of the profile at once. State and
+  // debounce timers carry over; the new values apply from the next frame.
+  bool activate_profile(const std::string &name);
+  bool activate_profile(uint8_t index);
+  const char *get_active_profile() const;
 
   // Calibration + reset services
   void start_baseline_calibration(uint32_t duration_s);
   void stop_baseline_calibration();
   void reset_to_defaults();
 
+  // Frame log services (dump via GET /bed_presence/frames while frozen; a resume during a dump is deferred)
+  void freeze_frame_log();
+  void resume_frame_log();
+
+  // Latency histogram services (threshold detector; no-ops below diagnostics_level: full)
+  void log_latency_histograms();
+  void reset_latency_histograms();
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  const LatencyHistogram &get_on_latency() const { return on_latency_; }
+  const LatencyHistogram &get_off_latency() const { return off_latency_; }
+#endif
+
+  // Occupancy summary service: close the current period now and publish it
+  void publish_occupancy_summary();
+
  protected:
   // Input sensor
   sensor::Sensor *energy_sensor_{nullptr};
   sensor::Sensor *distance_sensor_{nullptr};
+  sensor::Sensor *moving_energy_sensor_{nullptr};  // Frame log/stream and restlessness only
 
   // Baseline calibration collected on 2025-11-06 18:39:42
   // Location: New sensor position looking at bed
@@ -80,10 +255,78 @@ class BedPresenceEngine : public Component, public binary_sensor::BinarySensor {
   float k_on_{9.0f};   // Turn ON when z > k_on (default: 9 std deviations)
   float k_off_{4.0f};  // Turn OFF when z < k_off (default: 4 std deviations)
 
+  // Energy-domain thresholds (μ + kσ in Q8), recomputed whenever μ, σ or k change
+  EnergyThresholds energy_thresholds_{};
+
+  // Last state machine input; z is computed lazily for reasons and logs
+  float last_energy_{0.0f};
+  float last_z_{0.0f};
+  bool last_z_valid_{false};
+
   // Phase 3: Distance window (cm)
   float d_min_cm_{0.0f};
   float d_max_cm_{600.0f};
 
+  // Per-gate mode (LD2410 engineering mode): when gate sensors are configured the
+  // distance window selects which gates contribute instead of dropping frames
+  bool gate_mode_{false};
+  sensor::Sensor *gate_still_sensors_[GATE_COUNT]{};
+  sensor::Sensor *gate_move_sensors_[GATE_COUNT]{};
+  float gate_weights_[GATE_COUNT]{};         // Configured weight per gate
+  float gate_window_weights_[GATE_COUNT]{};  // Configured weight masked by distance window
+  float gate_still_energy_[GATE_COUNT]{};
+  float gate_move_energy_[GATE_COUNT]{};
+  GateBaseline gate_still_baseline_[GATE_COUNT];
+  GateBaseline gate_move_baseline_[GATE_COUNT];
+  float last_z_move_{0.0f};  // Weighted moving-energy z (reserved for restlessness)
+
+  // Multi-zone mode: zones share this engine's input frame, routed by distance
+  BedZone *zones_[MAX_ZONES]{};
+  uint8_t zone_count_{0};
+  ZoneWindowTable zone_windows_;
+
+  // Frame log: allocated once in setup(), records every new frame
+  FrameLog frame_log_;
+  uint16_t frame_log_capacity_{0};
+  bool last_logged_occupied_{false};
+  uint8_t last_zone_mask_{0};
+#ifdef USE_BED_PRESENCE_FRAME_LOG_HTTP
+  web_server_base::WebServerBase *frame_log_web_server_{nullptr};
+#endif
+
+  // Raw frame stream (TCP): created in setup() when a port is configured
+  uint16_t frame_stream_port_{0};
+  uint8_t frame_stream_max_clients_{2};
+  uint16_t frame_sequence_{0};
+#ifdef USE_BED_PRESENCE_FRAME_STREAM
+  FrameStreamServer *frame_stream_{nullptr};
+#endif
+
+  // Frame tracking: the energy sensor callback marks each new LD2410 frame so
+  // per-frame stages (prefilter, CUSUM) advance once per frame, not per loop()
+  bool frame_pending_{true};
+  bool new_frame_{false};
+
+  // Prefilter stage: the state machine sees the filtered value
+  Prefilter prefilter_;
+  PrefilterSettings configured_prefilter_{};  // YAML settings, restored by reset_to_defaults()
+
+  // Profile table, filled from the YAML; active_profile_ is NO_PROFILE until one is activated
+  EngineProfile profiles_[MAX_PROFILES]{};
+  uint8_t profile_count_{0};
+  uint8_t active_profile_{NO_PROFILE};
+  text_sensor::TextSensor *active_profile_sensor_{nullptr};
+  bool prefilter_gate_input_{false};  // Whether the filter window currently holds gate z-scores
+  float prefiltered_{0.0f};
+
+  // CUSUM detector mode: k_on/k_off act as reference levels, h_on/h_off as decision thresholds
+  DetectorMode detector_mode_{DETECTOR_THRESHOLD};
+  TwoSidedCusum cusum_;
+  float cusum_h_on_{20.0f};
+  float cusum_h_off_{40.0f};
+  float last_cusum_published_{-1.0f};
+  sensor::Sensor *cusum_statistic_sensor_{nullptr};
+
   // Phase 2: State machine (replaces simple boolean)
   State current_state_{IDLE};
 
@@ -94,24 +337,112 @@ class BedPresenceEngine : public Component, public binary_sensor::BinarySensor {
   unsigned long off_debounce_ms_{5000};        // Default: 5 seconds
   unsigned long abs_clear_delay_ms_{30000};    // Default: 30 seconds
 
+#if BED_PRESENCE_HAS_REASONS
   // Output sensors
   text_sensor::TextSensor *state_reason_sensor_{nullptr};
   text_sensor::TextSensor *last_change_reason_sensor_{nullptr};
+#endif
+
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  // Performance counters, published as diagnostic sensors every diagnostics_interval_ms_
+  PerfCounters counters_;
+  uint32_t diagnostics_interval_ms_{60000};
+  sensor::Sensor *frame_rate_sensor_{nullptr};
+  sensor::Sensor *frames_out_of_window_sensor_{nullptr};
+  sensor::Sensor *loop_time_max_sensor_{nullptr};
+  sensor::Sensor *loop_time_avg_sensor_{nullptr};
+  sensor::Sensor *transitions_per_hour_sensor_{nullptr};
+  sensor::Sensor *debounce_aborts_sensor_{nullptr};
+  sensor::Sensor *calibration_fill_sensor_{nullptr};
+
+  // Detection latency: ON from the first frame at/over k_on of the debounce that
+  // succeeded, OFF from the first frame under k_off after the last high-confidence
+  // frame (so the abs_clear_delay hold is included). Cumulative until reset.
+  LatencyHistogram on_latency_;
+  LatencyHistogram off_latency_;
+  bool off_candidate_{false};
+  unsigned long off_candidate_since_{0};
+  sensor::Sensor *on_latency_p90_sensor_{nullptr};
+  sensor::Sensor *off_latency_p90_sensor_{nullptr};
+  text_sensor::TextSensor *latency_summary_sensor_{nullptr};
+#endif
+
+  // Occupancy summary: closed at summary_rollover_hour_ local time when a clock is
+  // configured (falling back to summary_period_ms_ until it has synced), otherwise
+  // every summary_period_ms_ since the last rollover
+  OccupancySummary summary_;
+  bool summary_enabled_{false};
+  uint32_t summary_period_ms_{86400000};
+  uint32_t summary_last_check_ms_{0};
+#ifdef USE_TIME
+  time::RealTimeClock *summary_time_{nullptr};
+  uint8_t summary_rollover_hour_{12};
+  int summary_last_rollover_day_{-1};
+#endif
+  sensor::Sensor *time_in_bed_sensor_{nullptr};
+  sensor::Sensor *entries_sensor_{nullptr};
+  sensor::Sensor *exits_sensor_{nullptr};
+  sensor::Sensor *longest_in_bed_sensor_{nullptr};
+  sensor::Sensor *longest_absence_sensor_{nullptr};
+  sensor::Sensor *restless_events_sensor_{nullptr};
+
+  // Summarized telemetry: raw still energy aggregated per interval; each aggregate is
+  // only published when it moved by telemetry_delta_ or the heartbeat is due
+  EnergyTelemetry telemetry_;
+  bool telemetry_enabled_{false};
+  uint32_t telemetry_interval_ms_{60000};
+  uint32_t telemetry_window_start_ms_{0};
+  float telemetry_delta_{1.0f};
+  uint32_t telemetry_heartbeat_ms_{900000};
+  sensor::Sensor *telemetry_sensors_[TELEMETRY_STAT_COUNT]{};
+  DeltaHeartbeatFilter telemetry_filters_[TELEMETRY_STAT_COUNT];
+  sensor::Sensor *transition_z_sensor_{nullptr};
 
   // Internal methods
   float calculate_z_score(float energy, float mu, float sigma);
+  void process_current_frame();
   void process_energy_reading(float energy);
-  void publish_reason(const std::string &reason);
-  void publish_change_reason(const std::string &reason);
+  void record_frame();
+  void process_z_score(float z_still);
+  void run_state_machine(ThresholdCrossing crossing);
+  float current_z_score();
+  void update_energy_thresholds();
+  void process_cusum(float z_still);
+  float prefilter(float value, bool gate_input);
+  bool read_gate_frame();
+  void process_gate_frame(float energy);
+  void update_gate_window();
+  void process_zones(float energy);
+  void rebuild_zone_windows();
+  void reset_gate_baselines();
+  void publish_reason(const char *reason);
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+  void publish_diagnostics(uint32_t now);
+  void publish_latency_summary();
+#endif
+  void update_occupancy_summary(uint32_t now, bool occupied);
+  void publish_telemetry(uint32_t now);
+  bool summary_rollover_due(uint32_t now);
+  void publish_change_reason(ChangeReason reason);
 
   // Calibration helpers
   void handle_calibration_sample(float energy);
   void finalize_calibration();
+  void finalize_gate_calibration();
+  void publish_calibration_progress(unsigned long now);
 
   bool calibrating_{false};
+  unsigned long calibration_start_time_{0};
   unsigned long calibration_end_time_{0};
-  std::vector<float> calibration_samples_;
+  // Convergence mode: the requested duration becomes an upper bound
+  bool convergence_enabled_{false};
+  CalibrationConvergence convergence_;
+  static constexpr uint16_t CALIBRATION_PROGRESS_EVERY = 50;  // Frames between progress reasons (~5s)
   static constexpr size_t MAX_CALIBRATION_SAMPLES = 4096;
+  float calibration_samples_[MAX_CALIBRATION_SAMPLES];  // Preallocated: 16KB, reused for MAD deviations
+  size_t calibration_count_{0};
+  EnergyHistogram gate_still_histograms_[GATE_COUNT];
+  EnergyHistogram gate_move_histograms_[GATE_COUNT];
 };
 
 }  // namespace bed_presence_engine
@@ -0,0 +1,154 @@
+#include "bed_zone.h"
+#include "esphome/core/log.h"
+#include <cstdio>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+static const char *const TAG = "bed_presence_engine.zone";
+
+void BedZone::setup(uint8_t index) {
+  this->index_ = index;
+  this->update_energy_thresholds();
+  ESP_LOGCONFIG(TAG, "  Zone %u: [%.1fcm, %.1fcm], μ=%.2f, σ=%.2f, k_on=%.2f, k_off=%.2f", index, this->d_min_cm_,
+                this->d_max_cm_, this->mu_still_, this->sigma_still_, this->k_on_, this->k_off_);
+
+  this->current_state_ = IDLE;
+  this->publish_state(false);
+  this->publish_reason("Initial state: IDLE");
+}
+
+float BedZone::current_z_score() const {
+  if (this->sigma_still_ <= 0.001f) {
+    return 0.0f;
+  }
+  return (this->last_energy_ - this->mu_still_) / this->sigma_still_;
+}
+
+void BedZone::update_energy_thresholds() {
+  this->energy_thresholds_ = compute_energy_thresholds(this->mu_still_, this->sigma_still_, this->k_on_, this->k_off_);
+}
+
+// Same 4-state machine as the single-zone threshold detector, on precomputed Q8 thresholds
+void BedZone::process_frame(float energy, int32_t energy_q, unsigned long now) {
+  this->last_energy_ = energy;
+  bool at_or_above_on = energy_q >= this->energy_thresholds_.on;
+  bool above_on = energy_q > this->energy_thresholds_.on_strict;
+  bool below_off = energy_q < this->energy_thresholds_.off;
+
+  switch (this->current_state_) {
+    case IDLE:
+      if (at_or_above_on) {
+        this->debounce_start_time_ = now;
+        this->current_state_ = DEBOUNCING_ON;
+        ESP_LOGD(TAG, "Zone %u: IDLE → DEBOUNCING_ON (z=%.2f)", this->index_, this->current_z_score());
+      }
+      break;
+
+    case DEBOUNCING_ON:
+      if (at_or_above_on) {
+        if ((now - this->debounce_start_time_) >= this->on_debounce_ms_) {
+          this->current_state_ = PRESENT;
+          this->last_high_confidence_time_ = now;
+          this->publish_state(true);
+
+          char reason[64];
+          BED_PRESENCE_FORMAT_REASON(reason, "ON: z=%.2f, debounced %lums", this->current_z_score(),
+                                     this->on_debounce_ms_);
+          this->publish_reason(reason);
+          ESP_LOGI(TAG, "Zone %u: DEBOUNCING_ON → PRESENT: %s", this->index_, reason);
+        }
+      } else {
+        this->current_state_ = IDLE;
+        ESP_LOGD(TAG, "Zone %u: DEBOUNCING_ON → IDLE (abort)", this->index_);
+      }
+      break;
+
+    case PRESENT:
+      if (above_on) {
+        this->last_high_confidence_time_ = now;
+      }
+      if (below_off && (now - this->last_high_confidence_time_) >= this->abs_clear_delay_ms_) {
+        this->debounce_start_time_ = now;
+        this->current_state_ = DEBOUNCING_OFF;
+        ESP_LOGD(TAG, "Zone %u: PRESENT → DEBOUNCING_OFF (z=%.2f)", this->index_, this->current_z_score());
+      }
+      break;
+
+    case DEBOUNCING_OFF:
+      if (below_off) {
+        if ((now - this->debounce_start_time_) >= this->off_debounce_ms_) {
+          this->current_state_ = IDLE;
+          this->publish_state(false);
+
+          char reason[64];
+          BED_PRESENCE_FORMAT_REASON(reason, "OFF: z=%.2f, debounced %lums", this->current_z_score(),
+                                     this->off_debounce_ms_);
+          this->publish_reason(reason);
+          ESP_LOGI(TAG, "Zone %u: DEBOUNCING_OFF → IDLE: %s", this->index_, reason);
+        }
+      } else if (at_or_above_on) {
+        this->current_state_ = PRESENT;
+        this->last_high_confidence_time_ = now;
+        ESP_LOGD(TAG, "Zone %u: DEBOUNCING_OFF → PRESENT (signal returned)", this->index_);
+      }
+      break;
+  }
+}
+
+void BedZone::update_k_on(float k) {
+  ESP_LOGI(TAG, "Zone %u: updating k_on: %.2f -> %.2f", this->index_, this->k_on_, k);
+  this->k_on_ = k;
+  this->update_energy_thresholds();
+}
+
+void BedZone::update_k_off(float k) {
+  ESP_LOGI(TAG, "Zone %u: updating k_off: %.2f -> %.2f", this->index_, this->k_off_, k);
+  this->k_off_ = k;
+  this->update_energy_thresholds();
+}
+
+void BedZone::finalize_calibration() {
+  uint16_t count = this->calibration_histogram_.count();
+  if (count == 0) {
+    ESP_LOGW(TAG, "Zone %u: no calibration samples inside its window, keeping baseline", this->index_);
+    return;
+  }
+
+  GateBaseline baseline = baseline_from_histogram(this->calibration_histogram_);
+  this->mu_still_ = baseline.mu;
+  this->sigma_still_ = baseline.sigma;
+  this->update_energy_thresholds();
+  ESP_LOGI(TAG, "Zone %u calibration: mu=%.2f, sigma=%.2f (samples=%u)", this->index_, baseline.mu, baseline.sigma,
+           static_cast<unsigned>(count));
+}
+
+void BedZone::reset_to_defaults() {
+  // The distance window defines the zone and is kept
+  this->mu_still_ = 6.7f;
+  this->sigma_still_ = 3.5f;
+  this->k_on_ = 9.0f;
+  this->k_off_ = 4.0f;
+  this->on_debounce_ms_ = 3000;
+  this->off_debounce_ms_ = 5000;
+  this->abs_clear_delay_ms_ = 30000;
+  this->update_energy_thresholds();
+  this->calibration_histogram_.clear();
+
+  this->current_state_ = IDLE;
+  this->publish_state(false);
+  this->publish_reason("Reset to defaults");
+}
+
+void BedZone::publish_reason(const char *reason) {
+#if BED_PRESENCE_HAS_REASONS
+  if (this->state_reason_sensor_ != nullptr) {
+    this->state_reason_sensor_->publish_state(reason);
+  }
+#else
+  (void) reason;
+#endif
+}
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,86 @@
+#pragma once
+
+#include "esphome/components/binary_sensor/binary_sensor.h"
+#include "esphome/components/text_sensor/text_sensor.h"
+#include "bed_presence.h"
+#include "energy_thresholds.h"
+#include "gate_energy.h"
+#include <cstdint>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+/**
+ * One bed zone in multi-zone mode (e.g. the left and right side of a king bed).
+ *
+ * Zones are hosted by a BedPresenceEngine and share its LD2410 input: the
+ * engine routes each frame by distance and hands every zone whose window
+ * contains it the energy already converted to Q8. Each zone runs its own
+ * threshold state machine with its own baseline, k_on/k_off and debounce
+ * timers, and calibrates into a fixed-size histogram.
+ */
+class BedZone : public binary_sensor::BinarySensor {
+ public:
+  // Configuration setters
+  void set_d_min_cm(float value) { d_min_cm_ = value; }
+  void set_d_max_cm(float value) { d_max_cm_ = value; }
+  void set_baseline(float mu, float sigma) {
+    mu_still_ = mu;
+    sigma_still_ = sigma;
+  }
+  void set_k_on(float k) { k_on_ = k; }
+  void set_k_off(float k) { k_off_ = k; }
+  void set_on_debounce_ms(unsigned long ms) { on_debounce_ms_ = ms; }
+  void set_off_debounce_ms(unsigned long ms) { off_debounce_ms_ = ms; }
+  void set_abs_clear_delay_ms(unsigned long ms) { abs_clear_delay_ms_ = ms; }
+#if BED_PRESENCE_HAS_REASONS
+  void set_state_reason_sensor(text_sensor::TextSensor *sensor) { state_reason_sensor_ = sensor; }
+#endif
+
+  float get_d_min_cm() const { return this->d_min_cm_; }
+  float get_d_max_cm() const { return this->d_max_cm_; }
+  State get_state() const { return this->current_state_; }
+
+  // Public methods for runtime updates from HA
+  void update_k_on(float k);
+  void update_k_off(float k);
+
+  // Called by the hosting engine
+  void setup(uint8_t index);
+  void process_frame(float energy, int32_t energy_q, unsigned long now);
+  void add_calibration_sample(float energy) { this->calibration_histogram_.add(energy); }
+  void start_calibration() { this->calibration_histogram_.clear(); }
+  void finalize_calibration();
+  void reset_to_defaults();
+
+ protected:
+  float current_z_score() const;
+  void update_energy_thresholds();
+  void publish_reason(const char *reason);
+
+  uint8_t index_{0};
+
+  float d_min_cm_{0.0f};
+  float d_max_cm_{600.0f};
+  float mu_still_{6.7f};
+  float sigma_still_{3.5f};
+  float k_on_{9.0f};
+  float k_off_{4.0f};
+  EnergyThresholds energy_thresholds_{};
+  float last_energy_{0.0f};
+
+  State current_state_{IDLE};
+  unsigned long debounce_start_time_{0};
+  unsigned long last_high_confidence_time_{0};
+  unsigned long on_debounce_ms_{3000};
+  unsigned long off_debounce_ms_{5000};
+  unsigned long abs_clear_delay_ms_{30000};
+
+#if BED_PRESENCE_HAS_REASONS
+  text_sensor::TextSensor *state_reason_sensor_{nullptr};
+#endif
+  EnergyHistogram calibration_histogram_;
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -2,9 +2,26 @@
 import esphome.codegen as cg
 import esphome.config_validation as cv
 from esphome.components import sensor, binary_sensor, text_sensor
-from esphome.const import CONF_ID, DEVICE_CLASS_OCCUPANCY
+from esphome.components import time as time_
+from esphome.const import (
+    CONF_ID,
+    CONF_MODE,
+    CONF_NAME,
+    CONF_PORT,
+    CONF_TIME_ID,
+    CONF_UPDATE_INTERVAL,
+    DEVICE_CLASS_OCCUPANCY,
+    ENTITY_CATEGORY_DIAGNOSTIC,
+    STATE_CLASS_MEASUREMENT,
+    STATE_CLASS_TOTAL_INCREASING,
+    UNIT_HERTZ,
+    UNIT_HOUR,
+    UNIT_MINUTE,
+    UNIT_PERCENT,
+    UNIT_SECOND,
+)
 
-from . import bed_presence_engine_ns, BedPresenceEngine
+from . import bed_presence_engine_ns, BedPresenceEngine, BedZone
 
 # Configuration keys
 CONF_ENERGY_SENSOR = "energy_sensor"
@@ -18,32 +35,453 @@ CONF_DISTANCE_MIN = "distance_min_cm"
 CONF_DISTANCE_MAX = "distance_max_cm"
 CONF_STATE_REASON = "state_reason"
 CONF_LAST_CHANGE_REASON = "last_change_reason"
+CONF_GATES = "gates"
+CONF_GATE = "gate"
+CONF_STILL_ENERGY = "still_energy"
+CONF_MOVE_ENERGY = "move_energy"
+CONF_WEIGHT = "weight"
+CONF_DETECTOR = "detector"
+CONF_CUSUM_H_ON = "cusum_h_on"
+CONF_CUSUM_H_OFF = "cusum_h_off"
+CONF_CUSUM_STATISTIC = "cusum_statistic"
+CONF_PREFILTER = "prefilter"
+CONF_WINDOW = "window"
+CONF_ALPHA = "alpha"
+CONF_PROCESS_NOISE = "process_noise"
+CONF_MEASUREMENT_NOISE = "measurement_noise"
+CONF_ZONES = "zones"
+CONF_MOVING_ENERGY_SENSOR = "moving_energy_sensor"
+CONF_FRAME_LOG = "frame_log"
+CONF_CAPACITY = "capacity"
+CONF_FREEZE_ON_TRANSITION = "freeze_on_transition"
+CONF_POST_TRANSITION_FRAMES = "post_transition_frames"
+CONF_RESUME_AFTER_DUMP = "resume_after_dump"
+CONF_HOLD_OFF = "hold_off"
+CONF_FRAME_STREAM = "frame_stream"
+CONF_MAX_CLIENTS = "max_clients"
+CONF_DIAGNOSTICS = "diagnostics"
+CONF_FRAME_RATE = "frame_rate"
+CONF_FRAMES_OUT_OF_WINDOW = "frames_out_of_window"
+CONF_LOOP_TIME_MAX = "loop_time_max"
+CONF_LOOP_TIME_AVG = "loop_time_avg"
+CONF_TRANSITIONS_PER_HOUR = "transitions_per_hour"
+CONF_DEBOUNCE_ABORTS = "debounce_aborts"
+CONF_CALIBRATION_FILL = "calibration_fill"
+CONF_ON_LATENCY_P90 = "on_latency_p90"
+CONF_OFF_LATENCY_P90 = "off_latency_p90"
+CONF_LATENCY_SUMMARY = "latency_summary"
+CONF_OCCUPANCY_SUMMARY = "occupancy_summary"
+CONF_ROLLOVER_HOUR = "rollover_hour"
+CONF_PERIOD = "period"
+CONF_RESTLESS_THRESHOLD = "restless_threshold"
+CONF_RESTLESS_REFRACTORY = "restless_refractory"
+CONF_TIME_IN_BED = "time_in_bed"
+CONF_ENTRIES = "entries"
+CONF_EXITS = "exits"
+CONF_LONGEST_IN_BED = "longest_in_bed"
+CONF_LONGEST_ABSENCE = "longest_absence"
+CONF_RESTLESS_EVENTS = "restless_events"
+CONF_TELEMETRY = "telemetry"
+CONF_DELTA = "delta"
+CONF_HEARTBEAT = "heartbeat"
+CONF_STILL_ENERGY_MIN = "still_energy_min"
+CONF_STILL_ENERGY_MAX = "still_energy_max"
+CONF_STILL_ENERGY_MEAN = "still_energy_mean"
+CONF_STILL_ENERGY_P95 = "still_energy_p95"
+CONF_TRANSITION_Z = "transition_z"
+CONF_DIAGNOSTICS_LEVEL = "diagnostics_level"
+CONF_CALIBRATION_CONVERGENCE = "calibration_convergence"
+CONF_MIN_SAMPLES = "min_samples"
+CONF_STABLE_SAMPLES = "stable_samples"
+CONF_TOLERANCE = "tolerance"
+CONF_PROFILES = "profiles"
+CONF_ACTIVE_PROFILE = "active_profile"
 
-CONFIG_SCHEMA = binary_sensor.binary_sensor_schema(
-    BedPresenceEngine,
-    device_class=DEVICE_CLASS_OCCUPANCY
-).extend(
+# Compile-time diagnostics levels (diagnostics_level.h)
+DIAGNOSTICS_LEVELS = {
+    "lean": 0,  # State machine only
+    "basic": 1,  # + state reason text sensors
+    "full": 2,  # + verbose frame logs, performance counters, latency histograms
+}
+
+UNIT_MICROSECOND = "µs"
+CONF_BASELINE_MU = "baseline_mu"
+CONF_BASELINE_SIGMA = "baseline_sigma"
+
+# The frame log dump is served through web_server_base; declared here rather than imported so
+# builds without frame_log never depend on it
+CONF_WEB_SERVER_BASE_ID = "web_server_base_id"
+WebServerBase = cg.esphome_ns.namespace("web_server_base").class_("WebServerBase")
+
+EngineProfile = bed_presence_engine_ns.struct("EngineProfile")
+MAX_PROFILES = 4
+
+DetectorMode = bed_presence_engine_ns.enum("DetectorMode")
+DETECTOR_MODES = {
+    "threshold": DetectorMode.DETECTOR_THRESHOLD,
+    "cusum": DetectorMode.DETECTOR_CUSUM,
+}
+
+PrefilterMode = bed_presence_engine_ns.enum("PrefilterMode")
+PREFILTER_MODES = {
+    "none": PrefilterMode.PREFILTER_NONE,
+    "median": PrefilterMode.PREFILTER_MEDIAN,
+    "ewma": PrefilterMode.PREFILTER_EWMA,
+    "kalman": PrefilterMode.PREFILTER_KALMAN,
+}
+
+GATE_SCHEMA = cv.Schema(
+    {
+        cv.Required(CONF_GATE): cv.int_range(min=0, max=8),
+        cv.Required(CONF_STILL_ENERGY): cv.use_id(sensor.Sensor),
+        cv.Optional(CONF_MOVE_ENERGY): cv.use_id(sensor.Sensor),
+        cv.Optional(CONF_WEIGHT, default=1.0): cv.float_range(min=0.0, max=10.0),
+    }
+)
+
+
+def validate_odd(value):
+    if value % 2 == 0:
+        raise cv.Invalid("Median window must be odd")
+    return value
+
+
+PREFILTER_SCHEMA = cv.Schema(
+    {
+        cv.Optional(CONF_MODE, default="none"): cv.enum(PREFILTER_MODES, lower=True),
+        cv.Optional(CONF_WINDOW, default=5): cv.All(cv.int_range(min=1, max=15), validate_odd),
+        cv.Optional(CONF_ALPHA, default=0.3): cv.float_range(min=0.01, max=1.0),
+        cv.Optional(CONF_PROCESS_NOISE, default=0.05): cv.positive_float,
+        cv.Optional(CONF_MEASUREMENT_NOISE, default=1.0): cv.positive_not_null_float,
+    }
+)
+
+
+def validate_gates(gates):
+    seen = set()
+    for gate in gates:
+        if gate[CONF_GATE] in seen:
+            raise cv.Invalid(f"Gate {gate[CONF_GATE]} is configured more than once")
+        seen.add(gate[CONF_GATE])
+    return gates
+
+
+def validate_zone_window(zone):
+    if zone[CONF_DISTANCE_MIN] >= zone[CONF_DISTANCE_MAX]:
+        raise cv.Invalid(f"{CONF_DISTANCE_MIN} must be less than {CONF_DISTANCE_MAX}")
+    return zone
+
+
+ZONE_SCHEMA = cv.All(
+    binary_sensor.binary_sensor_schema(BedZone, device_class=DEVICE_CLASS_OCCUPANCY).extend(
+        {
+            cv.Required(CONF_DISTANCE_MIN): cv.float_range(min=0.0, max=1000.0),
+            cv.Required(CONF_DISTANCE_MAX): cv.float_range(min=0.0, max=1000.0),
+            cv.Optional(CONF_BASELINE_MU, default=6.7): cv.float_range(min=0.0, max=100.0),
+            cv.Optional(CONF_BASELINE_SIGMA, default=3.5): cv.positive_not_null_float,
+            cv.Optional(CONF_K_ON, default=9.0): cv.float_range(min=0.0, max=15.0),
+            cv.Optional(CONF_K_OFF, default=4.0): cv.float_range(min=0.0, max=15.0),
+            cv.Optional(CONF_ON_DEBOUNCE_MS, default=3000): cv.positive_int,
+            cv.Optional(CONF_OFF_DEBOUNCE_MS, default=5000): cv.positive_int,
+            cv.Optional(CONF_ABS_CLEAR_DELAY_MS, default=30000): cv.positive_int,
+            cv.Optional(CONF_STATE_REASON): text_sensor.text_sensor_schema(),
+        }
+    ),
+    validate_zone_window,
+)
+
+
+def validate_profile_window(profile):
+    if profile[CONF_DISTANCE_MIN] > profile[CONF_DISTANCE_MAX]:
+        raise cv.Invalid(f"{CONF_DISTANCE_MIN} must not be greater than {CONF_DISTANCE_MAX}")
+    return profile
+
+
+def validate_profile_names(profiles):
+    seen = set()
+    for profile in profiles:
+        if profile[CONF_NAME] in seen:
+            raise cv.Invalid(f"Profile '{profile[CONF_NAME]}' is configured more than once")
+        seen.add(profile[CONF_NAME])
+    return profiles
+
+
+# Parameter profile: a complete set of knobs, activated as a unit by the activate_profile service.
+# Unset knobs take the engine defaults, not the values currently active.
+PROFILE_SCHEMA = cv.All(
+    cv.Schema(
+        {
+            cv.Required(CONF_NAME): cv.All(cv.string_strict, cv.Length(min=1, max=32)),
+            cv.Optional(CONF_K_ON, default=9.0): cv.float_range(min=0.0, max=15.0),
+            cv.Optional(CONF_K_OFF, default=4.0): cv.float_range(min=0.0, max=15.0),
+            cv.Optional(CONF_ON_DEBOUNCE_MS, default=3000): cv.positive_int,
+            cv.Optional(CONF_OFF_DEBOUNCE_MS, default=5000): cv.positive_int,
+            cv.Optional(CONF_ABS_CLEAR_DELAY_MS, default=30000): cv.positive_int,
+            cv.Optional(CONF_DISTANCE_MIN, default=0.0): cv.float_range(min=0.0, max=1000.0),
+            cv.Optional(CONF_DISTANCE_MAX, default=600.0): cv.float_range(min=0.0, max=1000.0),
+            cv.Optional(CONF_PREFILTER, default={}): PREFILTER_SCHEMA,
+        }
+    ),
+    validate_profile_window,
+)
+
+
+def validate_diagnostics_level(config):
+    level = DIAGNOSTICS_LEVELS[config[CONF_DIAGNOSTICS_LEVEL]]
+    if level < DIAGNOSTICS_LEVELS["full"] and CONF_DIAGNOSTICS in config:
+        raise cv.Invalid(f"{CONF_DIAGNOSTICS} requires {CONF_DIAGNOSTICS_LEVEL}: full")
+    if level < DIAGNOSTICS_LEVELS["basic"]:
+        reasons = [key for key in (CONF_STATE_REASON, CONF_LAST_CHANGE_REASON) if key in config]
+        if any(CONF_STATE_REASON in zone for zone in config.get(CONF_ZONES, [])):
+            reasons.append(f"{CONF_ZONES}: {CONF_STATE_REASON}")
+        if reasons:
+            raise cv.Invalid(
+                f"{', '.join(reasons)} requires {CONF_DIAGNOSTICS_LEVEL}: basic or full"
+            )
+    return config
+
+
+def validate_frame_log(frame_log):
+    if frame_log[CONF_POST_TRANSITION_FRAMES] >= frame_log[CONF_CAPACITY]:
+        raise cv.Invalid(f"{CONF_POST_TRANSITION_FRAMES} must be less than {CONF_CAPACITY}")
+    return frame_log
+
+
+# 8 bytes per frame: the default keeps ~5 minutes of LD2410 frames (~10Hz) in 24KB
+FRAME_LOG_SCHEMA = cv.All(
+    cv.Schema(
+        {
+            cv.GenerateID(CONF_WEB_SERVER_BASE_ID): cv.use_id(WebServerBase),
+            cv.Optional(CONF_CAPACITY, default=3000): cv.int_range(min=16, max=8192),
+            cv.Optional(CONF_FREEZE_ON_TRANSITION, default=True): cv.boolean,
+            cv.Optional(CONF_POST_TRANSITION_FRAMES, default=100): cv.int_range(min=0, max=8191),
+            # Recording resumes after a completed download, and a transition capture that nobody
+            # downloads is dropped after hold_off (0s keeps it until downloaded or resumed)
+            cv.Optional(CONF_RESUME_AFTER_DUMP, default=True): cv.boolean,
+            cv.Optional(CONF_HOLD_OFF, default="10min"): cv.positive_time_period_milliseconds,
+        }
+    ),
+    validate_frame_log,
+    cv.requires_component("web_server_base"),
+)
+
+
+# Needs the socket component only when configured (api and web_server already load it)
+FRAME_STREAM_SCHEMA = cv.All(
+    cv.Schema(
+        {
+            cv.Optional(CONF_PORT, default=6055): cv.port,
+            cv.Optional(CONF_MAX_CLIENTS, default=2): cv.int_range(min=1, max=4),
+        }
+    ),
+    cv.requires_component("socket"),
+)
+
+
+def diagnostic_sensor_schema(unit, accuracy, state_class=STATE_CLASS_MEASUREMENT):
+    return sensor.sensor_schema(
+        unit_of_measurement=unit,
+        accuracy_decimals=accuracy,
+        state_class=state_class,
+        entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+    )
+
+
+# Engine performance counters, published every update_interval
+DIAGNOSTICS_SCHEMA = cv.Schema(
+    {
+        cv.Optional(CONF_UPDATE_INTERVAL, default="60s"): cv.positive_time_period_milliseconds,
+        cv.Optional(CONF_FRAME_RATE): diagnostic_sensor_schema(UNIT_HERTZ, 1),
+        cv.Optional(CONF_FRAMES_OUT_OF_WINDOW): diagnostic_sensor_schema(
+            "frames", 0, STATE_CLASS_TOTAL_INCREASING
+        ),
+        cv.Optional(CONF_LOOP_TIME_MAX): diagnostic_sensor_schema(UNIT_MICROSECOND, 0),
+        cv.Optional(CONF_LOOP_TIME_AVG): diagnostic_sensor_schema(UNIT_MICROSECOND, 1),
+        cv.Optional(CONF_TRANSITIONS_PER_HOUR): diagnostic_sensor_schema("transitions/h", 1),
+        cv.Optional(CONF_DEBOUNCE_ABORTS): diagnostic_sensor_schema(
+            "aborts", 0, STATE_CLASS_TOTAL_INCREASING
+        ),
+        cv.Optional(CONF_CALIBRATION_FILL): diagnostic_sensor_schema(UNIT_PERCENT, 1),
+        # Detection latency histograms (threshold detector), cumulative until reset
+        cv.Optional(CONF_ON_LATENCY_P90): diagnostic_sensor_schema(UNIT_SECOND, 1),
+        cv.Optional(CONF_OFF_LATENCY_P90): diagnostic_sensor_schema(UNIT_SECOND, 1),
+        cv.Optional(CONF_LATENCY_SUMMARY): text_sensor.text_sensor_schema(
+            entity_category=ENTITY_CATEGORY_DIAGNOSTIC
+        ),
+    }
+)
+
+DIAGNOSTIC_SENSORS = {
+    CONF_FRAME_RATE: "set_frame_rate_sensor",
+    CONF_FRAMES_OUT_OF_WINDOW: "set_frames_out_of_window_sensor",
+    CONF_LOOP_TIME_MAX: "set_loop_time_max_sensor",
+    CONF_LOOP_TIME_AVG: "set_loop_time_avg_sensor",
+    CONF_TRANSITIONS_PER_HOUR: "set_transitions_per_hour_sensor",
+    CONF_DEBOUNCE_ABORTS: "set_debounce_aborts_sensor",
+    CONF_CALIBRATION_FILL: "set_calibration_fill_sensor",
+    CONF_ON_LATENCY_P90: "set_on_latency_p90_sensor",
+    CONF_OFF_LATENCY_P90: "set_off_latency_p90_sensor",
+}
+
+
+def summary_sensor_schema(unit, accuracy, icon):
+    return sensor.sensor_schema(
+        unit_of_measurement=unit,
+        accuracy_decimals=accuracy,
+        icon=icon,
+        state_class=STATE_CLASS_MEASUREMENT,
+    )
+
+
+# Per-period occupancy totals, published once at each rollover
+OCCUPANCY_SUMMARY_SCHEMA = cv.Schema(
+    {
+        # With a clock the period closes at rollover_hour local time (noon keeps a night together)
+        cv.Optional(CONF_TIME_ID): cv.use_id(time_.RealTimeClock),
+        cv.Optional(CONF_ROLLOVER_HOUR, default=12): cv.int_range(min=0, max=23),
+        # Used without a clock, and until the clock has synced
+        cv.Optional(CONF_PERIOD, default="24h"): cv.All(
+            cv.positive_time_period_milliseconds,
+            cv.Range(min=cv.TimePeriod(minutes=1)),
+        ),
+        # Restlessness: moving energy (moving_energy_sensor) at or above the threshold while
+        # occupied; movement within restless_refractory of the last counts as the same event
+        cv.Optional(CONF_RESTLESS_THRESHOLD, default=50.0): cv.float_range(min=0.0, max=100.0),
+        cv.Optional(CONF_RESTLESS_REFRACTORY, default="30s"): cv.positive_time_period_milliseconds,
+        cv.Optional(CONF_TIME_IN_BED): summary_sensor_schema(UNIT_HOUR, 2, "mdi:bed-clock"),
+        cv.Optional(CONF_ENTRIES): summary_sensor_schema("entries", 0, "mdi:bed"),
+        cv.Optional(CONF_EXITS): summary_sensor_schema("exits", 0, "mdi:bed-empty"),
+        cv.Optional(CONF_LONGEST_IN_BED): summary_sensor_schema(UNIT_HOUR, 2, "mdi:sleep"),
+        cv.Optional(CONF_LONGEST_ABSENCE): summary_sensor_schema(UNIT_MINUTE, 1, "mdi:timer-sand"),
+        cv.Optional(CONF_RESTLESS_EVENTS): summary_sensor_schema("events", 0, "mdi:motion-sensor"),
+    }
+)
+
+OCCUPANCY_SUMMARY_SENSORS = {
+    CONF_TIME_IN_BED: "set_time_in_bed_sensor",
+    CONF_ENTRIES: "set_entries_sensor",
+    CONF_EXITS: "set_exits_sensor",
+    CONF_LONGEST_IN_BED: "set_longest_in_bed_sensor",
+    CONF_LONGEST_ABSENCE: "set_longest_absence_sensor",
+    CONF_RESTLESS_EVENTS: "set_restless_events_sensor",
+}
+
+
+TelemetryStat = bed_presence_engine_ns.enum("TelemetryStat")
+TELEMETRY_STATS = {
+    CONF_STILL_ENERGY_MIN: TelemetryStat.TELEMETRY_MIN,
+    CONF_STILL_ENERGY_MAX: TelemetryStat.TELEMETRY_MAX,
+    CONF_STILL_ENERGY_MEAN: TelemetryStat.TELEMETRY_MEAN,
+    CONF_STILL_ENERGY_P95: TelemetryStat.TELEMETRY_P95,
+}
+
+
+def telemetry_sensor_schema():
+    return sensor.sensor_schema(
+        unit_of_measurement=UNIT_PERCENT,
+        accuracy_decimals=1,
+        icon="mdi:radar",
+        state_class=STATE_CLASS_MEASUREMENT,
+    )
+
+
+# Summarized telemetry: per-interval still energy aggregates instead of one row per LD2410 frame.
+# An aggregate is published when it moved by at least `delta` or the heartbeat is due.
+TELEMETRY_SCHEMA = cv.Schema(
     {
-        cv.GenerateID(): cv.declare_id(BedPresenceEngine),
-        cv.Required(CONF_ENERGY_SENSOR): cv.use_id(sensor.Sensor),
-        cv.Optional(CONF_K_ON, default=9.0): cv.float_range(min=0.0, max=15.0),
-        cv.Optional(CONF_K_OFF, default=4.0): cv.float_range(min=0.0, max=15.0),
-        cv.Optional(CONF_ON_DEBOUNCE_MS, default=3000): cv.positive_int,
-        cv.Optional(CONF_OFF_DEBOUNCE_MS, default=5000): cv.positive_int,
-        cv.Optional(CONF_ABS_CLEAR_DELAY_MS, default=30000): cv.positive_int,
-        cv.Optional(CONF_STATE_REASON): text_sensor.text_sensor_schema(),
-        cv.Optional(CONF_LAST_CHANGE_REASON): text_sensor.text_sensor_schema(),
-        cv.Optional(CONF_DISTANCE_SENSOR): cv.use_id(sensor.Sensor),
-        cv.Optional(CONF_DISTANCE_MIN, default=0.0): cv.float_range(min=0.0, max=1000.0),
-        cv.Optional(CONF_DISTANCE_MAX, default=600.0): cv.float_range(min=0.0, max=1000.0),
+        cv.Optional(CONF_UPDATE_INTERVAL, default="60s"): cv.All(
+            cv.positive_time_period_milliseconds,
+            cv.Range(min=cv.TimePeriod(seconds=1), max=cv.TimePeriod(hours=1)),
+        ),
+        cv.Optional(CONF_DELTA, default=1.0): cv.float_range(min=0.0, max=100.0),
+        # 0s disables the heartbeat
+        cv.Optional(CONF_HEARTBEAT, default="15min"): cv.positive_time_period_milliseconds,
+        cv.Optional(CONF_STILL_ENERGY_MIN): telemetry_sensor_schema(),
+        cv.Optional(CONF_STILL_ENERGY_MAX): telemetry_sensor_schema(),
+        cv.Optional(CONF_STILL_ENERGY_MEAN): telemetry_sensor_schema(),
+        cv.Optional(CONF_STILL_ENERGY_P95): telemetry_sensor_schema(),
+        # z-score at each ON/OFF transition (published on the transition, unfiltered)
+        cv.Optional(CONF_TRANSITION_Z): sensor.sensor_schema(
+            accuracy_decimals=2,
+            icon="mdi:sigma",
+            state_class=STATE_CLASS_MEASUREMENT,
+        ),
     }
-).extend(cv.COMPONENT_SCHEMA)
+)
+
+
+# Calibration convergence: finish once median and MAD (running, per LD2410 frame) have stayed
+# within `tolerance` (energy %) for `stable_samples` frames, after at least `min_samples` frames.
+# The duration passed to the calibration service becomes an upper bound.
+CALIBRATION_CONVERGENCE_SCHEMA = cv.Schema(
+    {
+        cv.Optional(CONF_MIN_SAMPLES, default=300): cv.int_range(min=10, max=4000),
+        cv.Optional(CONF_STABLE_SAMPLES, default=150): cv.int_range(min=10, max=4000),
+        cv.Optional(CONF_TOLERANCE, default=1.0): cv.float_range(min=0.1, max=20.0),
+    }
+)
+
+
+CONFIG_SCHEMA = cv.All(
+    binary_sensor.binary_sensor_schema(
+        BedPresenceEngine,
+        device_class=DEVICE_CLASS_OCCUPANCY
+    ).extend(
+        {
+            cv.GenerateID(): cv.declare_id(BedPresenceEngine),
+            # Compiles reason strings, verbose logs and engine diagnostics in or out
+            cv.Optional(CONF_DIAGNOSTICS_LEVEL, default="full"): cv.one_of(*DIAGNOSTICS_LEVELS, lower=True),
+            cv.Required(CONF_ENERGY_SENSOR): cv.use_id(sensor.Sensor),
+            cv.Optional(CONF_K_ON, default=9.0): cv.float_range(min=0.0, max=15.0),
+            cv.Optional(CONF_K_OFF, default=4.0): cv.float_range(min=0.0, max=15.0),
+            cv.Optional(CONF_ON_DEBOUNCE_MS, default=3000): cv.positive_int,
+            cv.Optional(CONF_OFF_DEBOUNCE_MS, default=5000): cv.positive_int,
+            cv.Optional(CONF_ABS_CLEAR_DELAY_MS, default=30000): cv.positive_int,
+            cv.Optional(CONF_STATE_REASON): text_sensor.text_sensor_schema(),
+            cv.Optional(CONF_LAST_CHANGE_REASON): text_sensor.text_sensor_schema(),
+            cv.Optional(CONF_DISTANCE_SENSOR): cv.use_id(sensor.Sensor),
+            cv.Optional(CONF_MOVING_ENERGY_SENSOR): cv.use_id(sensor.Sensor),
+            cv.Optional(CONF_DISTANCE_MIN, default=0.0): cv.float_range(min=0.0, max=1000.0),
+            cv.Optional(CONF_DISTANCE_MAX, default=600.0): cv.float_range(min=0.0, max=1000.0),
+            # Per-gate mode: requires LD2410 engineering mode (g0-g8 energy sensors)
+            cv.Optional(CONF_GATES): cv.All(
+                cv.ensure_list(GATE_SCHEMA), cv.Length(min=1, max=9), validate_gates
+            ),
+            cv.Optional(CONF_PREFILTER): PREFILTER_SCHEMA,
+            # Frame log: ring buffer of recent frames, dumped over HTTP at /bed_presence/frames
+            cv.Optional(CONF_FRAME_LOG): FRAME_LOG_SCHEMA,
+            cv.Optional(CONF_DIAGNOSTICS): DIAGNOSTICS_SCHEMA,
+            cv.Optional(CONF_OCCUPANCY_SUMMARY): OCCUPANCY_SUMMARY_SCHEMA,
+            cv.Optional(CONF_TELEMETRY): TELEMETRY_SCHEMA,
+            cv.Optional(CONF_CALIBRATION_CONVERGENCE): CALIBRATION_CONVERGENCE_SCHEMA,
+            # Profiles: preconfigured knob sets (e.g. night/day), switched atomically by activate_profile
+            cv.Optional(CONF_PROFILES): cv.All(
+                cv.ensure_list(PROFILE_SCHEMA), cv.Length(min=1, max=MAX_PROFILES), validate_profile_names
+            ),
+            cv.Optional(CONF_ACTIVE_PROFILE): text_sensor.text_sensor_schema(icon="mdi:tune-variant"),
+            # Raw frame stream: every LD2410 frame over TCP (12 bytes each), dropped under backpressure
+            cv.Optional(CONF_FRAME_STREAM): FRAME_STREAM_SCHEMA,
+            # Bed zones: independent state machines (threshold detector) per distance band
+            cv.Optional(CONF_ZONES): cv.All(cv.ensure_list(ZONE_SCHEMA), cv.Length(min=1, max=8)),
+            # CUSUM detector: k_on/k_off become reference levels, h_on/h_off decision thresholds (z·frames)
+            cv.Optional(CONF_DETECTOR, default="threshold"): cv.enum(DETECTOR_MODES, lower=True),
+            cv.Optional(CONF_CUSUM_H_ON, default=20.0): cv.positive_not_null_float,
+            cv.Optional(CONF_CUSUM_H_OFF, default=40.0): cv.positive_not_null_float,
+            cv.Optional(CONF_CUSUM_STATISTIC): sensor.sensor_schema(
+                accuracy_decimals=1,
+                entity_category=ENTITY_CATEGORY_DIAGNOSTIC,
+            ),
+        }
+    ).extend(cv.COMPONENT_SCHEMA),
+    validate_diagnostics_level,
+)
 
 
 async def to_code(config):
     var = cg.new_Pvariable(config[CONF_ID])
     await cg.register_component(var, config)
     await binary_sensor.register_binary_sensor(var, config)
+    cg.add_define("BED_PRESENCE_DIAGNOSTICS_LEVEL", DIAGNOSTICS_LEVELS[config[CONF_DIAGNOSTICS_LEVEL]])
 
     energy_sensor = await cg.get_variable(config[CONF_ENERGY_SENSOR])
     cg.add(var.set_energy_sensor(energy_sensor))
@@ -52,9 +490,142 @@ async def to_code(config):
         distance_sensor = await cg.get_variable(config[CONF_DISTANCE_SENSOR])
         cg.add(var.set_distance_sensor(distance_sensor))
 
+    if CONF_MOVING_ENERGY_SENSOR in config:
+        moving_energy_sensor = await cg.get_variable(config[CONF_MOVING_ENERGY_SENSOR])
+        cg.add(var.set_moving_energy_sensor(moving_energy_sensor))
+
     cg.add(var.set_d_min_cm(config[CONF_DISTANCE_MIN]))
     cg.add(var.set_d_max_cm(config[CONF_DISTANCE_MAX]))
 
+    for gate in config.get(CONF_GATES, []):
+        still_energy = await cg.get_variable(gate[CONF_STILL_ENERGY])
+        cg.add(var.set_gate_still_energy_sensor(gate[CONF_GATE], still_energy))
+        if CONF_MOVE_ENERGY in gate:
+            move_energy = await cg.get_variable(gate[CONF_MOVE_ENERGY])
+            cg.add(var.set_gate_move_energy_sensor(gate[CONF_GATE], move_energy))
+        cg.add(var.set_gate_weight(gate[CONF_GATE], gate[CONF_WEIGHT]))
+
+    if CONF_FRAME_LOG in config:
+        frame_log = config[CONF_FRAME_LOG]
+        cg.add_define("USE_BED_PRESENCE_FRAME_LOG_HTTP")
+        server = await cg.get_variable(frame_log[CONF_WEB_SERVER_BASE_ID])
+        cg.add(var.set_frame_log_web_server(server))
+        cg.add(var.set_frame_log_capacity(frame_log[CONF_CAPACITY]))
+        cg.add(
+            var.set_frame_log_freeze_on_transition(
+                frame_log[CONF_FREEZE_ON_TRANSITION], frame_log[CONF_POST_TRANSITION_FRAMES]
+            )
+        )
+        cg.add(var.set_frame_log_auto_resume(frame_log[CONF_RESUME_AFTER_DUMP], frame_log[CONF_HOLD_OFF]))
+
+    if CONF_DIAGNOSTICS in config:
+        diagnostics = config[CONF_DIAGNOSTICS]
+        cg.add(var.set_diagnostics_interval_ms(diagnostics[CONF_UPDATE_INTERVAL]))
+        for key, setter in DIAGNOSTIC_SENSORS.items():
+            if key in diagnostics:
+                diagnostic_sensor = await sensor.new_sensor(diagnostics[key])
+                cg.add(getattr(var, setter)(diagnostic_sensor))
+        if CONF_LATENCY_SUMMARY in diagnostics:
+            latency_summary = await text_sensor.new_text_sensor(diagnostics[CONF_LATENCY_SUMMARY])
+            cg.add(var.set_latency_summary_sensor(latency_summary))
+
+    if CONF_OCCUPANCY_SUMMARY in config:
+        summary = config[CONF_OCCUPANCY_SUMMARY]
+        cg.add(var.set_summary_period_ms(summary[CONF_PERIOD]))
+        if CONF_TIME_ID in summary:
+            clock = await cg.get_variable(summary[CONF_TIME_ID])
+            cg.add(var.set_summary_time(clock, summary[CONF_ROLLOVER_HOUR]))
+        cg.add(var.set_restless_threshold(summary[CONF_RESTLESS_THRESHOLD]))
+        cg.add(var.set_restless_refractory_ms(summary[CONF_RESTLESS_REFRACTORY]))
+        for key, setter in OCCUPANCY_SUMMARY_SENSORS.items():
+            if key in summary:
+                summary_sensor = await sensor.new_sensor(summary[key])
+                cg.add(getattr(var, setter)(summary_sensor))
+
+    if CONF_TELEMETRY in config:
+        telemetry = config[CONF_TELEMETRY]
+        cg.add(var.set_telemetry_interval_ms(telemetry[CONF_UPDATE_INTERVAL]))
+        cg.add(var.set_telemetry_filter(telemetry[CONF_DELTA], telemetry[CONF_HEARTBEAT]))
+        for key, stat in TELEMETRY_STATS.items():
+            if key in telemetry:
+                telemetry_sensor = await sensor.new_sensor(telemetry[key])
+                cg.add(var.set_telemetry_sensor(stat, telemetry_sensor))
+        if CONF_TRANSITION_Z in telemetry:
+            transition_z = await sensor.new_sensor(telemetry[CONF_TRANSITION_Z])
+            cg.add(var.set_transition_z_sensor(transition_z))
+
+    if CONF_CALIBRATION_CONVERGENCE in config:
+        convergence = config[CONF_CALIBRATION_CONVERGENCE]
+        cg.add(
+            var.set_calibration_convergence(
+                convergence[CONF_MIN_SAMPLES], convergence[CONF_STABLE_SAMPLES], convergence[CONF_TOLERANCE]
+            )
+        )
+
+    for profile in config.get(CONF_PROFILES, []):
+        prefilter = profile[CONF_PREFILTER]
+        cg.add(
+            var.add_profile(
+                cg.StructInitializer(
+                    EngineProfile,
+                    ("name", profile[CONF_NAME]),
+                    ("k_on", profile[CONF_K_ON]),
+                    ("k_off", profile[CONF_K_OFF]),
+                    ("on_debounce_ms", profile[CONF_ON_DEBOUNCE_MS]),
+                    ("off_debounce_ms", profile[CONF_OFF_DEBOUNCE_MS]),
+                    ("abs_clear_delay_ms", profile[CONF_ABS_CLEAR_DELAY_MS]),
+                    ("d_min_cm", profile[CONF_DISTANCE_MIN]),
+                    ("d_max_cm", profile[CONF_DISTANCE_MAX]),
+                    ("prefilter_mode", prefilter[CONF_MODE]),
+                    ("prefilter_window", prefilter[CONF_WINDOW]),
+                    ("prefilter_alpha", prefilter[CONF_ALPHA]),
+                    ("prefilter_process_noise", prefilter[CONF_PROCESS_NOISE]),
+                    ("prefilter_measurement_noise", prefilter[CONF_MEASUREMENT_NOISE]),
+                )
+            )
+        )
+    if CONF_ACTIVE_PROFILE in config:
+        active_profile = await text_sensor.new_text_sensor(config[CONF_ACTIVE_PROFILE])
+        cg.add(var.set_active_profile_sensor(active_profile))
+
+    if CONF_FRAME_STREAM in config:
+        frame_stream = config[CONF_FRAME_STREAM]
+        cg.add_define("USE_BED_PRESENCE_FRAME_STREAM")
+        cg.add(var.set_frame_stream(frame_stream[CONF_PORT], frame_stream[CONF_MAX_CLIENTS]))
+
+    for zone in config.get(CONF_ZONES, []):
+        zone_var = await binary_sensor.new_binary_sensor(zone)
+        cg.add(zone_var.set_d_min_cm(zone[CONF_DISTANCE_MIN]))
+        cg.add(zone_var.set_d_max_cm(zone[CONF_DISTANCE_MAX]))
+        cg.add(zone_var.set_baseline(zone[CONF_BASELINE_MU], zone[CONF_BASELINE_SIGMA]))
+        cg.add(zone_var.set_k_on(zone[CONF_K_ON]))
+        cg.add(zone_var.set_k_off(zone[CONF_K_OFF]))
+        cg.add(zone_var.set_on_debounce_ms(zone[CONF_ON_DEBOUNCE_MS]))
+        cg.add(zone_var.set_off_debounce_ms(zone[CONF_OFF_DEBOUNCE_MS]))
+        cg.add(zone_var.set_abs_clear_delay_ms(zone[CONF_ABS_CLEAR_DELAY_MS]))
+        if CONF_STATE_REASON in zone:
+            zone_reason_sensor = await text_sensor.new_text_sensor(zone[CONF_STATE_REASON])
+            cg.add(zone_var.set_state_reason_sensor(zone_reason_sensor))
+        cg.add(var.add_zone(zone_var))
+
+    cg.add(var.set_detector_mode(config[CONF_DETECTOR]))
+    cg.add(var.set_cusum_h_on(config[CONF_CUSUM_H_ON]))
+    cg.add(var.set_cusum_h_off(config[CONF_CUSUM_H_OFF]))
+    if CONF_CUSUM_STATISTIC in config:
+        cusum_sensor = await sensor.new_sensor(config[CONF_CUSUM_STATISTIC])
+        cg.add(var.set_cusum_statistic_sensor(cusum_sensor))
+
+    if CONF_PREFILTER in config:
+        prefilter = config[CONF_PREFILTER]
+        cg.add(var.set_prefilter_window(prefilter[CONF_WINDOW]))
+        cg.add(var.set_prefilter_alpha(prefilter[CONF_ALPHA]))
+        cg.add(
+            var.set_prefilter_kalman_noise(
+                prefilter[CONF_PROCESS_NOISE], prefilter[CONF_MEASUREMENT_NOISE]
+            )
+        )
+        cg.add(var.set_prefilter_mode(prefilter[CONF_MODE]))
+
     cg.add(var.set_k_on(config[CONF_K_ON]))
     cg.add(var.set_k_off(config[CONF_K_OFF]))
 
@@ -0,0 +1,85 @@
+#pragma once
+
+#include <cmath>
+#include <cstdint>
+
+#include "gate_energy.h"
+
+namespace esphome {
+namespace bed_presence_engine {
+
+/**
+ * Early termination for baseline calibration.
+ *
+ * Samples go into an EnergyHistogram as they arrive, so the running median and
+ * MAD are exact and cost one pass over 101 bins per check. Every CHECK_EVERY
+ * samples the estimate is compared to a reference; when either μ or σ has moved
+ * by more than the tolerance the reference is re-taken and the stable run starts
+ * over. Comparing to the reference rather than the previous check means a slow
+ * drift cannot pass as stable. Calibration has converged once at least
+ * min_samples were collected and the last stable_samples of them left the
+ * estimate within tolerance.
+ */
+class CalibrationConvergence {
+ public:
+  static constexpr uint16_t CHECK_EVERY = 10;
+
+  void configure(uint16_t min_samples, uint16_t stable_samples, float tolerance) {
+    this->min_samples_ = min_samples;
+    this->stable_samples_ = stable_samples;
+    this->tolerance_ = tolerance;
+  }
+
+  void start() {
+    this->histogram_.clear();
+    this->estimate_ = {0.0f, 0.0f};
+    this->reference_ = {0.0f, 0.0f};
+    this->stable_since_ = 0;
+    this->converged_ = false;
+  }
+
+  // Returns true once the estimate has converged
+  bool add(float energy) {
+    this->histogram_.add(energy);
+    uint16_t count = this->histogram_.count();
+    if (count % CHECK_EVERY != 0) {
+      return this->converged_;
+    }
+
+    this->estimate_ = baseline_from_histogram(this->histogram_);
+    if (count == CHECK_EVERY || std::fabs(this->estimate_.mu - this->reference_.mu) > this->tolerance_ ||
+        std::fabs(this->estimate_.sigma - this->reference_.sigma) > this->tolerance_) {
+      this->reference_ = this->estimate_;
+      this->stable_since_ = count;
+    }
+    this->converged_ = count >= this->min_samples_ && count - this->stable_since_ >= this->stable_samples_;
+    return this->converged_;
+  }
+
+  // Samples still needed if the estimate holds from here on
+  uint16_t remaining_samples() const {
+    uint16_t count = this->histogram_.count();
+    uint16_t to_min = count < this->min_samples_ ? this->min_samples_ - count : 0;
+    uint16_t stable = count - this->stable_since_;
+    uint16_t to_stable = stable < this->stable_samples_ ? this->stable_samples_ - stable : 0;
+    return to_min > to_stable ? to_min : to_stable;
+  }
+
+  uint16_t count() const { return this->histogram_.count(); }
+  bool converged() const { return this->converged_; }
+  // Estimate as of the last check
+  const GateBaseline &estimate() const { return this->estimate_; }
+
+ protected:
+  EnergyHistogram histogram_;
+  GateBaseline estimate_{0.0f, 0.0f};
+  GateBaseline reference_{0.0f, 0.0f};
+  uint16_t stable_since_{0};
+  bool converged_{false};
+  uint16_t min_samples_{300};
+  uint16_t stable_samples_{150};
+  float tolerance_{1.0f};
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,53 @@
+#pragma once
+
+namespace esphome {
+namespace bed_presence_engine {
+
+enum DetectorMode {
+  DETECTOR_THRESHOLD,  // z thresholds + wall-clock debounce (Phase 2)
+  DETECTOR_CUSUM       // Two-sided CUSUM change-point test on z
+};
+
+/**
+ * Two-sided CUSUM over the normalized still energy (z-score).
+ *
+ * The rise statistic accumulates how far z sits above the ON reference level
+ * and the fall statistic how far it sits below the OFF reference level; both
+ * are clamped at zero so noise around the current level never builds up. A
+ * level shift is declared once a statistic reaches its decision threshold h,
+ * whose size sets the false-alarm rate (the average run length between false
+ * alarms grows exponentially with h). Constant time and memory per frame.
+ */
+class TwoSidedCusum {
+ public:
+  float update_rise(float z, float reference) {
+    this->rise_ += z - reference;
+    if (this->rise_ < 0.0f) {
+      this->rise_ = 0.0f;
+    }
+    return this->rise_;
+  }
+
+  float update_fall(float z, float reference) {
+    this->fall_ += reference - z;
+    if (this->fall_ < 0.0f) {
+      this->fall_ = 0.0f;
+    }
+    return this->fall_;
+  }
+
+  float get_rise() const { return this->rise_; }
+  float get_fall() const { return this->fall_; }
+
+  void reset() {
+    this->rise_ = 0.0f;
+    this->fall_ = 0.0f;
+  }
+
+ protected:
+  float rise_{0.0f};
+  float fall_{0.0f};
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
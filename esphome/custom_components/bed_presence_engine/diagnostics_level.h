@@ -0,0 +1,37 @@
+#pragma once
+
+#include "esphome/core/defines.h"
+#include "esphome/core/log.h"
+
+// Compile-time diagnostics level, generated from `diagnostics_level:` in the YAML:
+//   lean  - state machine only: no reason strings or text sensors, no verbose frame logs,
+//           no performance counters or latency histograms
+//   basic - adds the state reason text sensors
+//   full  - adds verbose frame logs, performance counters and latency histograms (default)
+#define BED_PRESENCE_DIAGNOSTICS_LEAN 0
+#define BED_PRESENCE_DIAGNOSTICS_BASIC 1
+#define BED_PRESENCE_DIAGNOSTICS_FULL 2
+
+#ifndef BED_PRESENCE_DIAGNOSTICS_LEVEL
+#define BED_PRESENCE_DIAGNOSTICS_LEVEL BED_PRESENCE_DIAGNOSTICS_FULL
+#endif
+
+#define BED_PRESENCE_HAS_REASONS (BED_PRESENCE_DIAGNOSTICS_LEVEL >= BED_PRESENCE_DIAGNOSTICS_BASIC)
+#define BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS (BED_PRESENCE_DIAGNOSTICS_LEVEL >= BED_PRESENCE_DIAGNOSTICS_FULL)
+
+// Per-frame verbose logs; below `full` the arguments are never evaluated
+#if BED_PRESENCE_HAS_ENGINE_DIAGNOSTICS
+#define BED_PRESENCE_LOGVV(tag, ...) ESP_LOGVV(tag, __VA_ARGS__)
+#else
+#define BED_PRESENCE_LOGVV(tag, ...) \
+  do { \
+  } while (0)
+#endif
+
+// Formats a reason into a stack buffer; in lean builds the buffer is left empty and
+// neither the format string nor its arguments are compiled in
+#if BED_PRESENCE_HAS_REASONS
+#define BED_PRESENCE_FORMAT_REASON(buffer, ...) snprintf(buffer, sizeof(buffer), __VA_ARGS__)
+#else
+#define BED_PRESENCE_FORMAT_REASON(buffer, ...) ((buffer)[0] = '\0')
+#endif
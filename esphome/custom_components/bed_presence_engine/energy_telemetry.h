@@ -0,0 +1,99 @@
+#pragma once
+
+#include <cmath>
+#include <cstdint>
+#include "gate_energy.h"
+
+namespace esphome {
+namespace bed_presence_engine {
+
+enum TelemetryStat : uint8_t {
+  TELEMETRY_MIN,
+  TELEMETRY_MAX,
+  TELEMETRY_MEAN,
+  TELEMETRY_P95,
+  TELEMETRY_STAT_COUNT
+};
+
+/**
+ * Per-interval still energy aggregates, published in place of the raw LD2410 values.
+ *
+ * Samples go into the same fixed 101-bin histogram the calibration uses, so the
+ * p95 is exact for whole-percent readings and adding a frame is a bin increment
+ * plus a running sum. Intervals are capped at an hour (36000 frames) to stay
+ * inside the histogram's 16-bit count.
+ */
+class EnergyTelemetry {
+ public:
+  void add(float energy) {
+    this->histogram_.add(energy);
+    this->sum_ += energy;
+    if (this->count_ == 0 || energy < this->min_) {
+      this->min_ = energy;
+    }
+    if (this->count_ == 0 || energy > this->max_) {
+      this->max_ = energy;
+    }
+    this->count_++;
+  }
+
+  void clear() {
+    this->histogram_.clear();
+    this->sum_ = 0.0f;
+    this->count_ = 0;
+  }
+
+  uint32_t count() const { return this->count_; }
+
+  float stat(TelemetryStat stat) const {
+    if (this->count_ == 0) {
+      return NAN;
+    }
+    switch (stat) {
+      case TELEMETRY_MIN:
+        return this->min_;
+      case TELEMETRY_MAX:
+        return this->max_;
+      case TELEMETRY_MEAN:
+        return this->sum_ / this->count_;
+      case TELEMETRY_P95:
+        return this->histogram_.percentile(0.95f);
+      default:
+        return NAN;
+    }
+  }
+
+ protected:
+  EnergyHistogram histogram_;
+  float sum_{0.0f};
+  float min_{0.0f};
+  float max_{0.0f};
+  uint32_t count_{0};
+};
+
+/**
+ * Delta + heartbeat gate for one published value: publish when the value moved
+ * by at least `delta` since the last publish, or when `heartbeat_ms` has passed
+ * (0 disables the heartbeat). The first value always goes out.
+ */
+class DeltaHeartbeatFilter {
+ public:
+  bool should_publish(float value, uint32_t now, float delta, uint32_t heartbeat_ms) {
+    bool due = !this->published_ || std::fabs(value - this->last_value_) >= delta ||
+               (heartbeat_ms > 0 && now - this->last_publish_ms_ >= heartbeat_ms);
+    if (due) {
+      this->published_ = true;
+      this->last_value_ = value;
+      this->last_publish_ms_ = now;
+    }
+    return due;
+  }
+
+ protected:
+  bool published_{false};
+  float last_value_{0.0f};
+  uint32_t last_publish_ms_{0};
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
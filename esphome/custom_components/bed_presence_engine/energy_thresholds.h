@@ -0,0 +1,67 @@
+#pragma once
+
+#include <cmath>
+#include <cstdint>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+// Energies are compared in Q8 fixed point (1/256 of a percent)
+static constexpr float ENERGY_Q8_SCALE = 256.0f;
+
+/**
+ * ON/OFF thresholds mapped from z-space into the energy domain (μ + kσ).
+ *
+ * Recomputed only when μ, σ, k_on or k_off change, so the per-frame path is
+ * three integer comparisons instead of a float division per frame. Rounding
+ * is chosen so that for energies on the Q8 grid (every whole-percent LD2410
+ * reading) the comparisons match the z-score ones, up to float rounding of z
+ * right at the boundary:
+ *   z >= k_on  <=>  energy_q >= on
+ *   z >  k_on  <=>  energy_q >  on_strict
+ *   z <  k_off <=>  energy_q <  off
+ */
+struct EnergyThresholds {
+  int32_t on;
+  int32_t on_strict;
+  int32_t off;
+};
+
+inline int32_t clamp_to_q8(double value) {
+  // Keep one step of headroom at each end so the saturated thresholds below stay absolute
+  if (value >= static_cast<double>(INT32_MAX - 1)) {
+    return INT32_MAX - 1;
+  }
+  if (value <= static_cast<double>(INT32_MIN + 1)) {
+    return INT32_MIN + 1;
+  }
+  return static_cast<int32_t>(value);
+}
+
+// Per-frame conversion stays in single precision (the ESP32 FPU has no double support)
+inline int32_t energy_to_q8(float energy) {
+  float scaled = energy * ENERGY_Q8_SCALE;
+  if (scaled >= 2.0e9f) {
+    return INT32_MAX - 1;
+  }
+  if (scaled <= -2.0e9f) {
+    return INT32_MIN + 1;
+  }
+  // floor() without the libm call: truncate, then step down for negative fractions
+  int32_t truncated = static_cast<int32_t>(scaled);
+  return static_cast<float>(truncated) > scaled ? truncated - 1 : truncated;
+}
+
+inline EnergyThresholds compute_energy_thresholds(float mu, float sigma, float k_on, float k_off) {
+  if (sigma <= 0.001f) {
+    // calculate_z_score() treats a degenerate sigma as z=0 for every frame
+    return {k_on <= 0.0f ? INT32_MIN : INT32_MAX, k_on < 0.0f ? INT32_MIN : INT32_MAX,
+            k_off > 0.0f ? INT32_MAX : INT32_MIN};
+  }
+  double on = (static_cast<double>(mu) + static_cast<double>(k_on) * sigma) * ENERGY_Q8_SCALE;
+  double off = (static_cast<double>(mu) + static_cast<double>(k_off) * sigma) * ENERGY_Q8_SCALE;
+  return {clamp_to_q8(std::ceil(on)), clamp_to_q8(std::floor(on)), clamp_to_q8(std::ceil(off))};
+}
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,37 @@
+#pragma once
+
+#include <cstdint>
+
+#include "prefilter.h"
+
+namespace esphome {
+namespace bed_presence_engine {
+
+static constexpr uint8_t MAX_PROFILES = 4;
+static constexpr uint8_t NO_PROFILE = 0xFF;
+
+/**
+ * One preconfigured set of engine knobs (e.g. "night" and "day").
+ *
+ * Plain values only, filled in by codegen, so the profile table lives in a
+ * fixed array and switching profiles is a copy of a few dozen bytes. The name
+ * points at a string literal from the generated code.
+ */
+struct EngineProfile {
+  const char *name;
+  float k_on;
+  float k_off;
+  uint32_t on_debounce_ms;
+  uint32_t off_debounce_ms;
+  uint32_t abs_clear_delay_ms;
+  float d_min_cm;
+  float d_max_cm;
+  PrefilterMode prefilter_mode;
+  uint8_t prefilter_window;
+  float prefilter_alpha;
+  float prefilter_process_noise;
+  float prefilter_measurement_noise;
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,250 @@
+#pragma once
+
+#include <algorithm>
+#include <atomic>
+#include <cmath>
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+// Frame record flags (FrameRecord::flags); the low two bits hold the State
+static constexpr uint8_t FRAME_STATE_MASK = 0x03;
+static constexpr uint8_t FRAME_FLAG_CALIBRATING = 0x40;
+static constexpr uint8_t FRAME_FLAG_TRANSITION = 0x80;  // Occupancy output flipped since the previous record
+static constexpr uint16_t FRAME_DISTANCE_NONE = UINT16_MAX;
+
+/**
+ * One LD2410 frame as logged on-device (8 bytes, little endian on the wire).
+ */
+struct FrameRecord {
+  uint16_t dt_ms;        // Time since the previous record, saturating
+  uint16_t distance_cm;  // FRAME_DISTANCE_NONE when no distance reading
+  uint8_t still_energy;  // Percent
+  uint8_t move_energy;   // Percent
+  uint8_t flags;         // State | FRAME_FLAG_*
+  uint8_t zones;         // Bitmask of zones the frame was routed to
+};
+
+/**
+ * Dump header, followed by `count` records oldest first (16 bytes).
+ */
+struct FrameLogHeader {
+  char magic[4];           // "BPFL"
+  uint8_t version;
+  uint8_t record_size;
+  uint16_t count;
+  uint32_t last_timestamp_ms;  // millis() of the newest record
+  uint16_t trigger_index;      // Record that triggered the freeze, or UINT16_MAX
+  uint16_t reserved;
+};
+
+// Energies are logged as whole percent, distances as whole cm
+inline uint8_t quantize_energy(float energy) {
+  if (!(energy > 0.0f)) {
+    return 0;
+  }
+  return energy >= 255.0f ? 255 : static_cast<uint8_t>(std::lround(energy));
+}
+
+inline uint16_t quantize_distance(float distance_cm) {
+  if (std::isnan(distance_cm)) {
+    return FRAME_DISTANCE_NONE;
+  }
+  if (!(distance_cm > 0.0f)) {
+    return 0;
+  }
+  return distance_cm >= 65534.0f ? 65534 : static_cast<uint16_t>(std::lround(distance_cm));
+}
+
+static_assert(sizeof(FrameRecord) == 8, "FrameRecord must stay 8 bytes");
+static_assert(sizeof(FrameLogHeader) == 16, "FrameLogHeader must stay 16 bytes");
+
+// FrameLog::state_: a download holds the log frozen until the response is torn down
+enum FrameLogState : uint8_t {
+  FRAME_LOG_RECORDING,
+  FRAME_LOG_FROZEN,
+  FRAME_LOG_SENDING,
+};
+
+/**
+ * Ring buffer of the most recent frames for post-mortem replay.
+ *
+ * The buffer is allocated once at setup. Freezing (on demand, or a configurable
+ * number of frames after an occupancy transition) stops recording and rotates
+ * the ring in place so the header and records form one contiguous block that
+ * can be sent as-is. Readers only ever see a frozen log, and the web server
+ * streams the block straight from the buffer over several loop() passes, so
+ * recording cannot resume while a download is in flight: a resume requested
+ * meanwhile is deferred until the response is done.
+ *
+ * Recording resumes on its own after a completed download (resume_after_dump)
+ * and, for freezes triggered by a transition, once hold_off_ms has passed
+ * without one, so every transition gets its capture, not only the first.
+ * State changes other than begin/end_download happen on the loop() side;
+ * the download calls may come from the web server task.
+ */
+class FrameLog {
+ public:
+  static constexpr uint8_t VERSION = 1;
+
+  bool allocate(uint16_t capacity) {
+    if (this->buffer_ != nullptr || capacity == 0) {
+      return false;
+    }
+    this->buffer_ = new uint8_t[sizeof(FrameLogHeader) + static_cast<size_t>(capacity) * sizeof(FrameRecord)];
+    this->records_ = reinterpret_cast<FrameRecord *>(this->buffer_ + sizeof(FrameLogHeader));
+    this->capacity_ = capacity;
+    return true;
+  }
+
+  void set_freeze_on_transition(bool enabled, uint16_t post_frames) {
+    this->freeze_on_transition_ = enabled;
+    this->post_transition_frames_ = post_frames;
+  }
+
+  // hold_off_ms of 0 keeps a transition capture until it is downloaded or resumed
+  void set_auto_resume(bool after_dump, uint32_t hold_off_ms) {
+    this->resume_after_dump_ = after_dump;
+    this->hold_off_ms_ = hold_off_ms;
+  }
+
+  bool is_allocated() const { return this->buffer_ != nullptr; }
+  bool is_frozen() const { return this->state_ != FRAME_LOG_RECORDING; }
+  bool is_sending() const { return this->state_ == FRAME_LOG_SENDING; }
+  uint16_t count() const { return this->count_; }
+  uint16_t capacity() const { return this->capacity_; }
+
+  void record(unsigned long now, float still_energy, float move_energy, float distance_cm, uint8_t flags,
+              uint8_t zones) {
+    if (this->is_frozen() && !(this->auto_resume_due(now) && this->resume())) {
+      return;
+    }
+
+    unsigned long dt = this->count_ == 0 ? 0 : now - this->last_timestamp_;
+    FrameRecord &record = this->records_[this->head_];
+    record.dt_ms = dt > UINT16_MAX ? UINT16_MAX : static_cast<uint16_t>(dt);
+    record.distance_cm = quantize_distance(distance_cm);
+    record.still_energy = quantize_energy(still_energy);
+    record.move_energy = quantize_energy(move_energy);
+    record.flags = flags;
+    record.zones = zones;
+
+    uint16_t slot = this->head_;
+    this->head_ = (this->head_ + 1) % this->capacity_;
+    if (this->count_ < this->capacity_) {
+      this->count_++;
+    }
+    this->last_timestamp_ = now;
+
+    if ((flags & FRAME_FLAG_TRANSITION) && this->freeze_on_transition_ && !this->armed_) {
+      this->armed_ = true;
+      this->trigger_slot_ = slot;
+      this->post_remaining_ = this->post_transition_frames_;
+    }
+    if (this->armed_) {
+      if (this->post_remaining_ == 0) {
+        this->freeze();
+        this->auto_frozen_ = true;
+      } else {
+        this->post_remaining_--;
+      }
+    }
+  }
+
+  // Stop recording and lay the log out oldest-first behind the header
+  void freeze() {
+    if (this->is_frozen() || this->buffer_ == nullptr) {
+      return;
+    }
+    bool full = this->count_ == this->capacity_;
+    uint16_t oldest = full ? this->head_ : 0;
+    std::rotate(this->records_, this->records_ + oldest, this->records_ + this->count_);
+
+    FrameLogHeader header;
+    std::memcpy(header.magic, "BPFL", 4);
+    header.version = VERSION;
+    header.record_size = sizeof(FrameRecord);
+    header.count = this->count_;
+    header.last_timestamp_ms = static_cast<uint32_t>(this->last_timestamp_);
+    header.trigger_index = UINT16_MAX;
+    if (this->armed_) {
+      header.trigger_index = (this->trigger_slot_ + this->capacity_ - oldest) % this->capacity_;
+    }
+    header.reserved = 0;
+    std::memcpy(this->buffer_, &header, sizeof(header));
+
+    // After the rotation the oldest record sits at index 0
+    this->head_ = full ? 0 : this->count_;
+    this->frozen_at_ = this->last_timestamp_;
+    this->auto_frozen_ = false;
+    this->resume_requested_ = false;
+    this->armed_ = false;
+    this->state_ = FRAME_LOG_FROZEN;
+  }
+
+  // Start recording again; while a download is in flight the resume is deferred
+  // until end_download() and false is returned
+  bool resume() {
+    uint8_t expected = FRAME_LOG_FROZEN;
+    if (!this->state_.compare_exchange_strong(expected, FRAME_LOG_RECORDING) && expected == FRAME_LOG_SENDING) {
+      this->resume_requested_ = true;
+      return false;
+    }
+    this->resume_requested_ = false;
+    this->auto_frozen_ = false;
+    this->armed_ = false;
+    return true;
+  }
+
+  // Called by the dump handler: false unless the log is frozen and not already being sent
+  bool begin_download() {
+    uint8_t expected = FRAME_LOG_FROZEN;
+    return this->state_.compare_exchange_strong(expected, FRAME_LOG_SENDING);
+  }
+
+  // Called once the response is sent in full or the client went away
+  void end_download() {
+    if (this->resume_after_dump_) {
+      this->resume_requested_ = true;
+    }
+    this->state_ = FRAME_LOG_FROZEN;
+  }
+
+  // Contiguous dump (header + records); only valid while frozen
+  const uint8_t *data() const { return this->buffer_; }
+  size_t size_bytes() const { return sizeof(FrameLogHeader) + static_cast<size_t>(this->count_) * sizeof(FrameRecord); }
+  const FrameRecord *records() const { return this->records_; }
+
+ protected:
+  bool auto_resume_due(unsigned long now) const {
+    if (this->resume_requested_) {
+      return true;
+    }
+    return this->auto_frozen_ && this->hold_off_ms_ > 0 && now - this->frozen_at_ >= this->hold_off_ms_;
+  }
+
+  uint8_t *buffer_{nullptr};
+  FrameRecord *records_{nullptr};
+  uint16_t capacity_{0};
+  uint16_t count_{0};
+  uint16_t head_{0};
+  unsigned long last_timestamp_{0};
+
+  std::atomic<uint8_t> state_{FRAME_LOG_RECORDING};
+  std::atomic<bool> resume_requested_{false};
+  bool resume_after_dump_{true};
+  uint32_t hold_off_ms_{0};
+  bool auto_frozen_{false};  // Frozen by a transition (hold-off applies), not on demand
+  unsigned long frozen_at_{0};
+  bool freeze_on_transition_{false};
+  uint16_t post_transition_frames_{0};
+  bool armed_{false};
+  uint16_t trigger_slot_{0};
+  uint16_t post_remaining_{0};
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
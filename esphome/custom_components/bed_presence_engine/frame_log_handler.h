@@ -0,0 +1,59 @@
+#pragma once
+
+#include "esphome/core/defines.h"
+
+#ifdef USE_BED_PRESENCE_FRAME_LOG_HTTP
+
+#include "esphome/components/web_server_base/web_server_base.h"
+#include "frame_log.h"
+
+namespace esphome {
+namespace bed_presence_engine {
+
+/**
+ * GET /bed_presence/frames returns the frozen frame log as one binary block
+ * (FrameLogHeader followed by FrameRecords). While the log is still recording
+ * the request is rejected, so the response never reads a buffer being written.
+ * The response is sent straight from the log buffer, so the log stays frozen
+ * (FRAME_LOG_SENDING) until the request is torn down; one download at a time.
+ */
+class FrameLogHandler : public AsyncWebHandler {
+ public:
+  explicit FrameLogHandler(FrameLog *log) : log_(log) {}
+
+  bool canHandle(AsyncWebServerRequest *request) override {
+    return request->method() == HTTP_GET && request->url() == "/bed_presence/frames";
+  }
+
+  void handleRequest(AsyncWebServerRequest *request) override {
+    FrameLog *log = this->log_;
+    if (!log->begin_download()) {
+      request->send(409, "text/plain",
+                    log->is_sending() ? "Frame log download already in progress"
+                                      : "Frame log is recording; call the freeze_frame_log service first");
+      return;
+    }
+    AsyncWebServerResponse *response =
+        request->beginResponse_P(200, "application/octet-stream", log->data(), log->size_bytes());
+#ifdef USE_ARDUINO
+    // ESPAsyncWebServer sends the body in chunks as the client acks them; the disconnect
+    // callback runs once the response is complete or the client has gone away
+    request->onDisconnect([log]() { log->end_download(); });
+    request->send(response);
+#else
+    // The ESP-IDF server has written the whole response when send() returns
+    request->send(response);
+    log->end_download();
+#endif
+  }
+
+  bool isRequestHandlerTrivial() override { return false; }
+
+ protected:
+  FrameLog *log_;
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
+
+#endif  // USE_BED_PRESENCE_FRAME_LOG_HTTP
@@ -0,0 +1,113 @@
+#include "frame_stream.h"
+
+#ifdef USE_BED_PRESENCE_FRAME_STREAM
+
+#include "esphome/core/log.h"
+#include <cerrno>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+static const char *const TAG = "bed_presence_engine.stream";
+
+bool FrameStreamServer::start() {
+  this->listener_ = socket::socket_ip(SOCK_STREAM, 0);
+  if (this->listener_ == nullptr) {
+    ESP_LOGW(TAG, "Could not create stream socket");
+    return false;
+  }
+  int enable = 1;
+  this->listener_->setsockopt(SOL_SOCKET, SO_REUSEADDR, &enable, sizeof(enable));
+  this->listener_->setblocking(false);
+
+  struct sockaddr_storage server;
+  socklen_t server_len = socket::set_sockaddr_any(reinterpret_cast<struct sockaddr *>(&server), sizeof(server),
+                                                  this->port_);
+  if (this->listener_->bind(reinterpret_cast<struct sockaddr *>(&server), server_len) != 0 ||
+      this->listener_->listen(this->max_clients_) != 0) {
+    ESP_LOGW(TAG, "Could not listen on port %u (errno %d)", this->port_, errno);
+    this->listener_ = nullptr;
+    return false;
+  }
+  ESP_LOGCONFIG(TAG, "  Frame stream: tcp port %u, up to %u clients", this->port_, this->max_clients_);
+  return true;
+}
+
+void FrameStreamServer::accept_clients() {
+  if (this->listener_ == nullptr) {
+    return;
+  }
+  while (true) {
+    struct sockaddr_storage source;
+    socklen_t source_len = sizeof(source);
+    auto client = this->listener_->accept(reinterpret_cast<struct sockaddr *>(&source), &source_len);
+    if (client == nullptr) {
+      return;
+    }
+
+    uint8_t slot = 0;
+    while (slot < this->max_clients_ && this->clients_[slot] != nullptr) {
+      ++slot;
+    }
+    if (slot == this->max_clients_) {
+      ESP_LOGW(TAG, "Rejecting stream client, %u already connected", this->max_clients_);
+      client->close();
+      continue;
+    }
+
+    client->setblocking(false);
+    int enable = 1;
+    client->setsockopt(IPPROTO_TCP, TCP_NODELAY, &enable, sizeof(enable));
+    StreamHello hello{{'B', 'P', 'F', 'S'}, 1, sizeof(StreamFrame), 0};
+    if (client->write(&hello, sizeof(hello)) != static_cast<ssize_t>(sizeof(hello))) {
+      client->close();
+      continue;
+    }
+    this->buffers_[slot].clear();
+    this->clients_[slot] = std::move(client);
+    ESP_LOGI(TAG, "Stream client %u connected", slot);
+  }
+}
+
+void FrameStreamServer::publish(const StreamFrame &frame) {
+  for (uint8_t slot = 0; slot < this->max_clients_; ++slot) {
+    socket::Socket *client = this->clients_[slot].get();
+    if (client == nullptr) {
+      continue;
+    }
+    StreamOffer result = this->buffers_[slot].offer(frame, [client](const uint8_t *data, size_t len) -> long {
+      ssize_t written = client->write(data, len);
+      if (written < 0) {
+        return (errno == EWOULDBLOCK || errno == EAGAIN) ? 0 : -1;
+      }
+      return written;
+    });
+    if (result == STREAM_DROPPED) {
+      this->dropped_frames_++;
+    } else if (result == STREAM_CLOSED) {
+      this->close_client(slot);
+    }
+  }
+}
+
+uint8_t FrameStreamServer::client_count() const {
+  uint8_t count = 0;
+  for (uint8_t slot = 0; slot < this->max_clients_; ++slot) {
+    if (this->clients_[slot] != nullptr) {
+      ++count;
+    }
+  }
+  return count;
+}
+
+void FrameStreamServer::close_client(uint8_t index) {
+  this->clients_[index]->close();
+  this->clients_[index] = nullptr;
+  this->buffers_[index].clear();
+  ESP_LOGI(TAG, "Stream client %u disconnected", index);
+}
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
+
+#endif  // USE_BED_PRESENCE_FRAME_STREAM
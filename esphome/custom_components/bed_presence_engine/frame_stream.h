@@ -0,0 +1,131 @@
+#pragma once
+
+#include "esphome/core/defines.h"
+#include <cstddef>
+#include <cstdint>
+#include <cstring>
+
+#ifdef USE_BED_PRESENCE_FRAME_STREAM
+#include "esphome/components/socket/socket.h"
+#include <memory>
+#endif
+
+namespace esphome {
+namespace bed_presence_engine {
+
+/**
+ * One frame on the raw stream (12 bytes, little endian). Unlike the frame log
+ * the stream carries absolute timestamps and a sequence number, so a reader
+ * can detect frames dropped under backpressure.
+ */
+struct StreamFrame {
+  uint32_t timestamp_ms;
+  uint16_t sequence;
+  uint16_t distance_cm;  // FRAME_DISTANCE_NONE when no distance reading
+  uint8_t still_energy;
+  uint8_t move_energy;
+  uint8_t flags;  // Same layout as FrameRecord::flags
+  uint8_t zones;
+};
+
+// Sent once per connection before the first frame
+struct StreamHello {
+  char magic[4];  // "BPFS"
+  uint8_t version;
+  uint8_t frame_size;
+  uint16_t reserved;
+};
+
+static_assert(sizeof(StreamFrame) == 12, "StreamFrame must stay 12 bytes");
+static_assert(sizeof(StreamHello) == 8, "StreamHello must stay 8 bytes");
+
+enum StreamOffer : uint8_t {
+  STREAM_SENT,     // Frame queued in the socket (possibly partially, remainder kept)
+  STREAM_DROPPED,  // Socket still busy with the previous frame, new frame dropped
+  STREAM_CLOSED    // Socket error, client should be disconnected
+};
+
+/**
+ * Per-subscriber backpressure: at most one partially written frame is kept.
+ *
+ * Sockets are non-blocking. When a subscriber cannot keep up, the rest of a
+ * partially written frame is flushed first and new frames are dropped until it
+ * has gone out, so framing stays intact and the main loop never waits.
+ */
+class StreamClientBuffer {
+ public:
+  // write(data, len) returns bytes written, 0 if the socket would block, or < 0 on error
+  template<typename WriteFn> StreamOffer offer(const StreamFrame &frame, WriteFn &&write) {
+    if (this->pending_len_ > 0) {
+      long written = write(this->pending_ + this->pending_offset_, this->pending_len_);
+      if (written < 0) {
+        return STREAM_CLOSED;
+      }
+      this->pending_offset_ += written;
+      this->pending_len_ -= written;
+      if (this->pending_len_ > 0) {
+        return STREAM_DROPPED;
+      }
+    }
+
+    long written = write(reinterpret_cast<const uint8_t *>(&frame), sizeof(frame));
+    if (written < 0) {
+      return STREAM_CLOSED;
+    }
+    if (written == 0) {
+      return STREAM_DROPPED;
+    }
+    if (static_cast<size_t>(written) < sizeof(frame)) {
+      this->pending_offset_ = 0;
+      this->pending_len_ = sizeof(frame) - written;
+      std::memcpy(this->pending_, reinterpret_cast<const uint8_t *>(&frame) + written, this->pending_len_);
+    }
+    return STREAM_SENT;
+  }
+
+  void clear() {
+    this->pending_offset_ = 0;
+    this->pending_len_ = 0;
+  }
+
+ protected:
+  uint8_t pending_[sizeof(StreamFrame)]{};
+  uint8_t pending_offset_{0};
+  uint8_t pending_len_{0};
+};
+
+#ifdef USE_BED_PRESENCE_FRAME_STREAM
+
+/**
+ * TCP server streaming every LD2410 frame to up to MAX_STREAM_CLIENTS local
+ * subscribers. Accepting is polled once per frame; publishing never blocks.
+ */
+class FrameStreamServer {
+ public:
+  static constexpr uint8_t MAX_STREAM_CLIENTS = 4;
+
+  FrameStreamServer(uint16_t port, uint8_t max_clients)
+      : port_(port), max_clients_(max_clients < MAX_STREAM_CLIENTS ? max_clients : MAX_STREAM_CLIENTS) {}
+
+  bool start();
+  void accept_clients();
+  void publish(const StreamFrame &frame);
+
+  uint8_t client_count() const;
+  uint32_t dropped_frames() const { return this->dropped_frames_; }
+
+ protected:
+  void close_client(uint8_t index);
+
+  uint16_t port_;
+  uint8_t max_clients_;
+  std::unique_ptr<socket::Socket> listener_;
+  std::unique_ptr<socket::Socket> clients_[MAX_STREAM_CLIENTS];
+  StreamClientBuffer buffers_[MAX_STREAM_CLIENTS];
+  uint32_t dropped_frames_{0};
+};
+
+#endif  // USE_BED_PRESENCE_FRAME_STREAM
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
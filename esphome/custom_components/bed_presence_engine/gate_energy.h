@@ -0,0 +1,171 @@
+#pragma once
+
+#include <cmath>
+#include <cstdint>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+// LD2410 engineering mode reports energies for gates 0-8, each covering 75cm of range
+static constexpr uint8_t GATE_COUNT = 9;
+static constexpr float GATE_RESOLUTION_CM = 75.0f;
+
+struct GateBaseline {
+  float mu;
+  float sigma;
+};
+
+/**
+ * Fixed-size histogram of integer LD2410 energies (0-100%).
+ *
+ * LD2410 energies are whole percentages, so a 101-bin histogram holds the full
+ * calibration sample set for a gate in ~200 bytes and yields the exact median
+ * and MAD that sorting a sample vector would, without any heap allocation.
+ */
+class EnergyHistogram {
+ public:
+  static constexpr uint8_t MAX_ENERGY = 100;
+
+  void clear() {
+    for (auto &bin : this->bins_) {
+      bin = 0;
+    }
+    this->count_ = 0;
+  }
+
+  void add(float energy) {
+    if (this->count_ == UINT16_MAX) {
+      return;
+    }
+    long rounded = std::lround(energy);
+    if (rounded < 0) {
+      rounded = 0;
+    } else if (rounded > MAX_ENERGY) {
+      rounded = MAX_ENERGY;
+    }
+    this->bins_[rounded]++;
+    this->count_++;
+  }
+
+  uint16_t count() const { return this->count_; }
+
+  // Nearest-rank percentile (fraction in [0, 1]) of the rounded samples
+  float percentile(float fraction) const {
+    if (this->count_ == 0) {
+      return 0.0f;
+    }
+    float rank = std::ceil(fraction * this->count_);
+    uint16_t k = rank <= 1.0f ? 0 : static_cast<uint16_t>(rank) - 1;
+    return this->nth_value(k < this->count_ ? k : this->count_ - 1);
+  }
+
+  float median() const {
+    if (this->count_ == 0) {
+      return 0.0f;
+    }
+    uint16_t mid = this->count_ / 2;
+    if (this->count_ % 2 == 1) {
+      return this->nth_value(mid);
+    }
+    return (this->nth_value(mid - 1) + this->nth_value(mid)) / 2.0f;
+  }
+
+  // Median absolute deviation around the given median
+  float mad(float median) const {
+    if (this->count_ == 0) {
+      return 0.0f;
+    }
+    uint16_t mid = this->count_ / 2;
+    if (this->count_ % 2 == 1) {
+      return this->nth_deviation(mid, median);
+    }
+    return (this->nth_deviation(mid - 1, median) + this->nth_deviation(mid, median)) / 2.0f;
+  }
+
+ protected:
+  // k-th smallest sample (0-based)
+  float nth_value(uint16_t k) const {
+    uint32_t seen = 0;
+    for (uint8_t value = 0; value <= MAX_ENERGY; ++value) {
+      seen += this->bins_[value];
+      if (seen > k) {
+        return static_cast<float>(value);
+      }
+    }
+    return static_cast<float>(MAX_ENERGY);
+  }
+
+  // k-th smallest |sample - median|, walking outward from the median so
+  // deviations are visited in sorted order
+  float nth_deviation(uint16_t k, float median) const {
+    int lo = static_cast<int>(std::floor(median));
+    int hi = lo + 1;
+    uint32_t seen = 0;
+    while (lo >= 0 || hi <= MAX_ENERGY) {
+      float d_lo = lo >= 0 ? median - static_cast<float>(lo) : INFINITY;
+      float d_hi = hi <= MAX_ENERGY ? static_cast<float>(hi) - median : INFINITY;
+      if (d_lo <= d_hi) {
+        seen += this->bins_[lo--];
+        if (seen > k) {
+          return d_lo;
+        }
+      } else {
+        seen += this->bins_[hi++];
+        if (seen > k) {
+          return d_hi;
+        }
+      }
+    }
+    return 0.0f;
+  }
+
+  uint16_t bins_[MAX_ENERGY + 1]{};
+  uint16_t count_{0};
+};
+
+// Robust baseline from a calibration histogram: median, and MAD scaled to a normal sigma
+inline GateBaseline baseline_from_histogram(const EnergyHistogram &histogram) {
+  float median = histogram.median();
+  float sigma = histogram.mad(median) * 1.4826f;
+  if (sigma < 0.05f) {
+    sigma = 0.05f;
+  }
+  return {median, sigma};
+}
+
+/**
+ * Weighted mean z-score across gates, computed in a single pass.
+ *
+ * Gates with zero weight (unconfigured or outside the distance window) are
+ * skipped. A gate with a degenerate sigma contributes z=0, matching
+ * calculate_z_score(). Returns 0 when no gate carries weight.
+ */
+inline float weighted_gate_z(const float *energies, const GateBaseline *baselines, const float *weights,
+                             uint8_t count) {
+  float weighted_sum = 0.0f;
+  float weight_total = 0.0f;
+  for (uint8_t gate = 0; gate < count; ++gate) {
+    float weight = weights[gate];
+    if (weight <= 0.0f) {
+      continue;
+    }
+    weight_total += weight;
+    if (baselines[gate].sigma > 0.001f) {
+      weighted_sum += weight * (energies[gate] - baselines[gate].mu) / baselines[gate].sigma;
+    }
+  }
+  if (weight_total <= 0.0f) {
+    return 0.0f;
+  }
+  return weighted_sum / weight_total;
+}
+
+// True if gate [gate*75cm, (gate+1)*75cm) overlaps the distance window [d_min, d_max]
+inline bool gate_in_window(uint8_t gate, float d_min_cm, float d_max_cm) {
+  float gate_start = gate * GATE_RESOLUTION_CM;
+  float gate_end = gate_start + GATE_RESOLUTION_CM;
+  return gate_start <= d_max_cm && gate_end > d_min_cm;
+}
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
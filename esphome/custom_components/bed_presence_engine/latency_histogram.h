@@ -0,0 +1,96 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <cstdio>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+// Bucket upper edges (ms). Spaced to resolve both ON latency (~on_debounce, a
+// few seconds) and OFF latency (abs_clear_delay + off_debounce, ~35s by default)
+static constexpr uint8_t LATENCY_BUCKET_COUNT = 16;
+static constexpr uint32_t LATENCY_BUCKET_EDGES_MS[LATENCY_BUCKET_COUNT - 1] = {
+    250, 500, 1000, 2000, 3000, 4000, 5000, 7500, 10000, 15000, 20000, 30000, 40000, 60000, 120000};
+
+/**
+ * Fixed-bucket histogram of detection latencies.
+ *
+ * Recording is a short scan over 15 edges and happens once per transition, so
+ * it never touches the per-frame path. Percentiles are interpolated linearly
+ * inside the bucket that holds them; the overflow bucket is bounded by the
+ * largest latency seen.
+ */
+class LatencyHistogram {
+ public:
+  void record(uint32_t latency_ms) {
+    uint8_t bucket = 0;
+    while (bucket < LATENCY_BUCKET_COUNT - 1 && latency_ms > LATENCY_BUCKET_EDGES_MS[bucket]) {
+      bucket++;
+    }
+    this->buckets_[bucket]++;
+    this->count_++;
+    if (latency_ms > this->max_ms_) {
+      this->max_ms_ = latency_ms;
+    }
+  }
+
+  void record_abort() { this->aborts_++; }
+
+  void clear() {
+    for (uint8_t i = 0; i < LATENCY_BUCKET_COUNT; ++i) {
+      this->buckets_[i] = 0;
+    }
+    this->count_ = 0;
+    this->aborts_ = 0;
+    this->max_ms_ = 0;
+  }
+
+  uint32_t count() const { return this->count_; }
+  uint32_t aborts() const { return this->aborts_; }
+  uint32_t max_ms() const { return this->max_ms_; }
+  uint32_t bucket(uint8_t index) const { return index < LATENCY_BUCKET_COUNT ? this->buckets_[index] : 0; }
+
+  // Latency (ms) below which `fraction` of the recorded transitions fall; 0 when empty
+  float percentile_ms(float fraction) const {
+    if (this->count_ == 0) {
+      return 0.0f;
+    }
+    float rank = fraction * this->count_;
+    uint32_t below = 0;
+    for (uint8_t i = 0; i < LATENCY_BUCKET_COUNT; ++i) {
+      uint32_t in_bucket = this->buckets_[i];
+      if (in_bucket > 0 && below + in_bucket >= rank) {
+        float lower = i == 0 ? 0.0f : static_cast<float>(LATENCY_BUCKET_EDGES_MS[i - 1]);
+        float upper = i == LATENCY_BUCKET_COUNT - 1 ? static_cast<float>(this->max_ms_)
+                                                     : static_cast<float>(LATENCY_BUCKET_EDGES_MS[i]);
+        if (upper > this->max_ms_) {
+          upper = static_cast<float>(this->max_ms_);
+        }
+        float position = (rank - below) / in_bucket;
+        return lower + (upper - lower) * position;
+      }
+      below += in_bucket;
+    }
+    return static_cast<float>(this->max_ms_);
+  }
+
+  // Compact one-line summary, e.g. "n=12 p50=3.2s p90=4.1s max=6.0s aborts=3"
+  int format_summary(char *buffer, size_t size) const {
+    if (this->count_ == 0) {
+      return snprintf(buffer, size, "n=0 aborts=%u", static_cast<unsigned>(this->aborts_));
+    }
+    return snprintf(buffer, size, "n=%u p50=%.1fs p90=%.1fs max=%.1fs aborts=%u", static_cast<unsigned>(this->count_),
+                    this->percentile_ms(0.5f) / 1000.0f, this->percentile_ms(0.9f) / 1000.0f,
+                    this->max_ms_ / 1000.0f, static_cast<unsigned>(this->aborts_));
+  }
+
+ protected:
+  uint32_t buckets_[LATENCY_BUCKET_COUNT]{};
+  uint32_t count_{0};
+  uint32_t aborts_{0};
+  uint32_t max_ms_{0};
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
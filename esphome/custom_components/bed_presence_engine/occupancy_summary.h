@@ -0,0 +1,118 @@
+#pragma once
+
+#include <cstdint>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+/**
+ * Totals for one summary period (typically noon to noon, so a night is never split).
+ *
+ * Durations are in ms. A stretch in bed that spans the rollover is split there:
+ * the closed period gets the part up to the rollover, the next period the rest.
+ * An absence only counts once it ends with a re-entry in the same period, so the
+ * empty bed during the day does not show up as the longest absence.
+ */
+struct OccupancyPeriod {
+  uint32_t occupied_ms{0};
+  uint16_t entries{0};
+  uint16_t exits{0};
+  uint32_t longest_occupied_ms{0};
+  uint32_t longest_absence_ms{0};
+  uint16_t restless_events{0};
+};
+
+/**
+ * Incremental per-period occupancy aggregation.
+ *
+ * update() runs every loop with the current occupancy and only does work on
+ * transitions; restlessness is counted from moving energy while occupied, with
+ * a refractory gap so one roll-over is one event. close() hands back the finished
+ * period and starts the next one without losing the current stretch.
+ */
+class OccupancySummary {
+ public:
+  void set_restless_threshold(float energy) { this->restless_threshold_ = energy; }
+  void set_restless_refractory_ms(uint32_t ms) { this->restless_refractory_ms_ = ms; }
+
+  void start(uint32_t now, bool occupied) {
+    this->period_ = {};
+    this->period_start_ms_ = now;
+    this->occupied_ = occupied;
+    this->stretch_start_ms_ = now;
+    this->has_exit_ = false;
+    this->has_restless_ = false;
+  }
+
+  void update(uint32_t now, bool occupied) {
+    if (occupied == this->occupied_) {
+      return;
+    }
+    this->occupied_ = occupied;
+    if (occupied) {
+      this->period_.entries++;
+      if (this->has_exit_) {
+        this->note_absence(now - this->exit_ms_);
+      }
+    } else {
+      this->period_.exits++;
+      this->add_stretch(now - this->stretch_start_ms_);
+      this->exit_ms_ = now;
+      this->has_exit_ = true;
+    }
+    this->stretch_start_ms_ = now;
+  }
+
+  // Called once per LD2410 frame with its moving energy
+  void add_moving_energy(uint32_t now, float energy) {
+    if (!this->occupied_ || energy < this->restless_threshold_) {
+      return;
+    }
+    if (!this->has_restless_ || now - this->last_restless_ms_ >= this->restless_refractory_ms_) {
+      this->period_.restless_events++;
+      this->has_restless_ = true;
+    }
+    // Movement keeps extending the current event
+    this->last_restless_ms_ = now;
+  }
+
+  OccupancyPeriod close(uint32_t now) {
+    if (this->occupied_) {
+      this->add_stretch(now - this->stretch_start_ms_);
+    }
+    OccupancyPeriod finished = this->period_;
+    this->start(now, this->occupied_);
+    return finished;
+  }
+
+  uint32_t period_start_ms() const { return this->period_start_ms_; }
+  const OccupancyPeriod &current() const { return this->period_; }
+
+ protected:
+  void add_stretch(uint32_t ms) {
+    this->period_.occupied_ms += ms;
+    if (ms > this->period_.longest_occupied_ms) {
+      this->period_.longest_occupied_ms = ms;
+    }
+  }
+
+  void note_absence(uint32_t ms) {
+    if (ms > this->period_.longest_absence_ms) {
+      this->period_.longest_absence_ms = ms;
+    }
+  }
+
+  OccupancyPeriod period_;
+  uint32_t period_start_ms_{0};
+  bool occupied_{false};
+  uint32_t stretch_start_ms_{0};
+  bool has_exit_{false};
+  uint32_t exit_ms_{0};
+  bool has_restless_{false};
+  uint32_t last_restless_ms_{0};
+  float restless_threshold_{50.0f};
+  uint32_t restless_refractory_ms_{30000};
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,62 @@
+#pragma once
+
+#include <cstdint>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+/**
+ * Cheap engine health counters, published as diagnostic sensors.
+ *
+ * Per-window counters cover the time since the last publish and are reset by
+ * start_window(); totals run since boot (Home Assistant derives rates from
+ * them). Updating a counter is an add or a compare, so they stay on even when
+ * no diagnostic sensor is configured.
+ */
+struct PerfCounters {
+  // Per publish window
+  uint32_t window_start_ms{0};
+  uint32_t frames{0};
+  uint32_t loops{0};
+  uint32_t loop_time_total_us{0};
+  uint32_t loop_time_max_us{0};
+  uint32_t transitions{0};
+
+  // Since boot
+  uint32_t frames_out_of_window{0};
+  uint32_t debounce_aborts{0};
+
+  void record_loop(uint32_t elapsed_us) {
+    this->loops++;
+    this->loop_time_total_us += elapsed_us;
+    if (elapsed_us > this->loop_time_max_us) {
+      this->loop_time_max_us = elapsed_us;
+    }
+  }
+
+  void start_window(uint32_t now_ms) {
+    this->window_start_ms = now_ms;
+    this->frames = 0;
+    this->loops = 0;
+    this->loop_time_total_us = 0;
+    this->loop_time_max_us = 0;
+    this->transitions = 0;
+  }
+
+  float frame_rate(uint32_t now_ms) const { return per_second(this->frames, now_ms); }
+
+  float transitions_per_hour(uint32_t now_ms) const { return per_second(this->transitions, now_ms) * 3600.0f; }
+
+  float loop_time_avg_us() const {
+    return this->loops == 0 ? 0.0f : static_cast<float>(this->loop_time_total_us) / this->loops;
+  }
+
+ protected:
+  float per_second(uint32_t count, uint32_t now_ms) const {
+    uint32_t elapsed_ms = now_ms - this->window_start_ms;
+    return elapsed_ms == 0 ? 0.0f : count * 1000.0f / elapsed_ms;
+  }
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,185 @@
+#pragma once
+
+#include <cstdint>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+enum PrefilterMode : uint8_t {
+  PREFILTER_NONE,    // Pass frames straight through
+  PREFILTER_MEDIAN,  // Rolling median over the last N frames
+  PREFILTER_EWMA,    // Exponentially weighted moving average
+  PREFILTER_KALMAN   // 1-D random-walk Kalman filter
+};
+
+inline const char *prefilter_mode_to_string(PrefilterMode mode) {
+  switch (mode) {
+    case PREFILTER_MEDIAN:
+      return "median";
+    case PREFILTER_EWMA:
+      return "ewma";
+    case PREFILTER_KALMAN:
+      return "kalman";
+    case PREFILTER_NONE:
+    default:
+      return "none";
+  }
+}
+
+// Prefilter knobs without the filter history, e.g. the YAML configuration to restore later
+struct PrefilterSettings {
+  PrefilterMode mode;
+  uint8_t window;
+  float alpha;
+  float process_noise;
+  float measurement_noise;
+};
+
+/**
+ * Prefilter stage in front of the state machine.
+ *
+ * Suppresses single-frame spikes so they no longer start debounce timers that
+ * then abort. Every mode keeps its state in fixed members: the median uses a
+ * ring buffer plus a sorted copy of the window (bounded by MAX_MEDIAN_WINDOW),
+ * EWMA and Kalman are O(1). Nothing allocates.
+ */
+class Prefilter {
+ public:
+  static constexpr uint8_t MAX_MEDIAN_WINDOW = 15;
+
+  void set_mode(PrefilterMode mode) {
+    this->mode_ = mode;
+    this->reset();
+  }
+  void set_median_window(uint8_t window) {
+    if (window < 1) {
+      window = 1;
+    } else if (window > MAX_MEDIAN_WINDOW) {
+      window = MAX_MEDIAN_WINDOW;
+    }
+    this->median_window_ = window;
+    this->reset();
+  }
+  void set_ewma_alpha(float alpha) { this->ewma_alpha_ = alpha; }
+  void set_kalman_noise(float process_noise, float measurement_noise) {
+    this->kalman_q_ = process_noise;
+    this->kalman_r_ = measurement_noise;
+  }
+
+  // Applies a whole configuration at once; the filter history is only dropped
+  // when the mode or the median window actually changes
+  void configure(PrefilterMode mode, uint8_t window, float alpha, float process_noise, float measurement_noise) {
+    if (mode != this->mode_) {
+      this->set_mode(mode);
+    }
+    if (window != this->median_window_) {
+      this->set_median_window(window);
+    }
+    this->set_ewma_alpha(alpha);
+    this->set_kalman_noise(process_noise, measurement_noise);
+  }
+
+  PrefilterMode get_mode() const { return this->mode_; }
+  PrefilterSettings get_settings() const {
+    return {this->mode_, this->median_window_, this->ewma_alpha_, this->kalman_q_, this->kalman_r_};
+  }
+
+  void reset() {
+    this->count_ = 0;
+    this->head_ = 0;
+    this->primed_ = false;
+  }
+
+  float update(float value) {
+    switch (this->mode_) {
+      case PREFILTER_MEDIAN:
+        return this->update_median(value);
+      case PREFILTER_EWMA:
+        return this->update_ewma(value);
+      case PREFILTER_KALMAN:
+        return this->update_kalman(value);
+      case PREFILTER_NONE:
+      default:
+        return value;
+    }
+  }
+
+ protected:
+  float update_median(float value) {
+    if (this->count_ == this->median_window_) {
+      // Window full: evict the oldest frame from the sorted copy
+      float evicted = this->ring_[this->head_];
+      uint8_t i = 0;
+      while (i < this->count_ && this->sorted_[i] != evicted) {
+        ++i;
+      }
+      for (; i + 1 < this->count_; ++i) {
+        this->sorted_[i] = this->sorted_[i + 1];
+      }
+      --this->count_;
+    }
+
+    this->ring_[this->head_] = value;
+    this->head_ = (this->head_ + 1) % this->median_window_;
+
+    // Insertion step keeps sorted_ ordered
+    uint8_t i = this->count_;
+    while (i > 0 && this->sorted_[i - 1] > value) {
+      this->sorted_[i] = this->sorted_[i - 1];
+      --i;
+    }
+    this->sorted_[i] = value;
+    ++this->count_;
+
+    uint8_t mid = this->count_ / 2;
+    if (this->count_ % 2 == 1) {
+      return this->sorted_[mid];
+    }
+    return (this->sorted_[mid - 1] + this->sorted_[mid]) / 2.0f;
+  }
+
+  float update_ewma(float value) {
+    if (!this->primed_) {
+      this->estimate_ = value;
+      this->primed_ = true;
+    } else {
+      this->estimate_ += this->ewma_alpha_ * (value - this->estimate_);
+    }
+    return this->estimate_;
+  }
+
+  float update_kalman(float value) {
+    if (!this->primed_) {
+      this->estimate_ = value;
+      this->kalman_p_ = this->kalman_r_;
+      this->primed_ = true;
+      return this->estimate_;
+    }
+    // Predict (random walk), then correct
+    this->kalman_p_ += this->kalman_q_;
+    float gain = this->kalman_p_ / (this->kalman_p_ + this->kalman_r_);
+    this->estimate_ += gain * (value - this->estimate_);
+    this->kalman_p_ *= (1.0f - gain);
+    return this->estimate_;
+  }
+
+  PrefilterMode mode_{PREFILTER_NONE};
+
+  // Median state
+  uint8_t median_window_{5};
+  uint8_t count_{0};
+  uint8_t head_{0};
+  float ring_[MAX_MEDIAN_WINDOW]{};
+  float sorted_[MAX_MEDIAN_WINDOW]{};
+
+  // EWMA / Kalman state
+  bool primed_{false};
+  float estimate_{0.0f};
+  float ewma_alpha_{0.3f};
+  float kalman_q_{0.05f};   // Process noise variance
+  float kalman_r_{1.0f};    // Measurement noise variance
+  float kalman_p_{1.0f};    // Estimate variance
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,99 @@
+#pragma once
+
+#include <cstdint>
+
+namespace esphome {
+namespace bed_presence_engine {
+
+static constexpr uint8_t MAX_ZONES = 8;
+
+/**
+ * Distance-to-zone lookup for multi-zone mode.
+ *
+ * Zone windows [d_min, d_max] are folded into a sorted list of edges once,
+ * with a precomputed zone bitmask for every edge and every gap between edges.
+ * A frame is routed with one binary search over at most 2 * MAX_ZONES edges
+ * instead of testing each zone's window, so routing cost grows with log(zones)
+ * and zones outside the frame's distance are never touched.
+ */
+class ZoneWindowTable {
+ public:
+  void build(const float *d_min_cm, const float *d_max_cm, uint8_t count) {
+    this->edge_count_ = 0;
+    for (uint8_t zone = 0; zone < count; ++zone) {
+      this->insert_edge(d_min_cm[zone]);
+      this->insert_edge(d_max_cm[zone]);
+    }
+
+    // Region 2i+1 is the edge itself, region 2i the gap below it
+    uint8_t regions = 2 * this->edge_count_ + 1;
+    for (uint8_t region = 0; region < regions; ++region) {
+      float distance = this->representative(region);
+      uint8_t mask = 0;
+      for (uint8_t zone = 0; zone < count; ++zone) {
+        if (distance >= d_min_cm[zone] && distance <= d_max_cm[zone]) {
+          mask |= 1u << zone;
+        }
+      }
+      this->masks_[region] = mask;
+    }
+  }
+
+  // Bitmask of zones whose window contains the distance
+  uint8_t lookup(float distance_cm) const {
+    uint8_t lo = 0;
+    uint8_t hi = this->edge_count_;
+    while (lo < hi) {
+      uint8_t mid = (lo + hi) / 2;
+      if (this->edges_[mid] < distance_cm) {
+        lo = mid + 1;
+      } else {
+        hi = mid;
+      }
+    }
+    if (lo < this->edge_count_ && this->edges_[lo] == distance_cm) {
+      return this->masks_[2 * lo + 1];
+    }
+    return this->masks_[2 * lo];
+  }
+
+ protected:
+  void insert_edge(float edge) {
+    uint8_t i = this->edge_count_;
+    while (i > 0 && this->edges_[i - 1] > edge) {
+      --i;
+    }
+    if (i > 0 && this->edges_[i - 1] == edge) {
+      return;
+    }
+    for (uint8_t j = this->edge_count_; j > i; --j) {
+      this->edges_[j] = this->edges_[j - 1];
+    }
+    this->edges_[i] = edge;
+    this->edge_count_++;
+  }
+
+  float representative(uint8_t region) const {
+    uint8_t index = region / 2;
+    if (region % 2 == 1) {
+      return this->edges_[index];
+    }
+    if (this->edge_count_ == 0) {
+      return 0.0f;
+    }
+    if (index == 0) {
+      return this->edges_[0] - 1.0f;
+    }
+    if (index == this->edge_count_) {
+      return this->edges_[index - 1] + 1.0f;
+    }
+    return (this->edges_[index - 1] + this->edges_[index]) / 2.0f;
+  }
+
+  float edges_[2 * MAX_ZONES]{};
+  uint8_t edge_count_{0};
+  uint8_t masks_[4 * MAX_ZONES + 1]{};
+};
+
+}  // namespace bed_presence_engine
+}  // namespace esphome
@@ -0,0 +1,151 @@
+#include "bed_presence_replay.h"
+
+#include "bed_presence.h"
+#include "esphome/core/hal.h"
+
+#include <cmath>
+
+using esphome::bed_presence_engine::BedPresenceEngine;
+using esphome::bed_presence_engine::DetectorMode;
+using esphome::bed_presence_engine::PrefilterMode;
+
+namespace {
+
+// The firmware engine plus the sensors it reads; frames are published through
+// the stub sensors exactly as the LD2410 component would
+class ReplayEngine : public BedPresenceEngine {
+ public:
+  explicit ReplayEngine(const bp_replay_config &config) {
+    this->set_energy_sensor(&this->energy_);
+    this->set_distance_sensor(&this->distance_);
+    this->mu_still_ = config.mu;
+    this->sigma_still_ = config.sigma;
+    this->set_k_on(config.k_on);
+    this->set_k_off(config.k_off);
+    this->set_on_debounce_ms(config.on_debounce_ms);
+    this->set_off_debounce_ms(config.off_debounce_ms);
+    this->set_abs_clear_delay_ms(config.abs_clear_delay_ms);
+    this->set_d_min_cm(config.d_min_cm);
+    this->set_d_max_cm(config.d_max_cm);
+    this->set_detector_mode(static_cast<DetectorMode>(config.detector));
+    this->set_cusum_h_on(config.cusum_h_on);
+    this->set_cusum_h_off(config.cusum_h_off);
+    this->set_prefilter_window(config.prefilter_window);
+    this->set_prefilter_alpha(config.prefilter_alpha);
+    this->set_prefilter_kalman_noise(config.prefilter_process_noise, config.prefilter_measurement_noise);
+    this->set_prefilter_mode(static_cast<PrefilterMode>(config.prefilter_mode));
+  }
+
+  void update(const bp_replay_config &config) {
+    this->mu_still_ = config.mu;
+    this->sigma_still_ = config.sigma;
+    // Also recomputes the energy thresholds from the new baseline
+    this->update_k_on(config.k_on);
+    this->update_k_off(config.k_off);
+    this->update_on_debounce_ms(config.on_debounce_ms);
+    this->update_off_debounce_ms(config.off_debounce_ms);
+    this->update_abs_clear_delay_ms(config.abs_clear_delay_ms);
+    this->update_d_min_cm(config.d_min_cm);
+    this->update_d_max_cm(config.d_max_cm);
+  }
+
+  size_t run(const uint32_t *timestamps_ms, const float *energies, const float *distances, size_t count,
+             uint8_t *states, bp_replay_event *events, size_t event_capacity) {
+    size_t event_count = 0;
+    for (size_t i = 0; i < count; ++i) {
+      esphome::set_millis(timestamps_ms[i]);
+      if (!this->started_) {
+        this->setup();
+        this->started_ = true;
+      }
+      if (distances != nullptr && !std::isnan(distances[i])) {
+        this->distance_.publish_state(distances[i]);
+      }
+      this->energy_.publish_state(energies[i]);
+      this->loop();
+
+      if (states != nullptr) {
+        states[i] = static_cast<uint8_t>(this->current_state_);
+      }
+      if (this->state != this->occupied_) {
+        this->occupied_ = this->state;
+        if (event_count < event_capacity) {
+          events[event_count] = {static_cast<uint32_t>(i), static_cast<uint8_t>(this->occupied_)};
+        }
+        event_count++;
+      }
+    }
+    return event_count;
+  }
+
+ protected:
+  esphome::sensor::Sensor energy_;
+  esphome::sensor::Sensor distance_;
+  bool started_{false};
+  bool occupied_{false};
+};
+
+}  // namespace
+
+struct bp_replay_engine {
+  ReplayEngine engine;
+  explicit bp_replay_engine(const bp_replay_config &config) : engine(config) {}
+};
+
+extern "C" {
+
+int bp_replay_api_version(void) { return BP_REPLAY_API_VERSION; }
+
+void bp_replay_default_config(bp_replay_config *config) {
+  // Same defaults as the engine members and binary_sensor.py
+  *config = {};
+  config->mu = 6.7f;
+  config->sigma = 3.5f;
+  config->k_on = 9.0f;
+  config->k_off = 4.0f;
+  config->on_debounce_ms = 3000;
+  config->off_debounce_ms = 5000;
+  config->abs_clear_delay_ms = 30000;
+  config->d_min_cm = 0.0f;
+  config->d_max_cm = 600.0f;
+  config->detector = BP_DETECTOR_THRESHOLD;
+  config->cusum_h_on = 20.0f;
+  config->cusum_h_off = 40.0f;
+  config->prefilter_mode = 0;
+  config->prefilter_window = 5;
+  config->prefilter_alpha = 0.3f;
+  config->prefilter_process_noise = 0.05f;
+  config->prefilter_measurement_noise = 1.0f;
+}
+
+bp_replay_engine *bp_replay_create(const bp_replay_config *config) {
+  bp_replay_config defaults;
+  if (config == nullptr) {
+    bp_replay_default_config(&defaults);
+    config = &defaults;
+  }
+  return new bp_replay_engine(*config);
+}
+
+void bp_replay_destroy(bp_replay_engine *engine) { delete engine; }
+
+void bp_replay_update(bp_replay_engine *engine, const bp_replay_config *config) {
+  if (engine == nullptr || config == nullptr) {
+    return;
+  }
+  engine->engine.update(*config);
+}
+
+size_t bp_replay_run(bp_replay_engine *engine, const uint32_t *timestamps_ms, const float *energies,
+                     const float *distances, size_t count, uint8_t *states, bp_replay_event *events,
+                     size_t event_capacity) {
+  if (engine == nullptr || timestamps_ms == nullptr || energies == nullptr) {
+    return 0;
+  }
+  if (events == nullptr) {
+    event_capacity = 0;
+  }
+  return engine->engine.run(timestamps_ms, energies, distances, count, states, events, event_capacity);
+}
+
+}  // extern "C"
@@ -0,0 +1,90 @@
+#pragma once
+
+/**
+ * Flat C API over the real BedPresenceEngine for bulk host replay.
+ *
+ * Built as a shared library (see build.sh) from the same sources and ESPHome
+ * stubs as the unit tests, so a replay runs the exact firmware state machine.
+ * All arrays are caller-owned; nothing is copied or allocated per frame.
+ *
+ * The stub millis() clock is process-wide: run one replay at a time per process.
+ */
+
+#include <stddef.h>
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define BP_REPLAY_API_VERSION 2
+#define BP_REPLAY_EXPORT __attribute__((visibility("default")))
+
+enum {
+  BP_DETECTOR_THRESHOLD = 0,
+  BP_DETECTOR_CUSUM = 1,
+};
+
+/* Engine knobs; bp_replay_default_config() fills in the firmware defaults */
+typedef struct {
+  float mu;
+  float sigma;
+  float k_on;
+  float k_off;
+  uint32_t on_debounce_ms;
+  uint32_t off_debounce_ms;
+  uint32_t abs_clear_delay_ms;
+  float d_min_cm;
+  float d_max_cm;
+  uint8_t detector;       /* BP_DETECTOR_* */
+  float cusum_h_on;
+  float cusum_h_off;
+  uint8_t prefilter_mode; /* 0 none, 1 median, 2 ewma, 3 kalman (PrefilterMode) */
+  uint8_t prefilter_window;
+  float prefilter_alpha;
+  float prefilter_process_noise;
+  float prefilter_measurement_noise;
+} bp_replay_config;
+
+/* One ON/OFF publish: the frame index and the published state (1 = occupied) */
+typedef struct {
+  uint32_t index;
+  uint8_t occupied;
+} bp_replay_event;
+
+typedef struct bp_replay_engine bp_replay_engine;
+
+BP_REPLAY_EXPORT int bp_replay_api_version(void);
+BP_REPLAY_EXPORT void bp_replay_default_config(bp_replay_config *config);
+
+BP_REPLAY_EXPORT bp_replay_engine *bp_replay_create(const bp_replay_config *config);
+BP_REPLAY_EXPORT void bp_replay_destroy(bp_replay_engine *engine);
+
+/**
+ * Applies new knobs and baseline to a running engine through the same update
+ * calls as the Home Assistant number entities; the state machine keeps its
+ * state and timers. The detector and prefilter fields are ignored here: they
+ * are fixed when the engine is created.
+ */
+BP_REPLAY_EXPORT void bp_replay_update(bp_replay_engine *engine, const bp_replay_config *config);
+
+/**
+ * Feeds `count` frames through the engine, in order, continuing from any
+ * previous call on the same engine.
+ *
+ * timestamps_ms: millis() at each frame (non-decreasing, wraps like the device)
+ * energies:      still energy (%) per frame
+ * distances:     distance (cm) per frame, or NULL; NaN means no distance reading
+ * states:        out, state machine state after each frame (State enum), or NULL
+ * events:        out, ON/OFF publishes, at most event_capacity are written
+ *
+ * Returns the number of events that occurred; if it exceeds event_capacity the
+ * rest were not written (the states array is always complete).
+ */
+BP_REPLAY_EXPORT size_t bp_replay_run(bp_replay_engine *engine, const uint32_t *timestamps_ms,
+                                      const float *energies, const float *distances, size_t count,
+                                      uint8_t *states, bp_replay_event *events, size_t event_capacity);
+
+#ifdef __cplusplus
+}
+#endif
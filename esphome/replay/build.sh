@@ -0,0 +1,23 @@
+#!/bin/bash
+
+# Build the replay shared library (libbed_presence_replay.so) from the engine sources
+#
+# Compiles the real BedPresenceEngine against the host stubs in test/stubs, with the
+# flat C API from bed_presence_replay.h. The engine is built at diagnostics_level lean:
+# the state machine is identical and reason strings are not needed for replay.
+# Requires g++. Usage: ./build.sh [output path]
+
+set -e  # Exit on error
+set -u  # Exit on undefined variable
+
+ESPHOME_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+COMPONENT="$ESPHOME_DIR/custom_components/bed_presence_engine"
+OUTPUT="${1:-$ESPHOME_DIR/replay/libbed_presence_replay.so}"
+
+g++ -std=c++14 -O2 -fPIC -shared -fvisibility=hidden -Wall -Wextra \
+    -DUNIT_TEST -DBED_PRESENCE_DIAGNOSTICS_LEVEL=0 \
+    -I "$COMPONENT" -I "$ESPHOME_DIR/test/stubs" \
+    "$ESPHOME_DIR/replay/bed_presence_replay.cpp" "$COMPONENT/bed_presence.cpp" "$COMPONENT/bed_zone.cpp" \
+    -o "$OUTPUT"
+
+echo "Built $OUTPUT"
@@ -0,0 +1,21 @@
+#pragma once
+
+namespace esphome {
+namespace binary_sensor {
+
+class BinarySensor {
+ public:
+  void publish_state(bool state) {
+    this->state = state;
+    this->has_state_ = true;
+  }
+  bool has_state() const { return this->has_state_; }
+
+  bool state{false};
+
+ protected:
+  bool has_state_{false};
+};
+
+}  // namespace binary_sensor
+}  // namespace esphome
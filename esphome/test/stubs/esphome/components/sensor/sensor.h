@@ -0,0 +1,30 @@
+#pragma once
+
+#include <functional>
+#include <utility>
+#include <vector>
+
+namespace esphome {
+namespace sensor {
+
+class Sensor {
+ public:
+  void publish_state(float state) {
+    this->state = state;
+    this->has_state_ = true;
+    for (auto &callback : this->callbacks_) {
+      callback(state);
+    }
+  }
+  bool has_state() const { return this->has_state_; }
+  void add_on_state_callback(std::function<void(float)> &&callback) { this->callbacks_.push_back(std::move(callback)); }
+
+  float state{0.0f};
+
+ protected:
+  bool has_state_{false};
+  std::vector<std::function<void(float)>> callbacks_;
+};
+
+}  // namespace sensor
+}  // namespace esphome
@@ -0,0 +1,22 @@
+#pragma once
+
+// Minimal host stand-in for ESPHome's Component, used by the native unit tests.
+
+#include "esphome/core/hal.h"
+#include <cstdint>
+
+namespace esphome {
+
+namespace setup_priority {
+static const float DATA = 600.0f;
+}  // namespace setup_priority
+
+class Component {
+ public:
+  virtual ~Component() = default;
+  virtual void setup() {}
+  virtual void loop() {}
+  virtual float get_setup_priority() const { return 0.0f; }
+};
+
+}  // namespace esphome
@@ -0,0 +1,3 @@
+#pragma once
+
+// Host builds: no optional ESPHome features (web server, API) are compiled in
@@ -0,0 +1,28 @@
+#pragma once
+
+// Minimal host stand-in for ESPHome's millis()/micros(), used by the native unit tests.
+
+#include <cstdint>
+
+namespace esphome {
+
+// Mock clock: tests advance time through set_millis()/advance_millis(); advance_micros()
+// adds sub-millisecond time so loop() durations can be simulated
+inline uint32_t &stub_millis() {
+  static uint32_t now = 0;
+  return now;
+}
+inline uint32_t &stub_micros_offset() {
+  static uint32_t offset = 0;
+  return offset;
+}
+inline uint32_t millis() { return stub_millis(); }
+inline uint32_t micros() { return stub_millis() * 1000u + stub_micros_offset(); }
+inline void set_millis(uint32_t now) {
+  stub_millis() = now;
+  stub_micros_offset() = 0;
+}
+inline void advance_millis(uint32_t ms) { stub_millis() += ms; }
+inline void advance_micros(uint32_t us) { stub_micros_offset() += us; }
+
+}  // namespace esphome
@@ -0,0 +1,20 @@
+#pragma once
+
+// Host logging stub: arguments are format-checked but nothing is printed.
+
+namespace esphome {
+
+__attribute__((format(printf, 2, 3))) inline void esp_log_stub(const char *tag, const char *format, ...) {
+  (void) tag;
+  (void) format;
+}
+
+}  // namespace esphome
+
+#define ESP_LOGE(tag, ...) ::esphome::esp_log_stub(tag, __VA_ARGS__)
+#define ESP_LOGW(tag, ...) ::esphome::esp_log_stub(tag, __VA_ARGS__)
+#define ESP_LOGI(tag, ...) ::esphome::esp_log_stub(tag, __VA_ARGS__)
+#define ESP_LOGD(tag, ...) ::esphome::esp_log_stub(tag, __VA_ARGS__)
+#define ESP_LOGCONFIG(tag, ...) ::esphome::esp_log_stub(tag, __VA_ARGS__)
+#define ESP_LOGV(tag, ...) ::esphome::esp_log_stub(tag, __VA_ARGS__)
+#define ESP_LOGVV(tag, ...) ::esphome::esp_log_stub(tag, __VA_ARGS__)
@@ -1,205 +1,136 @@
 /**
- * Unit Tests for Bed Presence Engine - Phase 2
+ * Unit Tests for Bed Presence Engine
  *
- * These tests document and verify Phase 2 state machine logic with debouncing.
- * Since the actual implementation requires ESPHome dependencies,
- * these tests demonstrate the expected behavior using a simplified model.
+ * The state machine, engine feature and allocation tests drive the real BedPresenceEngine
+ * (bed_presence.cpp) against the ESPHome stubs in test/stubs; the helper
+ * classes (histograms, prefilter, frame log, ...) are tested directly.
  */
 
 #include <gtest/gtest.h>
 #include <algorithm>
 #include <cmath>
+#include <cstdlib>
+#include <cstring>
+#include <new>
 #include <string>
 #include <vector>
 
-/**
- * Simplified Phase 2 Presence Engine for Testing
- *
- * This models the core Phase 2 logic without ESPHome dependencies:
- * - Z-score calculation
- * - 4-state machine (IDLE, DEBOUNCING_ON, PRESENT, DEBOUNCING_OFF)
- * - Debounce timers with time mocking
- * - Absolute clear delay
- */
-class SimplePresenceEngine {
-public:
-    // State machine states
-    enum State { IDLE, DEBOUNCING_ON, PRESENT, DEBOUNCING_OFF };
-
-    // Configuration (matching actual implementation defaults)
-    float mu_still_ = 100.0f;
-    float sigma_still_ = 20.0f;
-    float k_on_ = 4.0f;
-    float k_off_ = 2.0f;
-    unsigned long on_debounce_ms_ = 3000;
-    unsigned long off_debounce_ms_ = 5000;
-    unsigned long abs_clear_delay_ms_ = 30000;
-    float d_min_cm_ = 0.0f;
-    float d_max_cm_ = 600.0f;
-
-    // State
-    State current_state_ = IDLE;
-    bool binary_output_ = false;  // Simulates binary sensor output
-    std::string last_reason_ = "";
-
-    // Time tracking (mock time for testing)
-    unsigned long mock_time_ = 0;
-    unsigned long debounce_start_time_ = 0;
-    unsigned long last_high_confidence_time_ = 0;
-    bool calibrating_ = false;
-    unsigned long calibration_end_time_ = 0;
-    std::vector<float> calibration_samples_;
-
-    // Z-score calculation: z = (x - μ) / σ
-    float calculate_z_score(float energy) {
-        if (sigma_still_ <= 0.001f) {
-            return 0.0f;  // Prevent division by zero
-        }
-        return (energy - mu_still_) / sigma_still_;
+#include "bed_presence.h"
+#include "bed_zone.h"
+#include "calibration_convergence.h"
+#include "cusum.h"
+#include "energy_telemetry.h"
+#include "energy_thresholds.h"
+#include "frame_log.h"
+#include "frame_stream.h"
+#include "gate_energy.h"
+#include "latency_histogram.h"
+#include "occupancy_summary.h"
+#include "perf_counters.h"
+#include "prefilter.h"
+#include "zone_window.h"
+
+using esphome::bed_presence_engine::CalibrationConvergence;
+using esphome::bed_presence_engine::DEBOUNCING_OFF;
+using esphome::bed_presence_engine::DEBOUNCING_ON;
+using esphome::bed_presence_engine::DeltaHeartbeatFilter;
+using esphome::bed_presence_engine::EnergyHistogram;
+using esphome::bed_presence_engine::EnergyTelemetry;
+using esphome::bed_presence_engine::EnergyThresholds;
+using esphome::bed_presence_engine::FrameLog;
+using esphome::bed_presence_engine::FrameLogHeader;
+using esphome::bed_presence_engine::FrameRecord;
+using esphome::bed_presence_engine::StreamClientBuffer;
+using esphome::bed_presence_engine::StreamFrame;
+using esphome::bed_presence_engine::compute_energy_thresholds;
+using esphome::bed_presence_engine::energy_to_q8;
+using esphome::bed_presence_engine::TwoSidedCusum;
+using esphome::bed_presence_engine::GATE_COUNT;
+using esphome::bed_presence_engine::IDLE;
+using esphome::bed_presence_engine::PRESENT;
+using esphome::bed_presence_engine::GateBaseline;
+using esphome::bed_presence_engine::gate_in_window;
+using esphome::bed_presence_engine::LatencyHistogram;
+using esphome::bed_presence_engine::OccupancyPeriod;
+using esphome::bed_presence_engine::OccupancySummary;
+using esphome::bed_presence_engine::weighted_gate_z;
+using esphome::bed_presence_engine::PerfCounters;
+using esphome::bed_presence_engine::Prefilter;
+using esphome::bed_presence_engine::PREFILTER_EWMA;
+using esphome::bed_presence_engine::PREFILTER_KALMAN;
+using esphome::bed_presence_engine::PREFILTER_MEDIAN;
+using esphome::bed_presence_engine::PREFILTER_NONE;
+using esphome::bed_presence_engine::ZoneWindowTable;
+
+// Median of a sample vector by sorting, the reference for the fixed-buffer implementations
+static float reference_median(std::vector<float> values) {
+    if (values.empty()) {
+        return 0.0f;
     }
-
-    // Advance mock time
-    void advance_time(unsigned long ms) {
-        mock_time_ += ms;
-    }
-
-    static float compute_median(std::vector<float> values) {
-        if (values.empty()) {
-            return 0.0f;
-        }
-
-        size_t mid = values.size() / 2;
-        std::nth_element(values.begin(), values.begin() + mid, values.end());
-        float median = values[mid];
-
-        if (values.size() % 2 == 0) {
-            std::nth_element(values.begin(), values.begin() + mid - 1, values.end());
-            median = (median + values[mid - 1]) / 2.0f;
-        }
-        return median;
-    }
-
-    void finalize_calibration() {
-        calibrating_ = false;
-        if (calibration_samples_.empty()) {
-            return;
-        }
-
-        auto samples = calibration_samples_;
-        calibration_samples_.clear();
-
-        float median = compute_median(samples);
-        std::vector<float> deviations(samples.size());
-        for (size_t i = 0; i < samples.size(); ++i) {
-            deviations[i] = std::fabs(samples[i] - median);
-        }
-        float mad = compute_median(deviations);
-        float sigma = mad * 1.4826f;
-        if (sigma < 0.05f) {
-            sigma = 0.05f;
-        }
-
-        mu_still_ = median;
-        sigma_still_ = sigma;
-    }
-
-    void start_calibration(uint32_t duration_s) {
-        calibrating_ = true;
-        calibration_samples_.clear();
-        calibration_end_time_ = mock_time_ + duration_s * 1000UL;
+    std::sort(values.begin(), values.end());
+    size_t mid = values.size() / 2;
+    if (values.size() % 2 == 0) {
+        return (values[mid - 1] + values[mid]) / 2.0f;
     }
+    return values[mid];
+}
 
-    void maybe_collect_calibration(float energy) {
-        if (!calibrating_) {
-            return;
-        }
-        calibration_samples_.push_back(energy);
-        if (mock_time_ >= calibration_end_time_) {
-            finalize_calibration();
+/**
+ * State machine tests against the real BedPresenceEngine.
+ *
+ * The engine runs on the ESPHome stubs in test/stubs: each process_energy() call
+ * publishes one LD2410 frame (distance inside or outside the window) and runs
+ * loop() once; advance_time() moves the stub millis() clock. The baseline is
+ * set to μ=100, σ=20 with k_on=4, k_off=2 so the z-scores below are round numbers.
+ */
+class PresenceEngineTest : public ::testing::Test {
+protected:
+    class TestEngine : public esphome::bed_presence_engine::BedPresenceEngine {
+    public:
+        using BedPresenceEngine::calculate_z_score;
+        using BedPresenceEngine::calibrating_;
+        using BedPresenceEngine::calibration_count_;
+        using BedPresenceEngine::current_state_;
+        using BedPresenceEngine::gate_still_histograms_;
+        using BedPresenceEngine::last_high_confidence_time_;
+        using BedPresenceEngine::mu_still_;
+        using BedPresenceEngine::sigma_still_;
+        using BedPresenceEngine::update_energy_thresholds;
+
+        float calculate_z_score(float energy) {
+            return BedPresenceEngine::calculate_z_score(energy, this->mu_still_, this->sigma_still_);
         }
+    };
+
+    void SetUp() override {
+        esphome::set_millis(0);
+        engine_.set_energy_sensor(&energy_);
+        engine_.set_distance_sensor(&distance_);
+        engine_.set_state_reason_sensor(&reason_);
+        engine_.set_k_on(4.0f);
+        engine_.set_k_off(2.0f);
+        engine_.mu_still_ = 100.0f;
+        engine_.sigma_still_ = 20.0f;
+        engine_.setup();
     }
 
-    // Process energy reading (Phase 3 logic: distance window + calibration + state machine)
     void process_energy(float energy, bool distance_allowed = true) {
-        if (calibrating_ && mock_time_ >= calibration_end_time_) {
-            finalize_calibration();
-        }
+        float d_min = engine_.get_d_min_cm();
+        float d_max = engine_.get_d_max_cm();
+        distance_.publish_state(distance_allowed ? (d_min + d_max) / 2.0f : d_max + 100.0f);
+        energy_.publish_state(energy);
+        engine_.loop();
+    }
 
-        if (!distance_allowed) {
-            return;
-        }
+    void advance_time(unsigned long ms) { esphome::advance_millis(ms); }
 
-        float z_still = calculate_z_score(energy);
-        unsigned long now = mock_time_;
-
-        maybe_collect_calibration(energy);
-
-        switch (current_state_) {
-            case IDLE:
-                if (z_still >= k_on_) {
-                    debounce_start_time_ = now;
-                    current_state_ = DEBOUNCING_ON;
-                }
-                break;
-
-            case DEBOUNCING_ON:
-                if (z_still >= k_on_) {
-                    // Condition still holds, check timer
-                    if ((now - debounce_start_time_) >= on_debounce_ms_) {
-                        current_state_ = PRESENT;
-                        last_high_confidence_time_ = now;
-                        binary_output_ = true;
-
-                        char buf[64];
-                        snprintf(buf, sizeof(buf), "ON: z=%.2f, debounced %lums", z_still, on_debounce_ms_);
-                        last_reason_ = buf;
-                    }
-                } else {
-                    // Condition lost, abort debounce
-                    current_state_ = IDLE;
-                }
-                break;
-
-            case PRESENT:
-                // Update high confidence timestamp whenever strong signal detected
-                if (z_still > k_on_) {
-                    last_high_confidence_time_ = now;
-                }
-
-                // Check for transition to DEBOUNCING_OFF
-                if (z_still < k_off_) {
-                    // Low signal detected, check absolute clear delay
-                    if ((now - last_high_confidence_time_) >= abs_clear_delay_ms_) {
-                        debounce_start_time_ = now;
-                        current_state_ = DEBOUNCING_OFF;
-                    }
-                }
-                break;
-
-            case DEBOUNCING_OFF:
-                if (z_still < k_off_) {
-                    // Condition still holds, check timer
-                    if ((now - debounce_start_time_) >= off_debounce_ms_) {
-                        current_state_ = IDLE;
-                        binary_output_ = false;
-
-                        char buf[64];
-                        snprintf(buf, sizeof(buf), "OFF: z=%.2f, debounced %lums", z_still, off_debounce_ms_);
-                        last_reason_ = buf;
-                    }
-                } else if (z_still >= k_on_) {
-                    // High signal returned, abort debounce
-                    current_state_ = PRESENT;
-                    last_high_confidence_time_ = now;
-                }
-                break;
-        }
-    }
-};
+    bool binary_output() const { return engine_.state; }
+    const std::string &last_reason() const { return reason_.state; }
 
-class PresenceEngineTest : public ::testing::Test {
-protected:
-    SimplePresenceEngine engine_;
+    esphome::sensor::Sensor energy_;
+    esphome::sensor::Sensor distance_;
+    esphome::text_sensor::TextSensor reason_;
+    TestEngine engine_;
 };
 
 TEST_F(PresenceEngineTest, ZScoreCalculation) {
@@ -212,8 +143,8 @@ TEST_F(PresenceEngineTest, ZScoreCalculation) {
 }
 
 TEST_F(PresenceEngineTest, InitialStateIsIdle) {
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
-    EXPECT_FALSE(engine_.binary_output_);
+    EXPECT_EQ(engine_.current_state_, IDLE);
+    EXPECT_FALSE(binary_output());
 }
 
 TEST_F(PresenceEngineTest, TransitionsToOccupiedWithDebouncing) {
@@ -221,235 +152,236 @@ TEST_F(PresenceEngineTest, TransitionsToOccupiedWithDebouncing) {
     // z=4 means energy = 100 + 4*20 = 180
 
     // High signal detected, should enter DEBOUNCING_ON
-    engine_.process_energy(185.0f);  // z=4.25
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::DEBOUNCING_ON);
-    EXPECT_FALSE(engine_.binary_output_);  // Binary sensor still OFF during debounce
+    process_energy(185.0f);  // z=4.25
+    EXPECT_EQ(engine_.current_state_, DEBOUNCING_ON);
+    EXPECT_FALSE(binary_output());  // Binary sensor still OFF during debounce
 
     // Advance time but not enough to complete debounce
-    engine_.advance_time(2000);  // 2 seconds (need 3)
-    engine_.process_energy(185.0f);  // Still high
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::DEBOUNCING_ON);
-    EXPECT_FALSE(engine_.binary_output_);  // Still OFF
+    advance_time(2000);  // 2 seconds (need 3)
+    process_energy(185.0f);  // Still high
+    EXPECT_EQ(engine_.current_state_, DEBOUNCING_ON);
+    EXPECT_FALSE(binary_output());  // Still OFF
 
     // Advance time to complete debounce
-    engine_.advance_time(1000);  // Total 3 seconds
-    engine_.process_energy(185.0f);  // Still high
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
-    EXPECT_TRUE(engine_.binary_output_);  // Now ON
+    advance_time(1000);  // Total 3 seconds
+    process_energy(185.0f);  // Still high
+    EXPECT_EQ(engine_.current_state_, PRESENT);
+    EXPECT_TRUE(binary_output());  // Now ON
 }
 
 TEST_F(PresenceEngineTest, DebouncingOnAborts) {
     // Start debouncing
-    engine_.process_energy(185.0f);  // z=4.25
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::DEBOUNCING_ON);
+    process_energy(185.0f);  // z=4.25
+    EXPECT_EQ(engine_.current_state_, DEBOUNCING_ON);
 
     // Advance time partway
-    engine_.advance_time(2000);
+    advance_time(2000);
 
     // Signal drops below threshold before debounce completes
-    engine_.process_energy(135.0f);  // z=1.75 < k_on
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
-    EXPECT_FALSE(engine_.binary_output_);  // Should remain OFF
+    process_energy(135.0f);  // z=1.75 < k_on
+    EXPECT_EQ(engine_.current_state_, IDLE);
+    EXPECT_FALSE(binary_output());  // Should remain OFF
 }
 
 TEST_F(PresenceEngineTest, TransitionsToVacantWithDebouncing) {
     // First get to PRESENT state
-    engine_.process_energy(185.0f);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(185.0f);
+    advance_time(3000);
+    process_energy(185.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
 
     // Wait for absolute clear delay (30 seconds default)
-    engine_.advance_time(30000);
+    advance_time(30000);
 
     // Now low signal detected, should enter DEBOUNCING_OFF
-    engine_.process_energy(135.0f);  // z=1.75 < k_off
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::DEBOUNCING_OFF);
-    EXPECT_TRUE(engine_.binary_output_);  // Still ON during debounce
+    process_energy(135.0f);  // z=1.75 < k_off
+    EXPECT_EQ(engine_.current_state_, DEBOUNCING_OFF);
+    EXPECT_TRUE(binary_output());  // Still ON during debounce
 
     // Advance time to complete off debounce (5 seconds)
-    engine_.advance_time(5000);
-    engine_.process_energy(135.0f);  // Still low
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
-    EXPECT_FALSE(engine_.binary_output_);  // Now OFF
+    advance_time(5000);
+    process_energy(135.0f);  // Still low
+    EXPECT_EQ(engine_.current_state_, IDLE);
+    EXPECT_FALSE(binary_output());  // Now OFF
 }
 
 TEST_F(PresenceEngineTest, DebouncingOffAborts) {
     // Get to PRESENT state
-    engine_.process_energy(185.0f);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(185.0f);
+    advance_time(3000);
+    process_energy(185.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
 
     // Wait for absolute clear delay and enter DEBOUNCING_OFF
-    engine_.advance_time(30000);
-    engine_.process_energy(135.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::DEBOUNCING_OFF);
+    advance_time(30000);
+    process_energy(135.0f);
+    EXPECT_EQ(engine_.current_state_, DEBOUNCING_OFF);
 
     // Advance time partway through debounce
-    engine_.advance_time(3000);
+    advance_time(3000);
 
     // High signal returns, should abort debounce
-    engine_.process_energy(185.0f);  // z=4.25 >= k_on
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
-    EXPECT_TRUE(engine_.binary_output_);  // Should remain ON
+    process_energy(185.0f);  // z=4.25 >= k_on
+    EXPECT_EQ(engine_.current_state_, PRESENT);
+    EXPECT_TRUE(binary_output());  // Should remain ON
 }
 
 TEST_F(PresenceEngineTest, AbsoluteClearDelayBlocksTransition) {
     // Get to PRESENT state
-    engine_.process_energy(185.0f);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(185.0f);
+    advance_time(3000);
+    process_energy(185.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
 
     // Low signal detected but abs_clear_delay not yet elapsed
-    engine_.advance_time(10000);  // Only 10 seconds (need 30)
-    engine_.process_energy(135.0f);  // z < k_off
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);  // Should remain PRESENT
-    EXPECT_TRUE(engine_.binary_output_);  // Should remain ON
+    advance_time(10000);  // Only 10 seconds (need 30)
+    process_energy(135.0f);  // z < k_off
+    EXPECT_EQ(engine_.current_state_, PRESENT);  // Should remain PRESENT
+    EXPECT_TRUE(binary_output());  // Should remain ON
 }
 
 TEST_F(PresenceEngineTest, HighConfidenceTimestampTracking) {
     // Get to PRESENT state
-    engine_.process_energy(185.0f);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(185.0f);
+    advance_time(3000);
+    process_energy(185.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
     unsigned long first_hc_time = engine_.last_high_confidence_time_;
 
     // Advance time and provide another high signal
-    engine_.advance_time(10000);
-    engine_.process_energy(185.0f);  // z > k_on
+    advance_time(10000);
+    process_energy(185.0f);  // z > k_on
     EXPECT_GT(engine_.last_high_confidence_time_, first_hc_time);  // Should update
 
     // Now need to wait 30 seconds from latest high confidence signal before clearing
-    engine_.advance_time(29000);  // Almost 30 seconds from second signal
-    engine_.process_energy(135.0f);  // Low signal
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);  // Still blocking
+    advance_time(29000);  // Almost 30 seconds from second signal
+    process_energy(135.0f);  // Low signal
+    EXPECT_EQ(engine_.current_state_, PRESENT);  // Still blocking
 }
 
 TEST_F(PresenceEngineTest, UpdateKOnDynamically) {
-    engine_.k_on_ = 5.0f;  // Increase threshold
+    engine_.update_k_on(5.0f);  // Increase threshold
 
     // Now need z>=5, so energy >= 100 + 5*20 = 200
-    engine_.process_energy(185.0f);  // z=4.25 < k_on
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
-
-    engine_.process_energy(205.0f);  // z=5.25 >= k_on
-    engine_.advance_time(3000);
-    engine_.process_energy(205.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
-    EXPECT_TRUE(engine_.binary_output_);
+    process_energy(185.0f);  // z=4.25 < k_on
+    EXPECT_EQ(engine_.current_state_, IDLE);
+
+    process_energy(205.0f);  // z=5.25 >= k_on
+    advance_time(3000);
+    process_energy(205.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
+    EXPECT_TRUE(binary_output());
 }
 
 TEST_F(PresenceEngineTest, UpdateKOffDynamically) {
     // Get to PRESENT state
-    engine_.process_energy(185.0f);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(185.0f);
+    advance_time(3000);
+    process_energy(185.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
 
     // Update k_off to 3.0
-    engine_.k_off_ = 3.0f;
+    engine_.update_k_off(3.0f);
 
     // Now need z<3 to enter DEBOUNCING_OFF, so energy < 100 + 3*20 = 160
-    engine_.advance_time(30000);  // Wait for abs_clear_delay
-    engine_.process_energy(165.0f);  // z=3.25 > k_off
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);  // Should remain PRESENT
+    advance_time(30000);  // Wait for abs_clear_delay
+    process_energy(165.0f);  // z=3.25 > k_off
+    EXPECT_EQ(engine_.current_state_, PRESENT);  // Should remain PRESENT
 
-    engine_.process_energy(155.0f);  // z=2.75 < k_off
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::DEBOUNCING_OFF);
+    process_energy(155.0f);  // z=2.75 < k_off
+    EXPECT_EQ(engine_.current_state_, DEBOUNCING_OFF);
 }
 
 TEST_F(PresenceEngineTest, StateReasonIsUpdated) {
     // Turn ON (with debouncing)
-    engine_.process_energy(185.0f);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f);
-    EXPECT_NE(engine_.last_reason_.find("ON:"), std::string::npos);
-    EXPECT_NE(engine_.last_reason_.find("z="), std::string::npos);
-    EXPECT_NE(engine_.last_reason_.find("debounced"), std::string::npos);
-    std::string reason_on = engine_.last_reason_;
+    process_energy(185.0f);
+    advance_time(3000);
+    process_energy(185.0f);
+    EXPECT_NE(last_reason().find("ON:"), std::string::npos);
+    EXPECT_NE(last_reason().find("z="), std::string::npos);
+    EXPECT_NE(last_reason().find("debounced"), std::string::npos);
+    std::string reason_on = last_reason();
 
     // Turn OFF (with debouncing)
-    engine_.advance_time(30000);
-    engine_.process_energy(135.0f);
-    engine_.advance_time(5000);
-    engine_.process_energy(135.0f);
-    EXPECT_NE(engine_.last_reason_.find("OFF:"), std::string::npos);
-    EXPECT_NE(engine_.last_reason_.find("z="), std::string::npos);
-    EXPECT_NE(engine_.last_reason_.find("debounced"), std::string::npos);
+    advance_time(30000);
+    process_energy(135.0f);
+    advance_time(5000);
+    process_energy(135.0f);
+    EXPECT_NE(last_reason().find("OFF:"), std::string::npos);
+    EXPECT_NE(last_reason().find("z="), std::string::npos);
+    EXPECT_NE(last_reason().find("debounced"), std::string::npos);
 
     // Reasons should be different
-    EXPECT_NE(reason_on, engine_.last_reason_);
+    EXPECT_NE(reason_on, last_reason());
 }
 
 TEST_F(PresenceEngineTest, HandlesZeroSigmaGracefully) {
     engine_.sigma_still_ = 0.0f;
+    engine_.update_energy_thresholds();
 
     // Should return z=0 without crashing
     EXPECT_FLOAT_EQ(engine_.calculate_z_score(100.0f), 0.0f);
     EXPECT_FLOAT_EQ(engine_.calculate_z_score(1000.0f), 0.0f);
 
     // Should not change state (z=0 is between k_off and k_on)
-    engine_.process_energy(1000.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
+    process_energy(1000.0f);
+    EXPECT_EQ(engine_.current_state_, IDLE);
 }
 
 TEST_F(PresenceEngineTest, HandlesNegativeEnergyValues) {
     // Negative energy should work (could happen with sensor noise)
-    engine_.process_energy(-40.0f);  // z = (-40-100)/20 = -7
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
+    process_energy(-40.0f);  // z = (-40-100)/20 = -7
+    EXPECT_EQ(engine_.current_state_, IDLE);
 
     // Should still be able to turn ON with high values (with debouncing)
-    engine_.process_energy(185.0f);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(185.0f);
+    advance_time(3000);
+    process_energy(185.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
 }
 
 TEST_F(PresenceEngineTest, HandlesVeryLargeEnergyValues) {
     // Very large energy should turn ON (with debouncing)
-    engine_.process_energy(10000.0f);  // z = (10000-100)/20 = 495
-    engine_.advance_time(3000);
-    engine_.process_energy(10000.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(10000.0f);  // z = (10000-100)/20 = 495
+    advance_time(3000);
+    process_energy(10000.0f);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
 
     // And back OFF with low values (with debouncing)
-    engine_.advance_time(30000);  // abs_clear_delay
-    engine_.process_energy(0.0f);  // z = (0-100)/20 = -5
-    engine_.advance_time(5000);  // off_debounce
-    engine_.process_energy(0.0f);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
+    advance_time(30000);  // abs_clear_delay
+    process_energy(0.0f);  // z = (0-100)/20 = -5
+    advance_time(5000);  // off_debounce
+    process_energy(0.0f);
+    EXPECT_EQ(engine_.current_state_, IDLE);
 }
 
 TEST_F(PresenceEngineTest, DistanceWindowBlocksFrames) {
-    engine_.d_min_cm_ = 50.0f;
-    engine_.d_max_cm_ = 200.0f;
+    engine_.update_d_min_cm(50.0f);
+    engine_.update_d_max_cm(200.0f);
 
     // High energy but frame rejected -> remains IDLE
-    engine_.process_energy(185.0f, false);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::IDLE);
+    process_energy(185.0f, false);
+    EXPECT_EQ(engine_.current_state_, IDLE);
 
     // Allow frame -> should debounce as normal
-    engine_.process_energy(185.0f, true);
-    engine_.advance_time(3000);
-    engine_.process_energy(185.0f, true);
-    EXPECT_EQ(engine_.current_state_, SimplePresenceEngine::PRESENT);
+    process_energy(185.0f, true);
+    advance_time(3000);
+    process_energy(185.0f, true);
+    EXPECT_EQ(engine_.current_state_, PRESENT);
 }
 
 TEST_F(PresenceEngineTest, CalibrationComputesMedianAndMad) {
-    engine_.start_calibration(2);  // 2 seconds
+    engine_.start_baseline_calibration(2);  // 2 seconds
 
-    engine_.process_energy(120.0f);  // Sample 1
-    engine_.process_energy(110.0f);  // Sample 2
-    engine_.advance_time(1000);
-    engine_.process_energy(130.0f);  // Sample 3
-    engine_.process_energy(800.0f);  // Outlier
+    process_energy(120.0f);  // Sample 1
+    process_energy(110.0f);  // Sample 2
+    advance_time(1000);
+    process_energy(130.0f);  // Sample 3
+    process_energy(800.0f);  // Outlier
 
     // Advance time to finish calibration
-    engine_.advance_time(2000);
-    engine_.process_energy(100.0f);  // Trigger finalize
+    advance_time(2000);
+    process_energy(100.0f);  // Trigger finalize
 
     // Median of [120,110,130,800] = (120+130)/2 = 125
     EXPECT_FLOAT_EQ(engine_.mu_still_, 125.0f);
@@ -457,6 +389,1045 @@ TEST_F(PresenceEngineTest, CalibrationComputesMedianAndMad) {
     EXPECT_NEAR(engine_.sigma_still_, 14.826f, 0.01f);
 }
 
+TEST_F(PresenceEngineTest, CalibrationSamplesOncePerFrame) {
+    esphome::sensor::Sensor gate_still[2];
+    engine_.set_gate_still_energy_sensor(1, &gate_still[0]);
+    engine_.set_gate_still_energy_sensor(2, &gate_still[1]);
+    engine_.set_gate_weight(1, 1.0f);
+    engine_.set_gate_weight(2, 1.0f);
+    engine_.update_d_max_cm(600.0f);  // Re-mask the gate weights
+
+    engine_.start_baseline_calibration(60);
+    for (int frame = 0; frame < 10; ++frame) {
+        gate_still[0].publish_state(20.0f);
+        gate_still[1].publish_state(8.0f);
+        process_energy(110.0f);
+        // ESPHome runs loop() several times between LD2410 frames
+        engine_.loop();
+        engine_.loop();
+        advance_time(100);
+    }
+
+    EXPECT_EQ(engine_.gate_still_histograms_[1].count(), 10);
+    EXPECT_EQ(engine_.gate_still_histograms_[2].count(), 10);
+    EXPECT_EQ(engine_.calibration_count_, 10u);
+}
+
+/**
+ * Feature tests against the real BedPresenceEngine, fed the way the LD2410 feeds it:
+ * one frame every 100ms with two loop() passes per frame. Each test configures the
+ * engine before calling engine_.setup().
+ */
+class EngineFrameTest : public ::testing::Test {
+protected:
+    class Engine : public esphome::bed_presence_engine::BedPresenceEngine {
+    public:
+        using BedPresenceEngine::calibrating_;
+        using BedPresenceEngine::current_state_;
+        using BedPresenceEngine::frame_log_;
+        using BedPresenceEngine::mu_still_;
+        using BedPresenceEngine::prefilter_;
+        using BedPresenceEngine::sigma_still_;
+    };
+
+    void SetUp() override {
+        esphome::set_millis(0);
+        engine_.set_energy_sensor(&energy_);
+    }
+
+    void feed_at(float distance, float energy, int frames) {
+        for (int i = 0; i < frames; ++i) {
+            distance_.publish_state(distance);
+            feed(energy, 1);
+        }
+    }
+
+    // Publish one LD2410 frame every 100ms and run loop() twice, as ESPHome does between frames
+    void feed(float energy, int frames) {
+        for (int i = 0; i < frames; ++i) {
+            esphome::advance_millis(100);
+            energy_.publish_state(energy);
+            engine_.loop();
+            engine_.loop();
+        }
+    }
+
+    esphome::sensor::Sensor energy_;
+    esphome::sensor::Sensor distance_;
+    Engine engine_;
+};
+
+TEST(GateEnergyTest, HistogramMatchesVectorMedianAndMad) {
+    EnergyHistogram histogram;
+    std::vector<float> samples = {3, 7, 7, 12, 5, 6, 9, 4, 100, 6};
+    for (float sample : samples) {
+        histogram.add(sample);
+    }
+
+    float median = reference_median(samples);
+    std::vector<float> deviations;
+    for (float sample : samples) {
+        deviations.push_back(std::fabs(sample - median));
+    }
+
+    EXPECT_EQ(histogram.count(), samples.size());
+    EXPECT_FLOAT_EQ(histogram.median(), median);  // 6.5
+    EXPECT_FLOAT_EQ(histogram.mad(histogram.median()), reference_median(deviations));
+}
+
+TEST(GateEnergyTest, HistogramClampsAndRoundsEnergies) {
+    EnergyHistogram histogram;
+    histogram.add(-5.0f);
+    histogram.add(4.6f);
+    histogram.add(250.0f);
+
+    EXPECT_EQ(histogram.count(), 3);
+    EXPECT_FLOAT_EQ(histogram.median(), 5.0f);
+    EXPECT_FLOAT_EQ(histogram.mad(5.0f), 5.0f);  // deviations [5, 0, 95]
+
+    histogram.clear();
+    EXPECT_EQ(histogram.count(), 0);
+    EXPECT_FLOAT_EQ(histogram.median(), 0.0f);
+}
+
+TEST(GateEnergyTest, WeightedZSkipsGatesOutsideWindow) {
+    float energies[GATE_COUNT] = {50, 26, 46, 0, 0, 0, 0, 0, 0};
+    GateBaseline baselines[GATE_COUNT];
+    for (auto &baseline : baselines) {
+        baseline = {6.0f, 2.0f};
+    }
+    float weights[GATE_COUNT] = {0.0f, 1.0f, 3.0f};  // Gate 0 masked out
+
+    // z1 = 10, z2 = 20 -> (1*10 + 3*20) / 4 = 17.5
+    EXPECT_FLOAT_EQ(weighted_gate_z(energies, baselines, weights, GATE_COUNT), 17.5f);
+
+    float no_weights[GATE_COUNT] = {};
+    EXPECT_FLOAT_EQ(weighted_gate_z(energies, baselines, no_weights, GATE_COUNT), 0.0f);
+}
+
+TEST(GateEnergyTest, GateWindowOverlap) {
+    // Window [100cm, 200cm] covers gate 1 [75,150) and gate 2 [150,225)
+    EXPECT_FALSE(gate_in_window(0, 100.0f, 200.0f));
+    EXPECT_TRUE(gate_in_window(1, 100.0f, 200.0f));
+    EXPECT_TRUE(gate_in_window(2, 100.0f, 200.0f));
+    EXPECT_FALSE(gate_in_window(3, 100.0f, 200.0f));
+}
+
+TEST(PrefilterTest, NonePassesThrough) {
+    Prefilter filter;
+    filter.set_mode(PREFILTER_NONE);
+    EXPECT_FLOAT_EQ(filter.update(185.0f), 185.0f);
+    EXPECT_FLOAT_EQ(filter.update(10.0f), 10.0f);
+}
+
+TEST(PrefilterTest, MedianRejectsSingleFrameSpike) {
+    Prefilter filter;
+    filter.set_mode(PREFILTER_MEDIAN);
+    filter.set_median_window(5);
+
+    for (int i = 0; i < 5; ++i) {
+        filter.update(100.0f);
+    }
+    // One noisy frame far above k_on does not move the output
+    EXPECT_FLOAT_EQ(filter.update(800.0f), 100.0f);
+    EXPECT_FLOAT_EQ(filter.update(100.0f), 100.0f);
+
+    // A sustained level shift passes once it holds the majority of the window
+    filter.update(185.0f);
+    filter.update(185.0f);
+    EXPECT_FLOAT_EQ(filter.update(185.0f), 185.0f);
+}
+
+TEST(PrefilterTest, MedianEvictsOldestFrame) {
+    Prefilter filter;
+    filter.set_mode(PREFILTER_MEDIAN);
+    filter.set_median_window(3);
+
+    EXPECT_FLOAT_EQ(filter.update(1.0f), 1.0f);
+    EXPECT_FLOAT_EQ(filter.update(3.0f), 2.0f);   // Partial window averages the middle pair
+    EXPECT_FLOAT_EQ(filter.update(2.0f), 2.0f);   // [1,3,2]
+    EXPECT_FLOAT_EQ(filter.update(9.0f), 3.0f);   // [3,2,9]
+    EXPECT_FLOAT_EQ(filter.update(9.0f), 9.0f);   // [2,9,9]
+    EXPECT_FLOAT_EQ(filter.update(0.0f), 9.0f);   // [9,9,0]
+}
+
+TEST(PrefilterTest, EwmaSmoothsTowardInput) {
+    Prefilter filter;
+    filter.set_mode(PREFILTER_EWMA);
+    filter.set_ewma_alpha(0.5f);
+
+    EXPECT_FLOAT_EQ(filter.update(100.0f), 100.0f);  // Primed with first frame
+    EXPECT_FLOAT_EQ(filter.update(200.0f), 150.0f);
+    EXPECT_FLOAT_EQ(filter.update(200.0f), 175.0f);
+}
+
+TEST(PrefilterTest, KalmanConvergesAndDampsSpikes) {
+    Prefilter filter;
+    filter.set_mode(PREFILTER_KALMAN);
+    filter.set_kalman_noise(0.01f, 1.0f);
+
+    filter.update(100.0f);
+    for (int i = 0; i < 50; ++i) {
+        filter.update(100.0f);
+    }
+    float spiked = filter.update(800.0f);
+    EXPECT_LT(spiked, 200.0f);  // Steady-state gain is small
+    EXPECT_GT(spiked, 100.0f);
+
+    for (int i = 0; i < 500; ++i) {
+        filter.update(185.0f);
+    }
+    EXPECT_NEAR(filter.update(185.0f), 185.0f, 0.5f);
+}
+
+TEST(CusumTest, NoiseBelowReferenceNeverAccumulates) {
+    TwoSidedCusum cusum;
+    float noise[] = {0.5f, -1.0f, 2.0f, 8.5f, -0.5f, 1.0f};
+    for (float z : noise) {
+        EXPECT_FLOAT_EQ(cusum.update_rise(z, 9.0f), 0.0f);
+    }
+}
+
+TEST(CusumTest, RiseStatisticAccumulatesLevelShift) {
+    TwoSidedCusum cusum;
+    // Occupied bed sits around z=16 -> +7 per frame against k_on=9
+    EXPECT_FLOAT_EQ(cusum.update_rise(16.0f, 9.0f), 7.0f);
+    EXPECT_FLOAT_EQ(cusum.update_rise(16.0f, 9.0f), 14.0f);
+    EXPECT_FLOAT_EQ(cusum.update_rise(16.0f, 9.0f), 21.0f);  // Crosses h=20 on the third frame
+
+    // A dip below the reference drains the statistic but clamps at zero
+    EXPECT_FLOAT_EQ(cusum.update_rise(0.0f, 9.0f), 12.0f);
+    EXPECT_FLOAT_EQ(cusum.update_rise(0.0f, 9.0f), 3.0f);
+    EXPECT_FLOAT_EQ(cusum.update_rise(0.0f, 9.0f), 0.0f);
+}
+
+TEST(CusumTest, FallStatisticTracksDropBelowReference) {
+    TwoSidedCusum cusum;
+    EXPECT_FLOAT_EQ(cusum.update_fall(16.0f, 4.0f), 0.0f);  // Still occupied
+    EXPECT_FLOAT_EQ(cusum.update_fall(0.0f, 4.0f), 4.0f);
+    EXPECT_FLOAT_EQ(cusum.update_fall(-1.0f, 4.0f), 9.0f);
+    EXPECT_FLOAT_EQ(cusum.get_rise(), 0.0f);
+
+    cusum.reset();
+    EXPECT_FLOAT_EQ(cusum.get_fall(), 0.0f);
+}
+
+TEST(EnergyThresholdsTest, MatchesZScoreComparisonsOnEnergyGrid) {
+    const float baselines[][2] = {{6.7f, 3.5f}, {8.0f, 1.4826f}, {40.0f, 0.05f}, {0.0f, 7.0f}};
+    const float ks[][2] = {{9.0f, 4.0f}, {2.0f, 1.5f}, {0.0f, -1.0f}, {-2.5f, 3.0f}};
+    for (const auto &b : baselines) {
+        for (const auto &k : ks) {
+            EnergyThresholds t = compute_energy_thresholds(b[0], b[1], k[0], k[1]);
+            for (int e = -10; e <= 110; ++e) {
+                float energy = static_cast<float>(e);
+                float z = (energy - b[0]) / b[1];
+                int32_t q = energy_to_q8(energy);
+                EXPECT_EQ(q >= t.on, z >= k[0]) << "e=" << e << " mu=" << b[0] << " sigma=" << b[1];
+                EXPECT_EQ(q > t.on_strict, z > k[0]) << "e=" << e << " mu=" << b[0] << " sigma=" << b[1];
+                EXPECT_EQ(q < t.off, z < k[1]) << "e=" << e << " mu=" << b[0] << " sigma=" << b[1];
+            }
+        }
+    }
+}
+
+TEST(EnergyThresholdsTest, DegenerateSigmaBehavesLikeZeroZ) {
+    // z is pinned at 0, so only the sign of k decides the comparisons
+    EnergyThresholds t = compute_energy_thresholds(6.7f, 0.0f, 9.0f, 4.0f);
+    EXPECT_FALSE(energy_to_q8(1000.0f) >= t.on);
+    EXPECT_TRUE(energy_to_q8(1000.0f) < t.off);
+
+    t = compute_energy_thresholds(6.7f, 0.0f, 0.0f, 0.0f);
+    EXPECT_TRUE(energy_to_q8(-1000.0f) >= t.on);
+    EXPECT_FALSE(energy_to_q8(-1000.0f) > t.on_strict);
+    EXPECT_FALSE(energy_to_q8(-1000.0f) < t.off);
+}
+
+TEST(EnergyThresholdsTest, SaturatesOutOfRangeEnergies) {
+    EnergyThresholds t = compute_energy_thresholds(6.7f, 3.5f, 9.0f, 4.0f);
+    EXPECT_TRUE(energy_to_q8(1e12f) >= t.on);
+    EXPECT_TRUE(energy_to_q8(-1e12f) < t.off);
+}
+
+TEST(ZoneWindowTest, RoutesDistanceToOverlappingZones) {
+    // Left side, right side, and a whole-bed zone overlapping both
+    const float d_min[] = {50.0f, 150.0f, 50.0f};
+    const float d_max[] = {150.0f, 250.0f, 250.0f};
+    ZoneWindowTable table;
+    table.build(d_min, d_max, 3);
+
+    EXPECT_EQ(table.lookup(10.0f), 0u);
+    EXPECT_EQ(table.lookup(50.0f), 0b101u);   // Window edges are inclusive
+    EXPECT_EQ(table.lookup(100.0f), 0b101u);
+    EXPECT_EQ(table.lookup(150.0f), 0b111u);
+    EXPECT_EQ(table.lookup(200.0f), 0b110u);
+    EXPECT_EQ(table.lookup(250.0f), 0b110u);
+    EXPECT_EQ(table.lookup(250.5f), 0u);
+}
+
+TEST(ZoneWindowTest, MatchesPerZoneWindowChecks) {
+    const float d_min[] = {0.0f, 75.0f, 120.0f, 120.0f, 300.0f};
+    const float d_max[] = {90.0f, 200.0f, 180.0f, 400.0f, 600.0f};
+    ZoneWindowTable table;
+    table.build(d_min, d_max, 5);
+    for (int d = -10; d <= 650; ++d) {
+        float distance = d;
+        uint8_t expected = 0;
+        for (uint8_t zone = 0; zone < 5; ++zone) {
+            if (distance >= d_min[zone] && distance <= d_max[zone]) {
+                expected |= 1u << zone;
+            }
+        }
+        EXPECT_EQ(table.lookup(distance), expected) << "distance=" << d;
+    }
+}
+
+// Two zones splitting the bed at 150cm, sharing the engine's distance sensor
+class ZoneEngineTest : public EngineFrameTest {
+protected:
+    void SetUp() override {
+        EngineFrameTest::SetUp();
+        left_.set_d_min_cm(0.0f);
+        left_.set_d_max_cm(150.0f);
+        right_.set_d_min_cm(150.5f);
+        right_.set_d_max_cm(300.0f);
+        engine_.set_distance_sensor(&distance_);
+        engine_.add_zone(&left_);
+        engine_.add_zone(&right_);
+        engine_.setup();
+    }
+
+    esphome::bed_presence_engine::BedZone left_;
+    esphome::bed_presence_engine::BedZone right_;
+};
+
+TEST_F(ZoneEngineTest, ZonesTrackTheirOwnDistanceBand) {
+    feed_at(100.0f, 64.0f, 50);  // Left sleeper
+    EXPECT_EQ(left_.get_state(), esphome::bed_presence_engine::PRESENT);
+    EXPECT_EQ(right_.get_state(), esphome::bed_presence_engine::IDLE);
+    EXPECT_TRUE(engine_.state);  // Whole-bed sensor still sees every frame in its window
+
+    feed_at(220.0f, 64.0f, 50);  // Right sleeper; left zone keeps its last state
+    EXPECT_EQ(right_.get_state(), esphome::bed_presence_engine::PRESENT);
+    EXPECT_EQ(left_.get_state(), esphome::bed_presence_engine::PRESENT);
+
+    feed_at(100.0f, 6.0f, 400);  // Left side empties
+    EXPECT_EQ(left_.get_state(), esphome::bed_presence_engine::IDLE);
+    EXPECT_EQ(right_.get_state(), esphome::bed_presence_engine::PRESENT);
+}
+
+TEST_F(ZoneEngineTest, ZonesCalibrateFromTheirOwnWindow) {
+    engine_.start_baseline_calibration(60);
+    feed_at(100.0f, 64.0f, 50);
+    feed_at(220.0f, 9.0f, 50);
+    engine_.stop_baseline_calibration();
+
+    // With the default baseline these would flip both zones the other way
+    // (left turned ON while calibrating, so it clears after abs_clear + off debounce)
+    feed_at(100.0f, 64.0f, 400);
+    EXPECT_EQ(left_.get_state(), esphome::bed_presence_engine::IDLE);
+    feed_at(220.0f, 12.0f, 50);  // σ floors at 0.05, so z=60
+    EXPECT_EQ(right_.get_state(), esphome::bed_presence_engine::PRESENT);
+}
+
+TEST(FrameLogTest, FreezeLaysOutRecordsOldestFirst) {
+    FrameLog log;
+    ASSERT_TRUE(log.allocate(4));
+    for (int i = 0; i < 6; ++i) {
+        log.record(1000 + i * 100, 10.0f + i, 2.4f, 150.0f, 0, 0);
+    }
+    log.freeze();
+
+    FrameLogHeader header;
+    std::memcpy(&header, log.data(), sizeof(header));
+    EXPECT_EQ(std::string(header.magic, 4), "BPFL");
+    EXPECT_EQ(header.count, 4u);
+    EXPECT_EQ(header.last_timestamp_ms, 1500u);
+    EXPECT_EQ(header.trigger_index, UINT16_MAX);
+    EXPECT_EQ(log.size_bytes(), sizeof(FrameLogHeader) + 4 * sizeof(FrameRecord));
+
+    const FrameRecord *records = log.records();
+    for (int i = 0; i < 4; ++i) {
+        EXPECT_EQ(records[i].still_energy, 12 + i);
+        EXPECT_EQ(records[i].move_energy, 2);
+        EXPECT_EQ(records[i].distance_cm, 150u);
+        EXPECT_EQ(records[i].dt_ms, 100u);
+    }
+
+    // Frozen logs ignore new frames until resumed
+    log.record(1600, 99.0f, 0.0f, NAN, 0, 0);
+    EXPECT_EQ(log.records()[3].still_energy, 15);
+    log.resume();
+    log.record(1600, 99.0f, 0.0f, NAN, 0, 0);
+    log.freeze();
+    EXPECT_EQ(log.records()[3].still_energy, 99);
+    EXPECT_EQ(log.records()[3].distance_cm, esphome::bed_presence_engine::FRAME_DISTANCE_NONE);
+}
+
+TEST(FrameLogTest, FreezesAfterPostTransitionFrames) {
+    FrameLog log;
+    ASSERT_TRUE(log.allocate(8));
+    log.set_freeze_on_transition(true, 2);
+    for (int i = 0; i < 10; ++i) {
+        uint8_t flags = i == 6 ? esphome::bed_presence_engine::FRAME_FLAG_TRANSITION : 0;
+        log.record(i * 100, static_cast<float>(i), 0.0f, 100.0f, flags, 0);
+        EXPECT_EQ(log.is_frozen(), i >= 8) << "frame " << i;
+    }
+
+    FrameLogHeader header;
+    std::memcpy(&header, log.data(), sizeof(header));
+    EXPECT_EQ(header.count, 8u);
+    ASSERT_EQ(header.trigger_index, 5u);  // Frames 1..8 kept, transition on frame 6
+    EXPECT_EQ(log.records()[header.trigger_index].still_energy, 6);
+}
+
+TEST(FrameLogTest, ResumeWaitsForDownloadInFlight) {
+    FrameLog log;
+    ASSERT_TRUE(log.allocate(4));
+    log.set_auto_resume(false, 0);
+    for (int i = 0; i < 4; ++i) {
+        log.record(i * 100, 10.0f + i, 0.0f, 100.0f, 0, 0);
+    }
+    EXPECT_FALSE(log.begin_download());  // Still recording
+    log.freeze();
+    ASSERT_TRUE(log.begin_download());
+    EXPECT_FALSE(log.begin_download());  // One download at a time
+
+    // The response still reads the buffer: the resume is deferred and frames are dropped
+    EXPECT_FALSE(log.resume());
+    log.record(400, 99.0f, 0.0f, 100.0f, 0, 0);
+    EXPECT_TRUE(log.is_sending());
+    EXPECT_EQ(log.records()[3].still_energy, 13);
+
+    log.end_download();
+    log.record(500, 99.0f, 0.0f, 100.0f, 0, 0);
+    EXPECT_FALSE(log.is_frozen());
+    log.freeze();
+    EXPECT_EQ(log.records()[3].still_energy, 99);
+}
+
+TEST(FrameLogTest, AutoResumesAfterDumpOrHoldOff) {
+    FrameLog log;
+    ASSERT_TRUE(log.allocate(8));
+    log.set_freeze_on_transition(true, 1);
+    log.set_auto_resume(true, 1000);
+    uint8_t transition = esphome::bed_presence_engine::FRAME_FLAG_TRANSITION;
+
+    log.record(0, 10.0f, 0.0f, 100.0f, transition, 0);
+    log.record(100, 10.0f, 0.0f, 100.0f, 0, 0);
+    ASSERT_TRUE(log.is_frozen());
+    log.record(1000, 10.0f, 0.0f, 100.0f, 0, 0);
+    EXPECT_TRUE(log.is_frozen());
+    log.record(1100, 10.0f, 0.0f, 100.0f, 0, 0);  // Hold-off elapsed, this frame is recorded
+    EXPECT_FALSE(log.is_frozen());
+
+    log.record(1200, 10.0f, 0.0f, 100.0f, transition, 0);
+    log.record(1300, 10.0f, 0.0f, 100.0f, 0, 0);
+    ASSERT_TRUE(log.begin_download());
+    log.end_download();
+    log.record(1400, 10.0f, 0.0f, 100.0f, 0, 0);  // Resumed after the dump
+    EXPECT_FALSE(log.is_frozen());
+
+    // On-demand freezes are kept until downloaded or resumed
+    log.freeze();
+    log.record(9000, 10.0f, 0.0f, 100.0f, 0, 0);
+    EXPECT_TRUE(log.is_frozen());
+}
+
+// Frame log fed by the engine: 600 frames, frozen 10 frames after a transition
+class FrameLogEngineTest : public EngineFrameTest {
+protected:
+    void SetUp() override {
+        EngineFrameTest::SetUp();
+        engine_.set_frame_log_capacity(600);
+        engine_.set_frame_log_freeze_on_transition(true, 10);
+        engine_.setup();
+    }
+
+    FrameLogHeader header() const {
+        FrameLogHeader header;
+        std::memcpy(&header, engine_.frame_log_.data(), sizeof(header));
+        return header;
+    }
+};
+
+TEST_F(FrameLogEngineTest, CapturesTransition) {
+    feed(6.0f, 50);
+    feed(64.0f, 50);
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::PRESENT);
+
+    ASSERT_TRUE(engine_.frame_log_.is_frozen());
+    FrameLogHeader frozen = header();
+    ASSERT_NE(frozen.trigger_index, UINT16_MAX);
+    const FrameRecord &trigger = engine_.frame_log_.records()[frozen.trigger_index];
+    EXPECT_EQ(trigger.flags & esphome::bed_presence_engine::FRAME_STATE_MASK, esphome::bed_presence_engine::PRESENT);
+    EXPECT_EQ(trigger.still_energy, 64);
+    EXPECT_EQ(frozen.count, frozen.trigger_index + 11u);
+}
+
+TEST_F(FrameLogEngineTest, CapturesEveryTransition) {
+    engine_.set_frame_log_auto_resume(true, 60000);
+    feed(6.0f, 50);
+    feed(64.0f, 50);
+    ASSERT_TRUE(engine_.frame_log_.is_frozen());
+
+    // A resume requested mid-download waits for the response to finish
+    ASSERT_TRUE(engine_.frame_log_.begin_download());
+    engine_.resume_frame_log();
+    feed(64.0f, 10);
+    EXPECT_TRUE(engine_.frame_log_.is_frozen());
+    engine_.frame_log_.end_download();
+    feed(64.0f, 1);
+    EXPECT_FALSE(engine_.frame_log_.is_frozen());
+
+    feed(6.0f, 400);  // OFF after abs_clear + off debounce, then frozen again
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::IDLE);
+    ASSERT_TRUE(engine_.frame_log_.is_frozen());
+    FrameLogHeader frozen = header();
+    ASSERT_NE(frozen.trigger_index, UINT16_MAX);
+    const FrameRecord &trigger = engine_.frame_log_.records()[frozen.trigger_index];
+    EXPECT_EQ(trigger.flags & esphome::bed_presence_engine::FRAME_STATE_MASK, esphome::bed_presence_engine::IDLE);
+
+    feed(6.0f, 600);  // Nobody downloaded it: recording resumes after the hold-off
+    EXPECT_FALSE(engine_.frame_log_.is_frozen());
+}
+
+// Socket stand-in: accepts up to `budget` bytes per call, then reports would-block
+struct FakeStreamSocket {
+    std::vector<uint8_t> received;
+    long budget{1000};
+    bool broken{false};
+
+    long operator()(const uint8_t *data, size_t len) {
+        if (broken) {
+            return -1;
+        }
+        long written = std::min<long>(budget, static_cast<long>(len));
+        received.insert(received.end(), data, data + written);
+        budget -= written;
+        return written;
+    }
+};
+
+TEST(FrameStreamTest, SlowClientDropsWholeFramesAndKeepsFraming) {
+    StreamClientBuffer buffer;
+    FakeStreamSocket socket;
+    StreamFrame frame{1000, 0, 150, 20, 3, 2, 0};
+
+    EXPECT_EQ(buffer.offer(frame, socket), esphome::bed_presence_engine::STREAM_SENT);
+
+    socket.budget = 5;  // Send buffer nearly full: frame 1 goes out partially
+    frame.sequence = 1;
+    EXPECT_EQ(buffer.offer(frame, socket), esphome::bed_presence_engine::STREAM_SENT);
+    socket.budget = 0;
+    frame.sequence = 2;
+    EXPECT_EQ(buffer.offer(frame, socket), esphome::bed_presence_engine::STREAM_DROPPED);
+
+    socket.budget = 1000;  // Remainder of frame 1 is flushed before frame 3
+    frame.sequence = 3;
+    EXPECT_EQ(buffer.offer(frame, socket), esphome::bed_presence_engine::STREAM_SENT);
+
+    ASSERT_EQ(socket.received.size(), 3 * sizeof(StreamFrame));
+    const uint16_t expected[] = {0, 1, 3};
+    for (int i = 0; i < 3; ++i) {
+        StreamFrame decoded;
+        std::memcpy(&decoded, socket.received.data() + i * sizeof(StreamFrame), sizeof(decoded));
+        EXPECT_EQ(decoded.sequence, expected[i]);
+        EXPECT_EQ(decoded.distance_cm, 150u);
+    }
+
+    socket.broken = true;
+    EXPECT_EQ(buffer.offer(frame, socket), esphome::bed_presence_engine::STREAM_CLOSED);
+}
+
+TEST(PerfCountersTest, WindowRatesAndLoopTimes) {
+    PerfCounters counters;
+    counters.start_window(10000);
+    counters.frames = 300;
+    counters.transitions = 2;
+    counters.record_loop(40);
+    counters.record_loop(100);
+    counters.record_loop(10);
+
+    EXPECT_FLOAT_EQ(counters.frame_rate(40000), 10.0f);
+    EXPECT_FLOAT_EQ(counters.transitions_per_hour(40000), 240.0f);
+    EXPECT_FLOAT_EQ(counters.loop_time_avg_us(), 50.0f);
+    EXPECT_EQ(counters.loop_time_max_us, 100u);
+
+    counters.debounce_aborts = 3;
+    counters.start_window(40000);
+    EXPECT_EQ(counters.loop_time_max_us, 0u);
+    EXPECT_FLOAT_EQ(counters.frame_rate(40000), 0.0f);
+    EXPECT_EQ(counters.debounce_aborts, 3u);  // Totals survive the window reset
+}
+
+// Performance counters fed by the engine
+class DiagnosticsEngineTest : public EngineFrameTest {};
+
+TEST_F(DiagnosticsEngineTest, PublishedOncePerInterval) {
+    esphome::sensor::Sensor frame_rate;
+    esphome::sensor::Sensor out_of_window;
+    esphome::sensor::Sensor transitions;
+    esphome::sensor::Sensor aborts;
+    engine_.set_distance_sensor(&distance_);
+    engine_.set_d_max_cm(200.0f);
+    engine_.set_diagnostics_interval_ms(60000);
+    engine_.set_frame_rate_sensor(&frame_rate);
+    engine_.set_frames_out_of_window_sensor(&out_of_window);
+    engine_.set_transitions_per_hour_sensor(&transitions);
+    engine_.set_debounce_aborts_sensor(&aborts);
+    engine_.setup();
+
+    feed_at(100.0f, 64.0f, 10);   // 1s spike: debounce starts, then aborts
+    feed_at(100.0f, 6.0f, 40);
+    feed_at(400.0f, 6.0f, 100);   // Outside the window
+    feed_at(100.0f, 64.0f, 50);   // ON
+    EXPECT_FALSE(frame_rate.has_state());
+    feed_at(100.0f, 64.0f, 400);  // 60s elapsed
+
+    ASSERT_TRUE(frame_rate.has_state());
+    EXPECT_FLOAT_EQ(frame_rate.state, 10.0f);
+    EXPECT_FLOAT_EQ(out_of_window.state, 100.0f);
+    EXPECT_FLOAT_EQ(aborts.state, 1.0f);
+    EXPECT_FLOAT_EQ(transitions.state, 60.0f);  // 1 transition in 1 minute
+}
+
+TEST(LatencyHistogramTest, BucketsAndInterpolatedPercentiles) {
+    LatencyHistogram histogram;
+    EXPECT_FLOAT_EQ(histogram.percentile_ms(0.5f), 0.0f);
+
+    for (int i = 0; i < 8; ++i) {
+        histogram.record(2500);  // (2000, 3000]
+    }
+    histogram.record(3000);      // Upper edge is inclusive
+    histogram.record(200000);    // Overflow bucket
+    histogram.record_abort();
+
+    EXPECT_EQ(histogram.count(), 10u);
+    EXPECT_EQ(histogram.bucket(4), 9u);
+    EXPECT_EQ(histogram.bucket(esphome::bed_presence_engine::LATENCY_BUCKET_COUNT - 1), 1u);
+    EXPECT_EQ(histogram.max_ms(), 200000u);
+    EXPECT_EQ(histogram.aborts(), 1u);
+
+    EXPECT_FLOAT_EQ(histogram.percentile_ms(0.45f), 2500.0f);  // Halfway through the 2-3s bucket
+    EXPECT_FLOAT_EQ(histogram.percentile_ms(0.9f), 3000.0f);
+    EXPECT_GT(histogram.percentile_ms(0.95f), 120000.0f);
+    EXPECT_LE(histogram.percentile_ms(1.0f), 200000.0f);
+
+    char summary[64];
+    histogram.format_summary(summary, sizeof(summary));
+    EXPECT_STREQ(summary, "n=10 p50=2.6s p90=3.0s max=200.0s aborts=1");
+
+    histogram.clear();
+    EXPECT_EQ(histogram.count(), 0u);
+    EXPECT_EQ(histogram.bucket(4), 0u);
+}
+
+// Detection latency histograms fed by the engine's threshold detector
+class DetectionLatencyEngineTest : public EngineFrameTest {};
+
+TEST_F(DetectionLatencyEngineTest, IncludesDebounceAndAbsClearHold) {
+    esphome::sensor::Sensor on_p90;
+    esphome::sensor::Sensor off_p90;
+    engine_.set_on_latency_p90_sensor(&on_p90);
+    engine_.set_off_latency_p90_sensor(&off_p90);
+    engine_.setup();
+
+    feed(64.0f, 10);   // 1s spike: ON debounce aborts
+    feed(6.0f, 10);
+    feed(64.0f, 40);   // First frame over k_on at t=2100ms, ON at t=5100ms
+    feed(6.0f, 400);   // Last high frame at t=6000ms; OFF once abs_clear (30s) + off debounce (5s) pass
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::IDLE);
+
+    const LatencyHistogram &on = engine_.get_on_latency();
+    EXPECT_EQ(on.count(), 1u);
+    EXPECT_EQ(on.aborts(), 1u);
+    EXPECT_EQ(on.max_ms(), 3000u);
+
+    // First frame under k_off at t=6100ms; DEBOUNCING_OFF at t=36000ms, OFF at t=41000ms
+    const LatencyHistogram &off = engine_.get_off_latency();
+    EXPECT_EQ(off.count(), 1u);
+    EXPECT_EQ(off.aborts(), 0u);
+    EXPECT_EQ(off.max_ms(), 34900u);
+
+    engine_.log_latency_histograms();
+    ASSERT_TRUE(on_p90.has_state());
+    EXPECT_GT(on_p90.state, 2.0f);
+    EXPECT_LE(on_p90.state, 3.0f);
+    EXPECT_GT(off_p90.state, 30.0f);
+    EXPECT_LE(off_p90.state, 34.9f);
+
+    engine_.reset_latency_histograms();
+    EXPECT_EQ(engine_.get_on_latency().count(), 0u);
+}
+
+TEST(OccupancySummaryTest, AggregatesStretchesAbsencesAndRestlessness) {
+    OccupancySummary summary;
+    summary.start(0, false);
+    summary.add_moving_energy(500, 90.0f);    // Empty bed: not restlessness
+    summary.update(1000, true);
+    summary.add_moving_energy(2000, 60.0f);   // Event 1
+    summary.add_moving_energy(2500, 70.0f);   // Same roll-over
+    summary.add_moving_energy(3000, 20.0f);   // Below threshold
+    summary.add_moving_energy(40000, 60.0f);  // Event 2, after the refractory gap
+    summary.update(3600000, false);
+    summary.update(3660000, true);            // 1 minute absence
+
+    OccupancyPeriod period = summary.close(7200000);
+    EXPECT_EQ(period.entries, 2u);
+    EXPECT_EQ(period.exits, 1u);
+    EXPECT_EQ(period.occupied_ms, 3599000u + 3540000u);  // Open stretch is split at the rollover
+    EXPECT_EQ(period.longest_occupied_ms, 3599000u);
+    EXPECT_EQ(period.longest_absence_ms, 60000u);
+    EXPECT_EQ(period.restless_events, 2u);
+
+    // The next period carries on with the bed still occupied
+    EXPECT_EQ(summary.current().entries, 0u);
+    summary.update(7300000, false);
+    period = summary.close(7400000);
+    EXPECT_EQ(period.exits, 1u);
+    EXPECT_EQ(period.occupied_ms, 100000u);
+    EXPECT_EQ(period.longest_absence_ms, 0u);  // Still out of bed at the rollover
+}
+
+// Occupancy summary fed by the engine's occupancy output and moving energy
+class OccupancySummaryEngineTest : public EngineFrameTest {};
+
+TEST_F(OccupancySummaryEngineTest, PublishedOncePerPeriod) {
+    esphome::sensor::Sensor moving;
+    esphome::sensor::Sensor time_in_bed;
+    esphome::sensor::Sensor entries;
+    esphome::sensor::Sensor exits;
+    esphome::sensor::Sensor restless;
+    engine_.set_moving_energy_sensor(&moving);
+    engine_.set_summary_period_ms(600000);
+    engine_.set_time_in_bed_sensor(&time_in_bed);
+    engine_.set_entries_sensor(&entries);
+    engine_.set_exits_sensor(&exits);
+    engine_.set_restless_events_sensor(&restless);
+    engine_.setup();
+
+    moving.publish_state(80.0f);
+    feed(64.0f, 100);   // ON at t=3100ms
+    moving.publish_state(0.0f);
+    feed(6.0f, 400);    // Last high frame at t=10000ms, OFF at t=45000ms
+    EXPECT_FALSE(time_in_bed.has_state());
+    feed(6.0f, 5500);   // 10 minute period ends
+
+    ASSERT_TRUE(time_in_bed.has_state());
+    EXPECT_NEAR(time_in_bed.state, (45000 - 3100) / 3600000.0f, 1e-6f);
+    EXPECT_FLOAT_EQ(entries.state, 1.0f);
+    EXPECT_FLOAT_EQ(exits.state, 1.0f);
+    EXPECT_FLOAT_EQ(restless.state, 1.0f);
+}
+
+TEST(EnergyTelemetryTest, IntervalAggregatesAndDeltaHeartbeatFilter) {
+    using esphome::bed_presence_engine::TELEMETRY_MAX;
+    using esphome::bed_presence_engine::TELEMETRY_MEAN;
+    using esphome::bed_presence_engine::TELEMETRY_MIN;
+    using esphome::bed_presence_engine::TELEMETRY_P95;
+
+    EnergyTelemetry telemetry;
+    EXPECT_TRUE(std::isnan(telemetry.stat(TELEMETRY_MEAN)));
+    for (int i = 1; i <= 100; ++i) {
+        telemetry.add(static_cast<float>(i));
+    }
+    EXPECT_FLOAT_EQ(telemetry.stat(TELEMETRY_MIN), 1.0f);
+    EXPECT_FLOAT_EQ(telemetry.stat(TELEMETRY_MAX), 100.0f);
+    EXPECT_FLOAT_EQ(telemetry.stat(TELEMETRY_MEAN), 50.5f);
+    EXPECT_FLOAT_EQ(telemetry.stat(TELEMETRY_P95), 95.0f);
+    telemetry.clear();
+    EXPECT_EQ(telemetry.count(), 0u);
+
+    DeltaHeartbeatFilter filter;
+    EXPECT_TRUE(filter.should_publish(10.0f, 0, 1.0f, 900000));       // First value
+    EXPECT_FALSE(filter.should_publish(10.5f, 60000, 1.0f, 900000));  // Within delta
+    EXPECT_TRUE(filter.should_publish(11.0f, 120000, 1.0f, 900000));   // Moved by delta
+    EXPECT_FALSE(filter.should_publish(11.0f, 1000000, 1.0f, 900000));
+    EXPECT_TRUE(filter.should_publish(11.0f, 1020000, 1.0f, 900000));  // Heartbeat
+    EXPECT_FALSE(filter.should_publish(11.0f, 9000000, 1.0f, 0));      // Heartbeat disabled
+}
+
+// Summarized telemetry fed by the engine's raw still energy
+class TelemetryEngineTest : public EngineFrameTest {};
+
+TEST_F(TelemetryEngineTest, PublishesFilteredIntervalAggregates) {
+    esphome::sensor::Sensor mean;
+    esphome::sensor::Sensor p95;
+    esphome::sensor::Sensor transition_z;
+    int mean_publishes = 0;
+    mean.add_on_state_callback([&mean_publishes](float) { mean_publishes++; });
+    engine_.set_telemetry_interval_ms(60000);
+    engine_.set_telemetry_filter(1.0f, 600000);
+    engine_.set_telemetry_sensor(esphome::bed_presence_engine::TELEMETRY_MEAN, &mean);
+    engine_.set_telemetry_sensor(esphome::bed_presence_engine::TELEMETRY_P95, &p95);
+    engine_.set_transition_z_sensor(&transition_z);
+    engine_.setup();
+
+    feed(6.0f, 600);
+    EXPECT_EQ(mean_publishes, 1);
+    EXPECT_FLOAT_EQ(mean.state, 6.0f);
+    feed(6.4f, 600 * 5);  // Within delta: suppressed until the 10 minute heartbeat
+    EXPECT_EQ(mean_publishes, 1);
+    feed(6.4f, 600 * 5);
+    EXPECT_EQ(mean_publishes, 2);
+    EXPECT_FALSE(transition_z.has_state());
+
+    feed(64.0f, 600);  // ON: z at the transition, and the mean jumps past delta
+    EXPECT_EQ(mean_publishes, 3);
+    EXPECT_FLOAT_EQ(p95.state, 64.0f);
+    ASSERT_TRUE(transition_z.has_state());
+    EXPECT_NEAR(transition_z.state, (64.0f - 6.7f) / 3.5f, 1e-4f);
+}
+
+TEST(CalibrationConvergenceTest, ConvergesAfterStableRunPastMinimum) {
+    CalibrationConvergence convergence;
+    convergence.configure(50, 30, 1.0f);
+    convergence.start();
+    for (int i = 0; i < 49; ++i) {
+        EXPECT_FALSE(convergence.add(i % 2 == 0 ? 5.0f : 7.0f));
+    }
+    EXPECT_EQ(convergence.remaining_samples(), 1u);  // Stable since sample 10, only the minimum is missing
+    EXPECT_TRUE(convergence.add(7.0f));
+    EXPECT_FLOAT_EQ(convergence.estimate().mu, 6.0f);
+    EXPECT_FLOAT_EQ(convergence.estimate().sigma, 1.4826f);
+}
+
+TEST(CalibrationConvergenceTest, ShiftRestartsStableRun) {
+    CalibrationConvergence convergence;
+    convergence.configure(50, 30, 1.0f);
+    convergence.start();
+    for (int i = 0; i < 20; ++i) {
+        EXPECT_FALSE(convergence.add(6.0f));
+    }
+    // Someone sits on the bed: the median moves at samples 40 and 50, so the run restarts at 50
+    for (int i = 20; i < 79; ++i) {
+        EXPECT_FALSE(convergence.add(30.0f)) << "sample " << i + 1;
+    }
+    EXPECT_TRUE(convergence.add(30.0f));
+    EXPECT_FLOAT_EQ(convergence.estimate().mu, 30.0f);
+
+    convergence.start();
+    EXPECT_EQ(convergence.count(), 0u);
+    EXPECT_FALSE(convergence.converged());
+    EXPECT_EQ(convergence.remaining_samples(), 50u);
+}
+
+// Calibration convergence driven by the engine's calibration service
+class CalibrationConvergenceEngineTest : public EngineFrameTest {};
+
+TEST_F(CalibrationConvergenceEngineTest, StopsOnceBaselineConverges) {
+    esphome::text_sensor::TextSensor reason;
+    engine_.set_state_reason_sensor(&reason);
+    engine_.set_calibration_convergence(300, 150, 1.0f);
+    engine_.setup();
+
+    engine_.start_baseline_calibration(600);
+    for (int i = 0; i < 250; ++i) {
+        feed(6.0f + i % 5, 1);  // 6-10%: μ=8, MAD=1
+    }
+    EXPECT_TRUE(engine_.calibrating_);
+    // Stable for 240 frames; 50 more to reach min_samples at the observed 10 frames/s
+    EXPECT_EQ(reason.state, "Calibrating: n=250, μ=8.00, σ=1.48, ~5s left");
+
+    for (int i = 250; i < 300; ++i) {
+        feed(6.0f + i % 5, 1);
+    }
+    EXPECT_FALSE(engine_.calibrating_);  // After 30s instead of 600s
+    EXPECT_FLOAT_EQ(engine_.mu_still_, 8.0f);
+    EXPECT_FLOAT_EQ(engine_.sigma_still_, 1.4826f);
+    EXPECT_EQ(reason.state.rfind("Calibration complete", 0), 0u);
+}
+
+// Two profiles: "night" matches the engine defaults, "fast" changes every knob group
+class ProfileEngineTest : public EngineFrameTest {
+protected:
+    void SetUp() override {
+        using esphome::bed_presence_engine::EngineProfile;
+        EngineFrameTest::SetUp();
+        engine_.add_profile(EngineProfile{"night", 9.0f, 4.0f, 3000, 5000, 30000, 0.0f, 600.0f,
+                                          PREFILTER_NONE, 5, 0.3f, 0.05f, 1.0f});
+        engine_.add_profile(EngineProfile{"fast", 12.0f, 6.0f, 1000, 1000, 2000, 0.0f, 300.0f,
+                                          PREFILTER_MEDIAN, 3, 0.3f, 0.05f, 1.0f});
+    }
+};
+
+TEST_F(ProfileEngineTest, SwitchKeepsStateAndDebounceTimers) {
+    esphome::text_sensor::TextSensor active;
+    engine_.set_active_profile_sensor(&active);
+    engine_.setup();
+    EXPECT_EQ(active.state, "none");
+
+    feed(64.0f, 20);  // 2s into the 3s ON debounce
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::DEBOUNCING_ON);
+    EXPECT_TRUE(engine_.activate_profile("fast"));
+    EXPECT_EQ(active.state, "fast");
+    EXPECT_FLOAT_EQ(engine_.get_k_on(), 12.0f);
+    EXPECT_EQ(engine_.get_abs_clear_delay_ms(), 2000u);
+    EXPECT_FLOAT_EQ(engine_.get_d_max_cm(), 300.0f);
+
+    // The running debounce is kept and now completes against the 1s timer
+    feed(64.0f, 1);
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::PRESENT);
+
+    EXPECT_FALSE(engine_.activate_profile("missing"));
+    EXPECT_FALSE(engine_.activate_profile(static_cast<uint8_t>(2)));
+    EXPECT_STREQ(engine_.get_active_profile(), "fast");
+
+    engine_.reset_to_defaults();
+    EXPECT_EQ(active.state, "none");
+}
+
+TEST_F(ProfileEngineTest, ResetRestoresConfiguredPrefilter) {
+    engine_.set_prefilter_mode(PREFILTER_EWMA);
+    engine_.set_prefilter_alpha(0.5f);
+    engine_.setup();
+    ASSERT_TRUE(engine_.activate_profile("fast"));
+    EXPECT_EQ(engine_.prefilter_.get_mode(), PREFILTER_MEDIAN);
+
+    engine_.reset_to_defaults();
+    EXPECT_STREQ(engine_.get_active_profile(), "none");
+    esphome::bed_presence_engine::PrefilterSettings settings = engine_.prefilter_.get_settings();
+    EXPECT_EQ(settings.mode, PREFILTER_EWMA);
+    EXPECT_EQ(settings.window, 5);
+    EXPECT_FLOAT_EQ(settings.alpha, 0.5f);
+}
+
+// Global allocation counter for the allocation-free hot path tests
+static bool g_count_allocations = false;
+static size_t g_allocation_count = 0;
+
+void *operator new(size_t size) {
+    if (g_count_allocations) {
+        ++g_allocation_count;
+    }
+    void *ptr = std::malloc(size == 0 ? 1 : size);
+    if (ptr == nullptr) {
+        throw std::bad_alloc();
+    }
+    return ptr;
+}
+
+void operator delete(void *ptr) noexcept { std::free(ptr); }
+void operator delete(void *ptr, size_t) noexcept { std::free(ptr); }
+
+class AllocationTest : public EngineFrameTest {
+protected:
+    void start_counting() {
+        g_allocation_count = 0;
+        g_count_allocations = true;
+    }
+
+    size_t stop_counting() {
+        g_count_allocations = false;
+        return g_allocation_count;
+    }
+};
+
+// Text sensors are left unset: ESPHome's TextSensor keeps its own std::string copy
+// of each published reason, which is outside the engine's control.
+TEST_F(AllocationTest, ThresholdHotPathDoesNotAllocate) {
+    engine_.setup();
+
+    start_counting();
+    feed(6.0f, 50);    // Vacant
+    feed(64.0f, 50);   // ON transition after 3s debounce
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::PRESENT);
+    feed(6.0f, 400);   // OFF after abs_clear + off debounce
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::IDLE);
+
+    engine_.start_baseline_calibration(60);
+    feed(8.0f, 200);
+    engine_.stop_baseline_calibration();
+    EXPECT_EQ(stop_counting(), 0u);
+    EXPECT_FLOAT_EQ(engine_.mu_still_, 8.0f);
+}
+
+TEST_F(AllocationTest, CusumWithPrefilterDoesNotAllocate) {
+    engine_.set_detector_mode(esphome::bed_presence_engine::DETECTOR_CUSUM);
+    engine_.set_prefilter_mode(esphome::bed_presence_engine::PREFILTER_MEDIAN);
+    engine_.setup();
+
+    start_counting();
+    feed(6.0f, 50);
+    feed(64.0f, 20);
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::PRESENT);
+    feed(6.0f, 50);
+    EXPECT_EQ(engine_.current_state_, esphome::bed_presence_engine::IDLE);
+    EXPECT_EQ(stop_counting(), 0u);
+}
+
+TEST_F(AllocationTest, ZonesDoNotAllocate) {
+    esphome::bed_presence_engine::BedZone left;
+    esphome::bed_presence_engine::BedZone right;
+    left.set_d_max_cm(150.0f);
+    right.set_d_min_cm(150.5f);
+    engine_.set_distance_sensor(&distance_);
+    engine_.add_zone(&left);
+    engine_.add_zone(&right);
+    engine_.setup();
+
+    start_counting();
+    feed_at(100.0f, 64.0f, 50);
+    feed_at(220.0f, 64.0f, 50);
+    feed_at(100.0f, 6.0f, 400);
+    EXPECT_EQ(stop_counting(), 0u);
+    EXPECT_EQ(left.get_state(), esphome::bed_presence_engine::IDLE);
+}
+
+TEST_F(AllocationTest, FrameLogDoesNotAllocate) {
+    engine_.set_frame_log_capacity(600);
+    engine_.set_frame_log_freeze_on_transition(true, 10);
+    engine_.setup();
+
+    start_counting();
+    feed(6.0f, 50);
+    feed(64.0f, 50);
+    EXPECT_EQ(stop_counting(), 0u);
+    EXPECT_TRUE(engine_.frame_log_.is_frozen());
+}
+
+TEST_F(AllocationTest, DiagnosticsDoNotAllocate) {
+    esphome::sensor::Sensor frame_rate;
+    engine_.set_diagnostics_interval_ms(60000);
+    engine_.set_frame_rate_sensor(&frame_rate);
+    engine_.setup();
+
+    start_counting();
+    feed(64.0f, 50);
+    feed(6.0f, 600);  // Publishes once
+    EXPECT_EQ(stop_counting(), 0u);
+    EXPECT_TRUE(frame_rate.has_state());
+}
+
+TEST_F(AllocationTest, LatencyHistogramsDoNotAllocate) {
+    esphome::sensor::Sensor on_p90;
+    engine_.set_on_latency_p90_sensor(&on_p90);
+    engine_.setup();
+
+    start_counting();
+    feed(64.0f, 10);  // Aborted debounce
+    feed(6.0f, 10);
+    feed(64.0f, 40);
+    feed(6.0f, 400);
+    EXPECT_EQ(stop_counting(), 0u);
+    EXPECT_EQ(engine_.get_off_latency().count(), 1u);
+}
+
+TEST_F(AllocationTest, TelemetryDoesNotAllocate) {
+    esphome::sensor::Sensor mean;
+    esphome::sensor::Sensor transition_z;
+    engine_.set_telemetry_interval_ms(60000);
+    engine_.set_telemetry_sensor(esphome::bed_presence_engine::TELEMETRY_MEAN, &mean);
+    engine_.set_transition_z_sensor(&transition_z);
+    engine_.setup();
+
+    start_counting();
+    feed(6.0f, 600);
+    feed(64.0f, 600);
+    EXPECT_EQ(stop_counting(), 0u);
+    EXPECT_TRUE(transition_z.has_state());
+}
+
 int main(int argc, char **argv) {
     ::testing::InitGoogleTest(&argc, argv);
     return RUN_ALL_TESTS();
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Live Monitor for a Fleet of Bed Presence Detectors
+
+Discovers every bed presence device in the Home Assistant device and entity
+registries and follows all of them over a single WebSocket subscription to
+state_changed events, instead of one polling process per bed. Each device gets
+one row in a compact table:
+- occupancy state
+- z-score of the latest still energy against the device's baseline
+- still energy and k_on/k_off
+- time and reason of the last ON/OFF change
+
+Each event is routed to its device with one dict lookup and only re-formats
+that device's row; the screen is redrawn at most once per --refresh, so cost
+per event stays constant as the fleet grows.
+
+Usage:
+    python3 fleet_monitor.py
+
+    # Only devices whose name contains "guest", redraw twice a second
+    python3 fleet_monitor.py --match guest --refresh 0.5
+
+    # Against the local stand-in with 120 simulated beds
+    python3 ../tests/e2e/fake_ha.py --port 8123 --devices 120 &
+    HA_URL=http://localhost:8123 HA_TOKEN=fake-token python3 fleet_monitor.py
+
+Environment Variables:
+    HA_URL: Home Assistant URL (default: http://localhost:8123)
+    HA_TOKEN: Long-lived access token (required)
+
+Requires aiohttp and requests.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tests' / 'e2e'))
+
+from hass_ws import HomeAssistantClient  # noqa: E402
+from monitor_presence import BASELINE_PATTERN, Colors, calculate_z_score, get_ha_config  # noqa: E402
+
+# (domain, object id suffix) -> field of BedRow
+ROLES = {
+    ('binary_sensor', 'bed_occupied'): 'occupied',
+    ('sensor', 'ld2410_still_energy'): 'energy',
+    ('sensor', 'presence_state_reason'): 'reason',
+    ('sensor', 'presence_change_reason'): 'change_reason',
+    ('number', 'k_on_on_threshold_multiplier'): 'k_on',
+    ('number', 'k_off_off_threshold_multiplier'): 'k_off',
+}
+
+# Only the bed presence firmware publishes this, so it identifies the devices
+MARKER_ENTITY = ('sensor', 'presence_state_reason')
+
+# Hardcoded baseline from calibration, as in monitor_presence.py
+DEFAULT_MU = 6.3
+DEFAULT_SIGMA = 2.6
+
+NAME_WIDTH = 28
+REASON_WIDTH = 40
+
+
+def parse_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def split_entity_id(entity_id: str) -> Tuple[str, str]:
+    domain, _, object_id = entity_id.partition('.')
+    return domain, object_id
+
+
+def entity_role(entity_id: str, roles: Dict[Tuple[str, str], str] = ROLES) -> Optional[str]:
+    domain, object_id = split_entity_id(entity_id)
+    for (role_domain, suffix), role in roles.items():
+        if domain == role_domain and (object_id == suffix or object_id.endswith('_' + suffix)):
+            return role
+    return None
+
+
+async def discover_beds(client: HomeAssistantClient, roles: Dict[Tuple[str, str], str] = ROLES,
+                        match: Optional[str] = None) -> List[Tuple[str, Dict[str, str]]]:
+    """(device name, {entity id: role}) for every enabled bed presence device, sorted by name."""
+    devices = {device['id']: device for device in await client.get_devices()
+               if device.get('disabled_by') is None}
+    marker = {MARKER_ENTITY: 'marker'}
+    entities_by_device: Dict[str, Dict[str, str]] = {}
+    beds = set()
+    for entity in await client.get_entities():
+        device_id = entity.get('device_id')
+        if device_id not in devices or entity.get('disabled_by') is not None:
+            continue
+        if entity_role(entity['entity_id'], marker):
+            beds.add(device_id)
+        role = entity_role(entity['entity_id'], roles)
+        if role:
+            entities_by_device.setdefault(device_id, {})[entity['entity_id']] = role
+
+    found = []
+    for device_id in beds:
+        device = devices[device_id]
+        name = device.get('name_by_user') or device.get('name') or device_id
+        if match and match.lower() not in name.lower():
+            continue
+        found.append((name, entities_by_device.get(device_id, {})))
+    return sorted(found, key=lambda bed: bed[0].lower())
+
+
+class BedRow:
+    """Latest readings of one device and its formatted table row."""
+
+    __slots__ = ('name', 'occupied', 'energy', 'reason', 'change_reason', 'k_on', 'k_off',
+                 'mu', 'sigma', 'last_change', 'line')
+
+    def __init__(self, name: str, mu: float, sigma: float):
+        self.name = name
+        self.occupied = 'unknown'
+        self.energy: Optional[float] = None
+        self.reason = ''
+        self.change_reason = ''
+        self.k_on: Optional[float] = None
+        self.k_off: Optional[float] = None
+        self.mu = mu
+        self.sigma = sigma
+        self.last_change: Optional[datetime] = None
+        self.line = ''
+
+    def update(self, role: str, state: Dict) -> None:
+        value = state.get('state')
+        if role == 'occupied':
+            self.occupied = value
+            try:
+                self.last_change = datetime.fromisoformat(state['last_changed']).astimezone()
+            except (KeyError, TypeError, ValueError):
+                pass
+        elif role == 'energy':
+            self.energy = parse_float(value)
+        elif role in ('k_on', 'k_off'):
+            setattr(self, role, parse_float(value))
+        elif role == 'reason':
+            self.reason = value or ''
+            match = BASELINE_PATTERN.match(self.reason)
+            if match:
+                self.mu, self.sigma = float(match.group(1)), float(match.group(2))
+        else:
+            self.change_reason = value or ''
+
+    def format(self) -> str:
+        if self.occupied == 'on':
+            state = f"{Colors.OKGREEN}{Colors.BOLD}{'OCCUPIED':<9}{Colors.ENDC}"
+        elif self.occupied == 'off':
+            state = f"{Colors.OKCYAN}{'VACANT':<9}{Colors.ENDC}"
+        else:
+            state = f"{Colors.WARNING}{str(self.occupied).upper()[:9]:<9}{Colors.ENDC}"
+
+        if self.energy is None:
+            z_text, energy_text = f"{'-':>7}", f"{'-':>6}"
+        else:
+            z = calculate_z_score(self.energy, self.mu, self.sigma)
+            if self.k_on is not None and z > self.k_on:
+                color = Colors.OKGREEN
+            elif self.k_off is not None and z < self.k_off:
+                color = Colors.OKCYAN
+            else:
+                color = Colors.WARNING
+            z_text = f"{color}{z:7.2f}{Colors.ENDC}"
+            energy_text = f"{self.energy:5.1f}%"
+
+        k_on = '-' if self.k_on is None else f"{self.k_on:.1f}"
+        k_off = '-' if self.k_off is None else f"{self.k_off:.1f}"
+        changed = self.last_change.strftime('%H:%M:%S') if self.last_change else '-'
+        self.line = (f"{self.name[:NAME_WIDTH]:<{NAME_WIDTH}} {state} {z_text} {energy_text} "
+                     f"{k_on + '/' + k_off:>9}  {changed:<8}  {self.change_reason[:REASON_WIDTH]}")
+        return self.line
+
+
+class FleetMonitor:
+    """Routes state_changed events from one subscription to per-device rows."""
+
+    def __init__(self, client: HomeAssistantClient, mu: float, sigma: float, match: Optional[str] = None):
+        self.client = client
+        self.mu = mu
+        self.sigma = sigma
+        self.match = match
+        self.rows: List[BedRow] = []
+        self.routes: Dict[str, Tuple[BedRow, str]] = {}
+        self.dirty: Set[BedRow] = set()
+        self.events = 0
+
+    async def discover(self) -> int:
+        """Find the bed presence devices and map their entities; returns the device count."""
+        for name, entities in await discover_beds(self.client, ROLES, self.match):
+            row = BedRow(name, self.mu, self.sigma)
+            self.rows.append(row)
+            for entity_id, role in entities.items():
+                self.routes[entity_id] = (row, role)
+        return len(self.rows)
+
+    async def start(self) -> None:
+        """Subscribe first, then seed every row from one get_states snapshot."""
+        await self.client.subscribe_events(self.on_event)
+        for state in await self.client.get_states():
+            self._apply(state['entity_id'], state)
+        for row in self.rows:
+            row.format()
+        self.dirty.clear()
+
+    def on_event(self, event: Dict) -> None:
+        data = event.get('data', {})
+        new_state = data.get('new_state')
+        if new_state is not None:
+            self.events += 1
+            self._apply(data.get('entity_id'), new_state)
+
+    def _apply(self, entity_id: str, state: Dict) -> None:
+        route = self.routes.get(entity_id)
+        if route is not None:
+            row, role = route
+            row.update(role, state)
+            self.dirty.add(row)
+
+    def render(self, events_per_second: float) -> str:
+        for row in self.dirty:
+            row.format()
+        self.dirty.clear()
+
+        occupied = sum(1 for row in self.rows if row.occupied == 'on')
+        offline = sum(1 for row in self.rows if row.occupied not in ('on', 'off'))
+        now = datetime.now().strftime('%H:%M:%S')
+        lines = [
+            f"{Colors.HEADER}{Colors.BOLD}BED PRESENCE FLEET MONITOR{Colors.ENDC}  {now}  "
+            f"{len(self.rows)} devices, {Colors.OKGREEN}{occupied} occupied{Colors.ENDC}, "
+            f"{Colors.WARNING if offline else ''}{offline} unavailable{Colors.ENDC}  "
+            f"({events_per_second:.0f} events/s)",
+            '',
+            f"{Colors.BOLD}{'Device':<{NAME_WIDTH}} {'State':<9} {'z':>7} {'Energy':>6} "
+            f"{'k_on/k_off':>9}  {'Changed':<8}  Change reason{Colors.ENDC}",
+        ]
+        lines.extend(row.line for row in self.rows)
+        return '\n'.join(lines)
+
+
+async def run(args):
+    ha_url, ha_token = get_ha_config()
+    client = HomeAssistantClient(ha_url, ha_token)
+    await client.connect()
+    try:
+        monitor = FleetMonitor(client, args.mu, args.sigma, args.match)
+        count = await monitor.discover()
+        if count == 0:
+            print(f"{Colors.FAIL}ERROR: No bed presence devices found in the device registry{Colors.ENDC}")
+            sys.exit(1)
+        await monitor.start()
+
+        deadline = time.monotonic() + args.duration if args.duration else None
+        last_events, last_time = 0, time.monotonic()
+        # Clear once; later frames overwrite in place to avoid flicker
+        sys.stdout.write('\033[2J')
+        while deadline is None or time.monotonic() < deadline:
+            now = time.monotonic()
+            rate = (monitor.events - last_events) / max(now - last_time, 1e-6)
+            last_events, last_time = monitor.events, now
+            sys.stdout.write('\033[H' + monitor.render(rate) + '\033[J\n')
+            sys.stdout.flush()
+            await asyncio.sleep(args.refresh)
+    finally:
+        await client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Live table of every bed presence detector over one connection')
+    parser.add_argument('--match', type=str, default=None,
+                        help='Only devices whose name contains this text (case-insensitive)')
+    parser.add_argument('--refresh', type=float, default=1.0,
+                        help='Seconds between redraws (default: 1.0)')
+    parser.add_argument('--duration', type=float, default=0,
+                        help='Stop after this many seconds (default: run until Ctrl+C)')
+    parser.add_argument('--mu', type=float, default=DEFAULT_MU,
+                        help=f'Baseline mean until a device reports a calibration (default: {DEFAULT_MU})')
+    parser.add_argument('--sigma', type=float, default=DEFAULT_SIGMA,
+                        help=f'Baseline std until a device reports a calibration (default: {DEFAULT_SIGMA})')
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n{Colors.WARNING}⚠️  Monitoring interrupted{Colors.ENDC}")
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n{Colors.FAIL}❌ Unexpected error: {e}{Colors.ENDC}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Synthetic LD2410 Session Generator for the Bed Presence Engine
+
+Builds a seeded corpus of nights at the native ~10 Hz frame rate, with labeled
+ground truth, so load and accuracy tests do not depend on someone lying in a
+bed. Each night mixes vacant noise with slow drift, getting into bed, sleep
+with breathing, turning over, brief trips out of bed, and optionally a pet on
+the bed and fan/HVAC interference.
+
+A night is planned as a short list of segments; every per-frame signal is then
+rendered with NumPy in bulk, so a 30-night corpus builds in seconds.
+
+Outputs, per night, in --out:
+    night_000.npy         Frames in the stream_frames.py format (STREAM_FRAME_DTYPE).
+                          The state bits of flags carry the ground truth (IDLE or
+                          PRESENT), so replay_engine.py reports accuracy directly.
+    night_000.labels.npy  Per-frame LABEL_DTYPE: occupied, activity, interference
+    night_000.csv         With --csv: monitor_phase2.py CSV layout, one row per second
+    manifest.json         Seed, settings and a summary of every night
+
+Usage:
+    # 30 nights of 10 hours
+    python3 generate_sessions.py --out corpus --nights 30 --seed 1
+
+    # Replay one night against the labels
+    python3 replay_engine.py corpus/night_000.npy
+
+Requires numpy.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+from stream_frames import Colors, DISTANCE_NONE, STREAM_FRAME_DTYPE
+
+FRAME_INTERVAL_MS = 100
+
+# Ground-truth activities; a person is in bed during SETTLING, ASLEEP and TURNING
+VACANT, SETTLING, ASLEEP, TURNING, WALKING = range(5)
+ACTIVITY_NAMES = ['VACANT', 'SETTLING', 'ASLEEP', 'TURNING', 'WALKING']
+IN_BED = np.array([False, True, True, True, False])
+
+INTERFERENCE_PET = 0x01
+INTERFERENCE_FAN = 0x02
+
+LABEL_DTYPE = np.dtype([
+    ('occupied', 'u1'),
+    ('activity', 'u1'),
+    ('interference', 'u1'),
+])
+
+# State values written to the flags of each frame (see stream_frames.STATE_NAMES)
+STATE_IDLE = 0
+STATE_PRESENT = 2
+
+# Engine defaults, used for the z-score and threshold columns of the CSV
+DEFAULT_MU = 6.7
+DEFAULT_SIGMA = 3.5
+DEFAULT_K_ON = 9.0
+DEFAULT_K_OFF = 4.0
+
+
+@dataclass
+class SessionSettings:
+    """Knobs shared by every night of a corpus."""
+    hours: float = 10.0
+    vacant_mu: float = 6.7
+    vacant_sigma: float = 3.5
+    drift: float = 1.5              # Std of the slow baseline drift (%)
+    bed_distance_cm: float = 120.0
+    door_distance_cm: float = 380.0
+    turns_per_hour: float = 2.5
+    max_bathroom_trips: int = 2
+    pet_probability: float = 0.3    # Chance of a pet visiting the bed in a night
+    fan_probability: float = 0.4    # Chance of fan/HVAC cycling in a night
+
+
+# Per-activity energy model: (still mean, still std, move mean, move std, breathing amplitude)
+# VACANT still energy comes from the baseline instead; ASLEEP's still mean is drawn per night
+ACTIVITY_ENERGY = np.array([
+    [0.0, 0.0, 3.0, 2.0, 0.0],      # VACANT
+    [45.0, 10.0, 25.0, 12.0, 4.0],  # SETTLING
+    [0.0, 4.0, 6.0, 3.0, 6.0],      # ASLEEP
+    [60.0, 15.0, 70.0, 15.0, 0.0],  # TURNING
+    [25.0, 10.0, 60.0, 15.0, 0.0],  # WALKING
+])
+ACTIVITY_DISTANCE_STD = np.array([0.0, 6.0, 3.0, 15.0, 10.0])
+
+
+def plan_night(rng: np.random.Generator, settings: SessionSettings) -> List[Tuple[int, float]]:
+    """A night as (activity, seconds) segments, from lights-on to the end of the window."""
+    total = settings.hours * 3600.0
+    segments = [(VACANT, rng.uniform(0.05, 0.2) * total),
+                (WALKING, rng.uniform(4, 8)),
+                (SETTLING, rng.uniform(5, 30) * 60)]
+
+    wake = total - rng.uniform(0.05, 0.15) * total
+    elapsed = sum(seconds for _, seconds in segments)
+    sleep = max(wake - elapsed, 0.0)
+    trips = sorted(rng.uniform(0.2, 0.9, rng.integers(0, settings.max_bathroom_trips + 1)) * sleep)
+
+    # Turns arrive as a Poisson process; trips cut the sleep into stretches
+    cursor = 0.0
+    for stop in trips + [sleep]:
+        while cursor < stop:
+            gap = rng.exponential(3600.0 / settings.turns_per_hour)
+            if cursor + gap >= stop:
+                segments.append((ASLEEP, stop - cursor))
+                cursor = stop
+                break
+            segments.append((ASLEEP, gap))
+            segments.append((TURNING, rng.uniform(3, 15)))
+            cursor += gap
+        if stop < sleep:
+            segments += [(WALKING, rng.uniform(4, 8)), (VACANT, rng.uniform(2, 10) * 60),
+                         (WALKING, rng.uniform(4, 8)), (SETTLING, rng.uniform(1, 5) * 60)]
+
+    segments += [(TURNING, rng.uniform(5, 15)), (WALKING, rng.uniform(4, 8))]
+    elapsed = sum(seconds for _, seconds in segments)
+    segments.append((VACANT, max(total - elapsed, 60.0)))
+    return segments
+
+
+def segment_frames(segments: List[Tuple[int, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-frame activity, and the first frame of every segment."""
+    lengths = np.maximum(np.round([seconds * 1000.0 / FRAME_INTERVAL_MS for _, seconds in segments]), 1).astype(int)
+    activity = np.repeat([a for a, _ in segments], lengths).astype(np.uint8)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return activity, starts
+
+
+def slow_drift(rng: np.random.Generator, count: int, std: float) -> np.ndarray:
+    """Mean-reverting random walk at one point per minute, interpolated to frames."""
+    points = count // 600 + 2
+    steps = rng.normal(0.0, std * 0.3, points)
+    walk = np.empty(points)
+    walk[0] = rng.normal(0.0, std)
+    for i in range(1, points):
+        walk[i] = 0.95 * walk[i - 1] + steps[i]
+    return np.interp(np.arange(count) / 600.0, np.arange(points), walk)
+
+
+def episodes(rng: np.random.Generator, count: int, number: int, min_s: float, max_s: float) -> np.ndarray:
+    """Boolean mask of `number` random episodes."""
+    mask = np.zeros(count, dtype=bool)
+    for _ in range(number):
+        length = int(rng.uniform(min_s, max_s) * 1000 / FRAME_INTERVAL_MS)
+        start = int(rng.integers(0, max(count - length, 1)))
+        mask[start:start + length] = True
+    return mask
+
+
+def cycles(rng: np.random.Generator, count: int, on_s: Tuple[float, float], off_s: Tuple[float, float]) -> np.ndarray:
+    """Boolean mask of an on/off duty cycle, such as a thermostat."""
+    mask = np.zeros(count, dtype=bool)
+    cursor = int(rng.uniform(*off_s) * 1000 / FRAME_INTERVAL_MS)
+    while cursor < count:
+        on = int(rng.uniform(*on_s) * 1000 / FRAME_INTERVAL_MS)
+        mask[cursor:cursor + on] = True
+        cursor += on + int(rng.uniform(*off_s) * 1000 / FRAME_INTERVAL_MS)
+    return mask
+
+
+def render_night(rng: np.random.Generator, settings: SessionSettings) -> Tuple[np.ndarray, np.ndarray]:
+    """Frames (STREAM_FRAME_DTYPE) and labels (LABEL_DTYPE) for one night."""
+    segments = plan_night(rng, settings)
+    activity, starts = segment_frames(segments)
+    count = len(activity)
+    t = np.arange(count) * (FRAME_INTERVAL_MS / 1000.0)
+    model = ACTIVITY_ENERGY[activity]
+    in_bed = IN_BED[activity]
+
+    # Still energy: baseline with drift when vacant, activity model plus breathing otherwise
+    sleep_level = rng.uniform(35, 60)
+    still_mean = np.where(activity == VACANT, settings.vacant_mu + slow_drift(rng, count, settings.drift),
+                          np.where(activity == ASLEEP, sleep_level, model[:, 0]))
+    still_std = np.where(activity == VACANT, settings.vacant_sigma, model[:, 1])
+    breathing = model[:, 4] * np.sin(2 * np.pi * rng.uniform(0.2, 0.3) * t)
+    still = still_mean + breathing + rng.normal(0.0, 1.0, count) * still_std
+    moving = model[:, 2] + rng.normal(0.0, 1.0, count) * model[:, 3]
+
+    # Distance: the bed while in it, a ramp to or from the door while walking,
+    # and mostly no target when vacant apart from occasional furniture clutter
+    distance = settings.bed_distance_cm + rng.normal(0.0, 1.0, count) * ACTIVITY_DISTANCE_STD[activity]
+    walking = np.flatnonzero(activity[starts] == WALKING)
+    for i in walking:
+        start = starts[i]
+        end = starts[i + 1] if i + 1 < len(starts) else count
+        leaving = i + 1 < len(starts) and activity[starts[i + 1]] == VACANT
+        ramp = np.linspace(settings.bed_distance_cm, settings.door_distance_cm, end - start)
+        distance[start:end] += (ramp if leaving else ramp[::-1]) - settings.bed_distance_cm
+    has_target = in_bed | (activity == WALKING) | (rng.random(count) < 0.08)
+    distance = np.where(has_target, distance, np.where(activity == VACANT, rng.uniform(200, 300), distance))
+
+    interference = np.zeros(count, dtype=np.uint8)
+
+    # A pet on the bed: a weaker still signal near the bed, with jumps on and off
+    if rng.random() < settings.pet_probability:
+        pet = episodes(rng, count, int(rng.integers(1, 4)), 60, 30 * 60)
+        pet_still = rng.uniform(12, 25) + rng.normal(0.0, 4.0, count)
+        still = np.where(pet, np.maximum(still, pet_still), still)
+        edges = np.flatnonzero(np.diff(pet.astype(np.int8)))
+        for edge in edges:
+            moving[edge:edge + 20] = np.maximum(moving[edge:edge + 20], rng.uniform(40, 70))
+        distance = np.where(pet & ~in_bed, settings.bed_distance_cm + rng.normal(0.0, 20.0, count), distance)
+        has_target |= pet
+        interference[pet] |= INTERFERENCE_PET
+
+    # Fan/HVAC cycling: a periodic component on both gates while running
+    if rng.random() < settings.fan_probability:
+        fan = cycles(rng, count, (8 * 60, 20 * 60), (15 * 60, 40 * 60))
+        amplitude = rng.uniform(3, 8)
+        hum = amplitude * (0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(0.5, 2.0) * t))
+        still = np.where(fan, still + hum, still)
+        moving = np.where(fan, moving + 0.5 * hum, moving)
+        interference[fan] |= INTERFERENCE_FAN
+
+    frames = np.zeros(count, dtype=STREAM_FRAME_DTYPE)
+    jitter = rng.integers(-3, 4, count)
+    frames['timestamp_ms'] = (rng.integers(60_000, 3_600_000) + np.cumsum(FRAME_INTERVAL_MS + jitter)).astype(np.uint32)
+    frames['sequence'] = np.arange(count) & 0xFFFF
+    frames['still_energy'] = np.clip(np.round(still), 0, 100)
+    frames['move_energy'] = np.clip(np.round(moving), 0, 100)
+    frames['distance_cm'] = np.where(has_target, np.clip(np.round(distance), 0, 600), DISTANCE_NONE)
+    frames['flags'] = np.where(in_bed, STATE_PRESENT, STATE_IDLE)
+
+    labels = np.zeros(count, dtype=LABEL_DTYPE)
+    labels['occupied'] = in_bed
+    labels['activity'] = activity
+    labels['interference'] = interference
+    return frames, labels
+
+
+def write_monitor_csv(path: str, frames: np.ndarray, labels: np.ndarray, start: np.datetime64, interval_s: float):
+    """Write one row every interval_s in the layout of monitor_phase2.py --csv."""
+    step = max(int(interval_s * 1000 / FRAME_INTERVAL_MS), 1)
+    rows = np.arange(0, len(frames), step)
+    stamps = np.datetime_as_string(start + (rows * FRAME_INTERVAL_MS).astype('timedelta64[ms]'), unit='s')
+    energy = frames['still_energy'][rows].astype(float)
+    z_scores = (energy - DEFAULT_MU) / DEFAULT_SIGMA
+    on_threshold = f"{DEFAULT_MU + DEFAULT_K_ON * DEFAULT_SIGMA:.2f}"
+    off_threshold = f"{DEFAULT_MU + DEFAULT_K_OFF * DEFAULT_SIGMA:.2f}"
+
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['timestamp', 'energy_%', 'z_score', 'presence_state', 'state_reason', 'k_on', 'k_off',
+                         'on_threshold_%', 'off_threshold_%', 'on_debounce_ms', 'off_debounce_ms',
+                         'abs_clear_delay_ms'])
+        for stamp, e, z, occupied, activity in zip(stamps.tolist(), energy.tolist(), z_scores.tolist(),
+                                                  labels['occupied'][rows].tolist(),
+                                                  labels['activity'][rows].tolist()):
+            writer.writerow([stamp, f"{e:.2f}", f"{z:.2f}", 'PRESENT' if occupied else 'VACANT',
+                             f"synthetic: {ACTIVITY_NAMES[activity].lower()}", f"{DEFAULT_K_ON:.1f}",
+                             f"{DEFAULT_K_OFF:.1f}", on_threshold, off_threshold, 3000, 5000, 30000])
+
+
+def summarize(frames: np.ndarray, labels: np.ndarray) -> dict:
+    occupied = labels['occupied'].astype(np.int8)
+    return {
+        'frames': int(len(frames)),
+        'hours': round(len(frames) * FRAME_INTERVAL_MS / 3_600_000, 2),
+        'occupied_share': round(float(occupied.mean()), 4) if len(frames) else 0.0,
+        'entries': int(np.count_nonzero(np.diff(occupied) == 1)),
+        'turns': int(np.count_nonzero(np.diff((labels['activity'] == TURNING).astype(np.int8)) == 1)),
+        'pet': bool(np.any(labels['interference'] & INTERFERENCE_PET)),
+        'fan': bool(np.any(labels['interference'] & INTERFERENCE_FAN)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic LD2410 session corpus with ground truth')
+    parser.add_argument('--out', type=str, required=True,
+                        help='Output directory')
+    parser.add_argument('--nights', type=int, default=30,
+                        help='Number of nights (default: 30)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Corpus seed; night N always uses the same stream (default: 0)')
+    parser.add_argument('--hours', type=float, default=10.0,
+                        help='Length of each night in hours (default: 10)')
+    parser.add_argument('--pet-probability', type=float, default=0.3,
+                        help='Chance of a pet on the bed in a night (default: 0.3)')
+    parser.add_argument('--fan-probability', type=float, default=0.4,
+                        help='Chance of fan/HVAC interference in a night (default: 0.4)')
+    parser.add_argument('--csv', action='store_true',
+                        help='Also write monitor_phase2.py style CSVs')
+    parser.add_argument('--csv-interval', type=float, default=1.0,
+                        help='Seconds between CSV rows (default: 1)')
+    args = parser.parse_args()
+
+    settings = SessionSettings(hours=args.hours, pet_probability=args.pet_probability,
+                               fan_probability=args.fan_probability)
+    os.makedirs(args.out, exist_ok=True)
+    print(f"🛏️  Generating {args.nights} nights of {args.hours:g}h into {Colors.OKCYAN}{args.out}{Colors.ENDC} "
+          f"(seed {args.seed})")
+
+    start = time.monotonic()
+    nights = []
+    for night in range(args.nights):
+        rng = np.random.default_rng([args.seed, night])
+        frames, labels = render_night(rng, settings)
+        name = f"night_{night:03d}"
+        np.save(os.path.join(args.out, f"{name}.npy"), frames)
+        np.save(os.path.join(args.out, f"{name}.labels.npy"), labels)
+        if args.csv:
+            evening = np.datetime64('2026-01-01T21:00:00') + np.timedelta64(night, 'D')
+            write_monitor_csv(os.path.join(args.out, f"{name}.csv"), frames, labels, evening, args.csv_interval)
+        nights.append({'name': name, **summarize(frames, labels)})
+
+    manifest = {
+        'seed': args.seed,
+        'frame_interval_ms': FRAME_INTERVAL_MS,
+        'settings': asdict(settings),
+        'activities': ACTIVITY_NAMES,
+        'nights': nights,
+    }
+    with open(os.path.join(args.out, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    total_frames = sum(n['frames'] for n in nights)
+    print(f"{Colors.OKGREEN}✓{Colors.ENDC} {total_frames} frames in {time.monotonic() - start:.1f}s")
+    print(f"  Occupied: {np.mean([n['occupied_share'] for n in nights]) * 100:.1f}% | "
+          f"pets: {sum(n['pet'] for n in nights)} nights | fan: {sum(n['fan'] for n in nights)} nights")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"\n{Colors.FAIL}❌ Unexpected error: {e}{Colors.ENDC}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
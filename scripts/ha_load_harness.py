@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Throughput and Latency Load Harness for the Home Assistant Client Paths
+
+Drives the E2E suite's HomeAssistantClient (tests/e2e/hass_ws.py) and the REST
+polling path used by the monitoring scripts (get_entity_state in
+monitor_presence.py) at configurable concurrency and entity counts, against
+the local HA stand-in (tests/e2e/fake_ha.py, started in a separate process so
+its CPU is not charged to the client) or a real instance.
+
+Each cell of the workload x entities x concurrency matrix runs for --duration
+seconds and reports:
+- commands per second and errors
+- p50/p99 latency
+- client and server CPU per command (the server only when it is local)
+- client RSS growth over the cell
+
+Save a run with --save and pass it to --compare on the next run to see before
+and after numbers side by side.
+
+Usage:
+    # Full matrix against the stand-in
+    python3 ha_load_harness.py --entities 10,100,1000,10000 --concurrency 1,8,32 --save before.json
+
+    # After a change
+    python3 ha_load_harness.py --entities 10,100,1000,10000 --concurrency 1,8,32 --compare before.json
+
+    # Against a real instance (its own entity count); call_service is opt-in there
+    python3 ha_load_harness.py --url http://192.168.0.148:8123 --token $HA_TOKEN --workloads get_state
+
+call_service toggles each bed's k_on between its current value and one 0.1 above,
+so k_on stays above k_off, and restores the saved values when the cell ends.
+
+Requires aiohttp and requests.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+E2E_DIR = REPO_ROOT / 'tests' / 'e2e'
+sys.path.insert(0, str(E2E_DIR))
+
+from fake_ha import NUMBER_KNOBS  # noqa: E402
+from hass_ws import HomeAssistantClient  # noqa: E402
+from monitor_presence import get_entity_state  # noqa: E402
+
+WORKLOADS = ('get_state', 'call_service', 'rest_poll')
+# Writes device settings, so only run against a real instance when asked for
+REMOTE_WORKLOADS = ('get_state', 'rest_poll')
+
+# Entities the stand-in creates: per simulated bed (the numbers, bed_occupied, three LD2410
+# sensors, state reason, change reason, active profile), plus the calibration wizard helpers
+FAKE_ENTITIES_PER_DEVICE = len(NUMBER_KNOBS) + 7
+FAKE_HELPER_ENTITIES = 9
+TOGGLE_STEP = 0.1
+
+
+# ANSI color codes for terminal output
+class Colors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+
+def rss_kb() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU of another process, from /proc (None elsewhere)."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class FakeServer:
+    """fake_ha.py in a child process, sized to roughly the requested entity count."""
+
+    def __init__(self, entities: int, speed: float):
+        self.devices = max(1, round((entities - FAKE_HELPER_ENTITIES) / FAKE_ENTITIES_PER_DEVICE))
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.port = s.getsockname()[1]
+        self.token = 'fake-token'
+        self.http_url = f'http://127.0.0.1:{self.port}'
+        self.process = subprocess.Popen(
+            [sys.executable, str(E2E_DIR / 'fake_ha.py'), '--port', str(self.port),
+             '--devices', str(self.devices), '--speed', str(speed), '--token', self.token],
+            stdout=subprocess.DEVNULL)
+
+    def wait_ready(self, timeout: float = 30.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"fake_ha.py exited with code {self.process.returncode}")
+            try:
+                requests.get(f'{self.http_url}/api/', headers={'Authorization': f'Bearer {self.token}'}, timeout=1)
+                return
+            except requests.exceptions.ConnectionError:
+                time.sleep(0.1)
+        raise TimeoutError("fake_ha.py did not start")
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+async def run_async(op: Callable[[int], Awaitable[object]], concurrency: int,
+                    duration: float) -> Tuple[List[float], int]:
+    """Run op from `concurrency` tasks until the deadline; returns (latencies, errors)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker():
+        nonlocal errors
+        while loop.time() < deadline:
+            start = time.perf_counter()
+            try:
+                await op(next(counter))
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def run_threaded(op: Callable[[int], bool], concurrency: int, duration: float) -> Tuple[List[float], int]:
+    """Blocking op from `concurrency` threads, as when several script pollers run at once."""
+    deadline = time.monotonic() + duration
+    counter = itertools.count()
+
+    def worker() -> Tuple[List[float], int]:
+        latencies, errors = [], 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            if op(next(counter)):
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+        return latencies, errors
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: worker(), range(concurrency)))
+    return [l for latencies, _ in results for l in latencies], sum(errors for _, errors in results)
+
+
+async def run_cell(workload: str, ws_url: str, http_url: str, token: str, concurrency: int, duration: float,
+                   server_pid: Optional[int]) -> Dict:
+    client = HomeAssistantClient(ws_url, token, request_timeout=30.0)
+    await client.connect()
+    try:
+        states = await client._send_command({'type': 'get_states'})
+        entity_ids = [s['entity_id'] for s in states]
+        # Only k_on moves, and only upwards from its saved value, so the hysteresis gap is kept
+        saved = {s['entity_id']: float(s['state']) for s in states
+                 if s['entity_id'].endswith('k_on_on_threshold_multiplier') and is_number(s['state'])}
+        numbers = list(saved)
+
+        async def get_state(i: int):
+            if await client.get_state(entity_ids[i % len(entity_ids)]) is None:
+                raise LookupError(entity_ids[i % len(entity_ids)])
+
+        async def call_service(i: int):
+            entity_id = numbers[i % len(numbers)]
+            step = TOGGLE_STEP if (i // len(numbers)) % 2 == 0 else 0.0
+            await client.call_service('number', 'set_value', entity_id=entity_id,
+                                      value=round(saved[entity_id] + step, 3))
+
+        def rest_poll(i: int) -> bool:
+            return get_entity_state(http_url, token, entity_ids[i % len(entity_ids)]) is not None
+
+        rss_before = rss_kb()
+        cpu_before = time.process_time()
+        server_cpu_before = process_cpu_seconds(server_pid) if server_pid else None
+        wall_start = time.perf_counter()
+        if workload == 'get_state':
+            latencies, errors = await run_async(get_state, concurrency, duration)
+        elif workload == 'call_service':
+            if not numbers:
+                raise LookupError('No k_on number entities to write')
+            try:
+                latencies, errors = await run_async(call_service, concurrency, duration)
+            finally:
+                for entity_id, value in saved.items():
+                    await client.call_service('number', 'set_value', entity_id=entity_id, value=value)
+        else:
+            latencies, errors = await asyncio.to_thread(run_threaded, rest_poll, concurrency, duration)
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_before
+        server_cpu_after = process_cpu_seconds(server_pid) if server_pid else None
+    finally:
+        await client.disconnect()
+
+    ops = len(latencies)
+    latencies.sort()
+    server_cpu = None
+    if server_cpu_before is not None and server_cpu_after is not None and ops:
+        server_cpu = (server_cpu_after - server_cpu_before) / ops * 1e6
+    return {
+        'workload': workload,
+        'entities': len(entity_ids),
+        'concurrency': concurrency,
+        'ops': ops,
+        'errors': errors,
+        'ops_per_s': ops / wall if wall > 0 else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'client_cpu_us_per_op': cpu / ops * 1e6 if ops else None,
+        'server_cpu_us_per_op': server_cpu,
+        'rss_growth_kb': rss_kb() - rss_before,
+    }
+
+
+def cell_key(result: Dict) -> Tuple[str, int, int]:
+    return result['workload'], result['entities'], result['concurrency']
+
+
+def print_results(results: List[Dict], baseline: Optional[Dict[Tuple[str, int, int], Dict]]):
+    print(f"\n{Colors.HEADER}{Colors.BOLD}Results{Colors.ENDC}")
+    print(f"  {'workload':<13}{'entities':>9}{'conc':>6}{'ops/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'cli µs/op':>11}{'srv µs/op':>11}{'ΔRSS KB':>9}{'err':>6}")
+    for r in results:
+        server = f"{r['server_cpu_us_per_op']:.0f}" if r['server_cpu_us_per_op'] is not None else '-'
+        client = f"{r['client_cpu_us_per_op']:.0f}" if r['client_cpu_us_per_op'] is not None else '-'
+        print(f"  {r['workload']:<13}{r['entities']:>9}{r['concurrency']:>6}{r['ops_per_s']:>10.0f}"
+              f"{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}{client:>11}{server:>11}{r['rss_growth_kb']:>9}"
+              f"{r['errors']:>6}")
+        before = baseline.get(cell_key(r)) if baseline else None
+        if before and before['ops_per_s'] > 0:
+            change = (r['ops_per_s'] - before['ops_per_s']) / before['ops_per_s'] * 100
+            color = Colors.OKGREEN if change >= 0 else Colors.FAIL
+            print(f"  {Colors.OKCYAN}{'  before':<28}{before['ops_per_s']:>10.0f}{before['p50_ms']:>9.2f}"
+                  f"{before['p99_ms']:>9.2f}{Colors.ENDC}  {color}{change:+.0f}% ops/s{Colors.ENDC}")
+
+
+def parse_list(text: str) -> List[int]:
+    return [int(value) for value in text.split(',') if value]
+
+
+def is_number(value: str) -> bool:
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+async def run(args) -> List[Dict]:
+    default = REMOTE_WORKLOADS if args.url else WORKLOADS
+    workloads = [w for w in args.workloads.split(',') if w] if args.workloads else list(default)
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        raise ValueError(f"Unknown workloads: {', '.join(sorted(unknown))} (choose from {', '.join(WORKLOADS)})")
+
+    results = []
+    targets = [None] if args.url else parse_list(args.entities)
+    for entities in targets:
+        server = None
+        if args.url:
+            http_url = args.url.rstrip('/')
+            token = args.token
+            pid = None
+            print(f"🎯 Target: {Colors.OKCYAN}{http_url}{Colors.ENDC}")
+        else:
+            server = FakeServer(entities, args.speed)
+            server.wait_ready()
+            http_url, token, pid = server.http_url, server.token, server.process.pid
+            print(f"🧪 Stand-in with {server.devices} simulated bed(s) (~{entities} entities) on "
+                  f"{Colors.OKCYAN}{http_url}{Colors.ENDC}")
+        try:
+            for workload in workloads:
+                for concurrency in parse_list(args.concurrency):
+                    result = await run_cell(workload, http_url, http_url, token, concurrency, args.duration, pid)
+                    print(f"   {workload:<13} x{concurrency:<4} {result['ops_per_s']:8.0f} ops/s  "
+                          f"p99 {result['p99_ms']:.2f} ms")
+                    results.append(result)
+        finally:
+            if server:
+                server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load harness for the Home Assistant client and polling paths')
+    parser.add_argument('--workloads', type=str, default=None,
+                        help=f'Comma-separated workloads (default: {",".join(WORKLOADS)}; '
+                             f'{",".join(REMOTE_WORKLOADS)} with --url)')
+    parser.add_argument('--entities', type=str, default='10,100,1000',
+                        help='Comma-separated entity counts for the stand-in (default: 10,100,1000)')
+    parser.add_argument('--concurrency', type=str, default='1,8',
+                        help='Comma-separated concurrency levels (default: 1,8)')
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help='Seconds per cell (default: 5)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Stand-in simulated time multiplier; 0 freezes the devices (default: 1)')
+    parser.add_argument('--url', type=str, default=None,
+                        help='Benchmark a real Home Assistant at this URL instead of the stand-in')
+    parser.add_argument('--token', type=str, default=os.getenv('HA_TOKEN'),
+                        help='Access token for --url (default: $HA_TOKEN)')
+    parser.add_argument('--save', type=str, default=None,
+                        help='Save results to a JSON file')
+    parser.add_argument('--compare', type=str, default=None,
+                        help='Show a previous --save file next to these results')
+    args = parser.parse_args()
+    if args.url and not args.token:
+        parser.error('--url needs --token or HA_TOKEN')
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {cell_key(r): r for r in json.load(f)['results']}
+
+    results = asyncio.run(run(args))
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"\n{Colors.OKGREEN}💾 Results saved to: {args.save}{Colors.ENDC}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n{Colors.WARNING}⚠️  Interrupted by user{Colors.ENDC}")
+        sys.exit(130)
+    except Exception as e:
+        print(f"\n{Colors.FAIL}❌ Unexpected error: {e}{Colors.ENDC}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Prometheus Exporter for Bed Presence Telemetry
+
+Follows every bed presence device over one Home Assistant WebSocket
+subscription (devices are found as in fleet_monitor.py) and serves, per device:
+- gauges: still energy, z-score, occupancy, number entity values, baseline
+  mean/std and the time of the last calibration
+- counters: ON/OFF transitions, change reasons and completed calibrations
+- histograms: how long each occupied and vacant period lasted
+
+Scrapes never reach Home Assistant. Each event rewrites only the exposition
+lines of the series it touches; the full /metrics body is re-joined at most
+once per --render-interval and scrapes return the cached bytes.
+
+Usage:
+    python3 metrics_exporter.py --port 9731
+
+    # prometheus.yml
+    scrape_configs:
+      - job_name: bed_presence
+        static_configs:
+          - targets: ['exporter-host:9731']
+
+Environment Variables:
+    HA_URL: Home Assistant URL (default: http://localhost:8123)
+    HA_TOKEN: Long-lived access token (required)
+
+Requires aiohttp and requests.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from fleet_monitor import BASELINE_PATTERN, DEFAULT_MU, DEFAULT_SIGMA, discover_beds, parse_float
+from hass_ws import HomeAssistantClient
+from monitor_presence import Colors, calculate_z_score, get_ha_config
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+KNOBS = {
+    'k_on_on_threshold_multiplier': 'k_on',
+    'k_off_off_threshold_multiplier': 'k_off',
+    'on_debounce_timer_ms': 'on_debounce_ms',
+    'off_debounce_timer_ms': 'off_debounce_ms',
+    'absolute_clear_delay_ms': 'abs_clear_delay_ms',
+    'distance_min_cm': 'd_min_cm',
+    'distance_max_cm': 'd_max_cm',
+}
+
+ROLES = {
+    ('binary_sensor', 'bed_occupied'): 'occupied',
+    ('sensor', 'ld2410_still_energy'): 'energy',
+    ('sensor', 'presence_state_reason'): 'reason',
+    ('sensor', 'presence_change_reason'): 'change_reason',
+    **{('number', suffix): 'knob:' + knob for suffix, knob in KNOBS.items()},
+}
+
+# Minutes to half a day: short bed visits up to a full night
+DWELL_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400, 28800, 43200)
+
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    return ','.join(f'{key}="{escape_label(str(value))}"' for key, value in labels.items())
+
+
+def format_value(value: float) -> str:
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def sample(name: str, labels: str, value: float) -> str:
+    """One exposition line; labels is the pre-formatted text between the braces."""
+    return f'{name}{{{labels}}} {format_value(value)}\n' if labels else f'{name} {format_value(value)}\n'
+
+
+class Family:
+    """One metric family: its header and the current exposition text of each series."""
+
+    def __init__(self, name: str, kind: str, help_text: str):
+        self.name = name
+        self.kind = kind
+        self.header = f'# HELP {name} {help_text}\n# TYPE {name} {kind}\n'
+        self.series: Dict[str, str] = {}
+
+    def text(self) -> str:
+        return self.header + ''.join(self.series.values()) if self.series else ''
+
+
+class Gauge(Family):
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, 'gauge', help_text)
+
+    def set(self, labels: str, value: float) -> None:
+        self.series[labels] = sample(self.name, labels, value)
+
+    def remove(self, labels: str) -> None:
+        self.series.pop(labels, None)
+
+
+class Counter(Family):
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, 'counter', help_text)
+        self.values: Dict[str, float] = {}
+
+    def inc(self, labels: str, amount: float = 1.0) -> None:
+        value = self.values.get(labels, 0.0) + amount
+        self.values[labels] = value
+        self.series[labels] = sample(self.name, labels, value)
+
+
+class Histogram(Family):
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        super().__init__(name, 'histogram', help_text)
+        self.buckets = tuple(buckets)
+        self.bucket_labels = [format_value(bound) for bound in self.buckets] + ['+Inf']
+        # labels -> (non-cumulative bucket counts, sum)
+        self.values: Dict[str, Tuple[List[int], float]] = {}
+
+    def observe(self, labels: str, value: float) -> None:
+        counts, total = self.values.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect_left(self.buckets, value)] += 1
+        total += value
+        self.values[labels] = (counts, total)
+
+        lines, cumulative = [], 0
+        for bound, count in zip(self.bucket_labels, counts):
+            cumulative += count
+            lines.append(sample(f'{self.name}_bucket', f'{labels},le="{bound}"', cumulative))
+        lines.append(sample(f'{self.name}_sum', labels, total))
+        lines.append(sample(f'{self.name}_count', labels, cumulative))
+        self.series[labels] = ''.join(lines)
+
+
+class BedMetrics:
+    """Per-device state needed to derive the z-score and dwell times."""
+
+    __slots__ = ('labels', 'mu', 'sigma', 'energy')
+
+    def __init__(self, name: str, mu: float, sigma: float):
+        self.labels = format_labels({'device': name})
+        self.mu = mu
+        self.sigma = sigma
+        self.energy: Optional[float] = None
+
+
+def parse_time(state: Optional[Dict]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(state['last_changed']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class Exporter:
+    """Turns state_changed events into exposition text for /metrics."""
+
+    def __init__(self, client: HomeAssistantClient, mu: float = DEFAULT_MU, sigma: float = DEFAULT_SIGMA,
+                 match: Optional[str] = None, render_interval: float = 1.0):
+        self.client = client
+        self.mu = mu
+        self.sigma = sigma
+        self.match = match
+        self.render_interval = render_interval
+        self.routes: Dict[str, Tuple[BedMetrics, str]] = {}
+        self.body = b''
+        self.dirty = True
+
+        self.energy = Gauge('bed_presence_still_energy_percent', 'Latest LD2410 still energy.')
+        self.z_score = Gauge('bed_presence_z_score', 'Still energy z-score against the device baseline.')
+        self.occupied = Gauge('bed_presence_occupied', 'Bed occupied (1), vacant (0).')
+        self.available = Gauge('bed_presence_available', 'Occupancy entity is available.')
+        self.knob = Gauge('bed_presence_setting', 'Current value of each engine number entity.')
+        self.baseline_mean = Gauge('bed_presence_baseline_mean_percent', 'Baseline still energy mean (mu).')
+        self.baseline_std = Gauge('bed_presence_baseline_std_percent', 'Baseline still energy std (sigma).')
+        self.last_calibration = Gauge('bed_presence_last_calibration_timestamp_seconds',
+                                      'When the last baseline calibration completed.')
+        self.transitions = Counter('bed_presence_transitions_total', 'Occupancy changes by new state.')
+        self.change_reasons = Counter('bed_presence_change_reasons_total', 'Published change reasons.')
+        self.calibrations = Counter('bed_presence_calibrations_total', 'Completed baseline calibrations.')
+        self.dwell = Histogram('bed_presence_dwell_seconds', 'Length of finished occupied and vacant periods.',
+                               DWELL_BUCKETS)
+        self.devices = Gauge('bed_presence_exporter_devices', 'Devices followed by this exporter.')
+        self.events = Counter('bed_presence_exporter_events_total', 'state_changed events handled.')
+        self.renders = Counter('bed_presence_exporter_renders_total', 'Times the /metrics body was rebuilt.')
+        self.families: List[Family] = [
+            self.energy, self.z_score, self.occupied, self.available, self.knob,
+            self.baseline_mean, self.baseline_std, self.last_calibration,
+            self.transitions, self.change_reasons, self.calibrations, self.dwell,
+            self.devices, self.events, self.renders,
+        ]
+
+    async def start(self) -> int:
+        """Discover devices, subscribe, then seed from one get_states snapshot; returns the device count."""
+        beds = await discover_beds(self.client, ROLES, self.match)
+        for name, entities in beds:
+            bed = BedMetrics(name, self.mu, self.sigma)
+            self.baseline_mean.set(bed.labels, bed.mu)
+            self.baseline_std.set(bed.labels, bed.sigma)
+            for entity_id, role in entities.items():
+                self.routes[entity_id] = (bed, role)
+        self.devices.set('', len(beds))
+
+        await self.client.subscribe_events(self.on_event)
+        for state in await self.client.get_states():
+            route = self.routes.get(state['entity_id'])
+            if route is not None:
+                self._update(route[0], route[1], state, None)
+        self.render()
+        return len(beds)
+
+    def on_event(self, event: Dict) -> None:
+        data = event.get('data', {})
+        route = self.routes.get(data.get('entity_id'))
+        new_state = data.get('new_state')
+        if route is None or new_state is None:
+            return
+        self.events.inc('')
+        self._update(route[0], route[1], new_state, data.get('old_state'))
+        self.dirty = True
+
+    def _update(self, bed: BedMetrics, role: str, state: Dict, old_state: Optional[Dict]) -> None:
+        """Apply one state; old_state is None while seeding, so nothing is counted then."""
+        value = state.get('state')
+        if role == 'energy':
+            bed.energy = parse_float(value)
+            if bed.energy is None:
+                self.energy.remove(bed.labels)
+                self.z_score.remove(bed.labels)
+            else:
+                self.energy.set(bed.labels, bed.energy)
+                self.z_score.set(bed.labels, calculate_z_score(bed.energy, bed.mu, bed.sigma))
+        elif role == 'occupied':
+            self.available.set(bed.labels, value in ('on', 'off'))
+            if value in ('on', 'off'):
+                self.occupied.set(bed.labels, value == 'on')
+            else:
+                self.occupied.remove(bed.labels)
+            if old_state is None or old_state.get('state') == value or value not in ('on', 'off'):
+                return
+            old_value = old_state.get('state')
+            self.transitions.inc(f'{bed.labels},state="{value}"')
+            started, ended = parse_time(old_state), parse_time(state)
+            if old_value in ('on', 'off') and started is not None and ended is not None:
+                period = 'occupied' if old_value == 'on' else 'vacant'
+                self.dwell.observe(f'{bed.labels},state="{period}"', max(ended - started, 0.0))
+        elif role == 'reason':
+            # Only a completed calibration changes the baseline; progress reasons carry running estimates
+            match = BASELINE_PATTERN.match(value or '')
+            if match is None:
+                return
+            bed.mu, bed.sigma = float(match.group(1)), float(match.group(2))
+            self.baseline_mean.set(bed.labels, bed.mu)
+            self.baseline_std.set(bed.labels, bed.sigma)
+            if bed.energy is not None:
+                self.z_score.set(bed.labels, calculate_z_score(bed.energy, bed.mu, bed.sigma))
+            changed = parse_time(state)
+            if changed is not None:
+                self.last_calibration.set(bed.labels, changed)
+            if old_state is not None:
+                self.calibrations.inc(bed.labels)
+        elif role == 'change_reason':
+            if old_state is not None and value not in (None, 'unknown', 'unavailable'):
+                self.change_reasons.inc(f'{bed.labels},reason="{escape_label(value)}"')
+        else:
+            knob = parse_float(value)
+            labels = f'{bed.labels},setting="{role.split(":", 1)[1]}"'
+            if knob is None:
+                self.knob.remove(labels)
+            else:
+                self.knob.set(labels, knob)
+
+    def render(self) -> None:
+        self.renders.inc('')
+        self.body = ''.join(family.text() for family in self.families).encode()
+        self.dirty = False
+
+    async def render_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.render_interval)
+            if self.dirty:
+                self.render()
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.body, headers={'Content-Type': CONTENT_TYPE})
+
+
+async def run(args):
+    ha_url, ha_token = get_ha_config()
+    client = HomeAssistantClient(ha_url, ha_token)
+    await client.connect()
+    runner = None
+    render_task = None
+    try:
+        exporter = Exporter(client, args.mu, args.sigma, args.match, args.render_interval)
+        started = time.perf_counter()
+        count = await exporter.start()
+        if count == 0:
+            print(f"{Colors.FAIL}ERROR: No bed presence devices found in the device registry{Colors.ENDC}")
+            sys.exit(1)
+        render_task = asyncio.create_task(exporter.render_loop())
+
+        app = web.Application()
+        app.router.add_get('/metrics', exporter.handle_metrics)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, args.host, args.port).start()
+        print(f"{Colors.OKGREEN}✓ Following {count} devices "
+              f"({len(exporter.routes)} entities, ready in {time.perf_counter() - started:.1f}s){Colors.ENDC}")
+        print(f"  Serving {Colors.OKCYAN}http://{args.host}:{args.port}/metrics{Colors.ENDC}")
+
+        # The exporter is only useful while connected; exit so a supervisor restarts it
+        await client.wait_closed()
+        print(f"{Colors.FAIL}ERROR: Home Assistant connection closed{Colors.ENDC}")
+        sys.exit(1)
+    finally:
+        if render_task:
+            render_task.cancel()
+        if runner:
+            await runner.cleanup()
+        await client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prometheus exporter for bed presence telemetry')
+    parser.add_argument('--host', type=str, default='0.0.0.0', help='Listen address (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=9731, help='Listen port (default: 9731)')
+    parser.add_argument('--match', type=str, default=None,
+                        help='Only devices whose name contains this text (case-insensitive)')
+    parser.add_argument('--render-interval', type=float, default=1.0,
+                        help='Most often the /metrics body is rebuilt, in seconds (default: 1.0)')
+    parser.add_argument('--mu', type=float, default=DEFAULT_MU,
+                        help=f'Baseline mean until a device reports a calibration (default: {DEFAULT_MU})')
+    parser.add_argument('--sigma', type=float, default=DEFAULT_SIGMA,
+                        help=f'Baseline std until a device reports a calibration (default: {DEFAULT_SIGMA})')
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print(f"\n\n{Colors.WARNING}⚠️  Exporter stopped{Colors.ENDC}")
+        sys.exit(0)
+    except Exception as e:
+        print(f"\n{Colors.FAIL}❌ Unexpected error: {e}{Colors.ENDC}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -12,11 +12,18 @@ showing the relationship between:
 Usage:
     python3 monitor_phase2.py [--duration SECONDS] [--samples N]
 
+    # Overnight capture, one sample every 10 s
+    python3 monitor_phase2.py --duration 36000 --samples 3600 --csv night.csv
+
+    # Analyze recorded sessions (no Home Assistant needed)
+    python3 monitor_phase2.py --analyze night.csv corpus/night_*.csv
+
 Options:
     --duration SECONDS  Total monitoring duration in seconds (default: 60)
     --samples N         Number of samples to collect (default: 30)
     --csv FILE          Save results to CSV file
     --verbose           Show detailed state information
+    --analyze CSV...    Analyze recorded --csv files instead of monitoring
 
 Environment Variables:
     HA_URL: Home Assistant URL (default: http://localhost:8123)
@@ -29,7 +36,9 @@ import time
 import argparse
 import requests
 import csv
-from typing import Dict, List, Tuple, Optional
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Tuple, Optional
 from datetime import datetime
 from dataclasses import dataclass
 
@@ -254,124 +263,309 @@ def display_snapshot(snapshot: SensorSnapshot, mu: float, sigma: float,
         print()
 
 
-def analyze_session(snapshots: List[SensorSnapshot], mu: float, sigma: float):
-    """Analyze the collected session data and display summary statistics."""
+class Distribution:
+    """Count, sum, min/max and a fixed histogram: constant memory, approximate percentiles."""
+
+    def __init__(self, edges: Tuple[float, ...]):
+        self.edges = edges
+        self.bins = [0] * (len(edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value: float):
+        self.bins[bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Upper edge of the bin holding the percentile, clamped to the observed range."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for edge, count in zip(self.edges + (self.max,), self.bins):
+            seen += count
+            if seen >= rank:
+                return max(min(edge, self.max), self.min)
+        return self.max
+
+
+# Seconds; a short visit up to a whole night
+DWELL_EDGES = (10, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 28800)
+# Seconds from the threshold crossing to the published state change
+LATENCY_EDGES = (0.5, 1, 2, 3, 5, 10, 20, 30, 45, 60, 120, 300)
+TRANSITION_LOG_SIZE = 20
+RAPID_CHANGE_WINDOW = 10
+
+
+def parse_timestamp(timestamp: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except ValueError:
+        return None
 
-    if not snapshots:
-        return
 
-    energies = [s.energy for s in snapshots]
-    z_scores = [s.z_score for s in snapshots]
+class SessionAnalyzer:
+    """Session statistics updated one snapshot at a time, in constant memory.
 
-    # Count state changes
-    state_changes = 0
-    for i in range(1, len(snapshots)):
-        if snapshots[i].presence_state != snapshots[i-1].presence_state:
-            state_changes += 1
+    Feed it live from the monitoring loop or from a recorded CSV (see
+    read_csv()); report() prints the summary at any point.
+    """
 
-    # Calculate time in each state
-    present_count = sum(1 for s in snapshots if s.presence_state)
-    vacant_count = len(snapshots) - present_count
+    def __init__(self, mu: float, sigma: float):
+        self.mu = mu
+        self.sigma = sigma
+        self.count = 0
+        self.present_count = 0
+        self.transitions = 0
+        self.rapid_changes = 0
+        self.energy_min = float('inf')
+        self.energy_max = float('-inf')
+        self.energy_sum = 0.0
+        self.z_min = float('inf')
+        self.z_max = float('-inf')
+        self.z_sum = 0.0
+        self.last: Optional[SensorSnapshot] = None
+        self.first_time: Optional[float] = None
+        self.last_time: Optional[float] = None
+        self.transition_log: Deque[SensorSnapshot] = deque(maxlen=TRANSITION_LOG_SIZE)
+        # Completed periods only; the ones cut off by the start or end of the session are left out
+        self.dwell = {True: Distribution(DWELL_EDGES), False: Distribution(DWELL_EDGES)}
+        self.latency = {True: Distribution(LATENCY_EDGES), False: Distribution(LATENCY_EDGES)}
+        self._period_start: Optional[float] = None
+        self._crossing_since: Optional[float] = None
+
+    def add(self, snapshot: SensorSnapshot):
+        now = parse_timestamp(snapshot.timestamp)
+        self.count += 1
+        self.present_count += snapshot.presence_state
+        self.energy_min = min(self.energy_min, snapshot.energy)
+        self.energy_max = max(self.energy_max, snapshot.energy)
+        self.energy_sum += snapshot.energy
+        self.z_min = min(self.z_min, snapshot.z_score)
+        self.z_max = max(self.z_max, snapshot.z_score)
+        self.z_sum += snapshot.z_score
+        if self.first_time is None:
+            self.first_time = now
+        self.last_time = now
+
+        previous = self.last
+        if previous is not None and previous.presence_state != snapshot.presence_state:
+            self.transitions += 1
+            if self.count <= RAPID_CHANGE_WINDOW:
+                self.rapid_changes += 1
+            self.transition_log.append(snapshot)
+            if now is not None:
+                if self._period_start is not None:
+                    self.dwell[previous.presence_state].add(now - self._period_start)
+                if self._crossing_since is not None:
+                    self.latency[snapshot.presence_state].add(now - self._crossing_since)
+            self._period_start = now
+            self._crossing_since = None
+
+        # Start of the current run of samples that should lead to leaving this state
+        if snapshot.presence_state:
+            crossing = snapshot.z_score < snapshot.k_off
+        else:
+            crossing = snapshot.z_score >= snapshot.k_on
+        if not crossing:
+            self._crossing_since = None
+        elif self._crossing_since is None:
+            self._crossing_since = now
+
+        self.last = snapshot
+
+    def report(self):
+        """Display summary statistics of everything added so far."""
+        if not self.count:
+            return
+
+        mu, sigma, last = self.mu, self.sigma, self.last
+        vacant_count = self.count - self.present_count
+
+        print(f"\n{Colors.HEADER}{Colors.BOLD}")
+        print("=" * 80)
+        print("  SESSION ANALYSIS")
+        print("=" * 80)
+        print(f"{Colors.ENDC}")
+
+        print(f"\n{Colors.OKBLUE}Baseline Configuration:{Colors.ENDC}")
+        print(f"  μ (mean):              {mu:.2f}%")
+        print(f"  σ (std dev):           {sigma:.2f}%")
+        print(f"  k_on threshold:        {last.k_on:.1f}σ = {mu + (last.k_on * sigma):.2f}%")
+        print(f"  k_off threshold:       {last.k_off:.1f}σ = {mu + (last.k_off * sigma):.2f}%")
+        print(f"  Hysteresis gap:        {(last.k_on - last.k_off) * sigma:.2f}%")
+
+        print(f"\n{Colors.OKBLUE}Phase 2 Debounce Configuration:{Colors.ENDC}")
+        print(f"  ON debounce:           {last.on_debounce_ms}ms")
+        print(f"  OFF debounce:          {last.off_debounce_ms}ms")
+        print(f"  Absolute clear delay:  {last.abs_clear_delay_ms}ms")
+
+        print(f"\n{Colors.OKBLUE}Energy Statistics:{Colors.ENDC}")
+        print(f"  Min energy:            {self.energy_min:.2f}%")
+        print(f"  Max energy:            {self.energy_max:.2f}%")
+        print(f"  Mean energy:           {self.energy_sum / self.count:.2f}%")
+        print(f"  Range:                 {self.energy_max - self.energy_min:.2f}%")
+
+        print(f"\n{Colors.OKBLUE}Z-Score Statistics:{Colors.ENDC}")
+        print(f"  Min z-score:           {self.z_min:+.2f}σ")
+        print(f"  Max z-score:           {self.z_max:+.2f}σ")
+        print(f"  Mean z-score:          {self.z_sum / self.count:+.2f}σ")
+
+        print(f"\n{Colors.OKBLUE}State Machine Behavior:{Colors.ENDC}")
+        if self.first_time is not None and self.last_time is not None:
+            print(f"  Session length:        {format_duration(self.last_time - self.first_time)}")
+        print(f"  State transitions:     {self.transitions}")
+        print(f"  Time PRESENT:          {self.present_count}/{self.count} samples "
+              f"({self.present_count / self.count * 100:.1f}%)")
+        print(f"  Time VACANT:           {vacant_count}/{self.count} samples ({vacant_count / self.count * 100:.1f}%)")
+
+        if any(d.count for d in self.dwell.values()):
+            print(f"\n{Colors.OKBLUE}Dwell Times (completed periods):{Colors.ENDC}")
+            for present, name in ((True, 'PRESENT'), (False, 'VACANT')):
+                print_distribution(name, self.dwell[present])
+
+        if any(d.count for d in self.latency.values()):
+            print(f"\n{Colors.OKBLUE}Transition Latency (threshold crossing → state change):{Colors.ENDC}")
+            print_distribution('ON', self.latency[True])
+            print_distribution('OFF', self.latency[False])
+            print("  (resolution: one sample; OFF includes the absolute clear delay)")
+
+        # Show state transition log
+        if self.transitions > 0:
+            print(f"\n{Colors.OKBLUE}State Transition Log:{Colors.ENDC}")
+            if self.transitions > len(self.transition_log):
+                print(f"  ... {self.transitions - len(self.transition_log)} earlier transitions not shown")
+            for snapshot in self.transition_log:
+                if snapshot.presence_state:
+                    print(f"  {snapshot.timestamp}: {Colors.OKGREEN}VACANT → PRESENT{Colors.ENDC} "
+                          f"(z={snapshot.z_score:+.2f}σ, energy={snapshot.energy:.2f}%)")
+                else:
+                    print(f"  {snapshot.timestamp}: {Colors.WARNING}PRESENT → VACANT{Colors.ENDC} "
+                          f"(z={snapshot.z_score:+.2f}σ, energy={snapshot.energy:.2f}%)")
 
-    print(f"\n{Colors.HEADER}{Colors.BOLD}")
-    print("=" * 80)
-    print("  SESSION ANALYSIS")
-    print("=" * 80)
-    print(f"{Colors.ENDC}")
+        # Phase 2 validation checks
+        print(f"\n{Colors.OKBLUE}Phase 2 Validation Checks:{Colors.ENDC}")
 
-    print(f"\n{Colors.OKBLUE}Baseline Configuration:{Colors.ENDC}")
-    print(f"  μ (mean):              {mu:.2f}%")
-    print(f"  σ (std dev):           {sigma:.2f}%")
-    print(f"  k_on threshold:        {snapshots[-1].k_on:.1f}σ = {mu + (snapshots[-1].k_on * sigma):.2f}%")
-    print(f"  k_off threshold:       {snapshots[-1].k_off:.1f}σ = {mu + (snapshots[-1].k_off * sigma):.2f}%")
-    print(f"  Hysteresis gap:        {(snapshots[-1].k_on - snapshots[-1].k_off) * sigma:.2f}%")
-
-    print(f"\n{Colors.OKBLUE}Phase 2 Debounce Configuration:{Colors.ENDC}")
-    print(f"  ON debounce:           {snapshots[-1].on_debounce_ms}ms")
-    print(f"  OFF debounce:          {snapshots[-1].off_debounce_ms}ms")
-    print(f"  Absolute clear delay:  {snapshots[-1].abs_clear_delay_ms}ms")
-
-    print(f"\n{Colors.OKBLUE}Energy Statistics:{Colors.ENDC}")
-    print(f"  Min energy:            {min(energies):.2f}%")
-    print(f"  Max energy:            {max(energies):.2f}%")
-    print(f"  Mean energy:           {sum(energies)/len(energies):.2f}%")
-    print(f"  Range:                 {max(energies) - min(energies):.2f}%")
-
-    print(f"\n{Colors.OKBLUE}Z-Score Statistics:{Colors.ENDC}")
-    print(f"  Min z-score:           {min(z_scores):+.2f}σ")
-    print(f"  Max z-score:           {max(z_scores):+.2f}σ")
-    print(f"  Mean z-score:          {sum(z_scores)/len(z_scores):+.2f}σ")
-
-    print(f"\n{Colors.OKBLUE}State Machine Behavior:{Colors.ENDC}")
-    print(f"  State transitions:     {state_changes}")
-    print(f"  Time PRESENT:          {present_count}/{len(snapshots)} samples ({present_count/len(snapshots)*100:.1f}%)")
-    print(f"  Time VACANT:           {vacant_count}/{len(snapshots)} samples ({vacant_count/len(snapshots)*100:.1f}%)")
-
-    # Show state transition log
-    if state_changes > 0:
-        print(f"\n{Colors.OKBLUE}State Transition Log:{Colors.ENDC}")
-        for i in range(1, len(snapshots)):
-            if snapshots[i].presence_state != snapshots[i-1].presence_state:
-                if snapshots[i].presence_state:
-                    print(f"  {snapshots[i].timestamp}: {Colors.OKGREEN}VACANT → PRESENT{Colors.ENDC} "
-                          f"(z={snapshots[i].z_score:+.2f}σ, energy={snapshots[i].energy:.2f}%)")
-                else:
-                    print(f"  {snapshots[i].timestamp}: {Colors.WARNING}PRESENT → VACANT{Colors.ENDC} "
-                          f"(z={snapshots[i].z_score:+.2f}σ, energy={snapshots[i].energy:.2f}%)")
+        # Check if debouncing is working (no rapid oscillation)
+        if self.rapid_changes > 3:
+            print(f"  {Colors.WARNING}⚠️  High state change rate detected in first {RAPID_CHANGE_WINDOW} samples{Colors.ENDC}")
+            print("     Consider increasing debounce timers")
+        else:
+            print(f"  {Colors.OKGREEN}✓{Colors.ENDC} State stability: Good (no rapid oscillation)")
 
-    # Phase 2 validation checks
-    print(f"\n{Colors.OKBLUE}Phase 2 Validation Checks:{Colors.ENDC}")
+        # Check hysteresis gap
+        hysteresis_gap = (last.k_on - last.k_off) * sigma
+        if hysteresis_gap < 5.0:
+            print(f"  {Colors.WARNING}⚠️  Small hysteresis gap ({hysteresis_gap:.2f}%){Colors.ENDC}")
+            print("     Consider increasing k_on or decreasing k_off")
+        else:
+            print(f"  {Colors.OKGREEN}✓{Colors.ENDC} Hysteresis gap: {hysteresis_gap:.2f}% (good)")
 
-    # Check if debouncing is working (no rapid oscillation)
-    rapid_changes = 0
-    for i in range(1, min(len(snapshots), 10)):
-        if snapshots[i].presence_state != snapshots[i-1].presence_state:
-            rapid_changes += 1
+        print()
 
-    if rapid_changes > 3:
-        print(f"  {Colors.WARNING}⚠️  High state change rate detected in first 10 samples{Colors.ENDC}")
-        print(f"     Consider increasing debounce timers")
-    else:
-        print(f"  {Colors.OKGREEN}✓{Colors.ENDC} State stability: Good (no rapid oscillation)")
 
-    # Check hysteresis gap
-    hysteresis_gap = (snapshots[-1].k_on - snapshots[-1].k_off) * sigma
-    if hysteresis_gap < 5.0:
-        print(f"  {Colors.WARNING}⚠️  Small hysteresis gap ({hysteresis_gap:.2f}%){Colors.ENDC}")
-        print(f"     Consider increasing k_on or decreasing k_off")
-    else:
-        print(f"  {Colors.OKGREEN}✓{Colors.ENDC} Hysteresis gap: {hysteresis_gap:.2f}% (good)")
+def format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}min"
+    return f"{seconds / 3600:.2f}h"
 
-    print()
 
+def print_distribution(name: str, distribution: Distribution):
+    if not distribution.count:
+        print(f"  {name + ':':<22} -")
+        return
+    print(f"  {name + ':':<22} n={distribution.count}, "
+          f"min {format_duration(distribution.min)}, "
+          f"p50 ≤{format_duration(distribution.percentile(0.5))}, "
+          f"p90 ≤{format_duration(distribution.percentile(0.9))}, "
+          f"max {format_duration(distribution.max)}, "
+          f"mean {format_duration(distribution.mean)}")
 
-def save_to_csv(snapshots: List[SensorSnapshot], filename: str, mu: float, sigma: float):
-    """Save collected data to CSV file."""
 
-    with open(filename, 'w', newline='') as csvfile:
-        fieldnames = ['timestamp', 'energy_%', 'z_score', 'presence_state',
-                     'state_reason', 'k_on', 'k_off', 'on_threshold_%', 'off_threshold_%',
-                     'on_debounce_ms', 'off_debounce_ms', 'abs_clear_delay_ms']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+def analyze_session(snapshots: Iterable[SensorSnapshot], mu: float, sigma: float) -> SessionAnalyzer:
+    """Analyze the collected session data and display summary statistics."""
+    analyzer = SessionAnalyzer(mu, sigma)
+    for snapshot in snapshots:
+        analyzer.add(snapshot)
+    analyzer.report()
+    return analyzer
+
+
+CSV_FIELDS = ['timestamp', 'energy_%', 'z_score', 'presence_state',
+              'state_reason', 'k_on', 'k_off', 'on_threshold_%', 'off_threshold_%',
+              'on_debounce_ms', 'off_debounce_ms', 'abs_clear_delay_ms']
+
+
+def snapshot_row(s: SensorSnapshot, mu: float, sigma: float) -> Dict:
+    return {
+        'timestamp': s.timestamp,
+        'energy_%': f"{s.energy:.2f}",
+        'z_score': f"{s.z_score:.2f}",
+        'presence_state': 'PRESENT' if s.presence_state else 'VACANT',
+        'state_reason': s.state_reason,
+        'k_on': f"{s.k_on:.1f}",
+        'k_off': f"{s.k_off:.1f}",
+        'on_threshold_%': f"{mu + (s.k_on * sigma):.2f}",
+        'off_threshold_%': f"{mu + (s.k_off * sigma):.2f}",
+        'on_debounce_ms': s.on_debounce_ms,
+        'off_debounce_ms': s.off_debounce_ms,
+        'abs_clear_delay_ms': s.abs_clear_delay_ms
+    }
 
-        writer.writeheader()
-        for s in snapshots:
-            writer.writerow({
-                'timestamp': s.timestamp,
-                'energy_%': f"{s.energy:.2f}",
-                'z_score': f"{s.z_score:.2f}",
-                'presence_state': 'PRESENT' if s.presence_state else 'VACANT',
-                'state_reason': s.state_reason,
-                'k_on': f"{s.k_on:.1f}",
-                'k_off': f"{s.k_off:.1f}",
-                'on_threshold_%': f"{mu + (s.k_on * sigma):.2f}",
-                'off_threshold_%': f"{mu + (s.k_off * sigma):.2f}",
-                'on_debounce_ms': s.on_debounce_ms,
-                'off_debounce_ms': s.off_debounce_ms,
-                'abs_clear_delay_ms': s.abs_clear_delay_ms
-            })
-
-    print(f"{Colors.OKGREEN}💾 Data saved to: {filename}{Colors.ENDC}")
+
+def read_csv(filename: str) -> Iterator[SensorSnapshot]:
+    """Stream snapshots back from a --csv file (or a generate_sessions.py --csv night)."""
+    with open(filename, newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield SensorSnapshot(
+                timestamp=row['timestamp'],
+                energy=float(row['energy_%']),
+                z_score=float(row['z_score']),
+                presence_state=row['presence_state'] == 'PRESENT',
+                state_reason=row['state_reason'],
+                k_on=float(row['k_on']),
+                k_off=float(row['k_off']),
+                on_debounce_ms=int(row['on_debounce_ms']),
+                off_debounce_ms=int(row['off_debounce_ms']),
+                abs_clear_delay_ms=int(row['abs_clear_delay_ms'])
+            )
+
+
+def csv_baseline(filename: str) -> Optional[Tuple[float, float]]:
+    """μ and σ recorded in a --csv file, recovered from its first row's thresholds."""
+    with open(filename, newline='') as csvfile:
+        row = next(csv.DictReader(csvfile), None)
+    if row is None:
+        return None
+    k_on, k_off = float(row['k_on']), float(row['k_off'])
+    on_threshold, off_threshold = float(row['on_threshold_%']), float(row['off_threshold_%'])
+    if k_on == k_off:
+        return None
+    sigma = (on_threshold - off_threshold) / (k_on - k_off)
+    return on_threshold - k_on * sigma, sigma
+
+
+def analyze_files(filenames: List[str]):
+    """Analyze recorded sessions one row at a time, without Home Assistant."""
+    for filename in filenames:
+        baseline = csv_baseline(filename)
+        if baseline is None:
+            print(f"{Colors.WARNING}⚠️  {filename}: no samples{Colors.ENDC}")
+            continue
+        mu, sigma = baseline
+        print(f"📂 {Colors.OKCYAN}{filename}{Colors.ENDC}")
+        analyze_session(read_csv(filename), mu, sigma)
 
 
 def main():
@@ -384,9 +578,15 @@ def main():
                        help='Save results to CSV file')
     parser.add_argument('--verbose', action='store_true',
                        help='Show detailed state information')
+    parser.add_argument('--analyze', type=str, nargs='+', default=None, metavar='CSV',
+                       help='Analyze recorded --csv files instead of monitoring')
 
     args = parser.parse_args()
 
+    if args.analyze:
+        analyze_files(args.analyze)
+        return
+
     print(f"{Colors.HEADER}{Colors.BOLD}")
     print("=" * 80)
     print("  PHASE 2 INTEGRATION TESTING & MONITORING")
@@ -417,16 +617,22 @@ def main():
     # Start monitoring
     print(f"\n{Colors.OKBLUE}📊 Collecting {args.samples} samples over {args.duration} seconds...{Colors.ENDC}\n")
 
-    snapshots = []
+    # Samples go straight into the analyzer and the CSV, so overnight captures use constant memory
+    analyzer = SessionAnalyzer(mu, sigma)
     interval = args.duration / args.samples
+    csvfile = open(args.csv, 'w', newline='') if args.csv else None
+    writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDS) if csvfile else None
+    if writer:
+        writer.writeheader()
 
     try:
         for i in range(args.samples):
             snapshot = collect_snapshot(ha_url, ha_token, mu, sigma)
-            snapshots.append(snapshot)
-
-            prev_snapshot = snapshots[-2] if len(snapshots) > 1 else None
-            display_snapshot(snapshot, mu, sigma, args.verbose, prev_snapshot)
+            display_snapshot(snapshot, mu, sigma, args.verbose, analyzer.last)
+            analyzer.add(snapshot)
+            if writer:
+                writer.writerow(snapshot_row(snapshot, mu, sigma))
+                csvfile.flush()
 
             # Sleep until next sample (except after last sample)
             if i < args.samples - 1:
@@ -434,14 +640,16 @@ def main():
 
     except KeyboardInterrupt:
         print(f"\n\n{Colors.WARNING}⚠️  Monitoring interrupted by user{Colors.ENDC}\n")
+    finally:
+        if csvfile:
+            csvfile.close()
 
     # Analyze results
-    if snapshots:
-        analyze_session(snapshots, mu, sigma)
+    if analyzer.count:
+        analyzer.report()
 
-        # Save to CSV if requested
         if args.csv:
-            save_to_csv(snapshots, args.csv, mu, sigma)
+            print(f"{Colors.OKGREEN}💾 Data saved to: {args.csv}{Colors.ENDC}")
 
     print(f"{Colors.OKGREEN}✅ Monitoring complete!{Colors.ENDC}\n")
 
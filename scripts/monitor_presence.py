@@ -7,21 +7,44 @@ This script monitors the bed presence sensor in real-time, displaying:
 - Calculated z-score
 - Current presence state
 - Threshold values
+- Rolling charts of still energy and z-score with the ON/OFF threshold lines
+
+The view is drawn with curses, which only sends the cells that changed, at up
+to 10 redraws per second. Readings arrive through one Home Assistant WebSocket
+subscription; the charts sample the latest values on every redraw into
+fixed-size ring buffers.
 
 Usage:
     python3 monitor_presence.py
 
+    # Slower redraw and a longer history
+    python3 monitor_presence.py --hz 4 --history 1200
+
+Keys: q to quit.
+
 Environment Variables:
     HA_URL: Home Assistant URL (default: http://localhost:8123)
     HA_TOKEN: Long-lived access token (required)
+
+Requires aiohttp and requests (and windows-curses on Windows).
 """
 
+import argparse
+import asyncio
+import curses
 import os
+import re
 import sys
-import time
 import requests
+from collections import deque
 from datetime import datetime
-from typing import Dict, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'tests' / 'e2e'))
+
+from hass_ws import HomeAssistantClient  # noqa: E402
 
 # ANSI color codes for terminal output
 class Colors:
@@ -61,7 +84,7 @@ def get_ha_config() -> tuple[str, str]:
 
     if not ha_token:
         print(f"{Colors.FAIL}ERROR: HA_TOKEN not found in environment or .env.local{Colors.ENDC}")
-        print(f"Please set the HA_TOKEN environment variable or add it to .env.local")
+        print("Please set the HA_TOKEN environment variable or add it to .env.local")
         sys.exit(1)
 
     return ha_url, ha_token
@@ -97,178 +120,258 @@ def calculate_z_score(energy: float, mu: float, sigma: float) -> float:
     return (energy - mu) / sigma
 
 
-def format_state(state: str) -> str:
-    """Format presence state with color."""
-    if state == 'on':
-        return f"{Colors.OKGREEN}{Colors.BOLD}OCCUPIED{Colors.ENDC}"
-    elif state == 'off':
-        return f"{Colors.OKCYAN}VACANT{Colors.ENDC}"
-    else:
-        return f"{Colors.WARNING}{state.upper()}{Colors.ENDC}"
-
-
-def format_z_score(z: float, k_on: float, k_off: float) -> str:
-    """Format z-score with color based on threshold comparison."""
-    if z > k_on:
-        color = Colors.OKGREEN
-        indicator = ">>>"
-    elif z < k_off:
-        color = Colors.OKCYAN
-        indicator = "<<<"
-    else:
-        color = Colors.WARNING
-        indicator = "~~~"
-
-    return f"{color}{z:6.2f} {indicator}{Colors.ENDC}"
-
-
-def clear_screen():
-    """Clear the terminal screen."""
-    os.system('clear' if os.name != 'nt' else 'cls')
-
-
-def print_header():
-    """Print the header."""
-    print(f"{Colors.HEADER}{Colors.BOLD}")
-    print("=" * 80)
-    print("  BED PRESENCE DETECTION - REAL-TIME MONITOR")
-    print("=" * 80)
-    print(f"{Colors.ENDC}")
-
-
-def print_baseline_info(mu: float, sigma: float):
-    """Print baseline calibration info."""
-    print(f"{Colors.OKBLUE}Baseline Calibration:{Colors.ENDC}")
-    print(f"  Mean (μ):              {mu:.2f}%")
-    print(f"  Std Dev (σ):           {sigma:.2f}%")
-    print()
-
-
-def print_thresholds(k_on: float, k_off: float):
-    """Print threshold values."""
-    print(f"{Colors.OKBLUE}Detection Thresholds:{Colors.ENDC}")
-    print(f"  k_on (turn ON):        {k_on:.1f} std deviations")
-    print(f"  k_off (turn OFF):      {k_off:.1f} std deviations")
-    print(f"  Hysteresis gap:        {k_on - k_off:.1f} std deviations")
-    print()
-
-
-def print_sensor_data(still_energy: float, z_score: float, state: str,
-                      k_on: float, k_off: float, reason: str):
-    """Print current sensor readings."""
-    timestamp = datetime.now().strftime("%H:%M:%S")
-
-    print(f"{Colors.BOLD}Current Readings ({timestamp}):{Colors.ENDC}")
-    print(f"  Still Energy:          {still_energy:.1f}%")
-    print(f"  Z-Score:               {format_z_score(z_score, k_on, k_off)} (k_on={k_on:.1f}, k_off={k_off:.1f})")
-    print(f"  Presence State:        {format_state(state)}")
-    if reason:
-        print(f"  State Reason:          {reason}")
-    print()
-
-
-def print_legend():
-    """Print legend for z-score indicators."""
-    print(f"{Colors.BOLD}Legend:{Colors.ENDC}")
-    print(f"  {Colors.OKGREEN}>>> GREEN{Colors.ENDC}  : z-score > k_on  (should be OCCUPIED)")
-    print(f"  {Colors.OKCYAN}<<< CYAN{Colors.ENDC}   : z-score < k_off (should be VACANT)")
-    print(f"  {Colors.WARNING}~~~ YELLOW{Colors.ENDC} : k_off < z-score < k_on (hysteresis zone)")
-    print()
-    print(f"{Colors.WARNING}Press Ctrl+C to stop monitoring{Colors.ENDC}")
-    print()
-
-
-def monitor_loop(ha_url: str, ha_token: str):
-    """Main monitoring loop."""
-    # Hardcoded baseline from calibration
-    MU = 6.3
-    SIGMA = 2.6
-
-    # Entity IDs
-    STILL_ENERGY = "sensor.bed_presence_detector_ld2410_still_energy"
-    BED_OCCUPIED = "binary_sensor.bed_presence_detector_bed_occupied"
-    K_ON = "number.bed_presence_detector_k_on_on_threshold_multiplier"
-    K_OFF = "number.bed_presence_detector_k_off_off_threshold_multiplier"
-    STATE_REASON = "sensor.bed_presence_detector_presence_state_reason"
-
-    print_header()
-    print_baseline_info(MU, SIGMA)
-
-    # Get initial threshold values
-    k_on_state = get_entity_state(ha_url, ha_token, K_ON)
-    k_off_state = get_entity_state(ha_url, ha_token, K_OFF)
-
-    if not k_on_state or not k_off_state:
-        print(f"{Colors.FAIL}ERROR: Could not fetch threshold entities{Colors.ENDC}")
-        print(f"Make sure the device is online and entity names are correct.")
-        sys.exit(1)
-
-    k_on_val = float(k_on_state['state'])
-    k_off_val = float(k_off_state['state'])
-
-    print_thresholds(k_on_val, k_off_val)
-    print_legend()
-
-    print(f"{Colors.HEADER}{'=' * 80}{Colors.ENDC}")
-    print()
-
-    # Monitoring loop
-    last_thresholds = (k_on_val, k_off_val)
-
-    while True:
-        try:
-            # Fetch current values
-            energy_state = get_entity_state(ha_url, ha_token, STILL_ENERGY)
-            occupied_state = get_entity_state(ha_url, ha_token, BED_OCCUPIED)
-            k_on_state = get_entity_state(ha_url, ha_token, K_ON)
-            k_off_state = get_entity_state(ha_url, ha_token, K_OFF)
-            reason_state = get_entity_state(ha_url, ha_token, STATE_REASON)
-
-            if not energy_state or not occupied_state:
-                print(f"{Colors.FAIL}ERROR: Could not fetch entity states{Colors.ENDC}")
-                time.sleep(2)
-                continue
-
-            # Parse values
-            energy = float(energy_state['state'])
-            state = occupied_state['state']
-            k_on_val = float(k_on_state['state']) if k_on_state else last_thresholds[0]
-            k_off_val = float(k_off_state['state']) if k_off_state else last_thresholds[1]
-            reason = reason_state['state'] if reason_state else ""
-
-            # Calculate z-score
-            z_score = calculate_z_score(energy, MU, SIGMA)
-
-            # Check if thresholds changed
-            current_thresholds = (k_on_val, k_off_val)
-            if current_thresholds != last_thresholds:
-                # Move cursor up and reprint threshold info
-                print(f"\033[7A")  # Move up 7 lines
-                print_thresholds(k_on_val, k_off_val)
-                print_legend()
-                print(f"{Colors.HEADER}{'=' * 80}{Colors.ENDC}")
-                print()
-                last_thresholds = current_thresholds
-
-            # Print sensor data
-            print_sensor_data(energy, z_score, state, k_on_val, k_off_val, reason)
-
-            # Wait before next update
-            time.sleep(1)
-
-            # Move cursor up to overwrite previous reading
-            print(f"\033[{7 if reason else 6}A", end='')
-
-        except KeyboardInterrupt:
-            print(f"\n\n{Colors.OKGREEN}Monitoring stopped by user{Colors.ENDC}")
-            sys.exit(0)
-        except Exception as e:
-            print(f"\n{Colors.FAIL}ERROR: {e}{Colors.ENDC}")
-            time.sleep(2)
+# Entity IDs
+STILL_ENERGY = "sensor.bed_presence_detector_ld2410_still_energy"
+BED_OCCUPIED = "binary_sensor.bed_presence_detector_bed_occupied"
+K_ON = "number.bed_presence_detector_k_on_on_threshold_multiplier"
+K_OFF = "number.bed_presence_detector_k_off_off_threshold_multiplier"
+STATE_REASON = "sensor.bed_presence_detector_presence_state_reason"
+
+# Hardcoded baseline from calibration, replaced by the device's after a calibration
+MU = 6.3
+SIGMA = 2.6
+
+# Baseline in the state reason after a calibration ("Calibration complete: μ=6.21, σ=2.87, n=300").
+# Progress reasons ("Calibrating: n=120, μ=6.30, σ=2.91, ~18s left") carry estimates the engine has not applied.
+BASELINE_PATTERN = re.compile(r'^Calibration complete: μ=(-?[\d.]+), σ=(-?[\d.]+)')
+
+MAX_HZ = 10.0
+BLOCKS = ' ▁▂▃▄▅▆▇█'
+CHART_LABEL_WIDTH = 8
+# Header, readings, chart titles and footer around the two charts
+FIXED_ROWS = 12
+
+# curses color pairs
+GREEN, CYAN, YELLOW, RED, MAGENTA = range(1, 6)
+
+
+class DashboardState:
+    """Latest readings, and ring buffers of what the charts show."""
+
+    def __init__(self, history: int, mu: float = MU, sigma: float = SIGMA):
+        self.mu = mu
+        self.sigma = sigma
+        self.energy: Optional[float] = None
+        self.occupied = 'unknown'
+        self.k_on: Optional[float] = None
+        self.k_off: Optional[float] = None
+        self.reason = ''
+        self.last_update: Optional[datetime] = None
+        self.energy_history: Deque[float] = deque(maxlen=history)
+        self.z_history: Deque[float] = deque(maxlen=history)
+
+    @property
+    def z_score(self) -> Optional[float]:
+        if self.energy is None:
+            return None
+        return calculate_z_score(self.energy, self.mu, self.sigma)
+
+    def update(self, entity_id: str, state: Dict) -> None:
+        value = state.get('state')
+        self.last_update = datetime.now()
+        if entity_id == STILL_ENERGY:
+            self.energy = parse_number(value, self.energy)
+        elif entity_id == BED_OCCUPIED:
+            self.occupied = value
+        elif entity_id == K_ON:
+            self.k_on = parse_number(value, self.k_on)
+        elif entity_id == K_OFF:
+            self.k_off = parse_number(value, self.k_off)
+        elif entity_id == STATE_REASON:
+            self.reason = value or ''
+            match = BASELINE_PATTERN.match(self.reason)
+            if match:
+                self.mu, self.sigma = float(match.group(1)), float(match.group(2))
+
+    def sample(self) -> None:
+        """Append the current values to the charts (one column per redraw)."""
+        z = self.z_score
+        if z is not None:
+            self.energy_history.append(self.energy)
+            self.z_history.append(z)
+
+    def energy_threshold(self, k: Optional[float]) -> Optional[float]:
+        return None if k is None else self.mu + k * self.sigma
+
+
+def parse_number(value: Optional[str], previous: Optional[float]) -> Optional[float]:
+    """Float state, keeping the previous value through "unavailable" and the like."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return previous
+
+
+def chart_rows(values: Sequence[float], height: int, width: int,
+               thresholds: Sequence[Tuple[float, str]]) -> Tuple[List[str], List[Optional[str]], float, float]:
+    """Render the newest `width` values as `height` rows of block characters.
+
+    Returns (rows top to bottom, threshold label per row or None, low, high).
+    Threshold lines are drawn as '─' in the empty cells of their row.
+    """
+    values = list(values)[-width:]
+    levels = [value for value, _ in thresholds]
+    low = min(values + levels)
+    high = max(values + levels)
+    if high - low < 1e-6:
+        high = low + 1.0
+    # Headroom so the top threshold line is not the chart's edge
+    span = high - low
+    low, high = low - span * 0.05, high + span * 0.05
+    scale = height * 8 / (high - low)
+
+    table = column_table(height)
+    top = height * 8
+    columns = [table[min(max(int(round((value - low) * scale)), 0), top)] for value in values]
+    rows = [''.join(cells).ljust(width) for cells in zip(*columns)]
+
+    labels: List[Optional[str]] = [None] * height
+    for level, label in thresholds:
+        row = height - 1 - min(int((level - low) * scale / 8), height - 1)
+        rows[row] = rows[row].replace(' ', '─')
+        labels[row] = label
+    return rows, labels, low, high
+
+
+@lru_cache(maxsize=8)
+def column_table(height: int) -> List[Tuple[str, ...]]:
+    """Chart column (top to bottom) for every fill level from 0 to height * 8 eighths."""
+    return [tuple(BLOCKS[max(0, min(8, eighths - (height - 1 - row) * 8))] for row in range(height))
+            for eighths in range(height * 8 + 1)]
+
+
+class Dashboard:
+    """Draws DashboardState into a curses screen."""
+
+    def __init__(self, screen, state: DashboardState, ha_url: str):
+        self.screen = screen
+        self.state = state
+        self.ha_url = ha_url
+        curses.curs_set(0)
+        curses.use_default_colors()
+        for pair, color in ((GREEN, curses.COLOR_GREEN), (CYAN, curses.COLOR_CYAN),
+                            (YELLOW, curses.COLOR_YELLOW), (RED, curses.COLOR_RED),
+                            (MAGENTA, curses.COLOR_MAGENTA)):
+            curses.init_pair(pair, color, -1)
+        screen.nodelay(True)
+
+    def put(self, y: int, x: int, text: str, attr: int = 0) -> None:
+        rows, cols = self.screen.getmaxyx()
+        if 0 <= y < rows and x < cols:
+            # The bottom-right cell cannot be written without scrolling
+            limit = cols - x - (1 if y == rows - 1 else 0)
+            try:
+                self.screen.addstr(y, x, text[:limit], attr)
+            except curses.error:
+                pass
+
+    def z_attr(self, z: float) -> int:
+        state = self.state
+        if state.k_on is not None and z > state.k_on:
+            return curses.color_pair(GREEN)
+        if state.k_off is not None and z < state.k_off:
+            return curses.color_pair(CYAN)
+        return curses.color_pair(YELLOW)
+
+    def draw(self) -> None:
+        state = self.state
+        rows, cols = self.screen.getmaxyx()
+        # erase() only clears the buffer; refresh() still sends just the changed cells
+        self.screen.erase()
+        bold = curses.A_BOLD
+
+        self.put(0, 0, "BED PRESENCE DETECTION - REAL-TIME MONITOR", curses.color_pair(MAGENTA) | bold)
+        self.put(0, max(cols - 9, 45), datetime.now().strftime("%H:%M:%S"))
+        self.put(1, 0, f"{self.ha_url}   μ={state.mu:.2f}%  σ={state.sigma:.2f}%")
+
+        k_on = '-' if state.k_on is None else f"{state.k_on:.1f}"
+        k_off = '-' if state.k_off is None else f"{state.k_off:.1f}"
+        gap = '-' if state.k_on is None or state.k_off is None else f"{state.k_on - state.k_off:.1f}"
+        self.put(2, 0, f"k_on {k_on}σ   k_off {k_off}σ   hysteresis gap {gap}σ")
+
+        if state.occupied == 'on':
+            self.put(4, 0, "OCCUPIED", curses.color_pair(GREEN) | bold)
+        elif state.occupied == 'off':
+            self.put(4, 0, "VACANT", curses.color_pair(CYAN) | bold)
+        else:
+            self.put(4, 0, str(state.occupied).upper(), curses.color_pair(YELLOW) | bold)
+        z = state.z_score
+        if z is not None:
+            self.put(4, 12, f"Still energy {state.energy:5.1f}%")
+            self.put(4, 34, "z ")
+            self.put(4, 36, f"{z:+6.2f}σ", self.z_attr(z) | bold)
+        self.put(5, 0, f"Reason: {state.reason}")
+
+        chart_height = max((rows - FIXED_ROWS) // 2, 2)
+        width = max(cols - CHART_LABEL_WIDTH - 1, 10)
+        top = 7
+        on_energy, off_energy = state.energy_threshold(state.k_on), state.energy_threshold(state.k_off)
+        charts = (
+            ("Still energy (%)", state.energy_history,
+             [(level, label) for level, label in ((on_energy, 'on'), (off_energy, 'off')) if level is not None]),
+            ("z-score (σ)", state.z_history,
+             [(level, label) for level, label in ((state.k_on, 'k_on'), (state.k_off, 'k_off')) if level is not None]),
+        )
+        for title, history, thresholds in charts:
+            self.put(top, 0, title, bold)
+            if history:
+                lines, labels, low, high = chart_rows(history, chart_height, width, thresholds)
+                for offset, (line, label) in enumerate(zip(lines, labels)):
+                    self.put(top + 1 + offset, 0, line, curses.color_pair(YELLOW) if label else 0)
+                    if label:
+                        self.put(top + 1 + offset, width + 1, label, curses.color_pair(YELLOW))
+                self.put(top + 1, width + 1, f"{high:.1f}")
+                self.put(top + chart_height, width + 1, f"{low:.1f}")
+            top += chart_height + 2
+
+        updated = state.last_update.strftime("%H:%M:%S") if state.last_update else "waiting for data"
+        self.put(rows - 1, 0, f"q: quit   last update {updated}", curses.A_DIM)
+        self.screen.refresh()
+
+
+async def monitor_loop(screen, ha_url: str, ha_token: str, hz: float, history: int):
+    """Follow the entities over WebSocket and redraw at `hz` until q is pressed."""
+    state = DashboardState(history)
+    dashboard = Dashboard(screen, state, ha_url)
+    client = HomeAssistantClient(ha_url, ha_token)
+    await client.connect()
+    try:
+        watched = {STILL_ENERGY, BED_OCCUPIED, K_ON, K_OFF, STATE_REASON}
+
+        def on_state_changed(event: Dict) -> None:
+            data = event.get('data', {})
+            if data.get('entity_id') in watched and data.get('new_state'):
+                state.update(data['entity_id'], data['new_state'])
+
+        await client.subscribe_events(on_state_changed)
+        for entity in await client.get_states():
+            if entity['entity_id'] in watched:
+                state.update(entity['entity_id'], entity)
+
+        interval = 1.0 / min(max(hz, 0.1), MAX_HZ)
+        loop = asyncio.get_running_loop()
+        next_frame = loop.time()
+        while True:
+            key = screen.getch()
+            if key in (ord('q'), ord('Q')):
+                return
+            state.sample()
+            dashboard.draw()
+            next_frame += interval
+            await asyncio.sleep(max(next_frame - loop.time(), 0))
+    finally:
+        await client.disconnect()
 
 
 def main():
     """Main entry point."""
+    parser = argparse.ArgumentParser(description='Real-time bed presence monitor')
+    parser.add_argument('--hz', type=float, default=MAX_HZ,
+                        help=f'Redraws per second, at most {MAX_HZ:.0f} (default: {MAX_HZ:.0f})')
+    parser.add_argument('--history', type=int, default=600,
+                        help='Chart samples kept; the chart shows the newest that fit (default: 600)')
+    args = parser.parse_args()
+
     ha_url, ha_token = get_ha_config()
 
     print(f"\n{Colors.OKCYAN}Connecting to Home Assistant at {ha_url}...{Colors.ENDC}\n")
@@ -287,11 +390,13 @@ def main():
         print(f"{Colors.FAIL}ERROR: Connection failed: {e}{Colors.ENDC}")
         sys.exit(1)
 
-    print(f"{Colors.OKGREEN}✓ Connected successfully{Colors.ENDC}\n")
-    time.sleep(1)
+    if get_entity_state(ha_url, ha_token, BED_OCCUPIED) is None:
+        print(f"{Colors.FAIL}ERROR: {BED_OCCUPIED} not found{Colors.ENDC}")
+        print("Make sure the device is online and entity names are correct.")
+        sys.exit(1)
 
-    clear_screen()
-    monitor_loop(ha_url, ha_token)
+    curses.wrapper(lambda screen: asyncio.run(monitor_loop(screen, ha_url, ha_token, args.hz, args.history)))
+    print(f"{Colors.OKGREEN}Monitoring stopped by user{Colors.ENDC}")
 
 
 if __name__ == '__main__':
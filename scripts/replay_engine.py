@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Bulk Host Replay of the Bed Presence Engine
+
+Runs recorded or synthetic frames through the real firmware state machine,
+compiled for the host as libbed_presence_replay.so (esphome/replay/build.sh).
+Whole NumPy arrays go across in one call: inputs are passed by pointer when
+they already have the right dtype, and the per-frame states and ON/OFF events
+are written straight into preallocated output arrays.
+
+Usage:
+    # Build the library once
+    ./esphome/replay/build.sh
+
+    # Replay frames saved by stream_frames.py and compare with the device
+    python3 replay_engine.py frames.npy
+
+    # Try other thresholds on the same recording
+    python3 replay_engine.py frames.npy --k-on 7 --k-off 3 --mu 6.2 --sigma 2.9
+
+From Python:
+    from replay_engine import EngineReplay
+    with EngineReplay(k_on=7.0) as engine:
+        states, events = engine.run(timestamps_ms, energies, distances)
+
+Requires numpy.
+"""
+
+import argparse
+import ctypes
+import os
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from stream_frames import Colors, DISTANCE_NONE, STATE_MASK, STATE_NAMES
+
+API_VERSION = 2
+DEFAULT_LIBRARY = Path(__file__).resolve().parent.parent / 'esphome' / 'replay' / 'libbed_presence_replay.so'
+
+DETECTORS = {'threshold': 0, 'cusum': 1}
+PREFILTERS = {'none': 0, 'median': 1, 'ewma': 2, 'kalman': 3}
+
+
+# Mirrors bed_presence_replay.h
+class ReplayConfig(ctypes.Structure):
+    _fields_ = [
+        ('mu', ctypes.c_float),
+        ('sigma', ctypes.c_float),
+        ('k_on', ctypes.c_float),
+        ('k_off', ctypes.c_float),
+        ('on_debounce_ms', ctypes.c_uint32),
+        ('off_debounce_ms', ctypes.c_uint32),
+        ('abs_clear_delay_ms', ctypes.c_uint32),
+        ('d_min_cm', ctypes.c_float),
+        ('d_max_cm', ctypes.c_float),
+        ('detector', ctypes.c_uint8),
+        ('cusum_h_on', ctypes.c_float),
+        ('cusum_h_off', ctypes.c_float),
+        ('prefilter_mode', ctypes.c_uint8),
+        ('prefilter_window', ctypes.c_uint8),
+        ('prefilter_alpha', ctypes.c_float),
+        ('prefilter_process_noise', ctypes.c_float),
+        ('prefilter_measurement_noise', ctypes.c_float),
+    ]
+
+
+# bp_replay_event, including the C struct's tail padding
+EVENT_DTYPE = np.dtype([('index', '<u4'), ('occupied', 'u1')], align=True)
+
+
+def load_library(path: Optional[str] = None) -> ctypes.CDLL:
+    """Load the replay library and declare its signatures."""
+    path = path or os.environ.get('BED_PRESENCE_REPLAY_LIB') or str(DEFAULT_LIBRARY)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; build it with esphome/replay/build.sh")
+    lib = ctypes.CDLL(path)
+
+    lib.bp_replay_api_version.restype = ctypes.c_int
+    lib.bp_replay_api_version.argtypes = []
+    lib.bp_replay_default_config.restype = None
+    lib.bp_replay_default_config.argtypes = [ctypes.POINTER(ReplayConfig)]
+    lib.bp_replay_create.restype = ctypes.c_void_p
+    lib.bp_replay_create.argtypes = [ctypes.POINTER(ReplayConfig)]
+    lib.bp_replay_destroy.restype = None
+    lib.bp_replay_destroy.argtypes = [ctypes.c_void_p]
+    lib.bp_replay_update.restype = None
+    lib.bp_replay_update.argtypes = [ctypes.c_void_p, ctypes.POINTER(ReplayConfig)]
+    lib.bp_replay_run.restype = ctypes.c_size_t
+    lib.bp_replay_run.argtypes = [
+        ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t,
+        ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t,
+    ]
+
+    version = lib.bp_replay_api_version()
+    if version != API_VERSION:
+        raise RuntimeError(f"{path} has replay API version {version}, expected {API_VERSION}")
+    return lib
+
+
+def _pointer(array: Optional[np.ndarray]) -> Optional[int]:
+    return None if array is None else array.ctypes.data
+
+
+class EngineReplay:
+    """One engine instance; successive run() calls continue the same timeline.
+
+    Keyword arguments override fields of the firmware defaults (see ReplayConfig).
+    The library keeps a single process-wide clock that each run() sets frame by
+    frame, so engines may take turns but must not run from several threads at once.
+    """
+
+    def __init__(self, library: Optional[str] = None, **overrides):
+        self.handle = None
+        self.lib = load_library(library)
+        self.config = ReplayConfig()
+        self.lib.bp_replay_default_config(ctypes.byref(self.config))
+        self._override(overrides)
+        self.handle = self.lib.bp_replay_create(ctypes.byref(self.config))
+
+    def _override(self, overrides):
+        for name, value in overrides.items():
+            if value is None:
+                continue
+            if not hasattr(self.config, name):
+                raise ValueError(f"Unknown engine setting: {name}")
+            setattr(self.config, name, value)
+
+    def update(self, **overrides):
+        """Change knobs or the baseline mid-replay, as the Home Assistant number entities do.
+
+        The state machine keeps its state and timers. Detector and prefilter
+        settings only take effect at construction.
+        """
+        self._override(overrides)
+        self.lib.bp_replay_update(self.handle, ctypes.byref(self.config))
+
+    def close(self):
+        if self.handle:
+            self.lib.bp_replay_destroy(self.handle)
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def run(self, timestamps_ms: np.ndarray, energies: np.ndarray,
+            distances: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Replay frames; returns (states, events).
+
+        timestamps_ms (uint32), energies and distances (float32, NaN = no reading)
+        are passed without copying when they are already contiguous in those
+        dtypes. states is one State value per frame; events is an EVENT_DTYPE
+        array of (frame index, occupied) for every ON/OFF publish.
+        """
+        timestamps_ms = np.ascontiguousarray(timestamps_ms, dtype=np.uint32)
+        energies = np.ascontiguousarray(energies, dtype=np.float32)
+        if distances is not None:
+            distances = np.ascontiguousarray(distances, dtype=np.float32)
+        count = len(timestamps_ms)
+        if len(energies) != count or (distances is not None and len(distances) != count):
+            raise ValueError("timestamps_ms, energies and distances must have the same length")
+
+        # A publish needs at least one frame, so one slot per frame always suffices
+        states = np.empty(count, dtype=np.uint8)
+        events = np.empty(count, dtype=EVENT_DTYPE)
+        written = self.lib.bp_replay_run(
+            self.handle, _pointer(timestamps_ms), _pointer(energies), _pointer(distances), count,
+            _pointer(states), _pointer(events), count)
+        return states, events[:written]
+
+
+def frames_to_inputs(frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Engine inputs from stream frames or frame log records saved by stream_frames.py."""
+    if 'timestamp_ms' in frames.dtype.names:
+        timestamps = frames['timestamp_ms']
+    else:
+        timestamps = np.cumsum(frames['dt_ms'], dtype=np.uint32)
+    distances = frames['distance_cm'].astype(np.float32)
+    distances[frames['distance_cm'] == DISTANCE_NONE] = np.nan
+    return timestamps, frames['still_energy'].astype(np.float32), distances
+
+
+def print_events(events: np.ndarray, timestamps: np.ndarray):
+    start = int(timestamps[0]) if len(timestamps) else 0
+    for index, occupied in events[['index', 'occupied']].tolist():
+        seconds = (int(timestamps[index]) - start) / 1000.0
+        label = f"{Colors.OKGREEN}ON {Colors.ENDC}" if occupied else f"{Colors.OKBLUE}OFF{Colors.ENDC}"
+        print(f"  {seconds:9.1f}s  frame {index:<8} {label}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded frames through the bed presence engine')
+    parser.add_argument('frames', type=str,
+                        help='.npy file saved by stream_frames.py --npy')
+    parser.add_argument('--lib', type=str, default=None,
+                        help=f'Replay library (default: $BED_PRESENCE_REPLAY_LIB or {DEFAULT_LIBRARY})')
+    parser.add_argument('--mu', type=float, default=None, help='Baseline mean of still energy')
+    parser.add_argument('--sigma', type=float, default=None, help='Baseline std of still energy')
+    parser.add_argument('--k-on', type=float, default=None, help='ON threshold multiplier')
+    parser.add_argument('--k-off', type=float, default=None, help='OFF threshold multiplier')
+    parser.add_argument('--on-debounce-ms', type=int, default=None, help='ON debounce (ms)')
+    parser.add_argument('--off-debounce-ms', type=int, default=None, help='OFF debounce (ms)')
+    parser.add_argument('--abs-clear-delay-ms', type=int, default=None, help='Absolute clear delay (ms)')
+    parser.add_argument('--d-min-cm', type=float, default=None, help='Minimum distance (cm)')
+    parser.add_argument('--d-max-cm', type=float, default=None, help='Maximum distance (cm)')
+    parser.add_argument('--detector', choices=DETECTORS, default=None, help='Detector mode')
+    parser.add_argument('--prefilter', choices=PREFILTERS, default=None, help='Energy prefilter')
+    args = parser.parse_args()
+
+    frames = np.load(args.frames)
+    timestamps, energies, distances = frames_to_inputs(frames)
+    print(f"📂 Replaying {Colors.OKCYAN}{args.frames}{Colors.ENDC}: {len(frames)} frames")
+
+    with EngineReplay(
+            args.lib, mu=args.mu, sigma=args.sigma, k_on=args.k_on, k_off=args.k_off,
+            on_debounce_ms=args.on_debounce_ms, off_debounce_ms=args.off_debounce_ms,
+            abs_clear_delay_ms=args.abs_clear_delay_ms, d_min_cm=args.d_min_cm, d_max_cm=args.d_max_cm,
+            detector=DETECTORS.get(args.detector), prefilter_mode=PREFILTERS.get(args.prefilter)) as engine:
+        states, events = engine.run(timestamps, energies, distances)
+
+    print(f"\n{Colors.HEADER}{Colors.BOLD}Replay events{Colors.ENDC}")
+    print_events(events, timestamps)
+    print(f"  Total: {len(events)}")
+
+    recorded = frames['flags'] & STATE_MASK
+    agreement = np.count_nonzero(states == recorded) / max(len(frames), 1)
+    print(f"\n{Colors.HEADER}{Colors.BOLD}State agreement with the recording{Colors.ENDC}")
+    print(f"  All states:  {agreement * 100:5.1f}%")
+    for state, name in enumerate(STATE_NAMES):
+        replayed = np.count_nonzero(states == state) / max(len(frames), 1)
+        device = np.count_nonzero(recorded == state) / max(len(frames), 1)
+        print(f"  {name:<15} replay {replayed * 100:5.1f}%  device {device * 100:5.1f}%")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"\n{Colors.FAIL}❌ Unexpected error: {e}{Colors.ENDC}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
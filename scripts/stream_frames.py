@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Raw LD2410 Frame Reader for the Bed Presence Engine
+
+Reads the engine's full-rate binary frame stream (frame_stream: in the ESPHome
+config) or a frame log dump (GET /bed_presence/frames) and decodes it with
+NumPy structured arrays over memoryviews of the receive buffer, so frames are
+never copied or parsed one by one.
+
+Usage:
+    # Stream for 60 seconds and save the frames
+    python3 stream_frames.py --host 192.168.0.160 --duration 60 --npy frames.npy
+
+    # Decode a frame log captured around a transition
+    curl http://192.168.0.160/bed_presence/frames -o frames.bin
+    python3 stream_frames.py --dump frames.bin
+
+Requires numpy.
+"""
+
+import argparse
+import socket
+import sys
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+
+# ANSI color codes for terminal output
+class Colors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKCYAN = '\033[96m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+
+# Wire formats (little endian), mirroring frame_stream.h / frame_log.h
+STREAM_FRAME_DTYPE = np.dtype([
+    ('timestamp_ms', '<u4'),
+    ('sequence', '<u2'),
+    ('distance_cm', '<u2'),
+    ('still_energy', 'u1'),
+    ('move_energy', 'u1'),
+    ('flags', 'u1'),
+    ('zones', 'u1'),
+])
+FRAME_RECORD_DTYPE = np.dtype([
+    ('dt_ms', '<u2'),
+    ('distance_cm', '<u2'),
+    ('still_energy', 'u1'),
+    ('move_energy', 'u1'),
+    ('flags', 'u1'),
+    ('zones', 'u1'),
+])
+STREAM_HELLO_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', 'u1'), ('frame_size', 'u1'), ('reserved', '<u2'),
+])
+FRAME_LOG_HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', 'u1'), ('record_size', 'u1'), ('count', '<u2'),
+    ('last_timestamp_ms', '<u4'), ('trigger_index', '<u2'), ('reserved', '<u2'),
+])
+
+STATE_MASK = 0x03
+FLAG_CALIBRATING = 0x40
+FLAG_TRANSITION = 0x80
+DISTANCE_NONE = 0xFFFF
+STATE_NAMES = ['IDLE', 'DEBOUNCING_ON', 'PRESENT', 'DEBOUNCING_OFF']
+
+
+class FrameStreamReader:
+    """Reads the device's TCP frame stream into one preallocated buffer.
+
+    Arrays yielded by batches() are views into the receive buffer and are only
+    valid until the next batch is read; copy them to keep them.
+    """
+
+    def __init__(self, host: str, port: int = 6055, batch_frames: int = 256, timeout: float = 5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.buffer = bytearray(batch_frames * STREAM_FRAME_DTYPE.itemsize)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+        self._read_hello()
+
+    def _read_hello(self):
+        hello = bytearray(STREAM_HELLO_DTYPE.itemsize)
+        view = memoryview(hello)
+        received = 0
+        while received < len(hello):
+            n = self.sock.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("Stream closed before hello")
+            received += n
+        header = np.frombuffer(hello, dtype=STREAM_HELLO_DTYPE)[0]
+        if header['magic'] != b'BPFS' or header['frame_size'] != STREAM_FRAME_DTYPE.itemsize:
+            raise ValueError(f"Unexpected stream header: {header}")
+
+    def batches(self) -> Iterator[np.ndarray]:
+        frame_size = STREAM_FRAME_DTYPE.itemsize
+        while True:
+            n = self.sock.recv_into(self.view[self.filled:])
+            if n == 0:
+                return
+            self.filled += n
+            complete = self.filled // frame_size
+            if complete == 0:
+                continue
+            yield np.frombuffer(self.view[:complete * frame_size], dtype=STREAM_FRAME_DTYPE)
+
+            # Carry a partial trailing frame (< 12 bytes) to the front of the buffer
+            leftover = self.filled - complete * frame_size
+            if leftover:
+                self.view[:leftover] = self.view[complete * frame_size:self.filled]
+            self.filled = leftover
+
+    def close(self):
+        self.sock.close()
+
+
+def count_dropped(frames: np.ndarray, previous_sequence: Optional[int]) -> int:
+    """Frames dropped on the device, from gaps in the 16-bit sequence numbers."""
+    if len(frames) == 0:
+        return 0
+    sequence = frames['sequence'].astype(np.int64)
+    gaps = (np.diff(sequence) - 1) % 65536
+    dropped = int(gaps.sum())
+    if previous_sequence is not None:
+        dropped += (int(sequence[0]) - previous_sequence - 1) % 65536
+    return dropped
+
+
+def read_frame_log(path: str):
+    """Decode a frame log dump; returns (header, records) as zero-copy views of the file data."""
+    with open(path, 'rb') as f:
+        data = memoryview(f.read())
+    header = np.frombuffer(data[:FRAME_LOG_HEADER_DTYPE.itemsize], dtype=FRAME_LOG_HEADER_DTYPE)[0]
+    if header['magic'] != b'BPFL' or header['record_size'] != FRAME_RECORD_DTYPE.itemsize:
+        raise ValueError(f"Not a frame log dump: {path}")
+    records = np.frombuffer(data, dtype=FRAME_RECORD_DTYPE, count=int(header['count']),
+                            offset=FRAME_LOG_HEADER_DTYPE.itemsize)
+    return header, records
+
+
+def frame_log_timestamps(header, records: np.ndarray) -> np.ndarray:
+    """Absolute millis() per record, reconstructed backwards from the newest one."""
+    elapsed = np.cumsum(records['dt_ms'][::-1][:-1].astype(np.int64))
+    offsets = np.concatenate(([0], elapsed))[::-1]
+    return int(header['last_timestamp_ms']) - offsets
+
+
+def print_summary(frames: np.ndarray, seconds: float, dropped: int):
+    states = frames['flags'] & STATE_MASK
+    transitions = np.count_nonzero(frames['flags'] & FLAG_TRANSITION)
+    distances = frames['distance_cm'][frames['distance_cm'] != DISTANCE_NONE]
+
+    print(f"\n{Colors.HEADER}{Colors.BOLD}Frame summary{Colors.ENDC}")
+    print(f"  Frames:      {len(frames)}" + (f" ({len(frames) / seconds:.1f} Hz)" if seconds > 0 else ""))
+    if dropped:
+        print(f"  {Colors.WARNING}Dropped:     {dropped} (device-side backpressure){Colors.ENDC}")
+    else:
+        print("  Dropped:     0")
+    print(f"  Transitions: {transitions}")
+    if len(frames):
+        still = frames['still_energy']
+        print(f"  Still energy: min={still.min()} median={np.median(still):.0f} max={still.max()}")
+    if len(distances):
+        print(f"  Distance:    min={distances.min()}cm median={np.median(distances):.0f}cm max={distances.max()}cm")
+    for state, name in enumerate(STATE_NAMES):
+        share = np.count_nonzero(states == state) / max(len(frames), 1)
+        print(f"  {name:<15} {share * 100:5.1f}%")
+
+
+def stream(args):
+    reader = FrameStreamReader(args.host, args.port)
+    print(f"🔗 Streaming from {Colors.OKCYAN}{args.host}:{args.port}{Colors.ENDC} "
+          f"for {args.duration}s (Ctrl+C to stop)")
+
+    chunks = []
+    dropped = 0
+    last_sequence = None
+    start = time.monotonic()
+    try:
+        for batch in reader.batches():
+            dropped += count_dropped(batch, last_sequence)
+            last_sequence = int(batch['sequence'][-1])
+            chunks.append(batch.copy())
+            if time.monotonic() - start >= args.duration:
+                break
+    except KeyboardInterrupt:
+        print(f"\n{Colors.WARNING}⚠️  Interrupted by user{Colors.ENDC}")
+    finally:
+        reader.close()
+
+    frames = np.concatenate(chunks) if chunks else np.empty(0, dtype=STREAM_FRAME_DTYPE)
+    print_summary(frames, time.monotonic() - start, dropped)
+    if args.npy:
+        np.save(args.npy, frames)
+        print(f"{Colors.OKGREEN}💾 Frames saved to: {args.npy}{Colors.ENDC}")
+
+
+def dump(args):
+    header, records = read_frame_log(args.dump)
+    timestamps = frame_log_timestamps(header, records)
+    span = (timestamps[-1] - timestamps[0]) / 1000.0 if len(records) else 0.0
+    print(f"📂 Frame log {Colors.OKCYAN}{args.dump}{Colors.ENDC}: {len(records)} frames over {span:.1f}s")
+
+    trigger = int(header['trigger_index'])
+    if trigger != 0xFFFF:
+        state = STATE_NAMES[records['flags'][trigger] & STATE_MASK]
+        print(f"   Frozen after transition to {Colors.BOLD}{state}{Colors.ENDC} at frame {trigger} "
+              f"({(timestamps[-1] - timestamps[trigger]) / 1000.0:.1f}s before the end)")
+    print_summary(records, span, 0)
+    if args.npy:
+        np.save(args.npy, records)
+        print(f"{Colors.OKGREEN}💾 Frames saved to: {args.npy}{Colors.ENDC}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read raw LD2410 frames from the bed presence engine')
+    parser.add_argument('--host', type=str, default=None,
+                        help='Device hostname or IP for the TCP frame stream')
+    parser.add_argument('--port', type=int, default=6055,
+                        help='Frame stream port (default: 6055)')
+    parser.add_argument('--duration', type=float, default=60.0,
+                        help='Streaming duration in seconds (default: 60)')
+    parser.add_argument('--dump', type=str, default=None,
+                        help='Decode a frame log dump instead of streaming')
+    parser.add_argument('--npy', type=str, default=None,
+                        help='Save decoded frames to a .npy file')
+    args = parser.parse_args()
+
+    if args.dump:
+        dump(args)
+    elif args.host:
+        stream(args)
+    else:
+        parser.error('either --host or --dump is required')
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except Exception as e:
+        print(f"\n{Colors.FAIL}❌ Unexpected error: {e}{Colors.ENDC}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,43 @@
+"""
+Shared fixtures for the End-to-End integration tests.
+
+One authenticated WebSocket client is opened per test session (per worker
+under pytest-xdist) and reused by every test; see README_PHASE2.md.
+"""
+
+import os
+
+import pytest
+import pytest_asyncio
+from fake_ha import FakeHomeAssistant
+from hass_ws import HomeAssistantClient
+
+
+def pytest_configure(config):
+    # Provided by pytest-xdist; registered here so runs without it stay warning-free
+    config.addinivalue_line(
+        "markers",
+        "xdist_group(name): run tests sharing device state on the same xdist worker",
+    )
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def ha_client():
+    """Session-wide authenticated Home Assistant WebSocket client"""
+    url = os.getenv("HA_URL")
+    token = os.getenv("HA_TOKEN")
+    fake = None
+
+    if os.getenv("HA_FAKE"):
+        fake = FakeHomeAssistant()
+        await fake.start()
+        url, token = fake.url, fake.token
+    elif not url or not token:
+        pytest.skip("HA_URL and HA_TOKEN environment variables must be set (or HA_FAKE=1)")
+
+    client = HomeAssistantClient(url, token)
+    await client.connect()
+    yield client
+    await client.disconnect()
+    if fake:
+        await fake.stop()
@@ -0,0 +1,921 @@
+"""
+Local stand-in for Home Assistant, for running the E2E suite and scripts offline.
+
+Implements the subset of the HA APIs used by HomeAssistantClient and the
+scripts/ pollers:
+- WebSocket: auth handshake, get_states, get_services,
+  config/device_registry/list, config/entity_registry/list, call_service,
+  subscribe_events, unsubscribe_events, ping
+- REST: GET /api/, GET /api/states[/<entity_id>],
+  POST /api/services/<domain>/<service>, GET /api/history/period[/<start>]
+
+Entities belong to simulated bed devices. Each one runs the engine's
+threshold state machine over a frame source: Gaussian vacant noise by default,
+or frames saved by scripts/stream_frames.py or scripts/generate_sessions.py.
+The state machine is the real firmware engine from the replay library
+(esphome/replay/build.sh) when it is built, else a Python model of it. It
+publishes the firmware's entities, services, reason strings and change
+reasons. The calibration wizard helpers, scripts and status automation from
+homeassistant/configuration_helpers.yaml are modelled too.
+
+Usage:
+    # Run the E2E suite against the stand-in
+    HA_FAKE=1 pytest tests/e2e
+
+    # Standalone, for the scripts (HA_URL=http://localhost:8123 HA_TOKEN=fake-token)
+    python3 fake_ha.py --port 8123 --frames corpus/night_000.npy --speed 10
+
+    # Require the firmware engine (fails if libbed_presence_replay.so is not built)
+    python3 fake_ha.py --engine replay
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import random
+import statistics
+import sys
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from aiohttp import WSMsgType, web
+
+HA_VERSION = "2024.10.0"
+DEFAULT_TOKEN = "fake-token"
+FRAME_INTERVAL_MS = 100
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent.parent / "scripts"
+
+# auto: the replay library when it is built, else the Python model
+ENGINES = ("auto", "replay", "model")
+
+IDLE, DEBOUNCING_ON, PRESENT, DEBOUNCING_OFF = range(4)
+
+# (still energy %, moving energy %, distance cm or None)
+Frame = Tuple[float, float, Optional[float]]
+
+# Number entities: knob, entity suffix, friendly name, default, min, max, step, unit
+NUMBER_KNOBS = [
+    ("k_on", "k_on_on_threshold_multiplier", "k_on (ON Threshold Multiplier)", 9.0, 0.0, 15.0, 0.1, None),
+    ("k_off", "k_off_off_threshold_multiplier", "k_off (OFF Threshold Multiplier)", 4.0, 0.0, 15.0, 0.1, None),
+    ("on_debounce_ms", "on_debounce_timer_ms", "On Debounce Timer (ms)", 3000, 0, 60000, 100, "ms"),
+    ("off_debounce_ms", "off_debounce_timer_ms", "Off Debounce Timer (ms)", 5000, 0, 60000, 100, "ms"),
+    ("abs_clear_delay_ms", "absolute_clear_delay_ms", "Absolute Clear Delay (ms)", 30000, 0, 300000, 1000, "ms"),
+    ("d_min_cm", "distance_min_cm", "Distance Min (cm)", 0.0, 0, 600, 5, "cm"),
+    ("d_max_cm", "distance_max_cm", "Distance Max (cm)", 600.0, 50, 600, 5, "cm"),
+]
+DEFAULT_KNOBS = {knob: default for knob, _, _, default, *_ in NUMBER_KNOBS}
+DEFAULT_MU = 6.7
+DEFAULT_SIGMA = 3.5
+
+# Mirrors profiles: in esphome/packages/presence_engine.yaml
+PROFILES = {
+    "night": dict(DEFAULT_KNOBS),
+    "day": dict(DEFAULT_KNOBS, k_on=10.0, on_debounce_ms=10000, off_debounce_ms=3000, abs_clear_delay_ms=15000),
+}
+
+# ESPHome services from esphome/packages/services_calibration.yaml, with their variables
+DEVICE_SERVICES = {
+    "start_calibration": {"duration_s": "int"},
+    "calibrate_start_baseline": {"duration_s": "int"},
+    "stop_calibration": {},
+    "calibrate_stop": {},
+    "reset_to_defaults": {},
+    "calibrate_reset_all": {},
+    "activate_profile": {"profile": "string"},
+    "freeze_frame_log": {},
+    "resume_frame_log": {},
+    "log_latency_histograms": {},
+    "reset_latency_histograms": {},
+    "publish_occupancy_summary": {},
+}
+
+CALIBRATION_STEPS = [
+    "Idle", "Awaiting Empty Bed Confirmation", "Collecting Samples", "Finalizing", "Completed", "Error",
+]
+
+
+class ServiceNotFound(Exception):
+    """Raised for a call to a service that is not registered."""
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_timestamp(text: str) -> datetime:
+    """ISO 8601 timestamp as HA's history API reads it: without an offset it is UTC."""
+    stamp = datetime.fromisoformat(text)
+    return stamp if stamp.tzinfo is not None else stamp.replace(tzinfo=timezone.utc)
+
+
+def _replay_engine(library: Optional[str] = None, **settings: Any) -> Any:
+    """An EngineReplay from scripts/replay_engine.py, or None without numpy or the built library."""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    try:
+        from replay_engine import EngineReplay
+        return EngineReplay(library, **settings)
+    except (ImportError, FileNotFoundError):
+        return None
+
+
+def _engine_settings(knobs: Dict[str, float]) -> Dict[str, Any]:
+    """Knob values as ReplayConfig fields (the timers are integer milliseconds there)."""
+    return {knob: int(value) if knob.endswith("_ms") else float(value) for knob, value in knobs.items()}
+
+
+def vacant_frames(seed: Optional[int] = None, mu: float = DEFAULT_MU, sigma: float = DEFAULT_SIGMA) -> Iterator[Frame]:
+    """Endless empty-bed frames: Gaussian still energy around the default baseline, no target."""
+    rng = random.Random(seed)
+    while True:
+        yield max(0.0, round(rng.gauss(mu, sigma))), max(0.0, round(rng.gauss(3.0, 2.0))), None
+
+
+def npy_frames(path: str, loop: bool = True) -> Iterator[Frame]:
+    """Frames from a .npy saved by stream_frames.py or generate_sessions.py, looped by default."""
+    import numpy as np
+
+    frames = np.load(path)
+    still = frames["still_energy"].tolist()
+    moving = frames["move_energy"].tolist()
+    distance = [None if d == 0xFFFF else float(d) for d in frames["distance_cm"].tolist()]
+    while True:
+        yield from zip(still, moving, distance)
+        if not loop:
+            return
+
+
+class StateStore:
+    """Entity states, state_changed fan-out and a bounded history per entity."""
+
+    def __init__(self, history_size: int = 2000) -> None:
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.history: Dict[str, Deque[Tuple[datetime, Dict[str, Any]]]] = {}
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._history_size = history_size
+
+    def set(self, entity_id: str, state: Any, attributes: Optional[Dict[str, Any]] = None) -> bool:
+        """Set a state; fires state_changed and returns True only if something changed."""
+        old = self.states.get(entity_id)
+        state = str(state)
+        if attributes is None:
+            attributes = old["attributes"] if old else {}
+        if old is not None and old["state"] == state and old["attributes"] == attributes:
+            return False
+
+        now = _now()
+        stamp = now.isoformat()
+        context = {"id": uuid.uuid4().hex, "parent_id": None, "user_id": None}
+        new = {
+            "entity_id": entity_id,
+            "state": state,
+            "attributes": attributes,
+            "last_changed": stamp if old is None or old["state"] != state else old["last_changed"],
+            "last_updated": stamp,
+            "context": context,
+        }
+        self.states[entity_id] = new
+        if entity_id not in self.history:
+            self.history[entity_id] = deque(maxlen=self._history_size)
+        self.history[entity_id].append((now, new))
+
+        event = {
+            "event_type": "state_changed",
+            "data": {"entity_id": entity_id, "old_state": old, "new_state": new},
+            "origin": "LOCAL",
+            "time_fired": stamp,
+            "context": context,
+        }
+        for listener in list(self.listeners):
+            listener(event)
+        return True
+
+    def get(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        return self.states.get(entity_id)
+
+
+class SimulatedBed:
+    """One bed presence device: the engine's threshold state machine over a frame source."""
+
+    def __init__(self, store: StateStore, name: str = "bed_presence_detector",
+                 frames: Optional[Iterable[Frame]] = None, engine: str = "auto",
+                 library: Optional[str] = None) -> None:
+        """engine is one of ENGINES; library overrides the replay library path."""
+        self.store = store
+        self.name = name
+        self.friendly_name = name.replace("_", " ").title()
+        self.device_id = uuid.uuid5(uuid.NAMESPACE_DNS, name).hex
+        self.frames = iter(frames) if frames is not None else vacant_frames()
+
+        self.knobs = dict(DEFAULT_KNOBS)
+        self.mu = DEFAULT_MU
+        self.sigma = DEFAULT_SIGMA
+        self.state = IDLE
+        self.occupied = False
+        self.now_ms = 0
+        self.debounce_start_ms = 0
+        self.last_high_confidence_ms = 0
+        self.distance: Optional[float] = None
+        self.calibration_samples: Optional[List[float]] = None
+        self.calibration_end_ms = 0
+        self.active_profile = "none"
+        self.entities: List[str] = []
+
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.library = library
+        self.replay = self.create_replay() if engine != "model" else None
+        if engine == "replay" and self.replay is None:
+            raise RuntimeError("Replay library not available; build it with esphome/replay/build.sh")
+
+    def create_replay(self) -> Any:
+        """A firmware engine with the current baseline and knobs, starting in IDLE."""
+        return _replay_engine(self.library, mu=self.mu, sigma=self.sigma, **_engine_settings(self.knobs))
+
+    @property
+    def engine(self) -> str:
+        return "model" if self.replay is None else "replay"
+
+    def entity_id(self, domain: str, suffix: str) -> str:
+        return f"{domain}.{self.name}_{suffix}"
+
+    @property
+    def number_entities(self) -> Dict[str, str]:
+        """Number entity id -> knob."""
+        return {self.entity_id("number", suffix): knob for knob, suffix, *_ in NUMBER_KNOBS}
+
+    def registry_entry(self) -> Dict[str, Any]:
+        mac = self.device_id[:12]
+        return {
+            "id": self.device_id,
+            "area_id": None,
+            "config_entries": [uuid.uuid5(uuid.NAMESPACE_OID, self.name).hex],
+            "configuration_url": None,
+            "connections": [["mac", ":".join(mac[i:i + 2] for i in range(0, 12, 2))]],
+            "disabled_by": None,
+            "entry_type": None,
+            "hw_version": None,
+            "identifiers": [["esphome", mac]],
+            "manufacturer": "Espressif",
+            "model": "m5stack-atom",
+            "name": self.friendly_name,
+            "name_by_user": None,
+            "sw_version": "2024.10.0 (ESPHome)",
+            "via_device_id": None,
+        }
+
+    def entity_registry_entries(self) -> List[Dict[str, Any]]:
+        return [{
+            "entity_id": entity_id,
+            "id": uuid.uuid5(uuid.NAMESPACE_OID, entity_id).hex,
+            "unique_id": f"{self.device_id[:12]}-{entity_id.split('.', 1)[1]}",
+            "platform": "esphome",
+            "device_id": self.device_id,
+            "config_entry_id": uuid.uuid5(uuid.NAMESPACE_OID, self.name).hex,
+            "area_id": None,
+            "disabled_by": None,
+            "hidden_by": None,
+            "entity_category": None,
+            "has_entity_name": True,
+            "name": None,
+            "original_name": None,
+        } for entity_id in self.entities]
+
+    def publish_all(self) -> None:
+        """Publish every entity, as when the device connects."""
+        existing = set(self.store.states)
+        for knob, suffix, friendly, _, minimum, maximum, step, unit in NUMBER_KNOBS:
+            attributes = {"min": minimum, "max": maximum, "step": step, "mode": "box",
+                          "friendly_name": f"{self.friendly_name} {friendly}"}
+            if unit:
+                attributes["unit_of_measurement"] = unit
+            self.store.set(self.entity_id("number", suffix), float(self.knobs[knob]), attributes)
+        self.store.set(self.entity_id("binary_sensor", "bed_occupied"), "off",
+                       {"device_class": "occupancy", "friendly_name": f"{self.friendly_name} Bed Occupied"})
+        for suffix, friendly, unit in (("ld2410_still_energy", "LD2410 Still Energy", "%"),
+                                       ("ld2410_moving_energy", "LD2410 Moving Energy", "%"),
+                                       ("ld2410_still_distance", "LD2410 Still Distance", "cm")):
+            self.store.set(self.entity_id("sensor", suffix), "unknown",
+                           {"unit_of_measurement": unit, "state_class": "measurement",
+                            "friendly_name": f"{self.friendly_name} {friendly}"})
+        self.store.set(self.entity_id("sensor", "presence_state_reason"), "Initial state: IDLE",
+                       {"friendly_name": f"{self.friendly_name} Presence State Reason"})
+        self.store.set(self.entity_id("sensor", "presence_change_reason"), "idle:init",
+                       {"friendly_name": f"{self.friendly_name} Presence Change Reason"})
+        self.store.set(self.entity_id("sensor", "presence_active_profile"), self.active_profile,
+                       {"friendly_name": f"{self.friendly_name} Presence Active Profile"})
+        self.entities = [entity_id for entity_id in self.store.states if entity_id not in existing]
+        # The device has been streaming before HA sees it
+        self.step()
+
+    # Frames
+
+    def step(self) -> None:
+        """Consume one frame, as the device's loop() does."""
+        self.now_ms += FRAME_INTERVAL_MS
+        still, moving, distance = next(self.frames)
+        self.store.set(self.entity_id("sensor", "ld2410_still_energy"), int(still))
+        self.store.set(self.entity_id("sensor", "ld2410_moving_energy"), int(moving))
+        if distance is not None:
+            self.distance = distance
+            self.store.set(self.entity_id("sensor", "ld2410_still_distance"), int(distance))
+
+        in_window = self.distance is None or self.knobs["d_min_cm"] <= self.distance <= self.knobs["d_max_cm"]
+        if in_window and self.calibration_samples is not None:
+            self.calibration_samples.append(still)
+            if self.now_ms >= self.calibration_end_ms:
+                self.finalize_calibration()
+        z = (still - self.mu) / self.sigma
+        if self.replay is not None:
+            self.run_replay(still, distance, z)
+        elif in_window:
+            self.run_state_machine(z)
+
+    def run_replay(self, still: float, distance: Optional[float], z: float) -> None:
+        """Feed the frame to the firmware engine, which applies the distance window itself."""
+        states, events = self.replay.run([self.now_ms], [still], [math.nan if distance is None else distance])
+        self.state = int(states[0])
+        if len(events):
+            if events[0]["occupied"]:
+                self.publish_occupied(True, f"ON: z={z:.2f}, debounced {int(self.knobs['on_debounce_ms'])}ms",
+                                      "on:threshold_exceeded")
+            else:
+                self.publish_occupied(False, f"OFF: z={z:.2f}, debounced {int(self.knobs['off_debounce_ms'])}ms",
+                                      "off:abs_clear_delay")
+
+    def run_state_machine(self, z: float) -> None:
+        """Same transitions as BedPresenceEngine::run_state_machine (threshold detector)."""
+        now = self.now_ms
+        k_on, k_off = self.knobs["k_on"], self.knobs["k_off"]
+        if self.state == IDLE:
+            if z >= k_on:
+                self.debounce_start_ms = now
+                self.state = DEBOUNCING_ON
+        elif self.state == DEBOUNCING_ON:
+            if z < k_on:
+                self.state = IDLE
+            elif now - self.debounce_start_ms >= self.knobs["on_debounce_ms"]:
+                self.state = PRESENT
+                self.last_high_confidence_ms = now
+                self.publish_occupied(True, f"ON: z={z:.2f}, debounced {int(self.knobs['on_debounce_ms'])}ms",
+                                      "on:threshold_exceeded")
+        elif self.state == PRESENT:
+            if z > k_on:
+                self.last_high_confidence_ms = now
+            if z < k_off and now - self.last_high_confidence_ms >= self.knobs["abs_clear_delay_ms"]:
+                self.debounce_start_ms = now
+                self.state = DEBOUNCING_OFF
+        elif self.state == DEBOUNCING_OFF:
+            if z < k_off:
+                if now - self.debounce_start_ms >= self.knobs["off_debounce_ms"]:
+                    self.state = IDLE
+                    self.publish_occupied(False, f"OFF: z={z:.2f}, debounced {int(self.knobs['off_debounce_ms'])}ms",
+                                          "off:abs_clear_delay")
+            elif z >= k_on:
+                self.state = PRESENT
+                self.last_high_confidence_ms = now
+
+    def publish_occupied(self, occupied: bool, reason: str, change_reason: str) -> None:
+        self.occupied = occupied
+        self.store.set(self.entity_id("binary_sensor", "bed_occupied"), "on" if occupied else "off")
+        self.publish_reason(reason, change_reason)
+
+    def publish_reason(self, reason: str, change_reason: str) -> None:
+        self.store.set(self.entity_id("sensor", "presence_state_reason"), reason)
+        self.store.set(self.entity_id("sensor", "presence_change_reason"), change_reason)
+
+    # Services
+
+    def set_knob(self, knob: str, value: float) -> None:
+        self.knobs[knob] = value
+        if self.replay is not None:
+            self.replay.update(**_engine_settings({knob: value}))
+        suffix = next(suffix for name, suffix, *_ in NUMBER_KNOBS if name == knob)
+        self.store.set(self.entity_id("number", suffix), float(value))
+
+    def start_calibration(self, duration_s: int) -> None:
+        if duration_s <= 0:
+            return
+        self.calibration_samples = []
+        self.calibration_end_ms = self.now_ms + int(duration_s) * 1000
+        self.publish_reason("Calibration started", "calibration:started")
+
+    def stop_calibration(self) -> None:
+        if self.calibration_samples is not None:
+            self.finalize_calibration()
+
+    def finalize_calibration(self) -> None:
+        samples, self.calibration_samples = self.calibration_samples or [], None
+        if not samples:
+            self.publish_reason("Calibration failed: no samples", "calibration:insufficient_samples")
+            return
+        median = statistics.median(samples)
+        sigma = max(statistics.median(abs(s - median) for s in samples) * 1.4826, 0.05)
+        self.mu, self.sigma = median, sigma
+        if self.replay is not None:
+            self.replay.update(mu=median, sigma=sigma)
+        self.publish_reason(f"Calibration complete: μ={median:.2f}, σ={sigma:.2f}, n={len(samples)}",
+                            "calibration:completed")
+
+    def reset_to_defaults(self) -> None:
+        self.mu, self.sigma = DEFAULT_MU, DEFAULT_SIGMA
+        for knob, value in DEFAULT_KNOBS.items():
+            self.set_knob(knob, value)
+        self.calibration_samples = None
+        if self.replay is not None:
+            self.replay.close()
+            self.replay = self.create_replay()
+        self.active_profile = "none"
+        self.store.set(self.entity_id("sensor", "presence_active_profile"), self.active_profile)
+        self.state = IDLE
+        self.occupied = False
+        self.store.set(self.entity_id("binary_sensor", "bed_occupied"), "off")
+        self.publish_reason("Reset to defaults", "off:reset_to_defaults")
+
+    def activate_profile(self, profile: str) -> None:
+        if profile not in PROFILES:
+            return
+        for knob, value in PROFILES[profile].items():
+            self.set_knob(knob, value)
+        self.active_profile = profile
+        self.store.set(self.entity_id("sensor", "presence_active_profile"), profile)
+
+    def services(self) -> Dict[str, Callable[[Dict[str, Any]], None]]:
+        """esphome.<name>_<service> handlers."""
+        def noop(data: Dict[str, Any]) -> None:
+            pass
+
+        handlers = {service: noop for service in DEVICE_SERVICES}
+        handlers.update({
+            "start_calibration": lambda data: self.start_calibration(int(data.get("duration_s", 0))),
+            "calibrate_start_baseline": lambda data: self.start_calibration(int(data.get("duration_s", 0))),
+            "stop_calibration": lambda data: self.stop_calibration(),
+            "calibrate_stop": lambda data: self.stop_calibration(),
+            "reset_to_defaults": lambda data: self.reset_to_defaults(),
+            "calibrate_reset_all": lambda data: self.reset_to_defaults(),
+            "activate_profile": lambda data: self.activate_profile(str(data.get("profile", ""))),
+        })
+        return {f"{self.name}_{service}": handler for service, handler in handlers.items()}
+
+
+class _Connection:
+    """One authenticated WebSocket: ordered outgoing queue and event subscriptions."""
+
+    def __init__(self, ws: web.WebSocketResponse) -> None:
+        self.ws = ws
+        self.subscriptions: Dict[int, Optional[str]] = {}
+        self._outgoing: asyncio.Queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write())
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self._outgoing.put_nowait(message)
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        for subscription, event_type in self.subscriptions.items():
+            if event_type is None or event_type == event["event_type"]:
+                self.send({"id": subscription, "type": "event", "event": event})
+
+    async def _write(self) -> None:
+        while True:
+            message = await self._outgoing.get()
+            if self.ws.closed:
+                return
+            await self.ws.send_str(json.dumps(message))
+
+    async def close(self) -> None:
+        self._writer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._writer
+
+
+class FakeHomeAssistant:
+    """aiohttp server speaking the HA WebSocket/REST subset, backed by simulated beds."""
+
+    def __init__(self, *, devices: int = 1, frames: Optional[Callable[[int], Iterable[Frame]]] = None,
+                 speed: float = 1.0, token: str = DEFAULT_TOKEN, history_size: int = 2000,
+                 engine: str = "auto") -> None:
+        """frames(i) gives the frame source of device i (default: vacant noise seeded with i).
+
+        speed scales simulated time: 10.0 runs frames at 100 Hz, 0 freezes every device.
+        engine picks each device's state machine (see ENGINES).
+        """
+        self.token = token
+        self.speed = speed
+        self.store = StateStore(history_size)
+        self.devices = [
+            SimulatedBed(self.store, "bed_presence_detector" if i == 0 else f"bed_presence_detector_{i + 1}",
+                         frames(i) if frames is not None else vacant_frames(seed=i), engine)
+            for i in range(devices)
+        ]
+        self._numbers = {entity_id: (device, knob) for device in self.devices
+                         for entity_id, knob in device.number_entities.items()}
+        self._services: Dict[str, Dict[str, Callable[[Dict[str, Any]], Any]]] = {}
+        self._service_fields: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._connections: List[_Connection] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self.port = 0
+
+        self._register_services()
+        for device in self.devices:
+            device.publish_all()
+        self._publish_helpers()
+        self.store.listeners.append(self._calibration_status_automation)
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}/api/websocket"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        app = web.Application(middlewares=[self._auth_middleware])
+        app.router.add_get("/api/websocket", self._websocket)
+        app.router.add_get("/api/", self._api_status)
+        app.router.add_get("/api/states", self._rest_states)
+        app.router.add_get("/api/states/{entity_id}", self._rest_state)
+        app.router.add_post("/api/services/{domain}/{service}", self._rest_call_service)
+        app.router.add_get("/api/history/period", self._rest_history)
+        app.router.add_get("/api/history/period/{start}", self._rest_history)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._tasks.add(asyncio.create_task(self._run_devices()))
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, set()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        for connection in list(self._connections):
+            await connection.ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> FakeHomeAssistant:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    async def _run_devices(self) -> None:
+        """Step every device at the native frame rate, scaled by speed."""
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+        owed = 0.0
+        while True:
+            await asyncio.sleep(0.05)
+            now = loop.time()
+            owed += (now - last) * self.speed * 1000.0 / FRAME_INTERVAL_MS
+            last = now
+            for _ in range(int(owed)):
+                for device in self.devices:
+                    device.step()
+            owed -= int(owed)
+
+    # Services
+
+    def _register(self, domain: str, service: str, handler: Callable[[Dict[str, Any]], Any],
+                  variables: Optional[Dict[str, str]] = None) -> None:
+        self._services.setdefault(domain, {})[service] = handler
+        self._service_fields[(domain, service)] = {
+            name: {"required": True, "selector": {"number" if kind == "int" else "text": {}}}
+            for name, kind in (variables or {}).items()
+        }
+
+    def _register_services(self) -> None:
+        for device in self.devices:
+            for service, handler in device.services().items():
+                self._register("esphome", service, handler, DEVICE_SERVICES[service[len(device.name) + 1:]])
+
+        self._register("number", "set_value", self._number_set_value)
+        self._register("input_boolean", "turn_on", lambda data: self._set_helpers(data, "on"))
+        self._register("input_boolean", "turn_off", lambda data: self._set_helpers(data, "off"))
+        self._register("input_select", "select_option", lambda data: self._set_helpers(data, data["option"]))
+        self._register("input_number", "set_value", lambda data: self._set_helpers(data, float(data["value"])))
+        self._register("input_datetime", "set_datetime", lambda data: self._set_helpers(data, data["datetime"]))
+
+        scripts = {
+            "bed_presence_start_baseline_calibration": self._script_start_calibration,
+            "bed_presence_cancel_baseline_calibration": self._script_cancel_calibration,
+            "bed_presence_reset_calibration_defaults": self._script_reset_defaults,
+        }
+        scripts["calibrate_vacant_mode"] = scripts["bed_presence_start_baseline_calibration"]
+        for name, script in scripts.items():
+            self._register("script", name, lambda data, script=script: self._run_script(script))
+
+    def describe_services(self) -> Dict[str, Dict[str, Any]]:
+        """get_services payload, with the variables of the ESPHome services as fields."""
+        return {
+            domain: {service: {"name": service, "description": "", "fields": self._service_fields[(domain, service)]}
+                     for service in services}
+            for domain, services in self._services.items()
+        }
+
+    async def call_service(self, domain: str, service: str, data: Dict[str, Any]) -> None:
+        handler = self._services.get(domain, {}).get(service)
+        if handler is None:
+            raise ServiceNotFound(f"Service {domain}.{service} not found.")
+        result = handler(data)
+        if asyncio.iscoroutine(result):
+            await result
+
+    def _number_set_value(self, data: Dict[str, Any]) -> None:
+        for entity_id in self._entity_ids(data):
+            if entity_id not in self._numbers:
+                raise ValueError(f"Unknown number entity: {entity_id}")
+            device, knob = self._numbers[entity_id]
+            attributes = self.store.get(entity_id)["attributes"]
+            value = float(data["value"])
+            if not attributes["min"] <= value <= attributes["max"]:
+                raise ValueError(f"Value {value} for {entity_id} is outside valid range "
+                                 f"{attributes['min']} - {attributes['max']}")
+            device.set_knob(knob, value)
+
+    @staticmethod
+    def _entity_ids(data: Dict[str, Any]) -> List[str]:
+        entity_ids = data.get("entity_id", [])
+        return [entity_ids] if isinstance(entity_ids, str) else list(entity_ids)
+
+    # Calibration wizard (homeassistant/configuration_helpers.yaml)
+
+    def _publish_helpers(self) -> None:
+        self.store.set("input_select.bed_presence_calibration_step", "Idle",
+                       {"options": CALIBRATION_STEPS, "friendly_name": "Bed Presence Calibration Step"})
+        self.store.set("input_boolean.bed_presence_calibration_confirm_empty_bed", "off",
+                       {"friendly_name": "Confirm Bed Is Empty"})
+        self.store.set("input_boolean.bed_presence_calibration_in_progress", "off",
+                       {"friendly_name": "Calibration In Progress"})
+        self.store.set("input_number.bed_presence_calibration_duration_seconds", 60.0,
+                       {"min": 30, "max": 300, "step": 15, "mode": "slider", "unit_of_measurement": "s",
+                        "friendly_name": "Calibration Duration (seconds)"})
+        self.store.set("input_datetime.bed_presence_last_calibration", "unknown",
+                       {"has_date": True, "has_time": True, "friendly_name": "Last Calibration Completed"})
+        for name in ("bed_presence_start_baseline_calibration", "bed_presence_cancel_baseline_calibration",
+                     "bed_presence_reset_calibration_defaults", "calibrate_vacant_mode"):
+            self.store.set(f"script.{name}", "off", {"friendly_name": name})
+
+    def _set_helpers(self, data: Dict[str, Any], state: Any) -> None:
+        for entity_id in self._entity_ids(data):
+            if entity_id not in self.store.states:
+                raise ValueError(f"Unknown helper entity: {entity_id}")
+            self.store.set(entity_id, state)
+
+    def _helper(self, entity_id: str) -> str:
+        return self.store.states[entity_id]["state"]
+
+    async def _run_script(self, script: Callable[[], Awaitable[None]]) -> None:
+        # HA returns from script.<name> once the script has started; the sequence runs on
+        task = asyncio.create_task(script())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _script_start_calibration(self) -> None:
+        device = self.devices[0]
+        duration = max(int(float(self._helper("input_number.bed_presence_calibration_duration_seconds"))), 10)
+        if self._helper("input_boolean.bed_presence_calibration_confirm_empty_bed") != "on":
+            self.store.set("input_select.bed_presence_calibration_step", "Awaiting Empty Bed Confirmation")
+            return
+
+        self.store.set("input_boolean.bed_presence_calibration_in_progress", "on")
+        self.store.set("input_select.bed_presence_calibration_step", "Collecting Samples")
+        done = asyncio.get_running_loop().create_future()
+        change_reason = device.entity_id("sensor", "presence_change_reason")
+
+        def wait_for_trigger(event: Dict[str, Any]) -> None:
+            new_state = event["data"]["new_state"]
+            if (event["data"]["entity_id"] == change_reason and not done.done() and
+                    new_state["state"] in ("calibration:completed", "calibration:insufficient_samples")):
+                done.set_result(True)
+
+        self.store.listeners.append(wait_for_trigger)
+        try:
+            device.start_calibration(duration)
+            self.store.set("input_boolean.bed_presence_calibration_confirm_empty_bed", "off")
+            try:
+                await asyncio.wait_for(done, timeout=duration / self.speed if self.speed > 0 else None)
+            except asyncio.TimeoutError:
+                # The script calls calibrate_stop first, but the device's result only arrives
+                # after the step is set, so the status automation's Completed lands last
+                self.store.set("input_select.bed_presence_calibration_step", "Finalizing")
+                device.stop_calibration()
+        finally:
+            self.store.listeners.remove(wait_for_trigger)
+
+    async def _script_cancel_calibration(self) -> None:
+        self.devices[0].stop_calibration()
+        self.store.set("input_boolean.bed_presence_calibration_in_progress", "off")
+        self.store.set("input_boolean.bed_presence_calibration_confirm_empty_bed", "off")
+        self.store.set("input_select.bed_presence_calibration_step", "Idle")
+
+    async def _script_reset_defaults(self) -> None:
+        self.devices[0].reset_to_defaults()
+        self.store.set("input_boolean.bed_presence_calibration_in_progress", "off")
+        self.store.set("input_boolean.bed_presence_calibration_confirm_empty_bed", "off")
+        self.store.set("input_select.bed_presence_calibration_step", "Idle")
+
+    def _calibration_status_automation(self, event: Dict[str, Any]) -> None:
+        """The bed_presence_calibration_status automation."""
+        if event["data"]["entity_id"] != self.devices[0].entity_id("sensor", "presence_change_reason"):
+            return
+        state = event["data"]["new_state"]["state"]
+        if "calibration:completed" in state:
+            self.store.set("input_select.bed_presence_calibration_step", "Completed")
+            self.store.set("input_datetime.bed_presence_last_calibration", _now().strftime("%Y-%m-%d %H:%M:%S"))
+        elif "calibration:insufficient_samples" in state:
+            self.store.set("input_select.bed_presence_calibration_step", "Error")
+        else:
+            return
+        self.store.set("input_boolean.bed_presence_calibration_in_progress", "off")
+        self.store.set("input_boolean.bed_presence_calibration_confirm_empty_bed", "off")
+
+    # WebSocket API
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json({"type": "auth_required", "ha_version": HA_VERSION})
+        auth = await ws.receive_json()
+        if auth.get("type") != "auth" or auth.get("access_token") != self.token:
+            await ws.send_json({"type": "auth_invalid", "message": "Invalid access token or password"})
+            await ws.close()
+            return ws
+        await ws.send_json({"type": "auth_ok", "ha_version": HA_VERSION})
+
+        connection = _Connection(ws)
+        self._connections.append(connection)
+        self.store.listeners.append(connection.on_event)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    await self._handle_command(connection, json.loads(msg.data))
+                elif msg.type in (WSMsgType.CLOSED, WSMsgType.ERROR):
+                    break
+        finally:
+            self.store.listeners.remove(connection.on_event)
+            self._connections.remove(connection)
+            await connection.close()
+        return ws
+
+    async def _handle_command(self, connection: _Connection, message: Dict[str, Any]) -> None:
+        msg_id = message.get("id")
+        kind = message.get("type")
+
+        def result(value: Any = None) -> None:
+            connection.send({"id": msg_id, "type": "result", "success": True, "result": value})
+
+        def error(code: str, text: str) -> None:
+            connection.send({"id": msg_id, "type": "result", "success": False,
+                             "error": {"code": code, "message": text}})
+
+        if kind == "get_states":
+            result(list(self.store.states.values()))
+        elif kind == "get_services":
+            result(self.describe_services())
+        elif kind == "config/device_registry/list":
+            result([device.registry_entry() for device in self.devices])
+        elif kind == "config/entity_registry/list":
+            result([entry for device in self.devices for entry in device.entity_registry_entries()])
+        elif kind == "call_service":
+            data = dict(message.get("service_data") or {})
+            data.update(message.get("target") or {})
+            try:
+                await self.call_service(message.get("domain", ""), message.get("service", ""), data)
+            except ServiceNotFound as e:
+                error("not_found", str(e))
+            except (KeyError, ValueError) as e:
+                error("home_assistant_error", str(e))
+            else:
+                result({"context": {"id": uuid.uuid4().hex, "parent_id": None, "user_id": None}})
+        elif kind == "subscribe_events":
+            connection.subscriptions[msg_id] = message.get("event_type")
+            result()
+        elif kind == "unsubscribe_events":
+            if connection.subscriptions.pop(message.get("subscription"), False) is False:
+                error("not_found", "Subscription not found.")
+            else:
+                result()
+        elif kind == "ping":
+            connection.send({"id": msg_id, "type": "pong"})
+        else:
+            error("unknown_command", f"Unknown command: {kind}")
+
+    # REST API
+
+    @web.middleware
+    async def _auth_middleware(self, request: web.Request, handler: Callable) -> web.StreamResponse:
+        if request.path != "/api/websocket" and request.headers.get("Authorization") != f"Bearer {self.token}":
+            return web.json_response({"message": "401: Unauthorized"}, status=401)
+        return await handler(request)
+
+    async def _api_status(self, request: web.Request) -> web.Response:
+        return web.json_response({"message": "API running."})
+
+    async def _rest_states(self, request: web.Request) -> web.Response:
+        return web.json_response(list(self.store.states.values()))
+
+    async def _rest_state(self, request: web.Request) -> web.Response:
+        state = self.store.get(request.match_info["entity_id"])
+        if state is None:
+            return web.json_response({"message": "Entity not found."}, status=404)
+        return web.json_response(state)
+
+    async def _rest_call_service(self, request: web.Request) -> web.Response:
+        data = await request.json() if request.can_read_body else {}
+        changed: List[Dict[str, Any]] = []
+
+        def collect(event: Dict[str, Any]) -> None:
+            changed.append(event["data"]["new_state"])
+
+        self.store.listeners.append(collect)
+        try:
+            await self.call_service(request.match_info["domain"], request.match_info["service"], data)
+        except ServiceNotFound as e:
+            return web.json_response({"message": str(e)}, status=400)
+        except (KeyError, ValueError) as e:
+            return web.json_response({"message": str(e)}, status=400)
+        finally:
+            self.store.listeners.remove(collect)
+        return web.json_response(changed)
+
+    async def _rest_history(self, request: web.Request) -> web.Response:
+        """History in HA's shape: one list of states per entity, oldest first."""
+        start_text = request.match_info.get("start")
+        end_text = request.query.get("end_time")
+        try:
+            start = _parse_timestamp(start_text) if start_text else _now() - timedelta(days=1)
+        except ValueError:
+            return web.json_response({"message": "Invalid datetime"}, status=400)
+        try:
+            end = _parse_timestamp(end_text) if end_text else _now()
+        except ValueError:
+            return web.json_response({"message": "Invalid end_time"}, status=400)
+        minimal = "minimal_response" in request.query
+        no_attributes = "no_attributes" in request.query
+        entity_ids = [e for e in request.query.get("filter_entity_id", "").split(",") if e]
+        if not entity_ids:
+            return web.json_response({"message": "filter_entity_id is missing"}, status=400)
+
+        history = []
+        for entity_id in entity_ids:
+            states = [state for stamp, state in self.store.history.get(entity_id, ()) if start <= stamp <= end]
+            rows = []
+            for i, state in enumerate(states):
+                if minimal and i > 0:
+                    rows.append({"state": state["state"], "last_changed": state["last_changed"]})
+                elif no_attributes:
+                    rows.append({key: value for key, value in state.items() if key != "attributes"})
+                else:
+                    rows.append(state)
+            if rows:
+                history.append(rows)
+        return web.json_response(history)
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    frames = (lambda i: npy_frames(args.frames)) if args.frames else None
+    server = FakeHomeAssistant(devices=args.devices, frames=frames, speed=args.speed, token=args.token,
+                               engine=args.engine)
+    await server.start(args.host, args.port)
+    engine = server.devices[0].engine if server.devices else "none"
+    print(f"Fake Home Assistant on {server.http_url} ({args.devices} device(s), {engine} engine, "
+          f"token '{server.token}')")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local Home Assistant stand-in with simulated bed devices")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8123, help="Port (default: 8123)")
+    parser.add_argument("--token", default=DEFAULT_TOKEN, help=f"Accepted access token (default: {DEFAULT_TOKEN})")
+    parser.add_argument("--devices", type=int, default=1, help="Number of simulated beds (default: 1)")
+    parser.add_argument("--frames", default=None, help="Frame source .npy (default: vacant noise)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Simulated time multiplier (default: 1)")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="State machine: the replay library, the Python model, or auto (default: auto)")
+    args = parser.parse_args()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,8 @@ Lightweight Home Assistant WebSocket client used by the E2E tests.
 The official HA WebSocket API is documented at:
 https://developers.home-assistant.io/docs/api/websocket/#websocket-api
 This helper implements just enough of the protocol for the Phase 3
-integration tests (state queries, service calls, registry access).
+integration tests (state queries, service calls, registry access, event
+subscriptions and waiting on state changes).
 """
 
 from __future__ import annotations
@@ -12,7 +13,7 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import json
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlparse, urlunparse
 
 import aiohttp
@@ -31,6 +32,10 @@ class HomeAssistantClient:
         self._pending: Dict[int, asyncio.Future] = {}
         self._msg_id = 0
         self._id_lock = asyncio.Lock()
+        self._subscriptions: Dict[int, Callable[[Dict[str, Any]], None]] = {}
+        self._state_subscription: Optional[int] = None
+        self._state_subscription_lock = asyncio.Lock()
+        self._state_waiters: Dict[str, List[Tuple[Callable[[Dict[str, Any]], bool], asyncio.Future]]] = {}
 
     async def connect(self) -> None:
         """Open WebSocket connection and authenticate."""
@@ -76,19 +81,37 @@ class HomeAssistantClient:
             if not fut.done():
                 fut.set_exception(RuntimeError("Connection closed"))
 
+        # Subscriptions end with the connection
+        self._subscriptions.clear()
+        self._state_subscription = None
+        for waiters in self._state_waiters.values():
+            for _, fut in waiters:
+                if not fut.done():
+                    fut.set_exception(RuntimeError("Connection closed"))
+
+    async def wait_closed(self) -> None:
+        """Return once the connection has dropped (at once if not connected)."""
+        if self._listener_task is not None:
+            await asyncio.wait([self._listener_task])
+
+    async def _next_id(self) -> int:
+        async with self._id_lock:
+            self._msg_id += 1
+            return self._msg_id
+
     async def _send_command(
         self,
         payload: Dict[str, Any],
         *,
         timeout: Optional[float] = None,
+        msg_id: Optional[int] = None,
     ) -> Any:
         """Send a command and wait for the matching response."""
         if not self._ws:
             raise RuntimeError("Client is not connected")
 
-        async with self._id_lock:
-            self._msg_id += 1
-            msg_id = self._msg_id
+        if msg_id is None:
+            msg_id = await self._next_id()
 
         fut: asyncio.Future = asyncio.get_running_loop().create_future()
         self._pending[msg_id] = fut
@@ -111,7 +134,11 @@ class HomeAssistantClient:
                 if msg.type == aiohttp.WSMsgType.TEXT:
                     data = json.loads(msg.data)
                     msg_id = data.get("id")
-                    if msg_id is not None and msg_id in self._pending:
+                    if data.get("type") == "event":
+                        callback = self._subscriptions.get(msg_id)
+                        if callback is not None:
+                            callback(data["event"])
+                    elif msg_id is not None and msg_id in self._pending:
                         fut = self._pending.pop(msg_id)
                         if data.get("type") == "result" and data.get("success", True):
                             fut.set_result(data.get("result"))
@@ -135,6 +162,16 @@ class HomeAssistantClient:
         result = await self._send_command({"type": "config/device_registry/list"})
         return result or []
 
+    async def get_entities(self) -> List[Dict[str, Any]]:
+        """Return the full entity registry."""
+        result = await self._send_command({"type": "config/entity_registry/list"})
+        return result or []
+
+    async def get_states(self) -> List[Dict[str, Any]]:
+        """Return the current state of every entity."""
+        result = await self._send_command({"type": "get_states"})
+        return result or []
+
     async def get_services(self) -> Dict[str, Any]:
         """Return available services keyed by domain."""
         result = await self._send_command({"type": "get_services"})
@@ -142,9 +179,9 @@ class HomeAssistantClient:
 
     async def get_state(self, entity_id: str) -> Optional[Dict[str, Any]]:
         """Fetch the state dictionary for the given entity."""
-        states = await self._send_command({"type": "get_states"})
+        states = await self.get_states()
         return next(
-            (s for s in (states or []) if s["entity_id"] == entity_id),
+            (s for s in states if s["entity_id"] == entity_id),
             None,
         )
 
@@ -163,6 +200,86 @@ class HomeAssistantClient:
         }
         return await self._send_command(payload)
 
+    async def subscribe_events(
+        self,
+        callback: Callable[[Dict[str, Any]], None],
+        event_type: Optional[str] = "state_changed",
+    ) -> int:
+        """Call callback with every event of the given type; returns the subscription id."""
+        msg_id = await self._next_id()
+        # Registered before sending so no event between the result and our return is lost
+        self._subscriptions[msg_id] = callback
+        payload: Dict[str, Any] = {"type": "subscribe_events"}
+        if event_type is not None:
+            payload["event_type"] = event_type
+        try:
+            await self._send_command(payload, msg_id=msg_id)
+        except BaseException:
+            self._subscriptions.pop(msg_id, None)
+            raise
+        return msg_id
+
+    async def unsubscribe_events(self, subscription: int) -> None:
+        """Stop a subscription made with subscribe_events()."""
+        self._subscriptions.pop(subscription, None)
+        await self._send_command({"type": "unsubscribe_events", "subscription": subscription})
+
+    async def wait_for_state(
+        self,
+        entity_id: str,
+        predicate: Callable[[Dict[str, Any]], bool],
+        *,
+        timeout: float = 10.0,
+    ) -> Dict[str, Any]:
+        """Return the entity's state as soon as predicate(state) holds.
+
+        Checks the current state, then waits on state_changed events; all waits
+        share one subscription. Predicates that raise (e.g. float() of
+        "unavailable") count as not satisfied. Raises TimeoutError with the last
+        state seen.
+        """
+        await self._ensure_state_subscription()
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        waiter = (predicate, fut)
+        waiters = self._state_waiters.setdefault(entity_id, [])
+        waiters.append(waiter)
+        last = None
+        try:
+            last = await self.get_state(entity_id)
+            if last is not None and not fut.done() and self._matches(predicate, last):
+                fut.set_result(last)
+            return await asyncio.wait_for(fut, timeout=timeout)
+        except asyncio.TimeoutError:
+            latest = await self.get_state(entity_id)
+            state = (latest or last or {}).get("state")
+            raise TimeoutError(f"{entity_id} did not reach the expected state within {timeout}s "
+                               f"(last state: {state!r})") from None
+        finally:
+            waiters.remove(waiter)
+            if not waiters:
+                self._state_waiters.pop(entity_id, None)
+
+    async def _ensure_state_subscription(self) -> None:
+        async with self._state_subscription_lock:
+            if self._state_subscription is None:
+                self._state_subscription = await self.subscribe_events(self._on_state_changed)
+
+    def _on_state_changed(self, event: Dict[str, Any]) -> None:
+        data = event.get("data", {})
+        new_state = data.get("new_state")
+        if new_state is None:
+            return
+        for predicate, fut in self._state_waiters.get(data.get("entity_id"), ()):
+            if not fut.done() and self._matches(predicate, new_state):
+                fut.set_result(new_state)
+
+    @staticmethod
+    def _matches(predicate: Callable[[Dict[str, Any]], bool], state: Dict[str, Any]) -> bool:
+        try:
+            return bool(predicate(state))
+        except (TypeError, ValueError, KeyError):
+            return False
+
     @staticmethod
     def _normalize_url(url: str) -> str:
         """Convert http(s) URLs into ws(s) endpoints if needed."""
@@ -0,0 +1,224 @@
+"""
+Tests for the local Home Assistant stand-in (fake_ha.py).
+
+These cover the REST endpoints and event subscriptions used by the scripts,
+which test_calibration_flow.py does not exercise, and check the Python state
+machine model against the firmware engine. They need no HA or device.
+"""
+
+import asyncio
+import itertools
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from fake_ha import FakeHomeAssistant, SimulatedBed, StateStore, vacant_frames
+from hass_ws import HomeAssistantClient
+
+BUILD_SCRIPT = Path(__file__).resolve().parent.parent.parent / "esphome" / "replay" / "build.sh"
+
+
+@pytest_asyncio.fixture
+async def fake_ha():
+    async with FakeHomeAssistant(speed=50.0) as server:
+        yield server
+
+
+@pytest_asyncio.fixture
+async def client(fake_ha):
+    client = HomeAssistantClient(fake_ha.url, fake_ha.token)
+    await client.connect()
+    yield client
+    await client.disconnect()
+
+
+@pytest.fixture(scope="module")
+def replay_library(tmp_path_factory):
+    """The replay library built from the current engine sources (needs numpy and g++)."""
+    pytest.importorskip("numpy")
+    if shutil.which("g++") is None:
+        pytest.skip("g++ is needed to build the replay library")
+    path = tmp_path_factory.mktemp("replay") / "libbed_presence_replay.so"
+    subprocess.run(["bash", str(BUILD_SCRIPT), str(path)], check=True, capture_output=True)
+    return str(path)
+
+
+def session_frames(seed=1):
+    """A stay in bed, bursts around the ON debounce and a target outside the distance window."""
+    rng = random.Random(seed)
+    vacant = vacant_frames(seed)
+
+    def occupied(count, distance):
+        return [(max(0.0, round(rng.gauss(70.0, 8.0))), 20.0, distance) for _ in range(count)]
+
+    return (list(itertools.islice(vacant, 600)) + occupied(400, 150.0)
+            + list(itertools.islice(vacant, 400)) + [(80.0, 30.0, None)] * 25   # 2.5s, under on_debounce_ms
+            + list(itertools.islice(vacant, 275)) + [(80.0, 30.0, None)] * 25   # after on_debounce_ms=1000
+            + list(itertools.islice(vacant, 850)) + occupied(100, 700.0)        # outside the window
+            + [(still, moving, 150.0) for still, moving, _ in itertools.islice(vacant, 400)])
+
+
+@pytest.mark.asyncio
+async def test_rejects_invalid_token(fake_ha):
+    client = HomeAssistantClient(fake_ha.url, "wrong-token")
+    with pytest.raises(RuntimeError, match="Authentication failed"):
+        await client.connect()
+    await client.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_rest_states_and_services(fake_ha):
+    headers = {"Authorization": f"Bearer {fake_ha.token}"}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async with session.get(f"{fake_ha.http_url}/api/states/sensor.bed_presence_detector_ld2410_still_energy") as r:
+            assert r.status == 200
+            assert float((await r.json())["state"]) >= 0
+
+        async with session.get(f"{fake_ha.http_url}/api/states/sensor.missing") as r:
+            assert r.status == 404
+
+        async with session.post(f"{fake_ha.http_url}/api/services/number/set_value",
+                                json={"entity_id": "number.bed_presence_detector_k_on_on_threshold_multiplier",
+                                      "value": 7.5}) as r:
+            changed = await r.json()
+        assert [s["state"] for s in changed] == ["7.5"]
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{fake_ha.http_url}/api/states") as r:
+            assert r.status == 401
+
+
+@pytest.mark.asyncio
+async def test_history_lists_changes_per_entity(fake_ha):
+    await asyncio.sleep(0.3)
+    entity_id = "sensor.bed_presence_detector_ld2410_still_energy"
+    headers = {"Authorization": f"Bearer {fake_ha.token}"}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async with session.get(f"{fake_ha.http_url}/api/history/period",
+                               params={"filter_entity_id": entity_id, "minimal_response": ""}) as r:
+            history = await r.json()
+
+    assert len(history) == 1
+    assert history[0][0]["entity_id"] == entity_id
+    assert len(history[0]) > 10
+    assert set(history[0][1]) == {"state", "last_changed"}
+
+
+@pytest.mark.asyncio
+async def test_history_timestamps(fake_ha):
+    entity_id = "sensor.bed_presence_detector_ld2410_still_energy"
+    headers = {"Authorization": f"Bearer {fake_ha.token}"}
+    async with aiohttp.ClientSession(headers=headers) as session:
+        # No offset means UTC, as in HA
+        async with session.get(f"{fake_ha.http_url}/api/history/period/2020-01-01T00:00:00",
+                               params={"filter_entity_id": entity_id, "end_time": "2099-01-01T00:00:00"}) as r:
+            assert r.status == 200
+            assert len(await r.json()) == 1
+
+        async with session.get(f"{fake_ha.http_url}/api/history/period/yesterday",
+                               params={"filter_entity_id": entity_id}) as r:
+            assert r.status == 400
+            assert "message" in await r.json()
+
+        async with session.get(f"{fake_ha.http_url}/api/history/period",
+                               params={"filter_entity_id": entity_id, "end_time": "soon"}) as r:
+            assert r.status == 400
+
+
+@pytest.mark.asyncio
+async def test_subscribe_events_streams_state_changes(fake_ha, client):
+    changes = []
+    fake_ha.store.listeners.append(lambda event: changes.append(event["data"]["entity_id"]))
+    result = await client._send_command({"type": "subscribe_events", "event_type": "state_changed"})
+    assert result is None
+
+    await client.call_service("esphome", "bed_presence_detector_reset_to_defaults")
+    assert "sensor.bed_presence_detector_presence_change_reason" in changes
+
+
+@pytest.mark.asyncio
+async def test_unknown_service_fails(client):
+    with pytest.raises(RuntimeError, match="not_found"):
+        await client.call_service("esphome", "bed_presence_detector_no_such_service")
+
+
+@pytest.mark.asyncio
+async def test_calibration_wizard_completes(fake_ha, client):
+    await client.call_service("input_number", "set_value",
+                              entity_id="input_number.bed_presence_calibration_duration_seconds", value=30)
+    await client.call_service("input_boolean", "turn_on",
+                              entity_id="input_boolean.bed_presence_calibration_confirm_empty_bed")
+    await client.call_service("script", "bed_presence_start_baseline_calibration")
+
+    # 30 simulated seconds at 50x
+    await client.wait_for_state("input_select.bed_presence_calibration_step",
+                                lambda state: state["state"] == "Completed", timeout=4)
+    reason = await client.get_state("sensor.bed_presence_detector_presence_state_reason")
+    assert reason["state"].startswith("Calibration complete: μ=")
+    in_progress = await client.get_state("input_boolean.bed_presence_calibration_in_progress")
+    assert in_progress["state"] == "off"
+
+
+@pytest.mark.asyncio
+async def test_wait_for_state(client):
+    entity_id = "number.bed_presence_detector_k_on_on_threshold_multiplier"
+    waiting = asyncio.ensure_future(client.wait_for_state(entity_id, lambda state: float(state["state"]) == 6.5))
+    await client.call_service("number", "set_value", entity_id=entity_id, value=6.5)
+    assert (await waiting)["state"] == "6.5"
+
+    # Already satisfied: returns without waiting for an event
+    state = await client.wait_for_state(entity_id, lambda state: state["state"] == "6.5", timeout=0.1)
+    assert state["state"] == "6.5"
+
+    with pytest.raises(TimeoutError, match="last state: '6.5'"):
+        await client.wait_for_state(entity_id, lambda state: state["state"] == "1.0", timeout=0.1)
+
+
+@pytest.mark.asyncio
+async def test_entity_registry_maps_entities_to_devices():
+    async with FakeHomeAssistant(devices=2, speed=0) as server:
+        client = HomeAssistantClient(server.url, server.token)
+        await client.connect()
+        try:
+            devices = {device["id"]: device["name"] for device in await client.get_devices()}
+            entities = await client.get_entities()
+        finally:
+            await client.disconnect()
+
+    owners = {entity["entity_id"]: devices[entity["device_id"]] for entity in entities}
+    assert owners["binary_sensor.bed_presence_detector_bed_occupied"] == "Bed Presence Detector"
+    assert owners["binary_sensor.bed_presence_detector_2_bed_occupied"] == "Bed Presence Detector 2"
+    # Wizard helpers are not device entities
+    assert "input_select.bed_presence_calibration_step" not in owners
+
+
+def test_model_matches_replay_library(replay_library):
+    """The Python model makes the same transitions as the firmware engine on the same frames."""
+    frames = session_frames()
+    runs = {}
+    for engine in ("model", "replay"):
+        bed = SimulatedBed(StateStore(), frames=iter(frames), engine=engine, library=replay_library)
+        assert bed.engine == engine
+        bed.publish_all()
+        states, occupied = [bed.state], [bed.occupied]
+        for index in range(1, len(frames)):
+            if index == 1600:
+                bed.set_knob("on_debounce_ms", 1000.0)
+            elif index == 2100:
+                bed.start_calibration(30)
+            bed.step()
+            states.append(bed.state)
+            occupied.append(bed.occupied)
+        runs[engine] = states, occupied, (bed.mu, bed.sigma)
+
+    model, replay = runs["model"], runs["replay"]
+    assert replay[2] == model[2]
+    mismatches = [index for index, (a, b) in enumerate(zip(model[0], replay[0])) if a != b]
+    assert not mismatches, f"states differ from frame {mismatches[0]} ({len(mismatches)} frames)"
+    assert replay[1] == model[1]
+    # Both stays are detected: ON/OFF for the first, ON for the burst after the knob change
+    assert sum(a != b for a, b in zip(model[1], model[1][1:])) >= 3